@@ -27,14 +27,53 @@ class Settings(BaseSettings):
     HIGGSFIELD_BASE_URL: str = "https://platform.higgsfield.ai"
     HIGGSFIELD_TIMEOUT: int = 300  # seconds
     HIGGSFIELD_RETRIES: int = 3
-    HIGGSFIELD_POLLING_INTERVAL: int = 5  # seconds
+    HIGGSFIELD_POLLING_INTERVAL: Optional[float] = None  # seconds, fixed poll interval (unset: adaptive backoff)
+    HIGGSFIELD_POLL_INITIAL_INTERVAL: float = 1.0  # seconds, first status poll interval
+    HIGGSFIELD_POLL_MAX_INTERVAL: float = 15.0  # seconds, backoff ceiling for long video jobs
     
     # ElevenLabs API
     ELEVENLABS_API_KEY: Optional[str] = None
     ELEVENLABS_BASE_URL: str = "https://api.elevenlabs.io/v1"
     ELEVENLABS_TIMEOUT: int = 300  # seconds
     ELEVENLABS_RETRIES: int = 3
-    ELEVENLABS_POLLING_INTERVAL: int = 5  # seconds
+    ELEVENLABS_POLLING_INTERVAL: Optional[float] = None  # seconds, fixed poll interval (unset: adaptive backoff)
+    ELEVENLABS_POLL_INITIAL_INTERVAL: float = 1.0  # seconds
+    ELEVENLABS_POLL_MAX_INTERVAL: float = 10.0  # seconds
+    ELEVENLABS_POLL_MAX_WAIT: int = 300  # seconds, audio_stack wait per step
+
+    # Shared job poller
+    POLL_BACKOFF_FACTOR: float = 1.5
+    POLLER_MAX_WORKERS: int = 8  # concurrent status requests per tick
+
+    # Pooled HTTP transport shared by provider clients
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    HTTP2_ENABLED: bool = True  # only used when the `h2` package is installed
+
+    # Concurrent provider calls per /mcp/batch request
+    HIGGSFIELD_MAX_CONCURRENCY: int = 4
+    ELEVENLABS_MAX_CONCURRENCY: int = 4
+    BATCH_MAX_CONCURRENCY: int = 8  # actions without provider I/O
+    BATCH_MAX_ITEMS: int = 100
+
+    # Provider rate limiting: token bucket per provider/model + in-flight cap
+    HIGGSFIELD_RATE_LIMIT: float = 2.0  # requests per second (0 = unlimited)
+    HIGGSFIELD_RATE_BURST: int = 5
+    HIGGSFIELD_MAX_IN_FLIGHT: int = 8
+    ELEVENLABS_RATE_LIMIT: float = 2.0
+    ELEVENLABS_RATE_BURST: int = 5
+    ELEVENLABS_MAX_IN_FLIGHT: int = 8
+    PROVIDER_RETRY_BASE_DELAY: float = 1.0  # seconds, doubled per retry
+    PROVIDER_RETRY_MAX_DELAY: float = 30.0
+
+    # Provider circuit breaker (rolling window per provider)
+    BREAKER_WINDOW: float = 60.0  # seconds
+    BREAKER_MIN_CALLS: int = 5
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 60.0  # slower calls count as failures
+    BREAKER_OPEN_SECONDS: float = 30.0  # before half-open probing
+    BREAKER_HALF_OPEN_PROBES: int = 1
     
     # Server settings
     HOST: str = "0.0.0.0"
@@ -43,8 +82,45 @@ class Settings(BaseSettings):
     # Storage settings
     STORAGE_PATH: Optional[str] = None  # Default: Media/ at project root
     STORAGE_DOWNLOAD_ENABLED: bool = True  # Automatically download and store media files
+    STORAGE_DOWNLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # Per file (0 = no limit)
+    STORAGE_DOWNLOAD_RESUME_ATTEMPTS: int = 3  # Range continuations after an interrupted transfer
+    STORAGE_MAX_CONCURRENCY: int = 4  # Concurrent asset downloads/uploads (process-wide)
+    BLOB_STORE_ENABLED: bool = True  # Deduplicate media files by sha256 (hardlinks into data/_system/blobs)
+    BLOB_GC_GRACE_SECONDS: float = 3600.0  # Unreferenced blobs younger than this survive gc
+    MEDIA_UPLOAD_MAX_BYTES: int = 500 * 1024 * 1024  # Project media uploads (0 = no limit)
+    MEDIA_UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    ASSET_CACHE_MAX_AGE: int = 3600  # Browser cache lifetime of served media before revalidation (seconds)
     STORAGE_FTP_ENABLED: bool = False  # Enable SFTP upload for media files
     DATA_PATH: Optional[str] = None  # Default: data/ at project root
+    PIPELINE_CHECKPOINTS_ENABLED: bool = True  # Persist pipeline steps under data/<project>/pipeline_runs
+    JOB_MEMORY_TTL: float = 600.0  # Finished background jobs stay in memory this long (then read from disk)
+
+    # Project state documents (strata, UI strata, chat sessions, RAG metadata)
+    STORAGE_BACKEND: str = "file"  # "file" (JSON files under data/) or "sqlite"
+    STORAGE_SQLITE_PATH: Optional[str] = None  # Default: data/_system/narrations.sqlite3
+    STORAGE_FILE_LOCKS: bool = True  # Advisory lock files (data/_system/locks) so workers serialize project writes
+
+    # Chat sessions (messages are an append-only log per session)
+    CHAT_HISTORY_PAGE_SIZE: int = 50  # Default page of GET /projects/{id}/chat/{session}/messages
+
+    # Chat prompt context: recent turns verbatim + rolling summary of older turns
+    CHAT_CONTEXT_RECENT_TURNS: int = 6  # user/assistant turns kept verbatim
+    CHAT_CONTEXT_MAX_TOKENS: int = 3000  # Hard cap on summary + recent turns (estimated tokens)
+    CHAT_SUMMARY_MAX_TOKENS: int = 600
+    CHAT_SUMMARY_BATCH_TURNS: int = 4  # Turns leaving the window before the summary is refreshed
+    CHAT_SUMMARY_INPUT_MAX_TOKENS: int = 6000  # Per summarization call (longer backlogs are chunked)
+
+    # Strata patch journal (writer patches are appended, strata files rewritten on compaction)
+    STRATA_JOURNAL_ENABLED: bool = True
+    STRATA_JOURNAL_MAX_ENTRIES: int = 200  # Patches before the journal is folded into the strata file
+    STRATA_JOURNAL_MAX_BYTES: int = 4 * 1024 * 1024
+    STRATA_JOURNAL_ARCHIVE: bool = True  # Keep compacted patches in <strata>.journal.archive.jsonl
+
+    # Generation result cache (identical requests reuse the stored asset)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 5000
+    RESULT_CACHE_MAX_AGE: float = 30 * 24 * 3600  # seconds
+    RESULT_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024  # Local assets linked by cached results
 
     # FTP/SFTP settings
     FTP_HOST: Optional[str] = None
@@ -53,6 +129,11 @@ class Settings(BaseSettings):
     FTP_PASSWORD: Optional[str] = None
     FTP_BASE_DIR: str = "/"  # Remote base directory
     FTP_PUBLIC_BASE_URL: Optional[str] = None  # Public base URL to access uploaded files
+    FTP_MAX_SESSIONS: int = 4  # Pooled SFTP sessions (= parallel uploads)
+    FTP_SESSION_IDLE_TIMEOUT: float = 120.0  # seconds before an idle session is reopened
+    FTP_BACKGROUND_UPLOADS: bool = True  # Return the local link, upload in the background
+    FTP_UPLOAD_MAX_ATTEMPTS: int = 5
+    FTP_UPLOAD_RETRY_DELAY: float = 5.0  # seconds, doubled per attempt
 
     # OpenAI (for local agent scripts)
     OPENAI_API_KEY: Optional[str] = None  # Ignored by the server, but allowed in env
@@ -0,0 +1,7 @@
+"""
+Background job engine for long-running MCP actions.
+"""
+from app.jobs.engine import JobEngine, get_job_engine
+from app.jobs.progress import report_progress
+
+__all__ = ["JobEngine", "get_job_engine", "report_progress"]
@@ -0,0 +1,392 @@
+"""
+Background job engine for long-running MCP actions.
+
+A request sent with `background: true` is persisted as a job record and
+answered immediately with a handle. The engine then runs the action on the
+event loop with `wait_for_completion` forced on, so polling, download and
+SFTP upload happen server-side. Every status/progress change is pushed to
+the submitter's SSE session as a `job_update` event and persisted by a
+writer task off the event loop: changes made while a record is being
+written are coalesced into its next write. Finished jobs are dropped from
+memory after JOB_MEMORY_TTL and read back from disk when asked for.
+
+The in-memory state belongs to the event loop: `get` and `list` are
+coroutines that read records from disk in a worker thread, and
+`run_from_thread` serves sync callers running in the threadpool.
+"""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Dict, List, Optional, TypeVar
+from app.config.settings import settings
+from app.jobs.progress import serializable_payload
+from app.mcp.sessions import publish_event
+from app.utils.errors import to_mcp_error
+from app.utils.ids import generate_job_id, generate_timestamp
+from app.utils.logging import logger
+from app.utils.project_storage import atomic_write_text, get_data_root
+
+
+T = TypeVar("T")
+
+ACTIVE_STATUSES = {"queued", "running"}
+TERMINAL_STATUSES = {"completed", "failed"}
+
+# Keep the last N progress entries per job record
+MAX_PROGRESS_ENTRIES = 50
+
+
+class JobEngine:
+    """Runs MCP actions in the background and tracks their state."""
+
+    def __init__(
+        self,
+        store_dir: Optional[Path] = None,
+        notifier: Optional[Callable[[Optional[str], Dict[str, Any]], Any]] = None
+    ):
+        self.store_dir = store_dir or get_data_root() / "_system" / "jobs"
+        self.notifier = notifier or publish_event
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._dirty: Dict[str, None] = {}  # job ids waiting for a write, in order
+        self._writer: Optional[asyncio.Task] = None
+        self._finished: Dict[str, float] = {}  # terminal job id -> monotonic finish time
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # loop owning the state above
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+
+    def _job_path(self, job_id: str) -> Path:
+        safe_job_id = "".join(c for c in job_id if c.isalnum() or c in ("-", "_"))
+        return self.store_dir / f"{safe_job_id}.json"
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self._write(job["job_id"], json.dumps(job, indent=2, ensure_ascii=True, default=str))
+
+    def _write(self, job_id: str, text: str) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self._job_path(job_id), text)
+
+    def _schedule_save(self, job_id: str) -> None:
+        """Queue a job for the writer task (written synchronously outside a loop)."""
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._save(self._jobs[job_id])
+            return
+        self._dirty[job_id] = None
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_dirty())
+
+    async def _write_dirty(self) -> None:
+        """Write queued jobs in a worker thread, each at its latest state."""
+        while self._dirty:
+            job_id = next(iter(self._dirty))
+            self._dirty.pop(job_id)
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            # Serialized on the loop: the record is only mutated here
+            text = json.dumps(job, indent=2, ensure_ascii=True, default=str)
+            try:
+                await asyncio.to_thread(self._write, job_id, text)
+            except Exception as e:
+                logger.error(f"Failed to persist job {job_id}: {e}")
+
+    async def flush(self) -> None:
+        """Wait until every queued job record is on disk."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def _evict(self) -> None:
+        """Drop finished jobs older than JOB_MEMORY_TTL from memory (they stay on disk)."""
+        deadline = time.monotonic() - settings.JOB_MEMORY_TTL
+        for job_id, finished_at in list(self._finished.items()):
+            if finished_at > deadline:
+                break
+            if job_id in self._dirty:
+                continue
+            self._finished.pop(job_id)
+            self._jobs.pop(job_id, None)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._job_path(job_id)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Unreadable job record {path}: {e}")
+            return None
+
+    def _update(self, job_id: str, **changes: Any) -> Dict[str, Any]:
+        """Apply changes to an in-memory job (callers load it first), persist and notify."""
+        job = self._jobs[job_id]
+        job.update(changes)
+        job["updated_at"] = generate_timestamp()
+        self._jobs[job_id] = job
+        if job.get("status") in TERMINAL_STATUSES and job_id not in self._finished:
+            self._finished[job_id] = time.monotonic()
+        self._schedule_save(job_id)
+        self._notify(job)
+        self._evict()
+        return job
+
+    def _notify(self, job: Dict[str, Any]) -> None:
+        message = {
+            "type": "job_update",
+            "job_id": job["job_id"],
+            "action": job.get("action"),
+            "status": job.get("status"),
+            "progress": (job.get("progress") or [None])[-1],
+            "updated_at": job.get("updated_at"),
+        }
+        if job.get("status") in TERMINAL_STATUSES:
+            message["result"] = job.get("result")
+            message["error"] = job.get("error")
+        try:
+            self.notifier(job.get("session_id"), message)
+        except Exception as e:
+            logger.warning(f"Job notifier failed for {job['job_id']}: {e}")
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def submit(
+        self,
+        action: str,
+        payload: Dict[str, Any],
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Persist a job and schedule it on the running event loop.
+
+        Args:
+            action: Registered action name
+            payload: Action payload (may include `_trace`)
+            session_id: SSE session to notify (optional)
+
+        Returns:
+            Job handle returned to the caller
+        """
+        loop = asyncio.get_running_loop()
+        job_id = generate_job_id("engine")
+        created_at = generate_timestamp()
+        run_payload = {**payload, "wait_for_completion": True}
+        job = {
+            "job_id": job_id,
+            "action": action,
+            "status": "queued",
+            "session_id": session_id,
+            "payload": serializable_payload(run_payload),
+            "created_at": created_at,
+            "started_at": None,
+            "completed_at": None,
+            "progress": [],
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        self._update(job_id)
+
+        task = loop.create_task(self._run(job_id, action, run_payload))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        logger.info(f"Job queued: job_id={job_id}, action={action}, session={session_id}")
+        return self.handle(job)
+
+    def handle(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job, shaped like other job status responses."""
+        result = job.get("result") or {}
+        return {
+            "job_id": job["job_id"],
+            "status": job.get("status"),
+            "provider": "engine",
+            "model": job.get("action"),
+            "params": job.get("payload"),
+            "created_at": job.get("created_at"),
+            "completed_at": job.get("completed_at"),
+            "links": result.get("links", []) if isinstance(result, dict) else [],
+            "error": job.get("error"),
+            "progress": job.get("progress", []),
+            "result": job.get("result"),
+        }
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job handle, from memory or from disk."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = await asyncio.to_thread(self._load, job_id)
+        return self.handle(job) if job else None
+
+    def run_from_thread(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine that reads engine state from a sync caller (threadpool handler).
+
+        It runs on the loop that owns the state, or on a fresh loop if none
+        has touched the engine yet.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return asyncio.run(coro)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List known jobs, newest first."""
+        # Snapshot the loop-owned state; the directory scan runs in a worker thread
+        handles = {job_id: self.handle(job) for job_id, job in self._jobs.items()}
+        return await asyncio.to_thread(self._list_records, handles, list(self._dirty), status, limit)
+
+    def _list_records(
+        self,
+        handles: Dict[str, Dict[str, Any]],
+        queued: List[str],
+        status: Optional[str],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        paths = sorted(self.store_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True) \
+            if self.store_dir.exists() else []
+        # Jobs whose first write is still queued are the newest
+        job_ids = [job_id for job_id in queued if not self._job_path(job_id).exists()]
+        job_ids.extend(path.stem for path in paths)
+        jobs = []
+        for job_id in job_ids:
+            handle = handles.get(job_id)
+            if handle is None:
+                job = self._load(job_id)
+                handle = self.handle(job) if job else None
+            if not handle or (status and handle.get("status") != status):
+                continue
+            jobs.append(handle)
+            if len(jobs) >= limit:
+                break
+        return jobs
+
+    def recover(self) -> int:
+        """
+        Mark jobs left queued/running by a previous process as interrupted.
+
+        Returns:
+            Number of jobs marked
+        """
+        if not self.store_dir.exists():
+            return 0
+        count = 0
+        for path in self.store_dir.glob("*.json"):
+            job = self._load(path.stem)
+            if not job or job.get("status") not in ACTIVE_STATUSES or path.stem in self._tasks:
+                continue
+            self._jobs[path.stem] = job
+            self._update(
+                path.stem,
+                status="failed",
+                completed_at=generate_timestamp(),
+                error={
+                    "code": "JOB_INTERRUPTED",
+                    "message": "Server restarted while the job was running",
+                    "retryable": True
+                }
+            )
+            count += 1
+        if count:
+            logger.warning(f"Marked {count} interrupted background job(s) as failed")
+        return count
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs; they are recorded as interrupted."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+
+    # ---------------------------------------------
+    # Execution
+    # ---------------------------------------------
+
+    def _progress_callback(self, job_id: str) -> Callable[..., None]:
+        loop = asyncio.get_running_loop()
+
+        def record(stage: str, details: Dict[str, Any]) -> None:
+            job = self._jobs.get(job_id)
+            if not job or job.get("status") in TERMINAL_STATUSES:
+                return
+            progress = list(job.get("progress") or [])
+            progress.append({"stage": stage, "at": generate_timestamp(), **details})
+            self._update(job_id, progress=progress[-MAX_PROGRESS_ENTRIES:])
+
+        def callback(stage: str, **details: Any) -> None:
+            # Handlers may report from worker threads (sync handlers, downloads)
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                record(stage, details)
+            else:
+                loop.call_soon_threadsafe(record, stage, details)
+
+        return callback
+
+    async def _run(self, job_id: str, action: str, payload: Dict[str, Any]) -> None:
+        from app.tools.registry import dispatch_action_async
+
+        self._update(job_id, status="running", started_at=generate_timestamp())
+        run_payload = {**payload, "_progress": self._progress_callback(job_id)}
+        try:
+            data = await dispatch_action_async(action, run_payload)
+            status = data.get("status") if isinstance(data, dict) else None
+            error = None
+            if status == "failed":
+                error = data.get("error")
+            elif status not in (None, "completed"):
+                # Provider still pending after polling gave up: keep its job ids in result
+                error = {
+                    "code": "JOB_INCOMPLETE",
+                    "message": f"Action finished with provider status '{status}'",
+                    "retryable": True
+                }
+            self._update(
+                job_id,
+                status="failed" if error else "completed",
+                completed_at=generate_timestamp(),
+                result=data,
+                error=error
+            )
+            logger.info(f"Job finished: job_id={job_id}, action={action}, status={status}")
+        except asyncio.CancelledError:
+            self._update(
+                job_id,
+                status="failed",
+                completed_at=generate_timestamp(),
+                error={
+                    "code": "JOB_INTERRUPTED",
+                    "message": "Job cancelled during server shutdown",
+                    "retryable": True
+                }
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Job failed: job_id={job_id}, action={action}: {e}", exc_info=True)
+            self._update(
+                job_id,
+                status="failed",
+                completed_at=generate_timestamp(),
+                error=to_mcp_error(e).model_dump()
+            )
+
+
+# Global engine instance
+_engine: Optional[JobEngine] = None
+
+
+def get_job_engine() -> JobEngine:
+    """Get or create the job engine instance."""
+    global _engine
+    if _engine is None:
+        _engine = JobEngine()
+    return _engine
@@ -0,0 +1,49 @@
+"""
+Runtime hooks for handlers running under the job engine or a pipeline.
+"""
+from typing import Any, Dict, Optional
+from app.utils.logging import logger
+
+
+def serializable_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop runtime-only keys (`_trace`, `_progress`, ...) before persisting."""
+    return {key: value for key, value in payload.items() if not key.startswith("_")}
+
+
+def report_progress(payload: Dict[str, Any], stage: str, **details: Any) -> None:
+    """
+    Report a progress stage for the current action.
+
+    The job engine injects a `_progress` callable in the payload (like `_trace`);
+    outside the engine this is a no-op. Safe to call from worker threads.
+
+    Args:
+        payload: Handler payload
+        stage: Short stage name (e.g. "submitted", "downloading")
+        **details: JSON-serializable details (provider job id, step name, ...)
+    """
+    callback = payload.get("_progress") if isinstance(payload, dict) else None
+    if not callable(callback):
+        return
+    try:
+        callback(stage, **details)
+    except Exception as e:
+        logger.warning(f"Progress callback failed for stage={stage}: {e}")
+
+
+def resumed_submission(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Provider response standing in for a submit call when resuming.
+
+    A resumed pipeline step sets `_resume_job_id` to a provider job that was
+    submitted before a restart; handlers then re-attach to that job instead
+    of submitting a new one: `response = resumed_submission(payload) or client.generate(...)`.
+
+    Returns:
+        {"job_id": ...} when resuming, otherwise None
+    """
+    job_id = payload.get("_resume_job_id") if isinstance(payload, dict) else None
+    if not job_id:
+        return None
+    logger.info(f"Re-attaching to provider job {job_id} instead of submitting")
+    return {"job_id": job_id}
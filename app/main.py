@@ -3,7 +3,7 @@ FastAPI application entry point.
 """
 from fastapi import FastAPI, HTTPException, Response, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, HTMLResponse
+from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -32,17 +32,40 @@ from app.utils.project_media import (
     save_project_n1_motif_audio_upload,
     ensure_project_media_folders,
     get_project_n1_pix_path,
+    get_project_media_index,
+    delete_project_media,
+    list_project_media,
+    MediaTooLargeError,
 )
-from app.mcp.schemas import MCPRequest, MCPResponse
-from app.mcp.server import handle_mcp_request
+from app.mcp.schemas import MCPRequest, MCPResponse, MCPBatchRequest, MCPBatchResponse
+from app.mcp.server import (
+    handle_mcp_request_async,
+    handle_mcp_batch_async,
+    iter_mcp_batch_async,
+    validate_mcp_batch
+)
+from app.mcp.sessions import SESSION_QUEUES, DEFAULT_SESSION_ID
+from app.jobs.engine import get_job_engine
+from app.tools.poller import stop_poller
+from app.tools.rate_limit import get_limiter
+from app.tools.circuit_breaker import get_breaker
 from app.utils.errors import to_mcp_error, ProviderError
 from app.utils.normalize import normalize_request
 from app.tools.registry import list_actions
 from app.tools.higgsfield.client import get_client as get_higgsfield_client
+from app.tools.higgsfield.client import close_client as close_higgsfield_client
+from app.tools.elevenlabs.client import close_client as close_elevenlabs_client
+from app.utils.storage import close_download_client
+from app.utils.blob_store import get_blob_store
+from app.utils.file_serving import file_response
+from app.utils.ftp_storage import close_sftp_pool, is_ftp_enabled
+from app.utils.upload_queue import get_upload_queue, stop_upload_queue
+from app.utils.storage_backend import close_storage_backend
 from app.narration_agent.llm_client import LLMClient
 from app.narration_agent.service import handle_narration_message
 from app.narration_agent.chat.chat_service import get_chat_memory
 from app.narration_agent.task_runner import TaskRunner
+from app.narration_agent.spec_loader import preload_specs, reload_specs
 from app.narration_agent.narration.narration_service import run_n1_flow
 from app.narration_agent.chat.ui_translator import UITranslator
 from app.narration_agent.writer_agent.strategy_finder.rag_bootstrap import (
@@ -61,10 +84,6 @@ from pydantic import BaseModel
 # Setup logger
 logger = setup_logger("mcp_narrations")
 
-# Session store for SSE streams
-SESSION_QUEUES: Dict[str, asyncio.Queue] = {}
-DEFAULT_SESSION_ID = "default"
-
 
 # -------------------------------------------------
 # Lifespan event handlers
@@ -77,14 +96,26 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting MCP Narrations Server (env={settings.APP_ENV})")
     logger.info(f"Log level: {settings.LOG_LEVEL}")
     logger.info(f"Registered actions: {len(list_actions())}")
+    get_job_engine().recover()
+    preload_specs()
+    if is_ftp_enabled():
+        get_upload_queue().recover()
     try:
         loop = asyncio.get_running_loop()
         loop.run_in_executor(None, ensure_rag_ready)
     except RuntimeError:
         ensure_rag_ready()
     yield
-    # Shutdown (if needed in the future)
+    # Shutdown
     logger.info("Shutting down MCP Narrations Server")
+    await get_job_engine().shutdown()
+    await asyncio.to_thread(stop_poller)
+    await close_higgsfield_client()
+    await close_elevenlabs_client()
+    await asyncio.to_thread(close_download_client)
+    await asyncio.to_thread(stop_upload_queue)
+    await asyncio.to_thread(close_sftp_pool)
+    close_storage_backend()
 
 
 # Initialize FastAPI app
@@ -211,7 +242,14 @@ def health_check():
         "status": "ok",
         "service": "MCP Narrations",
         "version": "0.1.0",
-        "time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        "time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "providers": {
+            provider: {
+                "circuit": get_breaker(provider).stats(),
+                "rate_limit": get_limiter(provider).stats()
+            }
+            for provider in ("higgsfield", "elevenlabs")
+        }
     }
 
 
@@ -227,6 +265,13 @@ def stop_rag_services():
     return shutdown_rag_services()
 
 
+@app.post("/system/specs/reload")
+def reload_narration_specs():
+    if settings.APP_ENV != "development":
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+    return {"status": "ok", "specs": reload_specs()}
+
+
 @app.get("/logs/{log_name}")
 def get_logs(log_name: str, lines: int = 200) -> Dict[str, Any]:
     mapping = {
@@ -255,7 +300,7 @@ def get_logs(log_name: str, lines: int = 200) -> Dict[str, Any]:
 # -------------------------------------------------
 
 @app.get("/assets/{file_path:path}")
-def serve_asset(file_path: str):
+def serve_asset(file_path: str, request: Request):
     """
     Serve stored media files from Media/ directory.
     
@@ -266,6 +311,10 @@ def serve_asset(file_path: str):
         storage_root = get_storage_path()
         file_full_path = storage_root / file_path
         
+        # Hidden entries (temp files, legacy stores) are never served
+        if any(part.startswith(".") for part in Path(file_path).parts):
+            raise HTTPException(status_code=404, detail="File not found")
+        
         # Security: ensure file is within storage root
         try:
             file_full_path.resolve().relative_to(storage_root.resolve())
@@ -278,10 +327,8 @@ def serve_asset(file_path: str):
         if not file_full_path.is_file():
             raise HTTPException(status_code=404, detail="Not a file")
         
-        return FileResponse(
-            path=str(file_full_path),
-            media_type="application/octet-stream"
-        )
+        digest = get_blob_store().digest_of(file_full_path) if settings.BLOB_STORE_ENABLED else None
+        return file_response(request, file_full_path, digest)
     
     except HTTPException:
         raise
@@ -469,6 +516,8 @@ async def upload_project_pix(project_id: str, file: UploadFile = File(...)) -> D
     try:
         result = await save_project_image_upload(project_id, file)
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error("Error saving image upload project=%s: %s", project_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -489,6 +538,8 @@ async def upload_n1_character_image(
             file
         )
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -519,6 +570,8 @@ async def upload_n1_costume_image(
             file
         )
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -548,6 +601,8 @@ async def upload_n1_motif_image(
             file
         )
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -576,6 +631,8 @@ async def upload_n1_motif_audio(
             file
         )
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -589,16 +646,29 @@ async def upload_n1_motif_audio(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.get("/projects/{project_id}/media/index")
+def get_project_media_manifest(
+    project_id: str,
+    category: str | None = None,
+    kind: str | None = None,
+) -> Dict[str, Any]:
+    try:
+        entries = list_project_media(project_id, category=category, kind=kind)
+        return {"status": "ok", "count": len(entries), "entries": entries}
+    except Exception as e:
+        logger.error("Error listing media project=%s: %s", project_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @app.get("/projects/{project_id}/mediapix/{filename}")
-def get_n1_character_image(project_id: str, filename: str) -> Response:
+def get_n1_character_image(project_id: str, filename: str, request: Request) -> Response:
     try:
         file_path = get_project_n1_pix_path(project_id, filename)
         if not file_path.exists() or not file_path.is_file():
             raise HTTPException(status_code=404, detail="File not found")
-        return FileResponse(
-            path=str(file_path),
-            media_type="application/octet-stream"
-        )
+        entry = get_project_media_index(project_id).get("pix", file_path.name)
+        digest = entry.get("sha256") if entry and entry.get("size") == file_path.stat().st_size else None
+        return file_response(request, file_path, digest)
     except HTTPException:
         raise
     except Exception as e:
@@ -625,13 +695,20 @@ def delete_n1_character_image(
     if not safe_filename.startswith(expected_prefix):
         raise HTTPException(status_code=400, detail="Invalid filename prefix")
     try:
-        file_path = get_project_n1_pix_path(project_id, safe_filename)
-        if not file_path.exists():
+        deleted = delete_project_media(
+            project_id,
+            "pix",
+            safe_filename,
+            kind="character_image",
+            owner={"character": character_index},
+        )
+        if not deleted:
             raise HTTPException(status_code=404, detail="File not found")
-        file_path.unlink()
         return {"status": "ok", "filename": safe_filename}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(
             "Error deleting N1 image project=%s file=%s: %s",
@@ -659,13 +736,20 @@ def delete_n1_costume_image(
     if not safe_filename.startswith(expected_prefix):
         raise HTTPException(status_code=400, detail="Invalid filename prefix")
     try:
-        file_path = get_project_n1_pix_path(project_id, safe_filename)
-        if not file_path.exists():
+        deleted = delete_project_media(
+            project_id,
+            "pix",
+            safe_filename,
+            kind="costume_image",
+            owner={"character": character_index, "costume": costume_index},
+        )
+        if not deleted:
             raise HTTPException(status_code=404, detail="File not found")
-        file_path.unlink()
         return {"status": "ok", "filename": safe_filename}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(
             "Error deleting N1 costume image project=%s file=%s: %s",
@@ -690,13 +774,20 @@ def delete_n1_motif_image(
     if not safe_filename.startswith(expected_prefix):
         raise HTTPException(status_code=400, detail="Invalid filename prefix")
     try:
-        file_path = get_project_n1_pix_path(project_id, safe_filename)
-        if not file_path.exists():
+        deleted = delete_project_media(
+            project_id,
+            "pix",
+            safe_filename,
+            kind="motif_image",
+            owner={"motif": motif_index},
+        )
+        if not deleted:
             raise HTTPException(status_code=404, detail="File not found")
-        file_path.unlink()
         return {"status": "ok", "filename": safe_filename}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(
             "Error deleting N1 motif image project=%s file=%s: %s",
@@ -721,13 +812,20 @@ def delete_n1_motif_audio(
     if not safe_filename.startswith(expected_prefix):
         raise HTTPException(status_code=400, detail="Invalid filename prefix")
     try:
-        file_path = get_project_n1_pix_path(project_id, safe_filename)
-        if not file_path.exists():
+        deleted = delete_project_media(
+            project_id,
+            "pix",
+            safe_filename,
+            kind="motif_audio",
+            owner={"motif": motif_index},
+        )
+        if not deleted:
             raise HTTPException(status_code=404, detail="File not found")
-        file_path.unlink()
         return {"status": "ok", "filename": safe_filename}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(
             "Error deleting N1 motif audio project=%s file=%s: %s",
@@ -747,6 +845,8 @@ def upload_project_pix_url(project_id: str, body: MediaUrlRequest) -> Dict[str,
     try:
         result = save_project_image_url(project_id, url)
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error("Error saving image url project=%s: %s", project_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -760,6 +860,8 @@ def upload_project_audio_url(project_id: str, body: MediaUrlRequest) -> Dict[str
     try:
         result = save_project_audio_url(project_id, url)
         return {"status": "ok", **result}
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error("Error saving audio url project=%s: %s", project_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -825,6 +927,42 @@ def post_narration_message(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.get("/projects/{project_id}/chat/{session_id}/messages")
+def get_chat_messages(
+    project_id: str,
+    session_id: str,
+    offset: int = 0,
+    limit: int | None = None,
+    tail: int | None = None,
+) -> Dict[str, Any]:
+    """Page through a chat session history (`tail=N` for the last N messages)."""
+    if offset < 0 or (limit is not None and limit < 0) or (tail is not None and tail < 0):
+        raise HTTPException(status_code=400, detail="offset, limit and tail must be >= 0")
+    try:
+        memory_store = get_chat_memory()
+        if tail is not None:
+            messages = memory_store.load_messages(project_id, session_id, tail=tail)
+            total = memory_store.count_messages(project_id, session_id)
+            offset = max(total - len(messages), 0)
+        else:
+            if limit is None:
+                limit = settings.CHAT_HISTORY_PAGE_SIZE
+            messages = memory_store.load_messages(project_id, session_id, offset=offset, limit=limit)
+            total = memory_store.count_messages(project_id, session_id)
+        next_offset = offset + len(messages)
+        return {
+            "status": "ok",
+            "session_id": session_id,
+            "total": total,
+            "offset": offset,
+            "messages": messages,
+            "next_offset": next_offset if next_offset < total else None,
+        }
+    except Exception as e:
+        logger.error("Error reading chat history project=%s: %s", project_id, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @app.post("/projects/{project_id}/n1/run", response_model=RunN1Response)
 def post_run_n1(project_id: str) -> Dict[str, Any]:
     try:
@@ -997,6 +1135,7 @@ def root():
         "endpoints": {
             "sse": "/sse",
             "mcp": "/mcp",
+            "mcp_batch": "/mcp/batch",
             "health": "/health",
             "assets": "/assets/{path}"
         },
@@ -1147,8 +1286,15 @@ async def mcp_sse_log(request: Request):
     return {"status": "ok"}
 
 
+def _mcp_session_id(http_request: Request) -> str | None:
+    return (
+        http_request.headers.get("mcp-session-id")
+        or http_request.query_params.get("mcp-session-id")
+    )
+
+
 @app.post("/mcp", response_model=MCPResponse)
-def mcp_endpoint(request: MCPRequest) -> MCPResponse:
+async def mcp_endpoint(request: MCPRequest, http_request: Request) -> MCPResponse:
     """
     Main MCP endpoint for handling actions.
     
@@ -1159,9 +1305,12 @@ def mcp_endpoint(request: MCPRequest) -> MCPResponse:
     - trace: dict (optional)
     
     Returns normalized MCPResponse with status, data, or error.
+    Runs on the event loop: provider waits are awaited, not slept in a thread.
+    With payload.background=true the response carries a job handle and
+    progress is pushed to the SSE session given by the mcp-session-id header.
     """
     try:
-        response = handle_mcp_request(request)
+        response = await handle_mcp_request_async(request, session_id=_mcp_session_id(http_request))
         return response
     except Exception as e:
         # Fallback error handling (should not happen if handle_mcp_request works correctly)
@@ -1178,8 +1327,36 @@ def mcp_endpoint(request: MCPRequest) -> MCPResponse:
         )
 
 
+@app.post("/mcp/batch", response_model=MCPBatchResponse)
+async def mcp_batch_endpoint(batch: MCPBatchRequest, http_request: Request):
+    """
+    Execute a list of MCP requests concurrently.
+
+    All items are validated before any runs; an invalid item rejects the
+    whole batch. Items run under a per-provider concurrency cap
+    (HIGGSFIELD_MAX_CONCURRENCY / ELEVENLABS_MAX_CONCURRENCY).
+    With stream=true, results are sent as NDJSON lines
+    ({"index": i, ...MCPResponse}) in completion order.
+    """
+    session_id = _mcp_session_id(http_request)
+    if not batch.stream:
+        return await handle_mcp_batch_async(batch, session_id=session_id)
+
+    try:
+        validate_mcp_batch(batch)
+    except Exception:
+        # Rejected batches are answered as a regular JSON batch response
+        return await handle_mcp_batch_async(batch, session_id=session_id)
+
+    async def ndjson_stream():
+        async for index, response in iter_mcp_batch_async(batch, session_id=session_id):
+            yield json.dumps({"index": index, **response.model_dump()}) + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
 @app.post("/normalize")
-def normalize_endpoint(
+async def normalize_endpoint(
     request: Request,
     body: Dict[str, Any],
     dispatch: bool = True
@@ -1199,7 +1376,7 @@ def normalize_endpoint(
 
     if dispatch:
         request = MCPRequest(**normalized)
-        response = handle_mcp_request(request)
+        response = await handle_mcp_request_async(request)
         result["response"] = response.model_dump()
 
     return result
@@ -1249,6 +1426,24 @@ def higgsfield_status(
     }
 
 
+# -------------------------------------------------
+# Background jobs
+# -------------------------------------------------
+
+@app.get("/jobs")
+async def list_jobs(status: str | None = None, limit: int = 50) -> Dict[str, Any]:
+    jobs = await get_job_engine().list(status=status, limit=limit)
+    return {"jobs": jobs, "count": len(jobs)}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = await get_job_engine().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
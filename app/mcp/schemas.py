@@ -39,6 +39,23 @@ class MCPResponse(BaseModel):
     completed_at: Optional[str] = Field(None, description="ISO timestamp when request was completed")
 
 
+class MCPBatchRequest(BaseModel):
+    """Batch of MCP requests executed concurrently."""
+    requests: List[MCPRequest] = Field(..., description="Requests to execute")
+    request_id: Optional[str] = Field(None, description="Client-provided batch ID")
+    stream: bool = Field(False, description="Stream results as NDJSON as items complete")
+
+
+class MCPBatchResponse(BaseModel):
+    """Batch response: one MCPResponse per request, in request order."""
+    status: str = Field(..., description="Status: 'ok' or 'error' (batch rejected)")
+    request_id: Optional[str] = Field(None, description="Batch ID")
+    results: List[MCPResponse] = Field(default_factory=list, description="Per-request responses")
+    error: Optional[MCPError] = Field(None, description="Error information if the batch was rejected")
+    received_at: str = Field(..., description="ISO timestamp when the batch was received")
+    completed_at: Optional[str] = Field(None, description="ISO timestamp when the batch was completed")
+
+
 class AssetLink(BaseModel):
     """Asset link with metadata."""
     url: str
@@ -46,6 +63,7 @@ class AssetLink(BaseModel):
     asset_type: str
     provider: str
     created_at: str
+    upload_id: Optional[str] = None  # Pending background SFTP upload
 
 
 class JobStatus(BaseModel):
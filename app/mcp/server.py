@@ -1,110 +1,323 @@
 """
 MCP server handler - validates requests, dispatches actions, handles errors.
 """
+import asyncio
 import time
-from typing import Dict, Any
-from app.mcp.schemas import MCPRequest, MCPResponse, MCPError
-from app.tools.registry import dispatch_action, list_actions
-from app.utils.errors import to_mcp_error, ValidationError, ActionNotFoundError
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from app.config.settings import settings
+from app.mcp.schemas import MCPRequest, MCPResponse, MCPError, MCPBatchRequest, MCPBatchResponse
+from app.tools.registry import (
+    dispatch_action,
+    dispatch_action_async,
+    get_action_provider,
+    list_actions,
+    validate_action_payload
+)
+from app.jobs.engine import get_job_engine
+from app.utils.errors import to_mcp_error, MCPException, ValidationError, ActionNotFoundError
 from app.utils.ids import generate_request_id, generate_timestamp
 from app.utils.logging import logger
 
 
-def handle_mcp_request(request: MCPRequest) -> MCPResponse:
-    """
-    Handle an MCP request: validate, dispatch, and return response.
-    
-    Args:
-        request: MCP request
-    
-    Returns:
-        MCP response
-    """
-    received_at = generate_timestamp()
-    request_id = request.request_id or generate_request_id()
-    
-    # Log request
+def _log_received(request: MCPRequest, request_id: str) -> None:
     logger.info(
         f"Received MCP request: action={request.action}, "
         f"request_id={request_id}"
     )
-    
+
     if request.trace:
         logger.debug(
             f"Trace info: project={request.trace.project}, "
             f"user={request.trace.user}, session={request.trace.session}"
         )
-    
-    start_time = time.time()
-    
-    try:
-        # Validate request
-        if not request.action:
-            raise ValidationError("Action is required")
-        
-        # Dispatch action (pass trace in payload for handlers to access)
-        try:
-            payload_with_trace = request.payload or {}
-            if request.trace:
-                payload_with_trace["_trace"] = request.trace
-            data = dispatch_action(request.action, payload_with_trace)
-            completed_at = generate_timestamp()
-            latency_ms = int((time.time() - start_time) * 1000)
-            
-            logger.info(
-                f"Action completed: action={request.action}, "
-                f"request_id={request_id}, latency_ms={latency_ms}"
-            )
-            
-            return MCPResponse(
-                status="ok",
-                action=request.action,
-                request_id=request_id,
-                data=data,
-                error=None,
-                received_at=received_at,
-                completed_at=completed_at
-            )
-        
-        except ActionNotFoundError as e:
-            # Action not found - return error response
-            error = to_mcp_error(e)
-            completed_at = generate_timestamp()
-            
-            logger.warning(
-                f"Action not found: action={request.action}, "
-                f"request_id={request_id}"
-            )
-            
-            return MCPResponse(
-                status="error",
-                action=request.action,
-                request_id=request_id,
-                data=None,
-                error=error,
-                received_at=received_at,
-                completed_at=completed_at
-            )
-    
-    except Exception as e:
+
+
+def _build_payload(request: MCPRequest) -> Dict[str, Any]:
+    """Validate the request and return the payload (with trace) for the handler."""
+    if not request.action:
+        raise ValidationError("Action is required")
+
+    # Pass trace in payload for handlers to access
+    payload_with_trace = request.payload or {}
+    if request.trace:
+        payload_with_trace["_trace"] = request.trace
+    return payload_with_trace
+
+
+def _submit_background(
+    request: MCPRequest,
+    payload: Dict[str, Any],
+    session_id: Optional[str]
+) -> Dict[str, Any]:
+    """Hand the action to the job engine and return its handle."""
+    if request.action not in list_actions():
+        raise ActionNotFoundError(request.action)
+    if not session_id and request.trace:
+        session_id = request.trace.session
+    return get_job_engine().submit(request.action, payload, session_id=session_id)
+
+
+def _ok_response(
+    request: MCPRequest,
+    request_id: str,
+    data: Dict[str, Any],
+    received_at: str,
+    start_time: float
+) -> MCPResponse:
+    completed_at = generate_timestamp()
+    latency_ms = int((time.time() - start_time) * 1000)
+
+    logger.info(
+        f"Action completed: action={request.action}, "
+        f"request_id={request_id}, latency_ms={latency_ms}"
+    )
+
+    return MCPResponse(
+        status="ok",
+        action=request.action,
+        request_id=request_id,
+        data=data,
+        error=None,
+        received_at=received_at,
+        completed_at=completed_at
+    )
+
+
+def _error_response(
+    request: MCPRequest,
+    request_id: str,
+    exception: Exception,
+    received_at: str,
+    start_time: float
+) -> MCPResponse:
+    error = to_mcp_error(exception)
+    completed_at = generate_timestamp()
+
+    if isinstance(exception, ActionNotFoundError):
+        # Action not found - return error response
+        logger.warning(
+            f"Action not found: action={request.action}, "
+            f"request_id={request_id}"
+        )
+    else:
         # Unexpected error - convert to MCP error
-        error = to_mcp_error(e)
-        completed_at = generate_timestamp()
         latency_ms = int((time.time() - start_time) * 1000)
-        
         logger.error(
             f"Error processing request: action={request.action}, "
             f"request_id={request_id}, error={error.code}, "
             f"latency_ms={latency_ms}",
             exc_info=True
         )
-        
-        return MCPResponse(
+
+    return MCPResponse(
+        status="error",
+        action=request.action,
+        request_id=request_id,
+        data=None,
+        error=error,
+        received_at=received_at,
+        completed_at=completed_at
+    )
+
+
+def handle_mcp_request(request: MCPRequest) -> MCPResponse:
+    """
+    Handle an MCP request: validate, dispatch, and return response.
+
+    Args:
+        request: MCP request
+
+    Returns:
+        MCP response
+    """
+    received_at = generate_timestamp()
+    request_id = request.request_id or generate_request_id()
+    _log_received(request, request_id)
+    start_time = time.time()
+
+    try:
+        payload = _build_payload(request)
+        if payload.get("background"):
+            raise ValidationError("background requires the async /mcp endpoint")
+        data = dispatch_action(request.action, payload)
+        return _ok_response(request, request_id, data, received_at, start_time)
+    except Exception as e:
+        return _error_response(request, request_id, e, received_at, start_time)
+
+
+async def handle_mcp_request_async(
+    request: MCPRequest,
+    session_id: Optional[str] = None
+) -> MCPResponse:
+    """
+    Handle an MCP request from the event loop.
+
+    Same contract as `handle_mcp_request`, but dispatches through
+    `dispatch_action_async` so long provider waits do not hold a worker thread.
+    With `payload.background = true` the action is handed to the job engine
+    and a job handle is returned right away.
+
+    Args:
+        request: MCP request
+        session_id: SSE session to notify for background jobs (optional)
+
+    Returns:
+        MCP response
+    """
+    received_at = generate_timestamp()
+    request_id = request.request_id or generate_request_id()
+    _log_received(request, request_id)
+    start_time = time.time()
+
+    try:
+        payload = _build_payload(request)
+        if payload.pop("background", False):
+            data = _submit_background(request, payload, session_id)
+        else:
+            data = await dispatch_action_async(request.action, payload)
+        return _ok_response(request, request_id, data, received_at, start_time)
+    except Exception as e:
+        return _error_response(request, request_id, e, received_at, start_time)
+
+
+# ---------------------------------------------
+# Batch
+# ---------------------------------------------
+
+def _provider_concurrency(provider: str) -> int:
+    """Max concurrent batch items for a provider (settings `<PROVIDER>_MAX_CONCURRENCY`)."""
+    limit = getattr(settings, f"{provider.upper()}_MAX_CONCURRENCY", settings.BATCH_MAX_CONCURRENCY)
+    return max(1, int(limit))
+
+
+def validate_mcp_batch(batch: MCPBatchRequest) -> None:
+    """
+    Validate every item of a batch before any of them runs.
+
+    Each item's action must exist and its payload must pass the action's
+    validator (the checks its handler makes before calling a provider).
+
+    Args:
+        batch: Batch request
+
+    Raises:
+        ValidationError: If the batch is empty, too large, or any item is invalid
+    """
+    if not batch.requests:
+        raise ValidationError("requests must contain at least one item")
+    if len(batch.requests) > settings.BATCH_MAX_ITEMS:
+        raise ValidationError(
+            f"Batch too large: {len(batch.requests)} items (max {settings.BATCH_MAX_ITEMS})"
+        )
+
+    seen_request_ids = set()
+    errors = []
+    for index, request in enumerate(batch.requests):
+        if not request.action:
+            errors.append({"index": index, "code": "VALIDATION_ERROR", "message": "Action is required"})
+        else:
+            # Same payload the handler gets (with the trace), minus delivery options
+            payload = dict(request.payload or {})
+            payload.pop("background", None)
+            if request.trace:
+                payload["_trace"] = request.trace
+            try:
+                validate_action_payload(request.action, payload)
+            except MCPException as e:
+                errors.append({"index": index, "code": e.code, "message": e.message})
+        if request.request_id:
+            if request.request_id in seen_request_ids:
+                errors.append({
+                    "index": index,
+                    "code": "VALIDATION_ERROR",
+                    "message": f"Duplicate request_id: {request.request_id}"
+                })
+            seen_request_ids.add(request.request_id)
+
+    if errors:
+        raise ValidationError(
+            f"Batch rejected: {len(errors)} invalid item(s)",
+            details={"items": errors}
+        )
+
+
+async def iter_mcp_batch_async(
+    batch: MCPBatchRequest,
+    session_id: Optional[str] = None
+) -> AsyncIterator[Tuple[int, MCPResponse]]:
+    """
+    Run the items of a validated batch concurrently, yielding as each completes.
+
+    Items for the same provider share a semaphore sized by
+    `_provider_concurrency`. Closing the iterator early (e.g. client
+    disconnect while streaming) cancels the items still running.
+
+    Args:
+        batch: Batch request (see `validate_mcp_batch`)
+        session_id: SSE session for background items (optional)
+
+    Yields:
+        (index, response) tuples in completion order
+    """
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run_item(index: int, request: MCPRequest) -> Tuple[int, MCPResponse]:
+        provider = get_action_provider(request.action)
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(_provider_concurrency(provider))
+        async with semaphores[provider]:
+            return index, await handle_mcp_request_async(request, session_id=session_id)
+
+    tasks = [
+        asyncio.create_task(run_item(index, request))
+        for index, request in enumerate(batch.requests)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def handle_mcp_batch_async(
+    batch: MCPBatchRequest,
+    session_id: Optional[str] = None
+) -> MCPBatchResponse:
+    """
+    Handle a batch of MCP requests: validate all, run concurrently, collect.
+
+    Args:
+        batch: Batch request
+        session_id: SSE session for background items (optional)
+
+    Returns:
+        Batch response with per-item responses in request order
+    """
+    received_at = generate_timestamp()
+    batch_id = batch.request_id or generate_request_id()
+    logger.info(f"Received MCP batch: request_id={batch_id}, items={len(batch.requests)}")
+
+    try:
+        validate_mcp_batch(batch)
+    except ValidationError as e:
+        logger.warning(f"MCP batch rejected: request_id={batch_id}, error={e.message}")
+        return MCPBatchResponse(
             status="error",
-            action=request.action,
-            request_id=request_id,
-            data=None,
-            error=error,
+            request_id=batch_id,
+            error=to_mcp_error(e),
             received_at=received_at,
-            completed_at=completed_at
+            completed_at=generate_timestamp()
         )
+
+    results: List[Optional[MCPResponse]] = [None] * len(batch.requests)
+    async for index, response in iter_mcp_batch_async(batch, session_id=session_id):
+        results[index] = response
+
+    return MCPBatchResponse(
+        status="ok",
+        request_id=batch_id,
+        results=results,
+        received_at=received_at,
+        completed_at=generate_timestamp()
+    )
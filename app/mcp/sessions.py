@@ -0,0 +1,37 @@
+"""
+SSE session queues shared by the /sse transport and background notifiers.
+"""
+import asyncio
+from typing import Any, Dict, Optional
+from app.utils.logging import logger
+
+
+# Session store for SSE streams
+SESSION_QUEUES: Dict[str, asyncio.Queue] = {}
+DEFAULT_SESSION_ID = "default"
+
+
+def publish_event(session_id: Optional[str], message: Dict[str, Any]) -> bool:
+    """
+    Push a message to an open SSE session.
+
+    Must be called from the event loop that owns the queues.
+
+    Args:
+        session_id: SSE session id (mcp-session-id)
+        message: JSON-serializable message
+
+    Returns:
+        True if the message was enqueued, False if no such session is open
+    """
+    if not session_id:
+        return False
+    queue = SESSION_QUEUES.get(session_id)
+    if queue is None:
+        return False
+    try:
+        queue.put_nowait(message)
+        return True
+    except Exception as e:
+        logger.error("Failed to enqueue SSE event session=%s: %s", session_id, e, exc_info=True)
+        return False
@@ -1,13 +1,24 @@
-"""Persistent chat memory storage for narration_agent."""
+"""Persistent chat memory storage for narration_agent.
+
+Session messages are an append-only log (`append_messages`), read whole,
+by tail or by page (`load_messages`). The session document is a small
+sidecar holding the session meta, message counters and the rolling
+conversation summary, so saving meta or a new turn does not rewrite (or
+re-read) the history.
+"""
 
 from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from app.utils.ids import generate_timestamp
-from app.utils.project_storage import get_project_root
+from app.utils.locking import FileLock
+from app.utils.project_storage import get_project_root, project_lock
+from app.utils.storage_backend import file_document_path, file_log_path, get_storage_backend
+
+_LOG_KIND = "chat_messages"
 
 
 def _safe_session_id(session_id: str) -> str:
@@ -22,13 +33,39 @@ def _read_json(path: Path) -> Dict[str, Any]:
     return json.loads(text) if text else {}
 
 
-def _write_json(path: Path, data: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=True), encoding="utf-8")
+def _load(project_id: str, kind: str, session_id: str) -> Dict[str, Any]:
+    payload = get_storage_backend().get(project_id, kind, _safe_session_id(session_id))
+    return payload if isinstance(payload, dict) else {}
+
+
+def _store(project_id: str, kind: str, session_id: str, payload: Dict[str, Any]) -> None:
+    get_storage_backend().put(project_id, kind, _safe_session_id(session_id), payload)
+
+
+def _session_lock(project_id: str, session_id: str) -> FileLock:
+    """Serializes updates of a session (its log and sidecar)."""
+    return project_lock(project_id, f"chat_{_safe_session_id(session_id)}")
+
+
+def _user_stats(
+    messages: List[Dict[str, Any]], user_messages: int = 0, user_chars: int = 0
+) -> tuple[int, int]:
+    """
+    Count user messages and the length of their contents joined by blank lines.
+
+    Lets callers size the whole user side of a session without reading it.
+    """
+    for message in messages:
+        if not isinstance(message, dict) or message.get("role") != "user":
+            continue
+        content = message.get("content", "")
+        user_chars += (2 if user_messages else 0) + len(content if isinstance(content, str) else "")
+        user_messages += 1
+    return user_messages, user_chars
 
 
 class ChatMemoryStore:
-    """Store chat sessions on disk under each project."""
+    """Store chat sessions under each project (in the configured storage backend)."""
 
     def _legacy_session_path(self, project_id: str, session_id: str) -> Path:
         root = get_project_root(project_id)
@@ -36,32 +73,104 @@ class ChatMemoryStore:
         return root / "chat_memory" / f"{safe_session}.json"
 
     def get_session_path(self, project_id: str, session_id: str) -> Path:
-        root = get_project_root(project_id)
-        safe_session = _safe_session_id(session_id)
-        return root / "chat_states" / f"{safe_session}.json"
+        return file_document_path(project_id, "chat_session", _safe_session_id(session_id))
 
     def get_state_path(self, project_id: str, session_id: str) -> Path:
-        root = get_project_root(project_id)
-        safe_session = _safe_session_id(session_id)
-        return root / "chat_states" / f"{safe_session}_state.json"
+        return file_document_path(project_id, "chat_state", _safe_session_id(session_id))
 
     def get_output_state_path(self, project_id: str, session_id: str) -> Path:
-        root = get_project_root(project_id)
-        safe_session = _safe_session_id(session_id)
-        return root / "chat_states" / f"output_{safe_session}_state.json"
+        return file_document_path(project_id, "chat_output_state", _safe_session_id(session_id))
 
     def get_edit_session_path(self, project_id: str, edit_session_id: str) -> Path:
-        root = get_project_root(project_id)
-        safe_session = _safe_session_id(edit_session_id)
-        return root / "chat_states" / f"edit_{safe_session}.json"
+        return file_document_path(project_id, "chat_edit", _safe_session_id(edit_session_id))
 
-    def load_messages(self, project_id: str, session_id: str) -> List[Dict[str, str]]:
-        current_path = self.get_session_path(project_id, session_id)
-        payload = _read_json(current_path)
-        messages = payload.get("messages")
-        if isinstance(messages, list) and messages:
-            return [m for m in messages if isinstance(m, dict)]
+    def get_messages_path(self, project_id: str, session_id: str) -> Path:
+        return file_log_path(project_id, _LOG_KIND, _safe_session_id(session_id))
+
+    def _load_session(self, project_id: str, session_id: str) -> Dict[str, Any]:
+        """Session sidecar; messages stored inline (previous format) move to the log."""
+        payload = _load(project_id, "chat_session", session_id)
+        if "messages" not in payload:
+            return payload
+        with _session_lock(project_id, session_id):
+            payload = _load(project_id, "chat_session", session_id)
+            messages = payload.pop("messages", None)
+            if isinstance(messages, list):
+                return self._replace_messages(project_id, session_id, payload, messages)
+        return payload
+
+    def _store_session(
+        self, project_id: str, session_id: str, session: Dict[str, Any], **changes: Any
+    ) -> Dict[str, Any]:
+        payload = {
+            "project_id": project_id,
+            "session_id": session_id,
+            "updated_at": generate_timestamp(),
+            "meta": session.get("meta", {}),
+            "message_count": session.get("message_count", 0),
+            "user_messages": session.get("user_messages", 0),
+            "user_chars": session.get("user_chars", 0),
+        }
+        if session.get("summary"):
+            payload["summary"] = session["summary"]
+        payload.update(changes)
+        _store(project_id, "chat_session", session_id, payload)
+        return payload
+
+    def _replace_messages(
+        self,
+        project_id: str,
+        session_id: str,
+        session: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        messages = [m for m in messages if isinstance(m, dict)]
+        get_storage_backend().replace_log(project_id, _LOG_KIND, _safe_session_id(session_id), messages)
+        user_messages, user_chars = _user_stats(messages)
+        # A rewritten history invalidates the summary of its older messages
+        return self._store_session(
+            project_id,
+            session_id,
+            {key: value for key, value in session.items() if key != "summary"},
+            message_count=len(messages),
+            user_messages=user_messages,
+            user_chars=user_chars,
+        )
+
+    def load_messages(
+        self,
+        project_id: str,
+        session_id: str,
+        tail: Optional[int] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Messages of a session, oldest first.
+
+        Args:
+            project_id: Project id
+            session_id: Chat session id
+            tail: Only the last `tail` messages (overrides offset/limit)
+            offset: Index of the first message (paging)
+            limit: Maximum number of messages (None: up to the end)
+
+        Returns:
+            List of message dicts
+        """
+        if tail is not None:
+            if tail <= 0:
+                return []
+            offset, limit = -tail, None
+        session = self._load_session(project_id, session_id)
+        if not session.get("message_count"):
+            self._import_legacy_session(project_id, session_id)
+        messages = get_storage_backend().read_log(
+            project_id, _LOG_KIND, _safe_session_id(session_id), offset, limit
+        )
+        return [m for m in messages if isinstance(m, dict)]
 
+    def _import_legacy_session(self, project_id: str, session_id: str) -> None:
         legacy_path = self._legacy_session_path(project_id, session_id)
         legacy_payload = _read_json(legacy_path)
         legacy_messages = legacy_payload.get("messages")
@@ -71,21 +180,54 @@ class ChatMemoryStore:
                 legacy_path.unlink()
             except OSError:
                 pass
-            return [m for m in legacy_messages if isinstance(m, dict)]
-        return []
+
+    def count_messages(self, project_id: str, session_id: str) -> int:
+        return self._load_session(project_id, session_id).get("message_count", 0)
+
+    def load_session_stats(self, project_id: str, session_id: str) -> Dict[str, int]:
+        """Message count, user message count and joined user text length of a session."""
+        session = self._load_session(project_id, session_id)
+        return {
+            "message_count": session.get("message_count", 0),
+            "user_messages": session.get("user_messages", 0),
+            "user_chars": session.get("user_chars", 0),
+        }
+
+    def append_messages(
+        self, project_id: str, session_id: str, messages: List[Dict[str, str]]
+    ) -> int:
+        """
+        Append messages to a session log (no rewrite of the history).
+
+        Returns:
+            Number of messages in the session
+        """
+        messages = [m for m in messages if isinstance(m, dict)]
+        with _session_lock(project_id, session_id):
+            session = self._load_session(project_id, session_id)
+            count = get_storage_backend().append_log(
+                project_id, _LOG_KIND, _safe_session_id(session_id), messages
+            )
+            user_messages, user_chars = _user_stats(
+                messages, session.get("user_messages", 0), session.get("user_chars", 0)
+            )
+            self._store_session(
+                project_id,
+                session_id,
+                session,
+                message_count=count,
+                user_messages=user_messages,
+                user_chars=user_chars,
+            )
+        return count
 
     def save_messages(
         self, project_id: str, session_id: str, messages: List[Dict[str, str]]
     ) -> None:
-        existing = _read_json(self.get_session_path(project_id, session_id))
-        payload = {
-            "project_id": project_id,
-            "session_id": session_id,
-            "updated_at": generate_timestamp(),
-            "messages": messages,
-            "meta": existing.get("meta", {}) if isinstance(existing, dict) else {},
-        }
-        _write_json(self.get_session_path(project_id, session_id), payload)
+        """Replace the whole history of a session (prefer append_messages for new turns)."""
+        with _session_lock(project_id, session_id):
+            session = self._load_session(project_id, session_id)
+            self._replace_messages(project_id, session_id, session, messages)
 
     def save_state_snapshot(
         self, project_id: str, session_id: str, state_snapshot: Dict[str, Any]
@@ -96,7 +238,7 @@ class ChatMemoryStore:
             "updated_at": generate_timestamp(),
             "state_snapshot": state_snapshot,
         }
-        _write_json(self.get_state_path(project_id, session_id), payload)
+        _store(project_id, "chat_state", session_id, payload)
 
     def save_output_state_snapshot(
         self, project_id: str, session_id: str, state_snapshot: Dict[str, Any]
@@ -107,10 +249,10 @@ class ChatMemoryStore:
             "updated_at": generate_timestamp(),
             "state_snapshot": state_snapshot,
         }
-        _write_json(self.get_output_state_path(project_id, session_id), payload)
+        _store(project_id, "chat_output_state", session_id, payload)
 
     def load_edit_messages(self, project_id: str, edit_session_id: str) -> List[Dict[str, str]]:
-        payload = _read_json(self.get_edit_session_path(project_id, edit_session_id))
+        payload = _load(project_id, "chat_edit", edit_session_id)
         messages = payload.get("messages")
         if isinstance(messages, list) and messages:
             return [m for m in messages if isinstance(m, dict)]
@@ -130,25 +272,46 @@ class ChatMemoryStore:
             "messages": messages,
             "meta": meta or {},
         }
-        _write_json(self.get_edit_session_path(project_id, edit_session_id), payload)
+        _store(project_id, "chat_edit", edit_session_id, payload)
 
     def load_state_snapshot(self, project_id: str, session_id: str) -> Dict[str, Any]:
-        payload = _read_json(self.get_state_path(project_id, session_id))
-        snapshot = payload.get("state_snapshot") if isinstance(payload, dict) else None
+        payload = _load(project_id, "chat_state", session_id)
+        snapshot = payload.get("state_snapshot")
         return snapshot if isinstance(snapshot, dict) else {}
 
     def load_meta(self, project_id: str, session_id: str) -> Dict[str, Any]:
-        payload = _read_json(self.get_session_path(project_id, session_id))
-        meta = payload.get("meta") if isinstance(payload, dict) else None
+        meta = self._load_session(project_id, session_id).get("meta")
         return meta if isinstance(meta, dict) else {}
 
     def save_meta(self, project_id: str, session_id: str, meta: Dict[str, Any]) -> None:
-        existing = _read_json(self.get_session_path(project_id, session_id))
-        payload = {
-            "project_id": project_id,
-            "session_id": session_id,
-            "updated_at": generate_timestamp(),
-            "messages": existing.get("messages", []) if isinstance(existing, dict) else [],
-            "meta": meta,
+        with _session_lock(project_id, session_id):
+            session = self._load_session(project_id, session_id)
+            self._store_session(project_id, session_id, session, meta=meta)
+
+    def load_summary(self, project_id: str, session_id: str) -> Dict[str, Any]:
+        """Rolling summary of the session: text, through (messages covered) and updated_at."""
+        summary = self._load_session(project_id, session_id).get("summary")
+        if not isinstance(summary, dict):
+            summary = {}
+        return {
+            "text": summary.get("text", "") or "",
+            "through": summary.get("through", 0) or 0,
+            "updated_at": summary.get("updated_at", ""),
         }
-        _write_json(self.get_session_path(project_id, session_id), payload)
+
+    def save_summary(
+        self, project_id: str, session_id: str, summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Store a rolling summary unless a concurrent refresh already covered more messages.
+
+        Returns:
+            The summary now stored
+        """
+        with _session_lock(project_id, session_id):
+            session = self._load_session(project_id, session_id)
+            current = session.get("summary")
+            if isinstance(current, dict) and current.get("through", 0) >= summary.get("through", 0):
+                return self.load_summary(project_id, session_id)
+            self._store_session(project_id, session_id, session, summary=summary)
+        return summary
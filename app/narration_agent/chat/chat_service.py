@@ -8,6 +8,7 @@ from typing import Any, Dict, Optional
 from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
 from app.narration_agent.chat.state_sanitizer import sanitize_for_narration
 from app.narration_agent.chat.chat_orchestrator import ChatOrchestrator
+from app.narration_agent.chat.conversation_context import ConversationContextManager
 from app.narration_agent.llm_client import LLMClient
 from app.narration_agent.logging_utils import write_plan_log
 from app.narration_agent.task_runner import TaskRunner
@@ -97,12 +98,16 @@ def run_chat_flow(
         include_1c=False,
         chat_mode=last_trigger,
     )
+    conversation = ConversationContextManager(_CHAT_MEMORY, llm_client).build_context(
+        project_id, resolved_session_id
+    )
     llm_result, llm_meta = chat_orchestrator.build_task_plan_llm(
         llm_client=llm_client,
         input_payload={
             "session_id": resolved_session_id,
             "user_message": message,
-            "conversation_history": _CHAT_MEMORY.load_messages(project_id, resolved_session_id),
+            "conversation_summary": conversation["summary"],
+            "conversation_history": conversation["messages"],
             "state_ref": "",
             "state_payload": prior_snapshot,
             "config": {
@@ -124,6 +129,12 @@ def run_chat_flow(
         payload={
             "used_llm": llm_meta.get("used_llm"),
             "reason": llm_meta.get("reason"),
+            "conversation": {
+                "summarized_through": conversation["summarized_through"],
+                "recent_messages": len(conversation["messages"]),
+                "omitted": conversation["omitted"],
+                "estimated_tokens": conversation["estimated_tokens"],
+            },
             "raw_output": llm_meta.get("raw_output", "")[:8000],
         },
     )
@@ -0,0 +1,206 @@
+"""Token-budgeted conversation context for chat prompts.
+
+Prompts get the last CHAT_CONTEXT_RECENT_TURNS turns verbatim plus a
+rolling summary of everything older. The summary is persisted with the
+session, together with the index of the first message it does not cover,
+and is only refreshed once CHAT_SUMMARY_BATCH_TURNS more turns have left
+the verbatim window: the refresh reads just those messages (a page of the
+session log) and folds them into the previous summary. The result is capped
+at CHAT_CONTEXT_MAX_TOKENS, so prompt size does not grow with the session.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
+from app.narration_agent.llm_client import LLMClient, LLMRequest
+from app.narration_agent.spec_loader import load_text
+from app.utils.ids import generate_timestamp
+from app.utils.logging import setup_logger
+
+
+logger = setup_logger("mcp_narrations")
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators
+FALLBACK_LINE_CHARS = 300  # per message in the summary built without the LLM
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    content = message.get("content", "")
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content if isinstance(content, str) else str(content))
+
+
+def _clip_head(text: str, max_tokens: int) -> str:
+    """Keep the beginning of `text` within `max_tokens`."""
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[: max(max_chars - 3, 0)].rstrip() + "..."
+
+
+def _clip_tail(text: str, max_tokens: int) -> str:
+    """Keep the end of `text` (the most recent part of a summary) within `max_tokens`."""
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return "..." + text[len(text) - max(max_chars - 3, 0):].lstrip()
+
+
+def fit_to_budget(
+    summary: str,
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Trim a summary and recent messages to a token budget.
+
+    The summary is capped at CHAT_SUMMARY_MAX_TOKENS, then messages are kept
+    newest first while they fit. The latest message is always kept, clipped
+    if it alone exceeds the budget.
+
+    Returns:
+        (summary, messages) within `max_tokens` (estimated)
+    """
+    summary = _clip_tail(summary, min(settings.CHAT_SUMMARY_MAX_TOKENS, max_tokens))
+    budget = max_tokens - estimate_tokens(summary)
+    kept: List[Dict[str, Any]] = []
+    for message in reversed(messages):
+        cost = message_tokens(message)
+        if cost > budget:
+            if not kept and budget > MESSAGE_OVERHEAD_TOKENS:
+                content = str(message.get("content", ""))
+                kept.append(dict(message, content=_clip_head(content, budget - MESSAGE_OVERHEAD_TOKENS)))
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+    return summary, kept
+
+
+class ConversationContextManager:
+    """Recent turns plus a persisted rolling summary, within a token budget."""
+
+    def __init__(self, memory_store: ChatMemoryStore, llm_client: Optional[LLMClient] = None):
+        """
+        Args:
+            memory_store: Session storage (messages log and summary)
+            llm_client: Summarizer; without one, older turns are folded in as clipped excerpts
+        """
+        self.memory_store = memory_store
+        self.llm_client = llm_client
+        self.prompt = load_text("chat/02_conversation_summary.md").strip()
+
+    def build_context(self, project_id: str, session_id: str) -> Dict[str, Any]:
+        """
+        Conversation context for a prompt.
+
+        Args:
+            project_id: Project id
+            session_id: Chat session id
+
+        Returns:
+            Dict with summary (older turns), messages (recent turns, verbatim),
+            summarized_through (messages covered by the summary), omitted
+            (messages in neither, dropped to fit the budget) and estimated_tokens
+        """
+        summary = self.refresh_summary(project_id, session_id)
+        total = self.memory_store.count_messages(project_id, session_id)
+        # Bounded read even if summaries fell behind (e.g. summarizer errors)
+        max_window = 2 * (settings.CHAT_CONTEXT_RECENT_TURNS + settings.CHAT_SUMMARY_BATCH_TURNS)
+        start = max(summary["through"], total - max_window)
+        recent = self.memory_store.load_messages(project_id, session_id, offset=start)
+        text, messages = fit_to_budget(summary["text"], recent, settings.CHAT_CONTEXT_MAX_TOKENS)
+        return {
+            "summary": text,
+            "messages": messages,
+            "summarized_through": summary["through"],
+            "omitted": start - summary["through"] + len(recent) - len(messages),
+            "estimated_tokens": estimate_tokens(text) + sum(message_tokens(m) for m in messages),
+        }
+
+    def refresh_summary(self, project_id: str, session_id: str) -> Dict[str, Any]:
+        """
+        Fold the turns that left the verbatim window into the summary, if enough did.
+
+        Returns:
+            Summary dict with text, through and updated_at
+        """
+        summary = self.memory_store.load_summary(project_id, session_id)
+        total = self.memory_store.count_messages(project_id, session_id)
+        keep = 2 * settings.CHAT_CONTEXT_RECENT_TURNS
+        if total - summary["through"] < keep + 2 * max(settings.CHAT_SUMMARY_BATCH_TURNS, 1):
+            return summary
+        through = total - keep
+        leaving = self.memory_store.load_messages(
+            project_id, session_id, offset=summary["through"], limit=through - summary["through"]
+        )
+        updated = {
+            "text": self._fold(summary["text"], leaving),
+            "through": through,
+            "updated_at": generate_timestamp(),
+        }
+        return self.memory_store.save_summary(project_id, session_id, updated)
+
+    def _fold(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        """Fold messages into the summary, in chunks that fit one summarization call."""
+        text = previous
+        chunk: List[Dict[str, Any]] = []
+        chunk_tokens = 0
+        for message in messages:
+            cost = message_tokens(message)
+            if chunk and chunk_tokens + cost > settings.CHAT_SUMMARY_INPUT_MAX_TOKENS:
+                text = self._summarize(text, chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(message)
+            chunk_tokens += cost
+        if chunk:
+            text = self._summarize(text, chunk)
+        return text
+
+    def _summarize(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        budget = settings.CHAT_SUMMARY_MAX_TOKENS
+        if self.llm_client is not None:
+            payload = {
+                "previous_summary": previous,
+                "new_messages": [
+                    {
+                        "role": message.get("role", ""),
+                        "content": _clip_head(
+                            str(message.get("content", "")), settings.CHAT_SUMMARY_INPUT_MAX_TOKENS
+                        ),
+                    }
+                    for message in messages
+                ],
+                "max_words": budget * 3 // 4,
+            }
+            try:
+                response = self.llm_client.complete(
+                    LLMRequest(
+                        model=self.llm_client.default_model,
+                        messages=[
+                            {"role": "system", "content": self.prompt or "Summarize the conversation."},
+                            {"role": "user", "content": json.dumps(payload, ensure_ascii=True)},
+                        ],
+                        temperature=0.2,
+                        max_tokens=budget,
+                    )
+                )
+                text = response.content.strip()
+                if text:
+                    return _clip_tail(text, budget)
+            except Exception as e:
+                logger.warning(f"Conversation summary failed, using excerpts: {e}")
+        lines = [previous] if previous else []
+        for message in messages:
+            content = " ".join(str(message.get("content", "")).split())
+            lines.append(f"{message.get('role', '')}: {content[:FALLBACK_LINE_CHARS]}")
+        return _clip_tail("\n".join(lines), budget)
@@ -8,7 +8,7 @@ from typing import Any, Dict, List
 
 from app.narration_agent.llm_client import LLMClient, LLMRequest
 from app.utils.logging import setup_logger
-from app.utils.project_storage import read_strata, write_strata, write_ui_strata
+from app.utils.project_storage import read_strata, strata_lock, write_strata, write_ui_strata
 
 UI_TRANSLATE_FIELDS = {
     "n0": [
@@ -136,7 +136,16 @@ class UITranslator:
             )
         passthrough = self._select_fields(ui_data, UI_PASSTHROUGH_FIELDS.get(strata, []))
         merged_fields = _deep_merge(translated, passthrough)
-        updated = write_strata(project_id, strata, _deep_merge(deepcopy(data), merged_fields))
+        # Translation runs unlocked; merge into the state as it is now, not as read above
+        with strata_lock(project_id, strata):
+            try:
+                source_state = read_strata(project_id, strata)
+            except FileNotFoundError:
+                return None
+            data = source_state.get("data") if isinstance(source_state, dict) else None
+            if not isinstance(data, dict):
+                return None
+            updated = write_strata(project_id, strata, _deep_merge(data, merged_fields))
         self.update_ui_translation(project_id, strata, language=source_language)
         return updated
 
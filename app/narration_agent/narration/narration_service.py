@@ -11,7 +11,7 @@ from app.narration_agent.logging_utils import write_plan_log
 from app.narration_agent.narration.narrator_orchestrator import NarratorOrchestrator
 from app.narration_agent.task_runner import TaskRunner
 from app.utils.ids import generate_timestamp
-from app.utils.project_storage import get_project_root, read_strata, write_strata
+from app.utils.project_storage import get_project_root, read_strata, strata_lock, write_strata
 
 
 def has_pending_questions(state: Dict[str, Any]) -> bool:
@@ -140,50 +140,51 @@ def _build_n1_character_entry(name: str, profile: str) -> Dict[str, Any]:
 
 
 def _materialize_n1_character_entries(project_id: str) -> Dict[str, Any]:
-    try:
-        state = read_strata(project_id, "n1")
-    except FileNotFoundError:
-        return {}
-    data = state.get("data") if isinstance(state, dict) else {}
-    if not isinstance(data, dict):
-        return {}
-    characters = data.get("characters")
-    if not isinstance(characters, dict):
-        return {}
-    def materialize_group(group_key: str, profile: str, fallback_label: str) -> Dict[str, Any]:
-        group = characters.get(group_key)
-        if not isinstance(group, dict):
-            group = {}
-        number = max(0, _to_int(group.get("number", 0), 0))
-        raw_names = group.get("names", [])
-        names: List[str] = []
-        if isinstance(raw_names, list):
-            for value in raw_names:
-                if not isinstance(value, str):
-                    continue
-                cleaned = value.strip()
-                if cleaned:
-                    names.append(cleaned)
-        selected_names: List[str] = names[:number]
-        while len(selected_names) < number:
-            selected_names.append(f"{fallback_label} {len(selected_names) + 1}")
-        group["names"] = selected_names
-        group["characters"] = [
-            _build_n1_character_entry(name, profile) for name in selected_names
-        ]
-        return group
-
-    characters["main_characters"] = materialize_group(
-        "main_characters", "main", "Main Character"
-    )
-    characters["secondary_characters"] = materialize_group(
-        "secondary_characters", "secondary", "Secondary Character"
-    )
-    characters["background_characters"] = materialize_group(
-        "background_characters", "background", "Background Character"
-    )
-    data["characters"] = characters
-    return write_strata(project_id, "n1", data)
+    with strata_lock(project_id, "n1"):
+        try:
+            state = read_strata(project_id, "n1")
+        except FileNotFoundError:
+            return {}
+        data = state.get("data") if isinstance(state, dict) else {}
+        if not isinstance(data, dict):
+            return {}
+        characters = data.get("characters")
+        if not isinstance(characters, dict):
+            return {}
+        def materialize_group(group_key: str, profile: str, fallback_label: str) -> Dict[str, Any]:
+            group = characters.get(group_key)
+            if not isinstance(group, dict):
+                group = {}
+            number = max(0, _to_int(group.get("number", 0), 0))
+            raw_names = group.get("names", [])
+            names: List[str] = []
+            if isinstance(raw_names, list):
+                for value in raw_names:
+                    if not isinstance(value, str):
+                        continue
+                    cleaned = value.strip()
+                    if cleaned:
+                        names.append(cleaned)
+            selected_names: List[str] = names[:number]
+            while len(selected_names) < number:
+                selected_names.append(f"{fallback_label} {len(selected_names) + 1}")
+            group["names"] = selected_names
+            group["characters"] = [
+                _build_n1_character_entry(name, profile) for name in selected_names
+            ]
+            return group
+
+        characters["main_characters"] = materialize_group(
+            "main_characters", "main", "Main Character"
+        )
+        characters["secondary_characters"] = materialize_group(
+            "secondary_characters", "secondary", "Secondary Character"
+        )
+        characters["background_characters"] = materialize_group(
+            "background_characters", "background", "Background Character"
+        )
+        data["characters"] = characters
+        return write_strata(project_id, "n1", data)
 
 
 def _build_n1_main_character_writing_plan(project_id: str) -> Dict[str, Any]:
@@ -479,31 +480,32 @@ def _apply_output_metadata_to_n0(project_id: str, output_state: Dict[str, Any])
     if not (isinstance(video_type, str) and video_type.strip()) and not duration_s:
         return
 
-    try:
-        n0_state = read_strata(project_id, "n0")
-    except FileNotFoundError:
-        n0_state = {}
-    data = n0_state.get("data") if isinstance(n0_state, dict) else {}
-    if not isinstance(data, dict):
-        data = {}
-    narrative_presentation = _get_n0_narrative_presentation(data)
-
-    if isinstance(video_type, str) and video_type.strip():
-        mapped = _map_video_type_to_production_type(video_type.strip())
-        if mapped:
-            narrative_presentation["production_type"] = mapped
-
-    duration_seconds = _coerce_duration_seconds(duration_s)
-    if duration_seconds > 0:
-        narrative_presentation["target_duration"] = _format_duration_timecode(duration_seconds)
-        narrative_presentation["target_duration_text"] = _format_duration_text_en(duration_seconds)
-
-    if narrative_presentation:
-        data = {**data, "narrative_presentation": narrative_presentation}
+    with strata_lock(project_id, "n0"):
         try:
-            write_strata(project_id, "n0", data)
-        except Exception:
-            return
+            n0_state = read_strata(project_id, "n0")
+        except FileNotFoundError:
+            n0_state = {}
+        data = n0_state.get("data") if isinstance(n0_state, dict) else {}
+        if not isinstance(data, dict):
+            data = {}
+        narrative_presentation = _get_n0_narrative_presentation(data)
+
+        if isinstance(video_type, str) and video_type.strip():
+            mapped = _map_video_type_to_production_type(video_type.strip())
+            if mapped:
+                narrative_presentation["production_type"] = mapped
+
+        duration_seconds = _coerce_duration_seconds(duration_s)
+        if duration_seconds > 0:
+            narrative_presentation["target_duration"] = _format_duration_timecode(duration_seconds)
+            narrative_presentation["target_duration_text"] = _format_duration_text_en(duration_seconds)
+
+        if narrative_presentation:
+            data = {**data, "narrative_presentation": narrative_presentation}
+            try:
+                write_strata(project_id, "n0", data)
+            except Exception:
+                return
 
 
 def _map_video_type_to_production_type(value: str) -> str:
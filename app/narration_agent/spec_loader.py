@@ -1,25 +1,164 @@
-"""Load local specs (md/json) for narration_agent runtime."""
+"""Load local specs (md/json) for narration_agent runtime.
+
+Specs are served from an in-memory registry: every spec file under the
+package is read once (`preload_specs` at startup, or lazily on first use)
+and later calls do no file I/O. JSON specs are shared between callers as
+read-only objects (dict/list subclasses that refuse mutation); callers that
+need to build mutable state from a spec take a `thaw` copy.
+
+In development, `reload_specs` (or `POST /system/specs/reload`) drops the
+registry so edited specs are picked up without a restart.
+"""
 
 from __future__ import annotations
 
 import json
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from app.utils.logging import logger
 
 
 _BASE_DIR = Path(__file__).resolve().parent
 
+SPEC_SUFFIXES = (".md", ".json", ".txt")
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Spec objects are shared and read-only; use thaw() for a mutable copy")
+
+
+class FrozenDict(dict):
+    """dict that refuses mutation (still a dict for isinstance checks and json.dumps)."""
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        return thaw(self)
+
+
+class FrozenList(list):
+    """list that refuses mutation."""
+
+    __setitem__ = __delitem__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __iadd__ = __imul__ = _read_only
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> list:
+        return thaw(self)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Plain mutable deep copy of a (frozen) spec object."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class SpecRegistry:
+    """In-memory cache of spec texts and parsed JSON specs."""
+
+    def __init__(self, base_dir: Path = _BASE_DIR):
+        self.base_dir = base_dir
+        self._texts: Dict[str, Optional[str]] = {}
+        self._jsons: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, relative_path: str) -> str:
+        return Path(relative_path).as_posix()
+
+    def _read(self, key: str) -> Optional[str]:
+        path = self.base_dir / key
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    def text(self, relative_path: str) -> str:
+        key = self._key(relative_path)
+        with self._lock:
+            if key not in self._texts:
+                # Missing files are cached too: callers probe optional specs
+                self._texts[key] = self._read(key)
+            return self._texts[key] or ""
+
+    def json(self, relative_path: str) -> Dict[str, Any]:
+        key = self._key(relative_path)
+        with self._lock:
+            if key in self._jsons:
+                return self._jsons[key]
+        text = self.text(relative_path)
+        parsed = freeze(json.loads(text)) if text else FrozenDict()
+        with self._lock:
+            return self._jsons.setdefault(key, parsed)
+
+    def preload(self) -> int:
+        """Read (and parse) every spec file under the package; returns how many."""
+        count = 0
+        for path in sorted(self.base_dir.rglob("*")):
+            if path.suffix not in SPEC_SUFFIXES or "__pycache__" in path.parts or not path.is_file():
+                continue
+            relative_path = path.relative_to(self.base_dir).as_posix()
+            try:
+                if path.suffix == ".json":
+                    self.json(relative_path)
+                else:
+                    self.text(relative_path)
+            except Exception as e:
+                logger.warning(f"Failed to preload spec {relative_path}: {e}")
+                continue
+            count += 1
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._texts.clear()
+            self._jsons.clear()
+
+
+# Global registry instance
+_registry = SpecRegistry()
+
+
+def get_spec_registry() -> SpecRegistry:
+    return _registry
+
+
+def preload_specs() -> int:
+    """Load all specs into memory (called at startup)."""
+    count = _registry.preload()
+    logger.info(f"Preloaded {count} narration spec file(s)")
+    return count
+
+
+def reload_specs() -> int:
+    """Drop cached specs and read them again from disk (development hot-reload)."""
+    _registry.clear()
+    return preload_specs()
+
 
 def load_text(relative_path: str) -> str:
-    path = _BASE_DIR / relative_path
-    if not path.exists():
-        return ""
-    return path.read_text(encoding="utf-8")
+    return _registry.text(relative_path)
 
 
 def load_json(relative_path: str) -> Dict[str, Any]:
-    path = _BASE_DIR / relative_path
-    if not path.exists():
-        return {}
-    text = path.read_text(encoding="utf-8")
-    return json.loads(text) if text else {}
+    """Parsed JSON spec, shared and read-only (see `thaw`)."""
+    return _registry.json(relative_path)
@@ -5,9 +5,11 @@ import re
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
+from app.config.settings import settings
 from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
+from app.narration_agent.chat.conversation_context import fit_to_budget
 from app.narration_agent.llm_client import LLMClient, LLMRequest
-from app.narration_agent.spec_loader import load_json, load_text
+from app.narration_agent.spec_loader import load_json, load_text, thaw
 from app.narration_agent.chat.ui_translator import UITranslator
 from app.narration_agent.writer_agent.writer_orchestrator import WriterOrchestrator
 from app.narration_agent.writer_agent.strategy_finder.rag_bootstrap import (
@@ -153,7 +155,7 @@ class TaskRunner:
 
     def _initialize_state(self) -> Dict[str, Any]:
         template = load_json("chat/state_structure_01_abc.json") or {}
-        return {key: value for key, value in template.items() if not key.startswith("_")}
+        return {key: thaw(value) for key, value in template.items() if not key.startswith("_")}
 
     def _parse_json_patch(self, payload: str) -> Dict[str, Any]:
         if not payload:
@@ -447,21 +449,22 @@ class TaskRunner:
             pending_rounds = 0
         chat_mode = payload.get("chat_mode", "auto")
 
-        session_messages = self.memory_store.load_messages(project_id, session_id)
-        session_messages.append({"role": "user", "content": message})
-        full_user_text = "\n\n".join(
-            [
-                msg.get("content", "")
-                for msg in session_messages
-                if isinstance(msg, dict) and msg.get("role") == "user"
-            ]
-        ).strip()
+        # Only the recent window is read; the full user text is sized from the
+        # session counters and loaded only if the summary needs a repair
+        user_entry = {"role": "user", "content": message}
+        session_messages = self.memory_store.load_messages(project_id, session_id, tail=11)
+        session_messages.append(user_entry)
+        stats = self.memory_store.load_session_stats(project_id, session_id)
+        full_user_chars = (
+            stats["user_chars"] + (2 if stats["user_messages"] else 0) + len(message)
+        )
 
         system_prompt = self._build_system_prompt(
             project_empty, empty_strata, pending_questions, pending_rounds, chat_mode
         )
         chat_messages = [{"role": "system", "content": system_prompt}]
-        chat_messages.extend(session_messages[-12:])
+        _, window = fit_to_budget("", session_messages[-12:], settings.CHAT_CONTEXT_MAX_TOKENS)
+        chat_messages.extend(window)
 
         llm_response = self.llm_client.complete(
             LLMRequest(model=self.llm_client.default_model, messages=chat_messages, temperature=0.4)
@@ -474,10 +477,15 @@ class TaskRunner:
             patch = self._parse_json_payload(payload=json_payload, fallback="") or {}
             summary = self._get_nested_str(patch, ["core", "summary"])
             if summary:
-                src_len = len(full_user_text or message.strip())
+                src_len = full_user_chars or len(message.strip())
                 out_len = len(summary)
                 min_chars, max_chars = self._translation_length_bounds(src_len)
                 if src_len and (out_len < min_chars or out_len > max_chars):
+                    history = self.memory_store.load_messages(project_id, session_id)
+                    history.append(user_entry)
+                    full_user_text = "\n\n".join(
+                        [msg.get("content", "") for msg in history if msg.get("role") == "user"]
+                    ).strip()
                     repaired = self._repair_chat_1a_patch_length(
                         user_message=full_user_text or message,
                         patch=patch,
@@ -489,8 +497,9 @@ class TaskRunner:
                     if repaired_summary and (min_chars <= repaired_len <= max_chars):
                         json_payload = json.dumps(repaired, ensure_ascii=True)
 
-        session_messages.append({"role": "assistant", "content": user_text})
-        self.memory_store.save_messages(project_id, session_id, session_messages)
+        self.memory_store.append_messages(
+            project_id, session_id, [user_entry, {"role": "assistant", "content": user_text}]
+        )
 
         return {
             "assistant_message": user_text,
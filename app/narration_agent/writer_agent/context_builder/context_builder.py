@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Tuple, Union
 
 from app.narration_agent.spec_loader import load_json
-from app.utils.project_storage import get_strata_path, read_strata
+from app.utils.project_storage import read_strata
 
 PathSegment = Union[str, int]
 
@@ -302,16 +302,20 @@ def _load_neighbor_dependencies(project_id: str, strata: str) -> Dict[str, Any]:
         "n5": {},
     }
     for neighbor in neighbors.get(strata, []):
-        path = get_strata_path(project_id, neighbor)
-        if path.exists():
-            result[f"{neighbor}_ref"] = str(path)
-            try:
-                result[neighbor] = read_strata(project_id, neighbor)
-            except FileNotFoundError:
-                result[neighbor] = {}
+        try:
+            result[neighbor] = read_strata(project_id, neighbor)
+        except FileNotFoundError:
+            continue
+        result[f"{neighbor}_ref"] = _strata_ref(project_id, neighbor, result[neighbor])
     return result
 
 
+def _strata_ref(project_id: str, strata: str, state: Dict[str, Any]) -> str:
+    """Storage-independent reference to the state version loaded inline (journal included)."""
+    updated_at = state.get("updated_at") if isinstance(state, dict) else None
+    return f"{project_id}/{strata}@{updated_at}" if updated_at else f"{project_id}/{strata}"
+
+
 def _infer_writing_typology(target_path: str) -> str:
     mapping = load_json("narration/specs/writing_typology_map.json") or {}
     defaults = mapping.get("defaults", {}) if isinstance(mapping, dict) else {}
@@ -20,7 +20,8 @@ import httpx
 
 from app.utils.ids import generate_timestamp
 from app.utils.logging import setup_logger
-from app.utils.project_storage import get_data_root, get_project_root
+from app.utils.project_storage import get_data_root
+from app.utils.storage_backend import RAG_META_KEY, get_storage_backend
 from app.narration_agent.writer_agent.strategy_finder.library_rag import LibraryRAG
 
 logger = setup_logger("rag_bootstrap")
@@ -344,15 +345,7 @@ def _clear_all_rag_meta_files() -> int:
 
 def _clear_project_rag_meta_file(project_id: str) -> bool:
     try:
-        root = get_project_root(project_id)
-        safe_project = "".join(c for c in project_id if c.isalnum() or c in ("-", "_")).strip()
-        if not safe_project:
-            safe_project = "default"
-        path = root / "metadata" / f"{safe_project}_RAG_META.json"
-        if path.exists():
-            path.unlink(missing_ok=True)
-            return True
-        return False
+        return get_storage_backend().delete(project_id, "rag_meta", RAG_META_KEY)
     except Exception:
         return False
 
@@ -15,6 +15,7 @@ from typing import Any, Dict, List
 from app.config.settings import settings
 from app.utils.ids import generate_timestamp
 from app.utils.project_storage import get_data_root, get_project_root
+from app.utils.storage_backend import RAG_META_KEY, get_storage_backend
 
 from app.narration_agent.llm_client import LLMClient, LLMRequest
 from app.narration_agent.spec_loader import load_json
@@ -1551,8 +1552,7 @@ class StrategyFinder:
     def _resolve_rag_conversation_id(self, project_id: str, target_path: str) -> str:
         key = self._rag_conversation_key(target_path)
         legacy_key = self._legacy_rag_conversation_key(target_path)
-        path = self._rag_meta_path(project_id)
-        payload = self._read_json_file(path)
+        payload = self._read_rag_meta(project_id)
         conversations = payload.get("conversations", {}) if isinstance(payload, dict) else {}
         if not isinstance(conversations, dict):
             conversations = {}
@@ -1572,7 +1572,7 @@ class StrategyFinder:
                         "updated_at": generate_timestamp(),
                         "conversations": conversations,
                     }
-                    self._write_json_file(path, next_payload)
+                    self._write_rag_meta(project_id, next_payload)
                     return legacy_uuid
         new_uuid = self._rag.create_conversation(name=f"{project_id}:{key}", target_path=target_path)
         if not new_uuid:
@@ -1583,7 +1583,7 @@ class StrategyFinder:
             "updated_at": generate_timestamp(),
             "conversations": conversations,
         }
-        self._write_json_file(path, next_payload)
+        self._write_rag_meta(project_id, next_payload)
         return new_uuid
 
     def _rag_conversation_key(self, target_path: str) -> str:
@@ -1619,8 +1619,7 @@ class StrategyFinder:
 
     def _rotate_rag_conversation_id(self, project_id: str, target_path: str) -> str:
         key = self._rag_conversation_key(target_path)
-        path = self._rag_meta_path(project_id)
-        payload = self._read_json_file(path)
+        payload = self._read_rag_meta(project_id)
         conversations = payload.get("conversations", {}) if isinstance(payload, dict) else {}
         if not isinstance(conversations, dict):
             conversations = {}
@@ -1633,15 +1632,21 @@ class StrategyFinder:
             "updated_at": generate_timestamp(),
             "conversations": conversations,
         }
-        self._write_json_file(path, next_payload)
+        self._write_rag_meta(project_id, next_payload)
         return new_uuid
 
-    def _rag_meta_path(self, project_id: str) -> Path:
-        root = get_project_root(project_id)
-        safe_project = "".join(c for c in project_id if c.isalnum() or c in ("-", "_")).strip()
-        if not safe_project:
-            safe_project = "default"
-        return root / "metadata" / f"{safe_project}_RAG_META.json"
+    def _read_rag_meta(self, project_id: str) -> Dict[str, Any]:
+        try:
+            payload = get_storage_backend().get(project_id, "rag_meta", RAG_META_KEY)
+        except Exception:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def _write_rag_meta(self, project_id: str, payload: Dict[str, Any]) -> None:
+        try:
+            get_storage_backend().put(project_id, "rag_meta", RAG_META_KEY, payload)
+        except Exception:
+            return
 
     def _to_uuid_or_empty(self, value: Any) -> str:
         if not isinstance(value, str):
@@ -1,19 +1,175 @@
 """
 Pipeline: Combine voice, sound effects, and music into a single audio stack.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from app.config.settings import settings
 from app.tools.elevenlabs import voice, music, soundfx
 from app.tools.elevenlabs.client import get_client
 from app.utils.ids import generate_job_id, generate_timestamp
 from app.utils.errors import ValidationError
 from app.utils.logging import logger
+from app.jobs.progress import report_progress
 from app.mcp.schemas import AssetLink
+from app.pipelines.checkpoint import PipelineCheckpoint, run_checkpointed, run_checkpointed_async
+from app.pipelines.dag import PipelineDAG, PipelineStep, StepState, attach_step_job, update_step_result
 
 
-def audio_stack(payload: Dict[str, Any]) -> Dict[str, Any]:
+# (payload key, step name, required field, handler module, handler name)
+AUDIO_STEPS = [
+    ("voice", "voice_generation", "text", voice, "generate_voice"),
+    ("music", "music_generation", "prompt", music, "generate_music"),
+    ("soundfx", "soundfx_generation", "prompt", soundfx, "generate_soundfx"),
+]
+
+EXECUTION_MODES = {"sequential", "parallel"}
+
+
+def _timeout(value: Any, field: str) -> float:
+    """Coerce a timeout to seconds, rejecting non-numeric or non-positive values."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{field} must be a positive number of seconds")
+    if not 0 < seconds < float("inf"):
+        raise ValidationError(f"{field} must be a positive number of seconds")
+    return seconds
+
+
+def _plan(payload: Dict[str, Any]) -> List[Tuple[tuple, Dict[str, Any], float]]:
+    """
+    Validate the payload and return the steps to run.
+
+    Returns:
+        List of (step spec, handler params, timeout in seconds)
+    """
+    if not any(payload.get(key) for key, *_ in AUDIO_STEPS):
+        raise ValidationError("At least one of voice, music, or soundfx must be provided")
+
+    mode = payload.get("mode", "sequential")
+    if mode not in EXECUTION_MODES:
+        raise ValidationError(f"mode must be one of: {', '.join(sorted(EXECUTION_MODES))}")
+
+    default_timeout = settings.ELEVENLABS_POLL_MAX_WAIT
+    if payload.get("step_timeout") is not None:
+        default_timeout = _timeout(payload["step_timeout"], "step_timeout")
+    planned = []
+    for spec in AUDIO_STEPS:
+        key, _, required, _, _ = spec
+        params = payload.get(key)
+        if not params:
+            continue
+        if not params.get(required):
+            raise ValidationError(f"{key}.{required} is required when {key} is provided")
+        params = dict(params)
+        timeout = params.pop("timeout", None)
+        timeout = default_timeout if timeout is None else _timeout(timeout, f"{key}.timeout")
+        planned.append((spec, params, timeout))
+    return planned
+
+
+def _asset_link(spec: tuple, result: Dict[str, Any], final_status: Dict[str, Any]) -> List[Dict[str, Any]]:
+    url = final_status.get("result_url") or final_status.get("url")
+    if not url:
+        return []
+    asset = AssetLink(
+        url=url,
+        asset_id=result.get("asset_id", "unknown"),
+        asset_type=spec[0],
+        provider="elevenlabs",
+        created_at=generate_timestamp()
+    )
+    return [asset.model_dump(exclude_none=True)]
+
+
+def _polled_result(spec: tuple, result: Dict[str, Any], final_status: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the polled provider status into the submit result."""
+    status = final_status.get("status", "").lower()
+    if status == "completed":
+        return {**result, "status": "completed", "links": _asset_link(spec, result, final_status)}
+    if status in ("failed", "error"):
+        return {**result, "status": "failed", "error": final_status.get("error")}
+    return {
+        **result,
+        "status": "timeout",
+        "error": {
+            "code": "STEP_TIMEOUT",
+            "message": f"{spec[1]} did not complete in time",
+            "retryable": True
+        }
+    }
+
+
+def _step(spec: tuple, wait_for_completion: bool, max_wait: Optional[float] = None):
+    """
+    Step callable: submit, then wait through the shared poller on the event loop.
+
+    Sequential steps bound the wait with `max_wait`; parallel steps are
+    bounded as a whole by the DAG step timeout.
+    """
+    key, _, _, module, handler_name = spec
+
+    async def run(params: Dict[str, Any]) -> Dict[str, Any]:
+        result = await getattr(module, f"{handler_name}_async")(attach_step_job(params))
+        update_step_result(job_id=result.get("job_id"))
+        if result.get("status") != "pending" or not wait_for_completion:
+            return result
+        logger.info(f"Polling for {key} completion: job_id={result.get('job_id')}")
+        final_status = await get_client().poll_job_async(result.get("job_id"), max_wait=max_wait)
+        return _polled_result(spec, result, final_status)
+
+    return run
+
+
+def _build_dag(payload: Dict[str, Any], pipeline_job_id: str) -> PipelineDAG:
+    """
+    Independent steps, one per requested audio type. Sequential mode runs
+    them one at a time; parallel mode runs all of them at once.
+    """
+    planned = _plan(payload)
+    parallel = payload.get("mode") == "parallel"
+    wait_for_completion = payload.get("wait_for_completion", True)
+    retries = int(payload.get("retries", 0))
+
+    def on_step(state: StepState) -> None:
+        report_progress(
+            payload, "step", name=state.name, status=state.status,
+            attempt=state.attempts, pipeline_job_id=pipeline_job_id
+        )
+
+    steps = [
+        PipelineStep(
+            name=spec[0],
+            label=spec[1],
+            run=_step(spec, wait_for_completion, None if parallel else timeout),
+            params=params,
+            retries=retries,
+            timeout=timeout if parallel else None
+        )
+        for spec, params, timeout in planned
+    ]
+    return PipelineDAG(steps, max_concurrency=None if parallel else 1, on_step=on_step)
+
+
+def _prepare(payload: Dict[str, Any], pipeline_job_id: Optional[str] = None):
+    """Validate the payload and build the pipeline DAG."""
+    pipeline_job_id = pipeline_job_id or generate_job_id("pipeline")
+    dag = _build_dag(payload, pipeline_job_id)
+    params = {
+        "voice": payload.get("voice"),
+        "music": payload.get("music"),
+        "soundfx": payload.get("soundfx"),
+        "mode": payload.get("mode", "sequential")
+    }
+    return dag, pipeline_job_id, params
+
+
+def audio_stack(
+    payload: Dict[str, Any],
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
     """
     Pipeline: Generate and combine voice, sound effects, and music.
-    
+
     Expected payload:
         - voice: dict (optional) - Voice generation parameters
             - text: str (required if voice provided)
@@ -24,247 +180,37 @@ def audio_stack(payload: Dict[str, Any]) -> Dict[str, Any]:
         - soundfx: dict (optional) - Sound effect generation parameters
             - prompt: str (required if soundfx provided)
             - duration, temperature, seed
+        - Each step dict may set timeout: float (seconds) to override step_timeout
         - At least one of voice, music, or soundfx must be provided
+        - mode: str (optional) - "sequential" (default) or "parallel"
+        - step_timeout: float (optional) - Per-step wait in seconds (default: ELEVENLABS_POLL_MAX_WAIT)
+        - retries: int (optional) - Retries per step on retryable failure/timeout (default: 0)
         - wait_for_completion: bool (optional) - Wait for all jobs to complete (default: True)
-    
+
+    Args:
+        checkpoint: Checkpoint of an interrupted run to resume (see `pipeline_resume`)
+
     Returns:
-        Combined job status with links to all generated audio assets
+        Combined job status with links to all generated audio assets.
+        Steps that exceed their timeout are reported with status "timeout"
+        and the pipeline status is "partial".
     """
-    # Validate payload - at least one audio type must be provided
-    voice_params = payload.get("voice")
-    music_params = payload.get("music")
-    soundfx_params = payload.get("soundfx")
-    
-    if not voice_params and not music_params and not soundfx_params:
-        raise ValidationError("At least one of voice, music, or soundfx must be provided")
-    
-    wait_for_completion = payload.get("wait_for_completion", True)
-    
-    # Generate pipeline job ID
-    pipeline_job_id = generate_job_id("pipeline")
-    created_at = generate_timestamp()
-    
-    logger.info(f"Starting audio_stack pipeline: pipeline_job_id={pipeline_job_id}")
-    
     try:
-        steps = []
-        all_links = []
-        all_job_ids = []
-        errors = []
-        
-        # Step 1: Generate voice (if provided)
-        if voice_params:
-            if not voice_params.get("text"):
-                raise ValidationError("voice.text is required when voice is provided")
-            
-            logger.info(f"Step 1: Generating voice for pipeline {pipeline_job_id}")
-            voice_result = voice.generate_voice(voice_params)
-            voice_job_id = voice_result.get("job_id")
-            voice_status = voice_result.get("status")
-            all_job_ids.append(voice_job_id)
-            
-            steps.append({
-                "step": len(steps) + 1,
-                "name": "voice_generation",
-                "job_id": voice_job_id,
-                "status": voice_status
-            })
-            
-            if voice_status == "failed":
-                errors.append({
-                    "step": "voice_generation",
-                    "error": voice_result.get("error")
-                })
-            elif voice_status == "completed":
-                all_links.extend(voice_result.get("links", []))
-            elif voice_status == "pending" and wait_for_completion:
-                # Poll for voice completion
-                logger.info(f"Polling for voice completion: job_id={voice_job_id}")
-                elevenlabs_client = get_client()
-                final_voice_status = elevenlabs_client.get_job_status(voice_job_id)
-                
-                # Simple polling loop (could be improved)
-                max_polls = 60  # 5 minutes max at 5s intervals
-                poll_count = 0
-                while final_voice_status.get("status", "").lower() not in ["completed", "failed"] and poll_count < max_polls:
-                    import time
-                    time.sleep(5)
-                    final_voice_status = elevenlabs_client.get_job_status(voice_job_id)
-                    poll_count += 1
-                
-                voice_status = final_voice_status.get("status", "").lower()
-                steps[-1]["status"] = voice_status
-                
-                if voice_status == "completed":
-                    voice_url = final_voice_status.get("result_url") or final_voice_status.get("url")
-                    if voice_url:
-                        voice_asset = AssetLink(
-                            url=voice_url,
-                            asset_id=voice_result.get("asset_id", "unknown"),
-                            asset_type="voice",
-                            provider="elevenlabs",
-                            created_at=generate_timestamp()
-                        )
-                        all_links.append(voice_asset.dict() if hasattr(voice_asset, 'dict') else voice_asset)
-                elif voice_status == "failed":
-                    errors.append({
-                        "step": "voice_generation",
-                        "error": final_voice_status.get("error")
-                    })
-        
-        # Step 2: Generate music (if provided)
-        if music_params:
-            if not music_params.get("prompt"):
-                raise ValidationError("music.prompt is required when music is provided")
-            
-            logger.info(f"Step 2: Generating music for pipeline {pipeline_job_id}")
-            music_result = music.generate_music(music_params)
-            music_job_id = music_result.get("job_id")
-            music_status = music_result.get("status")
-            all_job_ids.append(music_job_id)
-            
-            steps.append({
-                "step": len(steps) + 1,
-                "name": "music_generation",
-                "job_id": music_job_id,
-                "status": music_status
-            })
-            
-            if music_status == "failed":
-                errors.append({
-                    "step": "music_generation",
-                    "error": music_result.get("error")
-                })
-            elif music_status == "completed":
-                all_links.extend(music_result.get("links", []))
-            elif music_status == "pending" and wait_for_completion:
-                # Poll for music completion
-                logger.info(f"Polling for music completion: job_id={music_job_id}")
-                elevenlabs_client = get_client()
-                final_music_status = elevenlabs_client.get_job_status(music_job_id)
-                
-                max_polls = 60
-                poll_count = 0
-                while final_music_status.get("status", "").lower() not in ["completed", "failed"] and poll_count < max_polls:
-                    import time
-                    time.sleep(5)
-                    final_music_status = elevenlabs_client.get_job_status(music_job_id)
-                    poll_count += 1
-                
-                music_status = final_music_status.get("status", "").lower()
-                steps[-1]["status"] = music_status
-                
-                if music_status == "completed":
-                    music_url = final_music_status.get("result_url") or final_music_status.get("url")
-                    if music_url:
-                        music_asset = AssetLink(
-                            url=music_url,
-                            asset_id=music_result.get("asset_id", "unknown"),
-                            asset_type="music",
-                            provider="elevenlabs",
-                            created_at=generate_timestamp()
-                        )
-                        all_links.append(music_asset.dict() if hasattr(music_asset, 'dict') else music_asset)
-                elif music_status == "failed":
-                    errors.append({
-                        "step": "music_generation",
-                        "error": final_music_status.get("error")
-                    })
-        
-        # Step 3: Generate sound effects (if provided)
-        if soundfx_params:
-            if not soundfx_params.get("prompt"):
-                raise ValidationError("soundfx.prompt is required when soundfx is provided")
-            
-            logger.info(f"Step 3: Generating sound effects for pipeline {pipeline_job_id}")
-            soundfx_result = soundfx.generate_soundfx(soundfx_params)
-            soundfx_job_id = soundfx_result.get("job_id")
-            soundfx_status = soundfx_result.get("status")
-            all_job_ids.append(soundfx_job_id)
-            
-            steps.append({
-                "step": len(steps) + 1,
-                "name": "soundfx_generation",
-                "job_id": soundfx_job_id,
-                "status": soundfx_status
-            })
-            
-            if soundfx_status == "failed":
-                errors.append({
-                    "step": "soundfx_generation",
-                    "error": soundfx_result.get("error")
-                })
-            elif soundfx_status == "completed":
-                all_links.extend(soundfx_result.get("links", []))
-            elif soundfx_status == "pending" and wait_for_completion:
-                # Poll for soundfx completion
-                logger.info(f"Polling for soundfx completion: job_id={soundfx_job_id}")
-                elevenlabs_client = get_client()
-                final_soundfx_status = elevenlabs_client.get_job_status(soundfx_job_id)
-                
-                max_polls = 60
-                poll_count = 0
-                while final_soundfx_status.get("status", "").lower() not in ["completed", "failed"] and poll_count < max_polls:
-                    import time
-                    time.sleep(5)
-                    final_soundfx_status = elevenlabs_client.get_job_status(soundfx_job_id)
-                    poll_count += 1
-                
-                soundfx_status = final_soundfx_status.get("status", "").lower()
-                steps[-1]["status"] = soundfx_status
-                
-                if soundfx_status == "completed":
-                    soundfx_url = final_soundfx_status.get("result_url") or final_soundfx_status.get("url")
-                    if soundfx_url:
-                        soundfx_asset = AssetLink(
-                            url=soundfx_url,
-                            asset_id=soundfx_result.get("asset_id", "unknown"),
-                            asset_type="soundfx",
-                            provider="elevenlabs",
-                            created_at=generate_timestamp()
-                        )
-                        all_links.append(soundfx_asset.dict() if hasattr(soundfx_asset, 'dict') else soundfx_asset)
-                elif soundfx_status == "failed":
-                    errors.append({
-                        "step": "soundfx_generation",
-                        "error": final_soundfx_status.get("error")
-                    })
-        
-        # Determine final status
-        all_statuses = [step["status"] for step in steps]
-        if "failed" in all_statuses:
-            final_status = "failed"
-            error = errors[0].get("error") if errors else {
-                "code": "AUDIO_STACK_FAILED",
-                "message": "One or more audio generation steps failed",
-                "retryable": True
-            }
-        elif all(s == "completed" for s in all_statuses):
-            final_status = "completed"
-            error = None
-        else:
-            final_status = "pending"
-            error = None
-        
-        completed_at = generate_timestamp() if final_status in ["completed", "failed"] else None
-        
-        return {
-            "job_id": pipeline_job_id,
-            "status": final_status,
-            "provider": "pipeline",
-            "model": "audio_stack",
-            "params": {
-                "voice": voice_params,
-                "music": music_params,
-                "soundfx": soundfx_params
-            },
-            "created_at": created_at,
-            "completed_at": completed_at,
-            "links": all_links,
-            "error": error,
-            "steps": steps
-        }
-    
+        return run_checkpointed("audio_stack", payload, _prepare, checkpoint)
     except Exception as e:
         logger.error(f"Error in audio_stack pipeline: {e}", exc_info=True)
         raise
+
+
+async def audio_stack_async(
+    payload: Dict[str, Any],
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
+    """
+    Async entry point for `audio_stack`: the DAG runs on the event loop.
+
+    In "parallel" mode all steps are submitted at once and awaited together,
+    each bounded by its own timeout, so wall-clock time tracks the slowest
+    step instead of the sum.
+    """
+    return await run_checkpointed_async("audio_stack", payload, _prepare, checkpoint)
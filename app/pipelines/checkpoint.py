@@ -0,0 +1,275 @@
+"""
+Crash-safe pipeline checkpoints.
+
+Every pipeline run writes its per-step state (provider job ids, result
+links, local asset URLs) to `data/<project>/pipeline_runs/<job_id>.json`
+as soon as it changes. After a restart, `pipeline_resume` rebuilds the
+pipeline from the stored payload: completed steps are not run again and
+steps whose provider job was already submitted re-attach to that job
+instead of paying for a new one. On the event loop, writes go through a
+writer task that runs them in a worker thread; changes made meanwhile are
+coalesced into its next write.
+"""
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config.settings import settings
+from app.jobs.progress import serializable_payload
+from app.mcp.schemas import TraceInfo
+from app.pipelines.dag import PipelineDAG, StepState
+from app.utils.errors import ValidationError
+from app.utils.ids import generate_timestamp
+from app.utils.logging import logger
+from app.utils.media_storage import get_project_name
+from app.utils.project_storage import atomic_write_text, get_project_root
+
+
+CHECKPOINT_DIR = "pipeline_runs"
+
+# (payload, pipeline_job_id) -> (dag, pipeline_job_id, response params)
+PrepareFn = Callable[[Dict[str, Any], Optional[str]], Tuple[PipelineDAG, str, Dict[str, Any]]]
+
+
+def _dump_trace(trace: Any) -> Optional[Dict[str, Any]]:
+    if trace is None:
+        return None
+    if hasattr(trace, "model_dump"):
+        return trace.model_dump()
+    return dict(trace) if isinstance(trace, dict) else None
+
+
+def get_checkpoint_path(project_name: str, pipeline_job_id: str) -> Path:
+    safe_job_id = "".join(c for c in pipeline_job_id if c.isalnum() or c in ("-", "_"))
+    if not safe_job_id:
+        raise ValidationError("pipeline_job_id is required")
+    return get_project_root(project_name) / CHECKPOINT_DIR / f"{safe_job_id}.json"
+
+
+class PipelineCheckpoint:
+    """Persistent state of one pipeline run."""
+
+    def __init__(self, path: Path, record: Dict[str, Any]):
+        self.path = path
+        self.record = record
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._version = 0  # Bumped per serialized state, so a stale write never lands last
+        self._written = 0
+        self._dirty = False
+        self._writer: Optional[asyncio.Task] = None
+
+    @classmethod
+    def create(
+        cls,
+        pipeline: str,
+        pipeline_job_id: str,
+        payload: Dict[str, Any]
+    ) -> "PipelineCheckpoint":
+        """
+        Start the checkpoint of a new run.
+
+        Args:
+            pipeline: Pipeline name ("image_to_video", "audio_stack", "custom")
+            pipeline_job_id: Pipeline job ID
+            payload: Pipeline payload (runtime keys are not persisted)
+        """
+        trace = payload.get("_trace")
+        project_name = get_project_name(payload, trace)
+        now = generate_timestamp()
+        checkpoint = cls(
+            get_checkpoint_path(project_name, pipeline_job_id),
+            {
+                "pipeline_job_id": pipeline_job_id,
+                "pipeline": pipeline,
+                "project": project_name,
+                "status": "running",
+                "payload": serializable_payload(payload),
+                "trace": _dump_trace(trace),
+                "created_at": now,
+                "updated_at": now,
+                "resumed_at": None,
+                "steps": {},
+                "response": None
+            }
+        )
+        checkpoint._schedule_save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, project_name: str, pipeline_job_id: str) -> Optional["PipelineCheckpoint"]:
+        """Load a checkpoint, or None if there is none (or it is unreadable)."""
+        path = get_checkpoint_path(project_name, pipeline_job_id)
+        if not path.exists():
+            return None
+        try:
+            return cls(path, json.loads(path.read_text(encoding="utf-8")))
+        except Exception as e:
+            logger.warning(f"Unreadable pipeline checkpoint {path}: {e}")
+            return None
+
+    @property
+    def pipeline_job_id(self) -> str:
+        return self.record["pipeline_job_id"]
+
+    @property
+    def created_at(self) -> str:
+        return self.record["created_at"]
+
+    def _dump(self) -> Tuple[int, str]:
+        with self._lock:
+            self.record["updated_at"] = generate_timestamp()
+            self._version += 1
+            return self._version, json.dumps(self.record, indent=2, ensure_ascii=True, default=str)
+
+    def _write(self, version: int, text: str) -> None:
+        with self._write_lock:
+            if version <= self._written:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.path, text)
+            self._written = version
+
+    def save(self) -> None:
+        """Write the record atomically (a crash never leaves a torn file)."""
+        self._write(*self._dump())
+
+    def _schedule_save(self) -> None:
+        """Save now outside the event loop; on it, queue the record for the writer task."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._dirty = True
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_dirty())
+
+    async def _write_dirty(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, *self._dump())
+            except Exception as e:
+                logger.error(f"Failed to write pipeline checkpoint {self.path}: {e}")
+
+    async def flush(self) -> None:
+        """Wait until the latest state queued on this loop is on disk."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def record_step(self, state: StepState) -> None:
+        """Persist a step state change (called from any thread)."""
+        with self._lock:
+            self.record["steps"][state.name] = {
+                "label": state.label,
+                "status": state.status,
+                "attempts": state.attempts,
+                "job_id": (state.result or {}).get("job_id"),
+                "result": state.result,
+                "error": state.error,
+                "started_at": state.started_at,
+                "completed_at": state.completed_at
+            }
+        self._schedule_save()
+
+    def attach(self, dag: PipelineDAG) -> None:
+        """Record every step change of `dag`, keeping its existing listener."""
+        listener = dag.on_step
+
+        def on_step(state: StepState) -> None:
+            try:
+                self.record_step(state)
+            except Exception as e:
+                logger.error(f"Failed to checkpoint pipeline step '{state.name}': {e}", exc_info=True)
+            if listener:
+                listener(state)
+
+        dag.on_step = on_step
+
+    def finish(self, response: Dict[str, Any]) -> None:
+        with self._lock:
+            self.record["status"] = response.get("status")
+            self.record["response"] = response
+        self.save()
+
+    async def finish_async(self, response: Dict[str, Any]) -> None:
+        """`finish` from the event loop: the write runs in a worker thread."""
+        with self._lock:
+            self.record["status"] = response.get("status")
+            self.record["response"] = response
+        self._schedule_save()
+        await self.flush()
+
+    def resume_payload(self, runtime: Dict[str, Any]) -> Dict[str, Any]:
+        """Stored payload plus the original trace and the caller's progress hook."""
+        payload = dict(self.record.get("payload") or {})
+        if self.record.get("trace"):
+            payload["_trace"] = TraceInfo(**self.record["trace"])
+        if runtime.get("_progress"):
+            payload["_progress"] = runtime["_progress"]
+        return payload
+
+
+def _begin(
+    pipeline: str,
+    payload: Dict[str, Any],
+    prepare: PrepareFn,
+    checkpoint: Optional[PipelineCheckpoint]
+) -> Tuple[PipelineDAG, str, Dict[str, Any], Optional[PipelineCheckpoint], Optional[Dict[str, Any]]]:
+    # `prepare` only validates and builds (batch validation calls it too): log the start here
+    dag, pipeline_job_id, params = prepare(
+        payload, checkpoint.pipeline_job_id if checkpoint else None
+    )
+    logger.info(f"Starting {pipeline} pipeline: pipeline_job_id={pipeline_job_id}")
+    if checkpoint is None and settings.PIPELINE_CHECKPOINTS_ENABLED:
+        checkpoint = PipelineCheckpoint.create(pipeline, pipeline_job_id, payload)
+    resume = None
+    if checkpoint is not None:
+        resume = checkpoint.record.get("steps") or None
+        checkpoint.attach(dag)
+    return dag, pipeline_job_id, params, checkpoint, resume
+
+
+def run_checkpointed(
+    pipeline: str,
+    payload: Dict[str, Any],
+    prepare: PrepareFn,
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
+    """
+    Build and run a pipeline DAG, checkpointing each step.
+
+    Args:
+        pipeline: Pipeline name (reported as the response `model`)
+        payload: Pipeline payload
+        prepare: Builds the DAG (reusing the given pipeline_job_id when resuming)
+        checkpoint: Checkpoint of an interrupted run to resume (optional)
+
+    Returns:
+        Pipeline response
+    """
+    dag, pipeline_job_id, params, checkpoint, resume = _begin(pipeline, payload, prepare, checkpoint)
+    created_at = checkpoint.created_at if checkpoint else generate_timestamp()
+    run = dag.run(resume)
+    response = run.to_response(pipeline_job_id, pipeline, params, created_at)
+    if checkpoint is not None:
+        checkpoint.finish(response)
+    return response
+
+
+async def run_checkpointed_async(
+    pipeline: str,
+    payload: Dict[str, Any],
+    prepare: PrepareFn,
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
+    """Async counterpart of `run_checkpointed` (runs the DAG on the event loop)."""
+    dag, pipeline_job_id, params, checkpoint, resume = _begin(pipeline, payload, prepare, checkpoint)
+    created_at = checkpoint.created_at if checkpoint else generate_timestamp()
+    run = await dag.run_async(resume)
+    response = run.to_response(pipeline_job_id, pipeline, params, created_at)
+    if checkpoint is not None:
+        await checkpoint.finish_async(response)
+    return response
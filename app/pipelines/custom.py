@@ -0,0 +1,75 @@
+"""
+Pipeline: run a declarative DAG of MCP actions.
+
+Lets clients define multi-shot pipelines (e.g. several keyframes, each
+turned into a video) as data instead of new pipeline code.
+"""
+from typing import Dict, Any, Optional
+from app.pipelines.checkpoint import PipelineCheckpoint, run_checkpointed, run_checkpointed_async
+from app.pipelines.dag import StepState, build_dag_from_spec
+from app.utils.ids import generate_job_id
+from app.utils.errors import ValidationError
+from app.jobs.progress import report_progress
+
+
+def _prepare(payload: Dict[str, Any], pipeline_job_id: Optional[str] = None):
+    steps = payload.get("steps")
+    if not steps:
+        raise ValidationError("steps is required")
+    max_concurrency = payload.get("max_concurrency")
+    if max_concurrency is not None and int(max_concurrency) < 1:
+        raise ValidationError("max_concurrency must be >= 1")
+
+    pipeline_job_id = pipeline_job_id or generate_job_id("pipeline")
+
+    def on_step(state: StepState) -> None:
+        report_progress(
+            payload, "step", name=state.name, status=state.status,
+            attempt=state.attempts, pipeline_job_id=pipeline_job_id
+        )
+
+    # Sub-actions store their assets under the caller's project
+    extra_payload = {"_trace": payload["_trace"]} if payload.get("_trace") else None
+    dag = build_dag_from_spec(
+        steps,
+        max_concurrency=int(max_concurrency) if max_concurrency else None,
+        extra_payload=extra_payload,
+        on_step=on_step
+    )
+    params = {"steps": steps, "max_concurrency": max_concurrency}
+    return dag, pipeline_job_id, params
+
+
+def run_pipeline(
+    payload: Dict[str, Any],
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
+    """
+    Run a declarative pipeline.
+
+    Expected payload:
+        - steps: list (required) - Steps to run, each:
+            - name: str (required) - Unique step name
+            - action: str (required) - Registered MCP action (not a pipeline)
+            - payload: dict (optional) - Action payload; "${step.path}" strings
+              are replaced by upstream results (e.g. "${keyframe.links.0.url}")
+            - depends_on: list (optional) - Extra ordering dependencies
+            - retries: int (optional) - Retries on retryable failure/timeout
+            - timeout: float (optional) - Step timeout in seconds
+        - max_concurrency: int (optional) - Max steps running at once
+
+    Args:
+        checkpoint: Checkpoint of an interrupted run to resume (see `pipeline_resume`)
+
+    Returns:
+        Combined job status with links from every step
+    """
+    return run_checkpointed("custom", payload, _prepare, checkpoint)
+
+
+async def run_pipeline_async(
+    payload: Dict[str, Any],
+    checkpoint: Optional[PipelineCheckpoint] = None
+) -> Dict[str, Any]:
+    """Async entry point for `run_pipeline`."""
+    return await run_checkpointed_async("custom", payload, _prepare, checkpoint)
@@ -0,0 +1,563 @@
+"""
+Small DAG engine for pipelines.
+
+A pipeline is a list of `PipelineStep`s. Each step declares the steps it
+depends on, and its params may reference upstream outputs with `Ref`
+(e.g. the image URL fed into the video step). Steps whose dependencies
+are met run concurrently (bounded by `max_concurrency`), each with its own
+retries and timeout. A step only runs once all its dependencies completed;
+if one failed, it is skipped.
+
+Step callables receive their resolved params and return a result dict with
+at least a `status` ("completed", "failed", "pending", "timeout", ...).
+They may be async or sync. Provider steps are async: they await the
+provider and the shared poller without holding a thread. Sync callables
+run in a worker thread, which a step timeout abandons but cannot stop.
+"""
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from app.utils.errors import ValidationError, to_mcp_error
+from app.utils.http import aclose_loop_clients
+from app.utils.ids import generate_timestamp
+from app.utils.logging import logger
+
+
+StepFn = Callable[[Dict[str, Any]], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]
+
+# Step states that let dependents run / that end a step without success
+SUCCESS_STATUS = "completed"
+FAILURE_STATUSES = {"failed", "timeout", "skipped"}
+# Step states whose provider job may still be running at the provider
+RESUMABLE_STATUSES = {"running", "pending", "timeout"}
+
+# "${step.path.to.value}" in JSON pipeline specs
+_REF_PATTERN = re.compile(r"^\$\{([A-Za-z0-9_\-]+)(?:\.([^}]*))?\}$")
+
+
+@dataclass(frozen=True)
+class Ref:
+    """Reference to (part of) an upstream step's result, resolved at run time."""
+    step: str
+    path: str = ""
+
+    def resolve(self, results: Dict[str, Dict[str, Any]]) -> Any:
+        value: Any = results.get(self.step)
+        for part in filter(None, self.path.split(".")):
+            if isinstance(value, dict):
+                value = value.get(part)
+            elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+                value = value[int(part)]
+            else:
+                return None
+        return value
+
+
+@dataclass
+class PipelineStep:
+    """One node of a pipeline DAG."""
+    name: str
+    run: StepFn
+    params: Dict[str, Any] = field(default_factory=dict)
+    depends_on: List[str] = field(default_factory=list)
+    retries: int = 0
+    retry_delay: float = 1.0
+    timeout: Optional[float] = None
+    label: Optional[str] = None  # name reported in pipeline results (default: name)
+
+    def dependencies(self) -> List[str]:
+        """Declared dependencies plus the steps referenced by `Ref` params."""
+        deps = list(self.depends_on)
+        for ref in _iter_refs(self.params):
+            if ref.step not in deps:
+                deps.append(ref.step)
+        return deps
+
+
+@dataclass
+class StepState:
+    """Execution state of a step."""
+    name: str
+    label: str
+    status: str = "waiting"
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    resume: Optional[Dict[str, Any]] = None  # interim result recorded before a restart
+
+    @property
+    def started(self) -> bool:
+        return self.attempts > 0
+
+
+# State of the step whose callable is running (copied into worker threads)
+_current_step: ContextVar[Optional[StepState]] = ContextVar("pipeline_current_step", default=None)
+_step_listener: ContextVar[Optional[Callable[[StepState], None]]] = ContextVar(
+    "pipeline_step_listener", default=None
+)
+
+
+def update_step_result(**fields: Any) -> None:
+    """
+    Publish interim result fields (e.g. the provider `job_id` right after
+    submit) from inside a step callable. They survive a timeout or error,
+    so partial results still point at the provider job, and listeners
+    (checkpoints) see them immediately. No-op outside a DAG.
+    """
+    state = _current_step.get()
+    if state is None:
+        return
+    state.result = {**(state.result or {}), **fields}
+    listener = _step_listener.get()
+    if listener is not None:
+        listener(state)
+
+
+def resumed_step_result() -> Optional[Dict[str, Any]]:
+    """
+    Result recorded for the current step by an interrupted run (e.g. the
+    provider `job_id` of a job still running), on the first attempt of a
+    resumed run only. None otherwise.
+    """
+    state = _current_step.get()
+    return state.resume if state is not None else None
+
+
+def attach_step_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handler payload for a provider action run inside a step.
+
+    The provider job id is recorded as soon as the handler reports it
+    submitted, and a resumed step passes `_resume_job_id` so the handler
+    re-attaches to the recorded job instead of submitting (and paying) again.
+    """
+    payload = dict(params)
+    resumed = resumed_step_result()
+    if resumed and resumed.get("job_id"):
+        payload["_resume_job_id"] = resumed["job_id"]
+    upstream = payload.get("_progress")
+
+    def progress(stage: str, **details: Any) -> None:
+        if stage == "submitted" and details.get("provider_job_id"):
+            update_step_result(job_id=details["provider_job_id"], status="pending")
+        if callable(upstream):
+            upstream(stage, **details)
+
+    payload["_progress"] = progress
+    return payload
+
+
+def _iter_refs(value: Any):
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_refs(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_refs(item)
+
+
+def resolve_params(value: Any, results: Dict[str, Dict[str, Any]]) -> Any:
+    """Replace every `Ref` in params with the referenced upstream value."""
+    if isinstance(value, Ref):
+        return value.resolve(results)
+    if isinstance(value, dict):
+        return {key: resolve_params(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_params(item, results) for item in value]
+    return value
+
+
+class PipelineRun:
+    """Outcome of a DAG run, with helpers to build the pipeline response."""
+
+    def __init__(self, states: List[StepState]):
+        self.states = states
+
+    def __getitem__(self, name: str) -> StepState:
+        for state in self.states:
+            if state.name == name:
+                return state
+        raise KeyError(name)
+
+    @property
+    def status(self) -> str:
+        """
+        Aggregate status: "failed" if a step failed, "partial" if a step
+        timed out, "completed" if all completed, otherwise "pending".
+        """
+        statuses = [state.status for state in self.states]
+        if "failed" in statuses:
+            return "failed"
+        if "timeout" in statuses:
+            return "partial"
+        if all(status == SUCCESS_STATUS for status in statuses):
+            return "completed"
+        return "pending"
+
+    @property
+    def error(self) -> Optional[Dict[str, Any]]:
+        """Error of the first failed (or timed-out) step."""
+        for wanted in ("failed", "timeout"):
+            for state in self.states:
+                if state.status == wanted and state.error:
+                    return state.error
+        return None
+
+    def links(self) -> List[Dict[str, Any]]:
+        """Asset links of every step that produced some, in declaration order."""
+        links = []
+        for state in self.states:
+            links.extend((state.result or {}).get("links") or [])
+        return links
+
+    def to_response(
+        self,
+        pipeline_job_id: str,
+        model: str,
+        params: Dict[str, Any],
+        created_at: str
+    ) -> Dict[str, Any]:
+        """Pipeline job status in the shape returned by provider actions."""
+        status = self.status
+        return {
+            "job_id": pipeline_job_id,
+            "status": status,
+            "provider": "pipeline",
+            "model": model,
+            "params": params,
+            "created_at": created_at,
+            "completed_at": generate_timestamp() if status in ("completed", "failed", "partial") else None,
+            "links": self.links(),
+            "error": self.error if status in ("failed", "partial") else None,
+            "steps": self.steps()
+        }
+
+    def steps(self) -> List[Dict[str, Any]]:
+        """Per-step summary (steps that never started are omitted)."""
+        summary = []
+        for state in self.states:
+            if not state.started:
+                continue
+            item = {
+                "step": len(summary) + 1,
+                "name": state.label,
+                "job_id": (state.result or {}).get("job_id"),
+                "status": state.status
+            }
+            if state.error and state.status != SUCCESS_STATUS:
+                item["error"] = state.error
+            if state.attempts > 1:
+                item["attempts"] = state.attempts
+            summary.append(item)
+        return summary
+
+
+class PipelineDAG:
+    """Validated set of steps that can be executed."""
+
+    def __init__(
+        self,
+        steps: List[PipelineStep],
+        max_concurrency: Optional[int] = None,
+        on_step: Optional[Callable[[StepState], None]] = None
+    ):
+        """
+        Args:
+            steps: Pipeline steps (declaration order is kept in results)
+            max_concurrency: Max steps running at once (None = unbounded, 1 = sequential)
+            on_step: Called whenever a step changes state (progress reporting)
+
+        Raises:
+            ValidationError: On duplicate names, unknown dependencies or cycles
+        """
+        self.steps = steps
+        self.max_concurrency = max_concurrency
+        self.on_step = on_step
+        self._validate()
+
+    def _validate(self) -> None:
+        names = [step.name for step in self.steps]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValidationError(f"Duplicate pipeline step names: {', '.join(duplicates)}")
+        if not self.steps:
+            raise ValidationError("Pipeline has no steps")
+
+        deps = {step.name: step.dependencies() for step in self.steps}
+        for name, step_deps in deps.items():
+            unknown = [dep for dep in step_deps if dep not in deps]
+            if unknown:
+                raise ValidationError(
+                    f"Step '{name}' depends on unknown step(s): {', '.join(unknown)}"
+                )
+
+        visiting, visited = set(), set()
+
+        def visit(name: str, trail: List[str]) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                cycle = " -> ".join(trail[trail.index(name):] + [name])
+                raise ValidationError(f"Pipeline has a dependency cycle: {cycle}")
+            visiting.add(name)
+            for dep in deps[name]:
+                visit(dep, trail + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in deps:
+            visit(name, [])
+
+    # ---------------------------------------------
+    # Execution
+    # ---------------------------------------------
+
+    def run(self, resume: Optional[Dict[str, Dict[str, Any]]] = None) -> PipelineRun:
+        """Run the DAG from sync code (uses a private loop)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._run_private(resume))
+        # Called from a thread that already runs a loop: use a fresh thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._run_private(resume)).result()
+
+    async def _run_private(self, resume: Optional[Dict[str, Dict[str, Any]]]) -> PipelineRun:
+        try:
+            return await self.run_async(resume)
+        finally:
+            # The loop ends with this run: close the HTTP clients opened on it
+            await aclose_loop_clients()
+
+    async def run_async(self, resume: Optional[Dict[str, Dict[str, Any]]] = None) -> PipelineRun:
+        """
+        Run the DAG on the current event loop.
+
+        Args:
+            resume: Step records of an interrupted run, by step name
+                ({"status", "result", "attempts", ...}). Completed steps are
+                not run again; the others see their recorded result through
+                `resumed_step_result()`.
+        """
+        states = {
+            step.name: StepState(name=step.name, label=step.label or step.name)
+            for step in self.steps
+        }
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, record in (resume or {}).items():
+            state = states.get(name)
+            if state is None or not record.get("result"):
+                continue
+            if record.get("status") == SUCCESS_STATUS:
+                state.status = SUCCESS_STATUS
+                state.result = record["result"]
+                state.attempts = max(1, int(record.get("attempts") or 1))
+                state.started_at = record.get("started_at")
+                state.completed_at = record.get("completed_at")
+                results[name] = state.result
+            elif record.get("status") in RESUMABLE_STATUSES:
+                # Provider job may still be running: re-attach to it
+                state.resume = record["result"]
+        done = {step.name: asyncio.Event() for step in self.steps}
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+
+        async def run_node(step: PipelineStep) -> None:
+            state = states[step.name]
+            if state.status == SUCCESS_STATUS:
+                # Completed before a restart
+                done[step.name].set()
+                return
+            try:
+                deps = step.dependencies()
+                for dep in deps:
+                    await done[dep].wait()
+                blocked = [dep for dep in deps if states[dep].status != SUCCESS_STATUS]
+                if blocked:
+                    failed = [dep for dep in blocked if states[dep].status in FAILURE_STATUSES]
+                    # Upstream failed: skip. Upstream still pending: stay pending.
+                    state.status = "skipped" if failed else "pending"
+                    self._notify(state)
+                    return
+                params = resolve_params(step.params, results)
+                if semaphore:
+                    async with semaphore:
+                        await self._execute(step, state, params)
+                else:
+                    await self._execute(step, state, params)
+                if state.result is not None:
+                    results[step.name] = state.result
+            finally:
+                done[step.name].set()
+
+        await asyncio.gather(*(run_node(step) for step in self.steps))
+        return PipelineRun([states[step.name] for step in self.steps])
+
+    async def _execute(self, step: PipelineStep, state: StepState, params: Dict[str, Any]) -> None:
+        state.started_at = generate_timestamp()
+        for attempt in range(step.retries + 1):
+            state.attempts = attempt + 1
+            state.status = "running"
+            if attempt:
+                # A retry submits a new provider job
+                state.resume = None
+                state.result = None
+            self._notify(state)
+            started = time.monotonic()
+            token = _current_step.set(state)
+            listener_token = _step_listener.set(self._notify)
+            try:
+                result = await self._call(step, params)
+                status = str(result.get("status") or SUCCESS_STATUS).lower()
+                state.result = result
+                state.status = "failed" if status == "error" else status
+                state.error = result.get("error") if state.status != SUCCESS_STATUS else None
+            except asyncio.TimeoutError:
+                if not asyncio.iscoroutinefunction(step.run):
+                    logger.warning(f"Pipeline step '{step.name}' timed out; its worker thread keeps running")
+                state.status = "timeout"
+                state.error = {
+                    "code": "STEP_TIMEOUT",
+                    "message": f"Step '{state.label}' did not complete within {step.timeout}s",
+                    "retryable": True
+                }
+            except Exception as e:
+                logger.error(f"Pipeline step '{step.name}' raised: {e}", exc_info=True)
+                state.status = "failed"
+                state.error = to_mcp_error(e).model_dump()
+            finally:
+                _current_step.reset(token)
+                _step_listener.reset(listener_token)
+
+            retryable = state.status == "timeout" or (
+                state.status == "failed" and (state.error or {}).get("retryable", True)
+            )
+            if not retryable or attempt == step.retries:
+                break
+            logger.warning(
+                f"Retrying pipeline step '{step.name}' "
+                f"(attempt {attempt + 1}/{step.retries + 1}, {time.monotonic() - started:.1f}s)"
+            )
+            await asyncio.sleep(step.retry_delay)
+
+        state.completed_at = generate_timestamp()
+        self._notify(state)
+
+    async def _call(self, step: PipelineStep, params: Dict[str, Any]) -> Dict[str, Any]:
+        if asyncio.iscoroutinefunction(step.run):
+            call = step.run(params)
+        else:
+            # Sync handlers block on provider I/O: keep them off the loop
+            call = asyncio.to_thread(step.run, params)
+        result = await asyncio.wait_for(call, step.timeout) if step.timeout else await call
+        return result if isinstance(result, dict) else {"status": SUCCESS_STATUS, "value": result}
+
+    def _notify(self, state: StepState) -> None:
+        if not self.on_step:
+            return
+        try:
+            self.on_step(state)
+        except Exception as e:
+            logger.warning(f"Pipeline step listener failed for '{state.name}': {e}")
+
+
+# ---------------------------------------------
+# Declarative (JSON) pipelines
+# ---------------------------------------------
+
+def _parse_refs(value: Any) -> Any:
+    """Turn "${step.path}" strings of a JSON spec into `Ref`s."""
+    if isinstance(value, str):
+        match = _REF_PATTERN.match(value)
+        return Ref(match.group(1), match.group(2) or "") if match else value
+    if isinstance(value, dict):
+        return {key: _parse_refs(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_parse_refs(item) for item in value]
+    return value
+
+
+def action_step(
+    name: str,
+    action: str,
+    params: Optional[Dict[str, Any]] = None,
+    depends_on: Optional[List[str]] = None,
+    retries: int = 0,
+    timeout: Optional[float] = None,
+    extra_payload: Optional[Dict[str, Any]] = None
+) -> PipelineStep:
+    """
+    Step that runs a registered MCP action (with wait_for_completion on).
+
+    Args:
+        name: Step name
+        action: Registered action name (e.g. "higgsfield_image")
+        params: Action payload; values may be `Ref`s
+        depends_on: Extra ordering dependencies
+        retries: Retries on failure/timeout
+        timeout: Step timeout in seconds
+        extra_payload: Runtime keys merged into the payload (e.g. `_trace`)
+    """
+    from app.tools.registry import dispatch_action_async
+
+    async def run(resolved: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {"wait_for_completion": True, **resolved, **(extra_payload or {})}
+        return await dispatch_action_async(action, attach_step_job(payload))
+
+    return PipelineStep(
+        name=name,
+        run=run,
+        params=params or {},
+        depends_on=depends_on or [],
+        retries=retries,
+        timeout=timeout,
+        label=name
+    )
+
+
+def build_dag_from_spec(
+    spec: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    extra_payload: Optional[Dict[str, Any]] = None,
+    on_step: Optional[Callable[[StepState], None]] = None
+) -> PipelineDAG:
+    """
+    Build a DAG from a JSON step list.
+
+    Each item: {"name", "action", "payload", "depends_on", "retries", "timeout"}.
+    Payload strings of the form "${step.path}" reference upstream results,
+    e.g. "${keyframe.links.0.url}".
+
+    Raises:
+        ValidationError: If the spec is malformed
+    """
+    if not isinstance(spec, list) or not spec:
+        raise ValidationError("steps must be a non-empty list")
+
+    from app.tools.registry import list_actions
+    known_actions = set(list_actions())
+    steps = []
+    for index, item in enumerate(spec):
+        if not isinstance(item, dict) or not item.get("name") or not item.get("action"):
+            raise ValidationError(f"steps[{index}] requires name and action")
+        if item["action"] not in known_actions:
+            raise ValidationError(f"steps[{index}]: unknown action {item['action']}")
+        if item["action"].startswith("pipeline_"):
+            raise ValidationError(f"steps[{index}]: pipelines cannot be nested")
+        steps.append(action_step(
+            name=item["name"],
+            action=item["action"],
+            params=_parse_refs(item.get("payload") or {}),
+            depends_on=item.get("depends_on") or [],
+            retries=int(item.get("retries", 0)),
+            timeout=item.get("timeout"),
+            extra_payload=extra_payload
+        ))
+    return PipelineDAG(steps, max_concurrency=max_concurrency, on_step=on_step)
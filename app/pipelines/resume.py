@@ -0,0 +1,81 @@
+"""
+Pipeline: resume an interrupted pipeline run from its checkpoint.
+"""
+import asyncio
+from typing import Dict, Any
+from app.pipelines.audio_stack import audio_stack, audio_stack_async
+from app.pipelines.checkpoint import PipelineCheckpoint
+from app.pipelines.custom import run_pipeline, run_pipeline_async
+from app.pipelines.image_to_video import image_to_video, image_to_video_async
+from app.utils.errors import ValidationError
+from app.utils.ids import generate_timestamp
+from app.utils.logging import logger
+from app.utils.media_storage import get_project_name
+
+
+# pipeline name -> (sync entry point, async entry point)
+RESUMABLE_PIPELINES = {
+    "image_to_video": (image_to_video, image_to_video_async),
+    "audio_stack": (audio_stack, audio_stack_async),
+    "custom": (run_pipeline, run_pipeline_async),
+}
+
+
+def _load(payload: Dict[str, Any]) -> PipelineCheckpoint:
+    pipeline_job_id = payload.get("pipeline_job_id")
+    if not pipeline_job_id:
+        raise ValidationError("pipeline_job_id is required")
+    project_name = get_project_name(payload, payload.get("_trace"))
+    checkpoint = PipelineCheckpoint.load(project_name, pipeline_job_id)
+    if checkpoint is None:
+        raise ValidationError(
+            f"No checkpoint for pipeline {pipeline_job_id} in project {project_name}",
+            details={"pipeline_job_id": pipeline_job_id, "project": project_name}
+        )
+    if checkpoint.record.get("pipeline") not in RESUMABLE_PIPELINES:
+        raise ValidationError(f"Pipeline {checkpoint.record.get('pipeline')} cannot be resumed")
+    return checkpoint
+
+
+def _start(checkpoint: PipelineCheckpoint) -> None:
+    steps = checkpoint.record.get("steps") or {}
+    logger.info(
+        f"Resuming pipeline {checkpoint.pipeline_job_id} ({checkpoint.record['pipeline']}): "
+        f"completed={[name for name, step in steps.items() if step.get('status') == 'completed']}"
+    )
+    checkpoint.record["status"] = "running"
+    checkpoint.record["resumed_at"] = generate_timestamp()
+    checkpoint._schedule_save()
+
+
+def resume_pipeline(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resume a pipeline interrupted by a restart (or that failed/timed out).
+
+    Completed steps are not run again. Steps whose provider job was already
+    submitted re-attach to it instead of submitting a new one; failed steps
+    run again.
+
+    Expected payload:
+        - pipeline_job_id: str (required) - Job ID returned by the pipeline
+        - project_name: str (optional) - Project of the run (default: trace project)
+
+    Returns:
+        Pipeline job status (same shape as the original pipeline)
+    """
+    checkpoint = _load(payload)
+    if checkpoint.record.get("status") == "completed" and checkpoint.record.get("response"):
+        return checkpoint.record["response"]
+    _start(checkpoint)
+    run, _ = RESUMABLE_PIPELINES[checkpoint.record["pipeline"]]
+    return run(checkpoint.resume_payload(payload), checkpoint)
+
+
+async def resume_pipeline_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Async entry point for `resume_pipeline`."""
+    checkpoint = await asyncio.to_thread(_load, payload)
+    if checkpoint.record.get("status") == "completed" and checkpoint.record.get("response"):
+        return checkpoint.record["response"]
+    _start(checkpoint)
+    _, run_async = RESUMABLE_PIPELINES[checkpoint.record["pipeline"]]
+    return await run_async(checkpoint.resume_payload(payload), checkpoint)
@@ -0,0 +1,215 @@
+"""
+Per-provider circuit breaker.
+
+Tracks the outcome and latency of every provider HTTP attempt over a
+rolling window. When the failure rate (5xx, transport errors, calls slower
+than the slow-call threshold) stays above the threshold, the breaker opens
+and calls fail fast with a retryable `ProviderError` instead of burning
+retries x timeout against a dead upstream. After a cooldown it half-opens
+and lets a few probe calls through: a success closes it, a failure opens
+it again.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+import httpx
+from app.config.settings import settings
+from app.utils.errors import ProviderError
+from app.utils.logging import logger
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _is_failure(error: BaseException) -> bool:
+    """Upstream failures; client errors (4xx, 429) show the provider is alive."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.RequestError)
+
+
+class CircuitBreaker:
+    """Circuit breaker for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        window: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None
+    ):
+        """
+        Args:
+            provider: Provider name
+            window: Rolling window in seconds (default: settings.BREAKER_WINDOW)
+            min_calls: Calls in the window before the breaker may open (default: settings.BREAKER_MIN_CALLS)
+            failure_rate: Failure ratio that opens the breaker (default: settings.BREAKER_FAILURE_RATE)
+            slow_call_seconds: Calls slower than this count as failures (default: settings.BREAKER_SLOW_CALL_SECONDS)
+            open_seconds: Time open before probing (default: settings.BREAKER_OPEN_SECONDS)
+            half_open_probes: Concurrent probe calls when half-open (default: settings.BREAKER_HALF_OPEN_PROBES)
+        """
+        self.provider = provider
+        self.window = window if window is not None else settings.BREAKER_WINDOW
+        self.min_calls = min_calls if min_calls is not None else settings.BREAKER_MIN_CALLS
+        self.failure_rate = failure_rate if failure_rate is not None else settings.BREAKER_FAILURE_RATE
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds is not None else settings.BREAKER_SLOW_CALL_SECONDS
+        self.open_seconds = open_seconds if open_seconds is not None else settings.BREAKER_OPEN_SECONDS
+        self.half_open_probes = half_open_probes if half_open_probes is not None else settings.BREAKER_HALF_OPEN_PROBES
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._calls: Deque[Tuple[float, bool, float]] = deque()  # (finished_at, failed, latency)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    # ---------------------------------------------
+    # State
+    # ---------------------------------------------
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        """Caller holds the lock."""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit for {self.provider} half-open: probing")
+        return self._state
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        logger.warning(f"Circuit for {self.provider} opened: {reason}")
+
+    def _rejection(self, now: float) -> ProviderError:
+        self.rejected += 1
+        retry_after = max(0.0, self.open_seconds - (now - self._opened_at))
+        return ProviderError(
+            provider=self.provider,
+            message=f"{self.provider} is unavailable (circuit open), retry in {retry_after:.0f}s",
+            details={"circuit": self._state, "retry_after": round(retry_after, 1)},
+            retryable=True
+        )
+
+    # ---------------------------------------------
+    # Calls
+    # ---------------------------------------------
+
+    def check(self) -> None:
+        """
+        Fail fast when the breaker is open.
+
+        Raises:
+            ProviderError: Retryable error while the circuit is open
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_probes):
+                raise self._rejection(now)
+
+    def _admit(self) -> bool:
+        """Admit a call; returns True for a half-open probe."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == OPEN:
+                raise self._rejection(now)
+            if state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    raise self._rejection(now)
+                self._probes += 1
+                return True
+            return False
+
+    def record(self, failed: bool, latency: float, probe: bool = False) -> None:
+        """Record the outcome of a call."""
+        failed = failed or latency > self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self._probes = max(0, self._probes - 1)
+                if self._state == HALF_OPEN:
+                    if failed:
+                        self._open(now, "probe failed")
+                    else:
+                        self._state = CLOSED
+                        self._calls.clear()
+                        logger.info(f"Circuit for {self.provider} closed: probe succeeded")
+                    return
+            self._calls.append((now, failed, latency))
+            self._prune(now)
+            if self._state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(now, f"{failures}/{len(self._calls)} failed calls in {self.window:.0f}s")
+
+    @contextmanager
+    def guard(self):
+        """
+        Run one provider attempt under the breaker.
+
+        Upstream failures (5xx, transport errors) and slow calls count
+        against the provider; other outcomes count as successes.
+
+        Raises:
+            ProviderError: Retryable error while the circuit is open
+        """
+        probe = self._admit()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.record(_is_failure(e), time.monotonic() - started, probe)
+            raise
+        else:
+            self.record(False, time.monotonic() - started, probe)
+
+    def stats(self) -> Dict[str, Any]:
+        """State, rolling error rate and latency."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._prune(now)
+            calls = list(self._calls)
+            rejected = self.rejected
+        latencies = sorted(latency for _, _, latency in calls)
+        failures = sum(1 for _, failed, _ in calls if failed)
+        return {
+            "state": state,
+            "calls": len(calls),
+            "error_rate": round(failures / len(calls), 3) if calls else 0.0,
+            "latency_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "latency_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+            "rejected_total": rejected
+        }
+
+
+# Global breaker instances
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Get or create the circuit breaker of a provider."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
@@ -1,13 +1,24 @@
 """
 ElevenLabs API client for voice, music, and sound effects generation.
 """
+import asyncio
+import time
+from functools import partial
 import httpx
 from typing import Dict, Any, Optional
 from app.config.settings import settings
 from app.utils.errors import ProviderError
+from app.utils.http import PooledTransport
+from app.tools.circuit_breaker import get_breaker
+from app.tools.poller import get_poller
+from app.tools.rate_limit import get_limiter, is_retryable_status, rate_key, retry_delay
 from app.utils.logging import logger
 
 
+# Statuses that end polling for /jobs
+JOB_TERMINAL_STATUSES = {"completed", "failed", "error"}
+
+
 class ElevenLabsClient:
     """Client for ElevenLabs API."""
     
@@ -17,6 +28,10 @@ class ElevenLabsClient:
         self.base_url = settings.ELEVENLABS_BASE_URL
         self.timeout = settings.ELEVENLABS_TIMEOUT
         self.retries = settings.ELEVENLABS_RETRIES
+        self.http = PooledTransport("elevenlabs", timeout=self.timeout)
+        self.limiter = get_limiter("elevenlabs")
+        self.breaker = get_breaker("elevenlabs")
+        self.polling_interval = settings.ELEVENLABS_POLLING_INTERVAL
         
         if not self.api_key:
             logger.warning("ELEVENLABS_API_KEY not set")
@@ -30,6 +45,33 @@ class ElevenLabsClient:
             headers["xi-api-key"] = self.api_key
         return headers
     
+    def _build_url(self, endpoint: str) -> str:
+        return f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+
+    def _status_error(self, error: httpx.HTTPStatusError, endpoint: str) -> ProviderError:
+        error_msg = f"ElevenLabs API error: {error.response.status_code}"
+        try:
+            error_data = error.response.json()
+            error_msg = error_data.get("detail", {}).get("message", error_msg)
+        except:
+            error_msg = error.response.text or error_msg
+        return ProviderError(
+            provider="elevenlabs",
+            message=error_msg,
+            details={
+                "status_code": error.response.status_code,
+                "endpoint": endpoint
+            },
+            retryable=is_retryable_status(error.response.status_code)
+        )
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Delay before the next retry; a 429 also pauses every queued ElevenLabs request."""
+        delay = retry_delay(attempt + 1, response)
+        if response is not None and response.status_code == 429:
+            self.limiter.pause(delay)
+        return delay
+
     def _request(
         self,
         method: str,
@@ -50,44 +92,96 @@ class ElevenLabsClient:
         Raises:
             ProviderError: If request fails
         """
-        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        url = self._build_url(endpoint)
         headers = self._get_headers()
+        key = rate_key(method, endpoint, kwargs.get("json"))
         
         for attempt in range(self.retries):
+            # Fail fast (without queueing) while the provider is down
+            self.breaker.check()
             try:
-                with httpx.Client(timeout=self.timeout) as client:
-                    response = client.request(
-                        method=method,
-                        url=url,
-                        headers=headers,
-                        **kwargs
-                    )
-                    response.raise_for_status()
-                    return response.json() if response.content else {}
+                with self.limiter.slot(key):
+                    with self.breaker.guard():
+                        response = self.http.client().request(
+                            method=method,
+                            url=url,
+                            headers=headers,
+                            **kwargs
+                        )
+                        response.raise_for_status()
+                return response.json() if response.content else {}
             
             except httpx.HTTPStatusError as e:
-                if e.response.status_code < 500 or attempt == self.retries - 1:
+                if not is_retryable_status(e.response.status_code) or attempt == self.retries - 1:
                     # Client error or last retry
-                    error_msg = f"ElevenLabs API error: {e.response.status_code}"
-                    try:
-                        error_data = e.response.json()
-                        error_msg = error_data.get("detail", {}).get("message", error_msg)
-                    except:
-                        error_msg = e.response.text or error_msg
-                    
+                    raise self._status_error(e, endpoint)
+                delay = self._backoff(attempt, e.response)
+                logger.warning(
+                    f"ElevenLabs API error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                time.sleep(delay)
+                continue
+            
+            except httpx.RequestError as e:
+                if attempt == self.retries - 1:
                     raise ProviderError(
                         provider="elevenlabs",
-                        message=error_msg,
-                        details={
-                            "status_code": e.response.status_code,
-                            "endpoint": endpoint
-                        },
-                        retryable=e.response.status_code >= 500
+                        message=f"Request failed: {str(e)}",
+                        details={"endpoint": endpoint},
+                        retryable=True
                     )
-                # Retry on server error
-                logger.warning(f"ElevenLabs API error (attempt {attempt + 1}/{self.retries}): {e}")
+                delay = self._backoff(attempt, None)
+                logger.warning(
+                    f"ElevenLabs request error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                time.sleep(delay)
                 continue
-            
+        
+        raise ProviderError(
+            provider="elevenlabs",
+            message="Request failed after retries",
+            details={"endpoint": endpoint},
+            retryable=True
+        )
+
+    async def _request_async(
+        self,
+        method: str,
+        endpoint: str,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of `_request`, same retry and error semantics.
+        """
+        url = self._build_url(endpoint)
+        headers = self._get_headers()
+        key = rate_key(method, endpoint, kwargs.get("json"))
+
+        for attempt in range(self.retries):
+            # Fail fast (without queueing) while the provider is down
+            self.breaker.check()
+            try:
+                async with self.limiter.slot_async(key):
+                    with self.breaker.guard():
+                        response = await self.http.async_client().request(
+                            method=method,
+                            url=url,
+                            headers=headers,
+                            **kwargs
+                        )
+                        response.raise_for_status()
+                return response.json() if response.content else {}
+
+            except httpx.HTTPStatusError as e:
+                if not is_retryable_status(e.response.status_code) or attempt == self.retries - 1:
+                    raise self._status_error(e, endpoint)
+                delay = self._backoff(attempt, e.response)
+                logger.warning(
+                    f"ElevenLabs API error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
             except httpx.RequestError as e:
                 if attempt == self.retries - 1:
                     raise ProviderError(
@@ -96,9 +190,13 @@ class ElevenLabsClient:
                         details={"endpoint": endpoint},
                         retryable=True
                     )
-                logger.warning(f"ElevenLabs request error (attempt {attempt + 1}/{self.retries}): {e}")
+                delay = self._backoff(attempt, None)
+                logger.warning(
+                    f"ElevenLabs request error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                await asyncio.sleep(delay)
                 continue
-        
+
         raise ProviderError(
             provider="elevenlabs",
             message="Request failed after retries",
@@ -132,6 +230,21 @@ class ElevenLabsClient:
             **kwargs
         }
         return self._request("POST", endpoint, json=payload)
+
+    async def text_to_speech_async(
+        self,
+        text: str,
+        voice_id: str = "21m00Tcm4TlvDq8ikWAM",
+        model_id: str = "eleven_multilingual_v2",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of `text_to_speech`."""
+        payload = {
+            "text": text,
+            "model_id": model_id,
+            **kwargs
+        }
+        return await self._request_async("POST", f"text-to-speech/{voice_id}", json=payload)
     
     def generate_music(
         self,
@@ -158,6 +271,21 @@ class ElevenLabsClient:
         if duration:
             payload["duration"] = duration
         return self._request("POST", endpoint, json=payload)
+
+    async def generate_music_async(
+        self,
+        prompt: str,
+        duration: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of `generate_music`."""
+        payload = {
+            "prompt": prompt,
+            **kwargs
+        }
+        if duration:
+            payload["duration"] = duration
+        return await self._request_async("POST", "music-generation", json=payload)
     
     def generate_sound_effect(
         self,
@@ -184,6 +312,21 @@ class ElevenLabsClient:
         if duration:
             payload["duration"] = duration
         return self._request("POST", endpoint, json=payload)
+
+    async def generate_sound_effect_async(
+        self,
+        prompt: str,
+        duration: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of `generate_sound_effect`."""
+        payload = {
+            "prompt": prompt,
+            **kwargs
+        }
+        if duration:
+            payload["duration"] = duration
+        return await self._request_async("POST", "sound-generation", json=payload)
     
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """
@@ -198,6 +341,52 @@ class ElevenLabsClient:
         endpoint = f"jobs/{job_id}"
         return self._request("GET", endpoint)
 
+    async def get_job_status_async(self, job_id: str) -> Dict[str, Any]:
+        return await self._request_async("GET", f"jobs/{job_id}")
+
+    def poll_job(
+        self,
+        job_id: str,
+        max_wait: Optional[int] = None,
+        poll_interval: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Wait for a job to complete or fail, through the shared poller.
+        
+        Args:
+            job_id: Job ID
+            max_wait: Maximum time to wait in seconds (None = no limit)
+            poll_interval: Fixed time between polls in seconds
+                (default: ELEVENLABS_POLLING_INTERVAL, unset: adaptive backoff)
+        
+        Returns:
+            Final job status (last known status on timeout)
+        """
+        return get_poller().wait(
+            "elevenlabs",
+            job_id,
+            lambda: self.get_job_status(job_id),
+            JOB_TERMINAL_STATUSES,
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
+
+    async def poll_job_async(
+        self,
+        job_id: str,
+        max_wait: Optional[int] = None,
+        poll_interval: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of `poll_job`."""
+        return await get_poller().wait_async(
+            "elevenlabs",
+            job_id,
+            partial(self.get_job_status_async, job_id),
+            JOB_TERMINAL_STATUSES,
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
+
 
 # Global client instance
 _client: Optional[ElevenLabsClient] = None
@@ -209,3 +398,9 @@ def get_client() -> ElevenLabsClient:
     if _client is None:
         _client = ElevenLabsClient()
     return _client
+
+
+async def close_client() -> None:
+    """Close the pooled connections of the client instance, if created."""
+    if _client is not None:
+        await _client.http.aclose()
@@ -1,116 +1,149 @@
 """
 ElevenLabs music generation handler.
 """
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional
 from app.tools.elevenlabs.client import get_client
 from app.utils.ids import generate_job_id, generate_asset_id, generate_timestamp
 from app.utils.errors import ValidationError
 from app.utils.logging import logger
+from app.jobs.progress import resumed_submission
+from app.tools.result_cache import cached_generation
 from app.utils.media_storage import get_project_name, process_asset_links
 from app.mcp.schemas import AssetLink
 
 
+MUSIC_PARAM_KEYS = ["temperature", "seed"]
+
+
+def _prepare(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the payload and build the per-call context shared by sync/async paths."""
+    if not payload.get("prompt"):
+        raise ValidationError("prompt is required")
+
+    # Get project name from payload or trace
+    trace = payload.get("_trace")
+    optional_params = {key: payload[key] for key in MUSIC_PARAM_KEYS if key in payload}
+    return {
+        "prompt": payload["prompt"],
+        "duration": payload.get("duration"),
+        "project_name": get_project_name(payload, trace),
+        "job_id": generate_job_id("elevenlabs"),
+        "asset_id": generate_asset_id("elevenlabs", "music"),
+        "created_at": generate_timestamp(),
+        "optional_params": optional_params
+    }
+
+
+def _result(
+    ctx: Dict[str, Any],
+    job_id: str,
+    status: str,
+    completed_at: Optional[str],
+    links: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "provider": "elevenlabs",
+        "model": "music-generation",
+        "params": {
+            "prompt": ctx["prompt"],
+            "duration": ctx["duration"],
+            **ctx["optional_params"]
+        },
+        "created_at": ctx["created_at"],
+        "completed_at": completed_at,
+        "links": links,
+        "error": None
+    }
+
+
+def _direct_asset_link(ctx: Dict[str, Any], response: Dict[str, Any], completed_at: str) -> AssetLink:
+    audio_url = response.get("audio_url") or response.get("url")
+    if not audio_url and "audio" in response:
+        audio_url = f"data:audio/mpeg;base64,{response.get('audio', '')[:50]}..."
+    return AssetLink(
+        url=audio_url or "pending",
+        asset_id=ctx["asset_id"],
+        asset_type="music",
+        provider="elevenlabs",
+        created_at=completed_at
+    )
+
+
+@cached_generation("elevenlabs_music")
 def generate_music(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate music from prompt using ElevenLabs.
-    
+
     Expected payload:
         - prompt: str (required) - Music generation prompt
         - duration: int (optional) - Duration in seconds
         - temperature: float (optional) - Temperature parameter
-        - seed: int (optional) - Random seed
-    
+        - seed: int (optional) - Random seed (only seeded requests are answered from the result cache)
+
     Returns:
         Job status with asset links
     """
-    # Validate payload
-    if not payload.get("prompt"):
-        raise ValidationError("prompt is required")
-    
-    prompt = payload["prompt"]
-    duration = payload.get("duration")
-    
-    # Get project name from payload or trace
-    trace = payload.get("_trace")
-    project_name = get_project_name(payload, trace)
-    
-    # Generate IDs
-    job_id = generate_job_id("elevenlabs")
-    asset_id = generate_asset_id("elevenlabs", "music")
-    created_at = generate_timestamp()
-    
-    logger.info(f"Generating music: job_id={job_id}, prompt_length={len(prompt)}")
-    
+    ctx = _prepare(payload)
+
+    logger.info(f"Generating music: job_id={ctx['job_id']}, prompt_length={len(ctx['prompt'])}")
+
     try:
         # Call ElevenLabs API
         client = get_client()
-        
-        # Extract optional parameters
-        optional_params = {}
-        for key in ["temperature", "seed"]:
-            if key in payload:
-                optional_params[key] = payload[key]
-        
-        response = client.generate_music(
-            prompt=prompt,
-            duration=duration,
-            **optional_params
+        response = resumed_submission(payload) or client.generate_music(
+            prompt=ctx["prompt"],
+            duration=ctx["duration"],
+            **ctx["optional_params"]
         )
-        
+
         # Check if response is async (job) or sync (audio data)
         if "job_id" in response:
-            # Async job
-            job_id = response["job_id"]
-            return {
-                "job_id": job_id,
-                "status": "pending",
-                "provider": "elevenlabs",
-                "model": "music-generation",
-                "params": {
-                    "prompt": prompt,
-                    "duration": duration,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": None,
-                "links": [],
-                "error": None
-            }
-        else:
-            # Synchronous response with audio
-            audio_url = response.get("audio_url") or response.get("url")
-            if not audio_url and "audio" in response:
-                audio_url = f"data:audio/mpeg;base64,{response.get('audio', '')[:50]}..."
-            
-            completed_at = generate_timestamp()
-            
-            asset_link = AssetLink(
-                url=audio_url or "pending",
-                asset_id=asset_id,
-                asset_type="music",
-                provider="elevenlabs",
-                created_at=completed_at
-            )
-            
-            # Process links (download and store if enabled)
-            links = process_asset_links([asset_link], project_name, "audio", completed_at)
-            
-            return {
-                "job_id": job_id,
-                "status": "completed",
-                "provider": "elevenlabs",
-                "model": "music-generation",
-                "params": {
-                    "prompt": prompt,
-                    "duration": duration,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-    
+            return _result(ctx, response["job_id"], "pending", None, [])
+
+        # Synchronous response with audio
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+
+        # Process links (download and store if enabled)
+        links = process_asset_links([asset_link], ctx["project_name"], "audio", completed_at)
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
+    except Exception as e:
+        logger.error(f"Error generating music: {e}", exc_info=True)
+        raise
+
+
+@cached_generation("elevenlabs_music")
+async def generate_music_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `generate_music`: the provider call runs on the event
+    loop, local download/upload runs in a worker thread.
+    """
+    ctx = _prepare(payload)
+
+    logger.info(f"Generating music (async): job_id={ctx['job_id']}, prompt_length={len(ctx['prompt'])}")
+
+    try:
+        client = get_client()
+        response = resumed_submission(payload) or await client.generate_music_async(
+            prompt=ctx["prompt"],
+            duration=ctx["duration"],
+            **ctx["optional_params"]
+        )
+
+        if "job_id" in response:
+            return _result(ctx, response["job_id"], "pending", None, [])
+
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+        links = await asyncio.to_thread(
+            process_asset_links, [asset_link], ctx["project_name"], "audio", completed_at
+        )
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
     except Exception as e:
         logger.error(f"Error generating music: {e}", exc_info=True)
         raise
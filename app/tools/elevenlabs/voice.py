@@ -1,19 +1,85 @@
 """
 ElevenLabs voice (TTS) handler.
 """
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional
 from app.tools.elevenlabs.client import get_client
 from app.utils.ids import generate_job_id, generate_asset_id, generate_timestamp
 from app.utils.errors import ValidationError
 from app.utils.logging import logger
+from app.jobs.progress import resumed_submission
+from app.tools.result_cache import cached_generation
 from app.utils.media_storage import get_project_name, process_asset_links
 from app.mcp.schemas import JobStatus, AssetLink
 
 
+VOICE_PARAM_KEYS = ["stability", "similarity_boost", "style", "use_speaker_boost"]
+
+
+def _prepare(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the payload and build the per-call context shared by sync/async paths."""
+    if not payload.get("text"):
+        raise ValidationError("text is required")
+
+    # Get project name from payload or trace
+    trace = payload.get("_trace")
+    optional_params = {key: payload[key] for key in VOICE_PARAM_KEYS if key in payload}
+    return {
+        "text": payload["text"],
+        "voice_id": payload.get("voice_id", "21m00Tcm4TlvDq8ikWAM"),
+        "model_id": payload.get("model_id", "eleven_multilingual_v2"),
+        "project_name": get_project_name(payload, trace),
+        "job_id": generate_job_id("elevenlabs"),
+        "asset_id": generate_asset_id("elevenlabs", "voice"),
+        "created_at": generate_timestamp(),
+        "optional_params": optional_params
+    }
+
+
+def _result(
+    ctx: Dict[str, Any],
+    job_id: str,
+    status: str,
+    completed_at: Optional[str],
+    links: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "provider": "elevenlabs",
+        "model": ctx["model_id"],
+        "params": {
+            "voice_id": ctx["voice_id"],
+            "text_length": len(ctx["text"]),
+            **ctx["optional_params"]
+        },
+        "created_at": ctx["created_at"],
+        "completed_at": completed_at,
+        "links": links,
+        "error": None
+    }
+
+
+def _direct_asset_link(ctx: Dict[str, Any], response: Dict[str, Any], completed_at: str) -> AssetLink:
+    audio_url = response.get("audio_url") or response.get("url")
+    if not audio_url and "audio" in response:
+        # Audio data in response - would need to be saved/uploaded
+        # For now, we'll treat it as a completed job
+        audio_url = f"data:audio/mpeg;base64,{response.get('audio', '')[:50]}..."
+    return AssetLink(
+        url=audio_url or "pending",
+        asset_id=ctx["asset_id"],
+        asset_type="voice",
+        provider="elevenlabs",
+        created_at=completed_at
+    )
+
+
+@cached_generation("elevenlabs_voice", seeded=False)
 def generate_voice(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate voice from text using ElevenLabs TTS.
-    
+
     Expected payload:
         - text: str (required) - Text to convert to speech
         - voice_id: str (optional) - Voice ID (default: "21m00Tcm4TlvDq8ikWAM")
@@ -22,102 +88,76 @@ def generate_voice(payload: Dict[str, Any]) -> Dict[str, Any]:
         - similarity_boost: float (optional) - Similarity boost parameter
         - style: float (optional) - Style parameter
         - use_speaker_boost: bool (optional) - Use speaker boost
-    
+
     Returns:
         Job status with asset links
     """
-    # Validate payload
-    if not payload.get("text"):
-        raise ValidationError("text is required")
-    
-    text = payload["text"]
-    voice_id = payload.get("voice_id", "21m00Tcm4TlvDq8ikWAM")
-    model_id = payload.get("model_id", "eleven_multilingual_v2")
-    
-    # Get project name from payload or trace
-    trace = payload.get("_trace")
-    project_name = get_project_name(payload, trace)
-    
-    # Generate IDs
-    job_id = generate_job_id("elevenlabs")
-    asset_id = generate_asset_id("elevenlabs", "voice")
-    created_at = generate_timestamp()
-    
-    logger.info(f"Generating voice: job_id={job_id}, voice_id={voice_id}, text_length={len(text)}")
-    
+    ctx = _prepare(payload)
+
+    logger.info(
+        f"Generating voice: job_id={ctx['job_id']}, voice_id={ctx['voice_id']}, "
+        f"text_length={len(ctx['text'])}"
+    )
+
     try:
         # Call ElevenLabs API
         client = get_client()
-        
-        # Extract optional parameters
-        optional_params = {}
-        for key in ["stability", "similarity_boost", "style", "use_speaker_boost"]:
-            if key in payload:
-                optional_params[key] = payload[key]
-        
-        response = client.text_to_speech(
-            text=text,
-            voice_id=voice_id,
-            model_id=model_id,
-            **optional_params
+        response = resumed_submission(payload) or client.text_to_speech(
+            text=ctx["text"],
+            voice_id=ctx["voice_id"],
+            model_id=ctx["model_id"],
+            **ctx["optional_params"]
         )
-        
+
         # Check if response is async (job) or sync (audio data)
         if "job_id" in response:
-            # Async job
-            job_id = response["job_id"]
-            return {
-                "job_id": job_id,
-                "status": "pending",
-                "provider": "elevenlabs",
-                "model": model_id,
-                "params": {
-                    "voice_id": voice_id,
-                    "text_length": len(text),
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": None,
-                "links": [],
-                "error": None
-            }
-        else:
-            # Synchronous response with audio
-            audio_url = response.get("audio_url") or response.get("url")
-            if not audio_url and "audio" in response:
-                # Audio data in response - would need to be saved/uploaded
-                # For now, we'll treat it as a completed job
-                audio_url = f"data:audio/mpeg;base64,{response.get('audio', '')[:50]}..."
-            
-            completed_at = generate_timestamp()
-            
-            asset_link = AssetLink(
-                url=audio_url or "pending",
-                asset_id=asset_id,
-                asset_type="voice",
-                provider="elevenlabs",
-                created_at=completed_at
-            )
-            
-            # Process links (download and store if enabled)
-            links = process_asset_links([asset_link], project_name, "audio", completed_at)
-            
-            return {
-                "job_id": job_id,
-                "status": "completed",
-                "provider": "elevenlabs",
-                "model": model_id,
-                "params": {
-                    "voice_id": voice_id,
-                    "text_length": len(text),
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-    
+            return _result(ctx, response["job_id"], "pending", None, [])
+
+        # Synchronous response with audio
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+
+        # Process links (download and store if enabled)
+        links = process_asset_links([asset_link], ctx["project_name"], "audio", completed_at)
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
+    except Exception as e:
+        logger.error(f"Error generating voice: {e}", exc_info=True)
+        raise
+
+
+@cached_generation("elevenlabs_voice", seeded=False)
+async def generate_voice_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `generate_voice`: the provider call runs on the event
+    loop, local download/upload runs in a worker thread.
+    """
+    ctx = _prepare(payload)
+
+    logger.info(
+        f"Generating voice (async): job_id={ctx['job_id']}, voice_id={ctx['voice_id']}, "
+        f"text_length={len(ctx['text'])}"
+    )
+
+    try:
+        client = get_client()
+        response = resumed_submission(payload) or await client.text_to_speech_async(
+            text=ctx["text"],
+            voice_id=ctx["voice_id"],
+            model_id=ctx["model_id"],
+            **ctx["optional_params"]
+        )
+
+        if "job_id" in response:
+            return _result(ctx, response["job_id"], "pending", None, [])
+
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+        links = await asyncio.to_thread(
+            process_asset_links, [asset_link], ctx["project_name"], "audio", completed_at
+        )
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
     except Exception as e:
         logger.error(f"Error generating voice: {e}", exc_info=True)
         raise
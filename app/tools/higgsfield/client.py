@@ -1,15 +1,26 @@
 """
 Higgsfield API client for image and video generation.
 """
-import httpx
+import asyncio
 import time
-from typing import Dict, Any, Optional
+from functools import partial
+import httpx
+from typing import Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
 from app.config.settings import settings
 from app.utils.errors import ProviderError
+from app.utils.http import PooledTransport
+from app.tools.circuit_breaker import get_breaker
+from app.tools.poller import get_poller
+from app.tools.rate_limit import get_limiter, is_retryable_status, rate_key, retry_delay
 from app.utils.logging import logger
 
 
+# Statuses that end polling for /jobs and /requests endpoints respectively
+JOB_TERMINAL_STATUSES = {"completed", "failed", "error"}
+REQUEST_TERMINAL_STATUSES = {"completed", "failed", "error", "canceled", "nsfw"}
+
+
 class HiggsfieldClient:
     """Client for Higgsfield API."""
     
@@ -21,6 +32,9 @@ class HiggsfieldClient:
         self.base_url = settings.HIGGSFIELD_BASE_URL
         self.timeout = settings.HIGGSFIELD_TIMEOUT
         self.retries = settings.HIGGSFIELD_RETRIES
+        self.http = PooledTransport("higgsfield", timeout=self.timeout)
+        self.limiter = get_limiter("higgsfield")
+        self.breaker = get_breaker("higgsfield")
         self.polling_interval = settings.HIGGSFIELD_POLLING_INTERVAL
         
         if not (self.api_key or (self.api_key_id and self.api_key_secret)):
@@ -64,6 +78,60 @@ class HiggsfieldClient:
             "output_format": params.get("output_format", "png")
         }
     
+    def _build_url(self, endpoint: str) -> str:
+        return f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+
+    def _parse_response(
+        self,
+        response: httpx.Response,
+        method: str,
+        endpoint: str,
+        url: str
+    ) -> Dict[str, Any]:
+        data = response.json() if response.content else {}
+        if isinstance(data, dict):
+            data["_provider_debug"] = {
+                "provider": "higgsfield",
+                "method": method,
+                "endpoint": endpoint,
+                "url": url,
+                "status_code": response.status_code,
+                "response_bytes": len(response.content or b"")
+            }
+        return data
+
+    def _status_error(
+        self,
+        error: httpx.HTTPStatusError,
+        endpoint: str,
+        url: str
+    ) -> ProviderError:
+        error_msg = f"Higgsfield API error: {error.response.status_code}"
+        try:
+            error_data = error.response.json()
+            error_msg = error_data.get("error", {}).get("message", error_msg)
+            if not error_msg:
+                error_msg = error_data.get("message", error_msg)
+        except:
+            error_msg = error.response.text or error_msg
+        return ProviderError(
+            provider="higgsfield",
+            message=error_msg,
+            details={
+                "status_code": error.response.status_code,
+                "endpoint": endpoint,
+                "url": url
+            },
+            retryable=is_retryable_status(error.response.status_code)
+        )
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Delay before the next retry; a 429 also pauses every queued Higgsfield request."""
+        delay = retry_delay(attempt + 1, response)
+        if response is not None and response.status_code == 429:
+            self.limiter.pause(delay)
+        return delay
+
     def _request(
         self,
         method: str,
@@ -84,57 +152,96 @@ class HiggsfieldClient:
         Raises:
             ProviderError: If request fails
         """
-        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        url = self._build_url(endpoint)
         headers = self._get_headers()
+        key = rate_key(method, endpoint, kwargs.get("json"))
         
         for attempt in range(self.retries):
+            # Fail fast (without queueing) while the provider is down
+            self.breaker.check()
             try:
-                with httpx.Client(timeout=self.timeout) as client:
-                    response = client.request(
-                        method=method,
-                        url=url,
-                        headers=headers,
-                        **kwargs
-                    )
-                    response.raise_for_status()
-                    data = response.json() if response.content else {}
-                    if isinstance(data, dict):
-                        data["_provider_debug"] = {
-                            "provider": "higgsfield",
-                            "method": method,
-                            "endpoint": endpoint,
-                            "url": url,
-                            "status_code": response.status_code,
-                            "response_bytes": len(response.content or b"")
-                        }
-                    return data
+                with self.limiter.slot(key):
+                    with self.breaker.guard():
+                        response = self.http.client().request(
+                            method=method,
+                            url=url,
+                            headers=headers,
+                            **kwargs
+                        )
+                        response.raise_for_status()
+                return self._parse_response(response, method, endpoint, url)
             
             except httpx.HTTPStatusError as e:
-                if e.response.status_code < 500 or attempt == self.retries - 1:
+                if not is_retryable_status(e.response.status_code) or attempt == self.retries - 1:
                     # Client error or last retry
-                    error_msg = f"Higgsfield API error: {e.response.status_code}"
-                    try:
-                        error_data = e.response.json()
-                        error_msg = error_data.get("error", {}).get("message", error_msg)
-                        if not error_msg:
-                            error_msg = error_data.get("message", error_msg)
-                    except:
-                        error_msg = e.response.text or error_msg
-                    
+                    raise self._status_error(e, endpoint, url)
+                delay = self._backoff(attempt, e.response)
+                logger.warning(
+                    f"Higgsfield API error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                time.sleep(delay)
+                continue
+            
+            except httpx.RequestError as e:
+                if attempt == self.retries - 1:
                     raise ProviderError(
                         provider="higgsfield",
-                        message=error_msg,
-                        details={
-                            "status_code": e.response.status_code,
-                            "endpoint": endpoint,
-                            "url": url
-                        },
-                        retryable=e.response.status_code >= 500
+                        message=f"Request failed: {str(e)}",
+                        details={"endpoint": endpoint},
+                        retryable=True
                     )
-                # Retry on server error
-                logger.warning(f"Higgsfield API error (attempt {attempt + 1}/{self.retries}): {e}")
+                delay = self._backoff(attempt, None)
+                logger.warning(
+                    f"Higgsfield request error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                time.sleep(delay)
                 continue
-            
+        
+        raise ProviderError(
+            provider="higgsfield",
+            message="Request failed after retries",
+            details={"endpoint": endpoint},
+            retryable=True
+        )
+
+    async def _request_async(
+        self,
+        method: str,
+        endpoint: str,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of `_request`, same retry and error semantics.
+        """
+        url = self._build_url(endpoint)
+        headers = self._get_headers()
+        key = rate_key(method, endpoint, kwargs.get("json"))
+
+        for attempt in range(self.retries):
+            # Fail fast (without queueing) while the provider is down
+            self.breaker.check()
+            try:
+                async with self.limiter.slot_async(key):
+                    with self.breaker.guard():
+                        response = await self.http.async_client().request(
+                            method=method,
+                            url=url,
+                            headers=headers,
+                            **kwargs
+                        )
+                        response.raise_for_status()
+                return self._parse_response(response, method, endpoint, url)
+
+            except httpx.HTTPStatusError as e:
+                if not is_retryable_status(e.response.status_code) or attempt == self.retries - 1:
+                    raise self._status_error(e, endpoint, url)
+                delay = self._backoff(attempt, e.response)
+                logger.warning(
+                    f"Higgsfield API error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
             except httpx.RequestError as e:
                 if attempt == self.retries - 1:
                     raise ProviderError(
@@ -143,9 +250,13 @@ class HiggsfieldClient:
                         details={"endpoint": endpoint},
                         retryable=True
                     )
-                logger.warning(f"Higgsfield request error (attempt {attempt + 1}/{self.retries}): {e}")
+                delay = self._backoff(attempt, None)
+                logger.warning(
+                    f"Higgsfield request error (attempt {attempt + 1}/{self.retries}, retry in {delay:.1f}s): {e}"
+                )
+                await asyncio.sleep(delay)
                 continue
-        
+
         raise ProviderError(
             provider="higgsfield",
             message="Request failed after retries",
@@ -155,26 +266,93 @@ class HiggsfieldClient:
 
     def _request_url(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
         headers = self._get_headers()
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                **kwargs
+        self.breaker.check()
+        with self.limiter.slot():
+            with self.breaker.guard():
+                response = self.http.client().request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    **kwargs
+                )
+                response.raise_for_status()
+        return self._parse_response(response, method, url, url)
+
+    async def _request_url_async(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        headers = self._get_headers()
+        self.breaker.check()
+        async with self.limiter.slot_async():
+            with self.breaker.guard():
+                response = await self.http.async_client().request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    **kwargs
+                )
+                response.raise_for_status()
+        return self._parse_response(response, method, url, url)
+
+    def _build_image_request(
+        self,
+        prompt: str,
+        model: Optional[str],
+        params: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        endpoint = self._resolve_image_endpoint(model)
+        if endpoint in {"nano-banana", "nano-banana-pro"}:
+            payload = self._normalize_nano_banana_payload(prompt, params)
+        else:
+            payload = {
+                "prompt": prompt,
+                **params
+            }
+            if model:
+                payload["model"] = model
+        return endpoint, payload
+
+    def _normalize_job_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        if "job_id" not in response:
+            if "id" in response:
+                response["job_id"] = response["id"]
+            elif "request_id" in response:
+                response["job_id"] = response["request_id"]
+        return response
+
+    def _build_video_payload(
+        self,
+        prompt: Optional[str],
+        image_url: Optional[str],
+        model: Optional[str],
+        params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        payload = {**params}
+        
+        if prompt:
+            payload["prompt"] = prompt
+        if image_url:
+            payload["image_url"] = image_url
+        if model:
+            payload["model"] = model
+        
+        if not prompt and not image_url:
+            raise ProviderError(
+                provider="higgsfield",
+                message="Either prompt or image_url is required",
+                retryable=False
             )
-            response.raise_for_status()
-            data = response.json() if response.content else {}
-            if isinstance(data, dict):
-                data["_provider_debug"] = {
-                    "provider": "higgsfield",
-                    "method": method,
-                    "endpoint": url,
-                    "url": url,
-                    "status_code": response.status_code,
-                    "response_bytes": len(response.content or b"")
-                }
-            return data
-    
+        return payload
+
+    def _validate_status_url(self, status_url: str) -> None:
+        parsed = urlparse(status_url)
+        base_host = urlparse(self.base_url).netloc
+        if parsed.scheme not in {"http", "https"} or parsed.netloc != base_host:
+            raise ProviderError(
+                provider="higgsfield",
+                message="Invalid status_url",
+                details={"status_url": status_url},
+                retryable=False
+            )
+
     def generate_image(
         self,
         prompt: str,
@@ -192,23 +370,20 @@ class HiggsfieldClient:
         Returns:
             Response with image data or job information
         """
-        endpoint = self._resolve_image_endpoint(model)
-        if endpoint in {"nano-banana", "nano-banana-pro"}:
-            payload = self._normalize_nano_banana_payload(prompt, kwargs)
-        else:
-            payload = {
-                "prompt": prompt,
-                **kwargs
-            }
-            if model:
-                payload["model"] = model
+        endpoint, payload = self._build_image_request(prompt, model, kwargs)
         response = self._request("POST", endpoint, json=payload)
-        if "job_id" not in response:
-            if "id" in response:
-                response["job_id"] = response["id"]
-            elif "request_id" in response:
-                response["job_id"] = response["request_id"]
-        return response
+        return self._normalize_job_response(response)
+
+    async def generate_image_async(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of `generate_image`."""
+        endpoint, payload = self._build_image_request(prompt, model, kwargs)
+        response = await self._request_async("POST", endpoint, json=payload)
+        return self._normalize_job_response(response)
     
     def generate_video(
         self,
@@ -229,24 +404,19 @@ class HiggsfieldClient:
         Returns:
             Response with video data or job information
         """
-        endpoint = "videos/generate"
-        payload = {**kwargs}
-        
-        if prompt:
-            payload["prompt"] = prompt
-        if image_url:
-            payload["image_url"] = image_url
-        if model:
-            payload["model"] = model
-        
-        if not prompt and not image_url:
-            raise ProviderError(
-                provider="higgsfield",
-                message="Either prompt or image_url is required",
-                retryable=False
-            )
-        
-        return self._request("POST", endpoint, json=payload)
+        payload = self._build_video_payload(prompt, image_url, model, kwargs)
+        return self._request("POST", "videos/generate", json=payload)
+
+    async def generate_video_async(
+        self,
+        prompt: Optional[str] = None,
+        image_url: Optional[str] = None,
+        model: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of `generate_video`."""
+        payload = self._build_video_payload(prompt, image_url, model, kwargs)
+        return await self._request_async("POST", "videos/generate", json=payload)
     
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """
@@ -261,21 +431,23 @@ class HiggsfieldClient:
         endpoint = f"jobs/{job_id}"
         return self._request("GET", endpoint)
 
+    async def get_job_status_async(self, job_id: str) -> Dict[str, Any]:
+        return await self._request_async("GET", f"jobs/{job_id}")
+
     def get_request_status(self, request_id: str) -> Dict[str, Any]:
         endpoint = f"requests/{request_id}/status"
         return self._request("GET", endpoint)
 
+    async def get_request_status_async(self, request_id: str) -> Dict[str, Any]:
+        return await self._request_async("GET", f"requests/{request_id}/status")
+
     def get_status_by_url(self, status_url: str) -> Dict[str, Any]:
-        parsed = urlparse(status_url)
-        base_host = urlparse(self.base_url).netloc
-        if parsed.scheme not in {"http", "https"} or parsed.netloc != base_host:
-            raise ProviderError(
-                provider="higgsfield",
-                message="Invalid status_url",
-                details={"status_url": status_url},
-                retryable=False
-            )
+        self._validate_status_url(status_url)
         return self._request_url("GET", status_url)
+
+    async def get_status_by_url_async(self, status_url: str) -> Dict[str, Any]:
+        self._validate_status_url(status_url)
+        return await self._request_url_async("GET", status_url)
     
     def poll_job(
         self,
@@ -284,34 +456,46 @@ class HiggsfieldClient:
         poll_interval: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        Poll a job until completion or failure.
+        Wait for a job to complete or fail.
+        
+        The job is handed to the shared poller, which polls it together with
+        every other pending job on an adaptive schedule.
         
         Args:
             job_id: Job ID
             max_wait: Maximum time to wait in seconds (None = no limit)
-            poll_interval: Time between polls in seconds (default: self.polling_interval)
+            poll_interval: Fixed time between polls in seconds
+                (default: HIGGSFIELD_POLLING_INTERVAL, unset: adaptive backoff)
         
         Returns:
-            Final job status
+            Final job status (last known status on timeout)
         """
-        poll_interval = poll_interval or self.polling_interval
-        start_time = time.time()
-        
-        while True:
-            status = self.get_job_status(job_id)
-            job_status = status.get("status", "").lower()
-            
-            # Check if job is complete
-            if job_status in ["completed", "failed", "error"]:
-                return status
-            
-            # Check timeout
-            if max_wait and (time.time() - start_time) >= max_wait:
-                logger.warning(f"Job {job_id} polling timeout after {max_wait}s")
-                return status
-            
-            # Wait before next poll
-            time.sleep(poll_interval)
+        return get_poller().wait(
+            "higgsfield",
+            job_id,
+            lambda: self.get_job_status(job_id),
+            JOB_TERMINAL_STATUSES,
+            kind="jobs",
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
+
+    async def poll_job_async(
+        self,
+        job_id: str,
+        max_wait: Optional[int] = None,
+        poll_interval: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of `poll_job`: awaits the poller without holding a thread."""
+        return await get_poller().wait_async(
+            "higgsfield",
+            job_id,
+            partial(self.get_job_status_async, job_id),
+            JOB_TERMINAL_STATUSES,
+            kind="jobs",
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
 
     def poll_request(
         self,
@@ -319,21 +503,31 @@ class HiggsfieldClient:
         max_wait: Optional[int] = None,
         poll_interval: Optional[int] = None
     ) -> Dict[str, Any]:
-        poll_interval = poll_interval or self.polling_interval
-        start_time = time.time()
-
-        while True:
-            status = self.get_request_status(request_id)
-            job_status = status.get("status", "").lower()
-
-            if job_status in ["completed", "failed", "error", "canceled", "nsfw"]:
-                return status
-
-            if max_wait and (time.time() - start_time) >= max_wait:
-                logger.warning(f"Request {request_id} polling timeout after {max_wait}s")
-                return status
+        return get_poller().wait(
+            "higgsfield",
+            request_id,
+            lambda: self.get_request_status(request_id),
+            REQUEST_TERMINAL_STATUSES,
+            kind="requests",
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
 
-            time.sleep(poll_interval)
+    async def poll_request_async(
+        self,
+        request_id: str,
+        max_wait: Optional[int] = None,
+        poll_interval: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return await get_poller().wait_async(
+            "higgsfield",
+            request_id,
+            partial(self.get_request_status_async, request_id),
+            REQUEST_TERMINAL_STATUSES,
+            kind="requests",
+            max_wait=max_wait,
+            poll_interval=poll_interval or self.polling_interval
+        )
 
 
 # Global client instance
@@ -346,3 +540,9 @@ def get_client() -> HiggsfieldClient:
     if _client is None:
         _client = HiggsfieldClient()
     return _client
+
+
+async def close_client() -> None:
+    """Close the pooled connections of the client instance, if created."""
+    if _client is not None:
+        await _client.http.aclose()
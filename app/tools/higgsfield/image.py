@@ -1,19 +1,139 @@
 """
 Higgsfield image generation handler.
 """
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional
 from app.tools.higgsfield.client import get_client
 from app.utils.ids import generate_job_id, generate_asset_id, generate_timestamp
 from app.utils.errors import ValidationError
 from app.utils.logging import logger
+from app.jobs.progress import report_progress, resumed_submission
+from app.tools.result_cache import cached_generation
 from app.utils.media_storage import get_project_name, process_asset_links
 from app.mcp.schemas import AssetLink
 
 
+IMAGE_PARAM_KEYS = [
+    "width",
+    "height",
+    "steps",
+    "guidance_scale",
+    "seed",
+    "aspect_ratio",
+    "num_images",
+    "output_format",
+    "input_images"
+]
+
+
+def _uses_request_status(model: Optional[str]) -> bool:
+    """Nano Banana models report progress on /requests instead of /jobs."""
+    return bool(model) and model.replace("_", "-").lower() in {"nano-banana", "nano-banana-pro"}
+
+
+def _prepare(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the payload and build the per-call context shared by sync/async paths."""
+    if not payload.get("prompt"):
+        raise ValidationError("prompt is required")
+
+    # Get project name from payload or trace
+    trace = payload.get("_trace")
+    optional_params = {key: payload[key] for key in IMAGE_PARAM_KEYS if key in payload}
+    return {
+        "prompt": payload["prompt"],
+        "model": payload.get("model"),
+        "wait_for_completion": payload.get("wait_for_completion", False),
+        "project_name": get_project_name(payload, trace),
+        "job_id": generate_job_id("higgsfield"),
+        "asset_id": generate_asset_id("higgsfield", "image"),
+        "created_at": generate_timestamp(),
+        "optional_params": optional_params
+    }
+
+
+def _result(
+    ctx: Dict[str, Any],
+    job_id: str,
+    status: str,
+    completed_at: Optional[str],
+    links: List[Dict[str, Any]],
+    error: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "provider": "higgsfield",
+        "model": ctx["model"] or "default",
+        "params": {
+            "prompt": ctx["prompt"],
+            **ctx["optional_params"]
+        },
+        "created_at": ctx["created_at"],
+        "completed_at": completed_at,
+        "links": links,
+        "error": error
+    }
+
+
+def _failed_result(ctx: Dict[str, Any], job_id: str, final_status: Dict[str, Any]) -> Dict[str, Any]:
+    error_msg = final_status.get("error", {}).get("message", "Job failed")
+    return _result(
+        ctx,
+        job_id,
+        "failed",
+        generate_timestamp(),
+        [],
+        error={
+            "code": "JOB_FAILED",
+            "message": error_msg,
+            "retryable": True
+        }
+    )
+
+
+def _completed_links(
+    ctx: Dict[str, Any],
+    final_status: Dict[str, Any],
+    completed_at: str
+) -> List[Dict[str, Any]]:
+    """Provider links for a completed job (not yet downloaded)."""
+    image_url = final_status.get("result_url") or final_status.get("url")
+    if not image_url:
+        return []
+    asset_link = AssetLink(
+        url=image_url,
+        asset_id=ctx["asset_id"],
+        asset_type="image",
+        provider="higgsfield",
+        created_at=completed_at
+    )
+    return [asset_link.model_dump(exclude_none=True) if hasattr(asset_link, 'model_dump') else asset_link.dict()]
+
+
+def _direct_image_url(response: Dict[str, Any]) -> Optional[str]:
+    image_url = response.get("image_url") or response.get("url") or response.get("result_url")
+    if not image_url and "image" in response:
+        image_url = f"data:image/png;base64,{response.get('image', '')[:50]}..."
+    return image_url
+
+
+def _with_debug(
+    result: Dict[str, Any],
+    provider_debug: Optional[Dict[str, Any]],
+    status_url: Optional[str] = None
+) -> Dict[str, Any]:
+    if provider_debug:
+        result["provider_debug"] = provider_debug
+    if status_url:
+        result["status_url"] = status_url
+    return result
+
+
+@cached_generation("higgsfield_image")
 def generate_image(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate image from prompt using Higgsfield.
-    
+
     Expected payload:
         - prompt: str (required) - Image generation prompt
         - model: str (optional) - Model name
@@ -21,185 +141,150 @@ def generate_image(payload: Dict[str, Any]) -> Dict[str, Any]:
         - height: int (optional) - Image height
         - steps: int (optional) - Number of steps
         - guidance_scale: float (optional) - Guidance scale
-        - seed: int (optional) - Random seed
+        - seed: int (optional) - Random seed (only seeded requests are answered from the result cache)
         - wait_for_completion: bool (optional) - Wait for job completion (default: False)
-    
+
     Returns:
         Job status with asset links
     """
-    # Validate payload
-    if not payload.get("prompt"):
-        raise ValidationError("prompt is required")
-    
-    prompt = payload["prompt"]
-    model = payload.get("model")
-    wait_for_completion = payload.get("wait_for_completion", False)
-    
-    # Get project name from payload or trace
-    trace = payload.get("_trace")
-    project_name = get_project_name(payload, trace)
-    
-    # Generate IDs
-    job_id = generate_job_id("higgsfield")
-    asset_id = generate_asset_id("higgsfield", "image")
-    created_at = generate_timestamp()
-    
-    logger.info(f"Generating image: job_id={job_id}, prompt_length={len(prompt)}")
-    
+    ctx = _prepare(payload)
+    model = ctx["model"]
+
+    logger.info(f"Generating image: job_id={ctx['job_id']}, prompt_length={len(ctx['prompt'])}")
+
     try:
         # Call Higgsfield API
         client = get_client()
-        
-        # Extract optional parameters
-        optional_params = {}
-        for key in [
-            "width",
-            "height",
-            "steps",
-            "guidance_scale",
-            "seed",
-            "aspect_ratio",
-            "num_images",
-            "output_format",
-            "input_images"
-        ]:
-            if key in payload:
-                optional_params[key] = payload[key]
-        
-        response = client.generate_image(
-            prompt=prompt,
+        response = resumed_submission(payload) or client.generate_image(
+            prompt=ctx["prompt"],
             model=model,
-            **optional_params
+            **ctx["optional_params"]
         )
         provider_debug = response.pop("_provider_debug", None)
-        
+
         # Check if response contains job_id (async) or direct result
         if "job_id" in response:
             job_id = response["job_id"]
+            report_progress(payload, "submitted", provider="higgsfield", provider_job_id=job_id)
             status = "pending"
             completed_at = None
             links = []
-            status_url = response.get("status_url")
-            
+
             # Poll for completion if requested
-            if wait_for_completion:
+            if ctx["wait_for_completion"]:
                 logger.info(f"Polling for job completion: job_id={job_id}")
-                if model and model.replace("_", "-").lower() in {"nano-banana", "nano-banana-pro"}:
+                if _uses_request_status(model):
                     final_status = client.poll_request(job_id)
                 else:
                     final_status = client.poll_job(job_id)
                 status = final_status.get("status", "pending").lower()
-                
+
                 if status == "completed":
                     completed_at = generate_timestamp()
-                    image_url = final_status.get("result_url") or final_status.get("url")
-                    if image_url:
-                        asset_link = AssetLink(
-                            url=image_url,
-                            asset_id=asset_id,
-                            asset_type="image",
-                            provider="higgsfield",
-                            created_at=completed_at
-                        )
-                        links = [asset_link.model_dump() if hasattr(asset_link, 'model_dump') else asset_link.dict()]
+                    links = _completed_links(ctx, final_status, completed_at)
+                    if links:
+                        report_progress(payload, "downloading", provider_job_id=job_id)
                         # Download and store locally
-                        links = process_asset_links(links, project_name, "image", completed_at)
+                        links = process_asset_links(links, ctx["project_name"], "image", completed_at)
+                elif status in ["failed", "error"]:
+                    return _failed_result(ctx, job_id, final_status)
+
+            result = _result(ctx, job_id, status, completed_at, links)
+            return _with_debug(result, provider_debug, response.get("status_url"))
+
+        # Synchronous response with image
+        image_url = _direct_image_url(response)
+        if not image_url:
+            result = _result(ctx, response.get("job_id", ctx["job_id"]), "pending", None, [])
+            return _with_debug(result, provider_debug)
+
+        completed_at = generate_timestamp()
+        asset_link = AssetLink(
+            url=image_url,
+            asset_id=ctx["asset_id"],
+            asset_type="image",
+            provider="higgsfield",
+            created_at=completed_at
+        )
+
+        # Process links (download and store if enabled)
+        links = process_asset_links([asset_link], ctx["project_name"], "image", completed_at)
+        result = _result(ctx, ctx["job_id"], "completed", completed_at, links)
+        return _with_debug(result, provider_debug)
+
+    except Exception as e:
+        logger.error(f"Error generating image: {e}", exc_info=True)
+        raise
+
+
+@cached_generation("higgsfield_image")
+async def generate_image_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `generate_image`: provider calls and polling run on the
+    event loop, local download/upload runs in a worker thread.
+    """
+    ctx = _prepare(payload)
+    model = ctx["model"]
+
+    logger.info(f"Generating image (async): job_id={ctx['job_id']}, prompt_length={len(ctx['prompt'])}")
+
+    try:
+        client = get_client()
+        response = resumed_submission(payload) or await client.generate_image_async(
+            prompt=ctx["prompt"],
+            model=model,
+            **ctx["optional_params"]
+        )
+        provider_debug = response.pop("_provider_debug", None)
+
+        if "job_id" in response:
+            job_id = response["job_id"]
+            report_progress(payload, "submitted", provider="higgsfield", provider_job_id=job_id)
+            status = "pending"
+            completed_at = None
+            links = []
+
+            if ctx["wait_for_completion"]:
+                logger.info(f"Polling for job completion: job_id={job_id}")
+                if _uses_request_status(model):
+                    final_status = await client.poll_request_async(job_id)
+                else:
+                    final_status = await client.poll_job_async(job_id)
+                status = final_status.get("status", "pending").lower()
+
+                if status == "completed":
+                    completed_at = generate_timestamp()
+                    links = _completed_links(ctx, final_status, completed_at)
+                    if links:
+                        report_progress(payload, "downloading", provider_job_id=job_id)
+                        links = await asyncio.to_thread(
+                            process_asset_links, links, ctx["project_name"], "image", completed_at
+                        )
                 elif status in ["failed", "error"]:
-                    error_msg = final_status.get("error", {}).get("message", "Job failed")
-                    return {
-                        "job_id": job_id,
-                        "status": "failed",
-                        "provider": "higgsfield",
-                        "model": model or "default",
-                        "params": {
-                            "prompt": prompt,
-                            **optional_params
-                        },
-                        "created_at": created_at,
-                        "completed_at": generate_timestamp(),
-                        "links": [],
-                        "error": {
-                            "code": "JOB_FAILED",
-                            "message": error_msg,
-                            "retryable": True
-                        }
-                    }
-            
-            result = {
-                "job_id": job_id,
-                "status": status,
-                "provider": "higgsfield",
-                "model": model or "default",
-                "params": {
-                    "prompt": prompt,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-            if provider_debug:
-                result["provider_debug"] = provider_debug
-            if status_url:
-                result["status_url"] = status_url
-            return result
-        else:
-            # Synchronous response with image
-            image_url = response.get("image_url") or response.get("url") or response.get("result_url")
-            if not image_url and "image" in response:
-                image_url = f"data:image/png;base64,{response.get('image', '')[:50]}..."
-
-            if not image_url:
-                result = {
-                    "job_id": response.get("job_id", job_id),
-                    "status": "pending",
-                    "provider": "higgsfield",
-                    "model": model or "default",
-                    "params": {
-                        "prompt": prompt,
-                        **optional_params
-                    },
-                    "created_at": created_at,
-                    "completed_at": None,
-                    "links": [],
-                    "error": None
-                }
-                if provider_debug:
-                    result["provider_debug"] = provider_debug
-                return result
-            
-            completed_at = generate_timestamp()
-            
-            asset_link = AssetLink(
-                url=image_url or "pending",
-                asset_id=asset_id,
-                asset_type="image",
-                provider="higgsfield",
-                created_at=completed_at
-            )
-            
-            # Process links (download and store if enabled)
-            links = process_asset_links([asset_link], project_name, "image", completed_at)
-            
-            result = {
-                "job_id": job_id,
-                "status": "completed",
-                "provider": "higgsfield",
-                "model": model or "default",
-                "params": {
-                    "prompt": prompt,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-            if provider_debug:
-                result["provider_debug"] = provider_debug
-            return result
-    
+                    return _failed_result(ctx, job_id, final_status)
+
+            result = _result(ctx, job_id, status, completed_at, links)
+            return _with_debug(result, provider_debug, response.get("status_url"))
+
+        image_url = _direct_image_url(response)
+        if not image_url:
+            result = _result(ctx, response.get("job_id", ctx["job_id"]), "pending", None, [])
+            return _with_debug(result, provider_debug)
+
+        completed_at = generate_timestamp()
+        asset_link = AssetLink(
+            url=image_url,
+            asset_id=ctx["asset_id"],
+            asset_type="image",
+            provider="higgsfield",
+            created_at=completed_at
+        )
+        links = await asyncio.to_thread(
+            process_asset_links, [asset_link], ctx["project_name"], "image", completed_at
+        )
+        result = _result(ctx, ctx["job_id"], "completed", completed_at, links)
+        return _with_debug(result, provider_debug)
+
     except Exception as e:
         logger.error(f"Error generating image: {e}", exc_info=True)
         raise
@@ -1,19 +1,120 @@
 """
 Higgsfield video generation handler.
 """
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional
 from app.tools.higgsfield.client import get_client
 from app.utils.ids import generate_job_id, generate_asset_id, generate_timestamp
 from app.utils.errors import ValidationError
 from app.utils.logging import logger
+from app.jobs.progress import report_progress, resumed_submission
+from app.tools.result_cache import cached_generation
 from app.utils.media_storage import get_project_name, process_asset_links
 from app.mcp.schemas import AssetLink
 
 
+VIDEO_PARAM_KEYS = ["duration", "fps", "width", "height", "steps", "seed"]
+
+
+def _prepare(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the payload and build the per-call context shared by sync/async paths."""
+    if not payload.get("prompt") and not payload.get("image_url"):
+        raise ValidationError("Either prompt or image_url is required")
+
+    # Get project name from payload or trace
+    trace = payload.get("_trace")
+    optional_params = {key: payload[key] for key in VIDEO_PARAM_KEYS if key in payload}
+    return {
+        "prompt": payload.get("prompt"),
+        "image_url": payload.get("image_url"),
+        "model": payload.get("model"),
+        "wait_for_completion": payload.get("wait_for_completion", False),
+        "project_name": get_project_name(payload, trace),
+        "job_id": generate_job_id("higgsfield"),
+        "asset_id": generate_asset_id("higgsfield", "video"),
+        "created_at": generate_timestamp(),
+        "optional_params": optional_params
+    }
+
+
+def _result(
+    ctx: Dict[str, Any],
+    job_id: str,
+    status: str,
+    completed_at: Optional[str],
+    links: List[Dict[str, Any]],
+    error: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": status,
+        "provider": "higgsfield",
+        "model": ctx["model"] or "default",
+        "params": {
+            "prompt": ctx["prompt"],
+            "image_url": ctx["image_url"],
+            **ctx["optional_params"]
+        },
+        "created_at": ctx["created_at"],
+        "completed_at": completed_at,
+        "links": links,
+        "error": error
+    }
+
+
+def _failed_result(ctx: Dict[str, Any], job_id: str, final_status: Dict[str, Any]) -> Dict[str, Any]:
+    error_msg = final_status.get("error", {}).get("message", "Job failed")
+    return _result(
+        ctx,
+        job_id,
+        "failed",
+        generate_timestamp(),
+        [],
+        error={
+            "code": "JOB_FAILED",
+            "message": error_msg,
+            "retryable": True
+        }
+    )
+
+
+def _completed_links(
+    ctx: Dict[str, Any],
+    final_status: Dict[str, Any],
+    completed_at: str
+) -> List[Dict[str, Any]]:
+    """Provider links for a completed job (not yet downloaded)."""
+    video_url = final_status.get("result_url") or final_status.get("url")
+    if not video_url:
+        return []
+    asset_link = AssetLink(
+        url=video_url,
+        asset_id=ctx["asset_id"],
+        asset_type="video",
+        provider="higgsfield",
+        created_at=completed_at
+    )
+    return [asset_link.model_dump(exclude_none=True) if hasattr(asset_link, 'model_dump') else asset_link.dict()]
+
+
+def _direct_asset_link(ctx: Dict[str, Any], response: Dict[str, Any], completed_at: str) -> AssetLink:
+    video_url = response.get("video_url") or response.get("url") or response.get("result_url")
+    if not video_url and "video" in response:
+        video_url = f"data:video/mp4;base64,{response.get('video', '')[:50]}..."
+    return AssetLink(
+        url=video_url or "pending",
+        asset_id=ctx["asset_id"],
+        asset_type="video",
+        provider="higgsfield",
+        created_at=completed_at
+    )
+
+
+@cached_generation("higgsfield_video")
 def generate_video(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate video from prompt or image using Higgsfield.
-    
+
     Expected payload:
         - prompt: str (optional) - Video generation prompt (required if image_url not provided)
         - image_url: str (optional) - URL of source image (required if prompt not provided)
@@ -23,148 +124,122 @@ def generate_video(payload: Dict[str, Any]) -> Dict[str, Any]:
         - width: int (optional) - Video width
         - height: int (optional) - Video height
         - steps: int (optional) - Number of steps
-        - seed: int (optional) - Random seed
+        - seed: int (optional) - Random seed (only seeded requests are answered from the result cache)
         - wait_for_completion: bool (optional) - Wait for job completion (default: False)
-    
+
     Returns:
         Job status with asset links
     """
-    # Validate payload
-    if not payload.get("prompt") and not payload.get("image_url"):
-        raise ValidationError("Either prompt or image_url is required")
-    
-    prompt = payload.get("prompt")
-    image_url = payload.get("image_url")
-    model = payload.get("model")
-    wait_for_completion = payload.get("wait_for_completion", False)
-    
-    # Get project name from payload or trace
-    trace = payload.get("_trace")
-    project_name = get_project_name(payload, trace)
-    
-    # Generate IDs
-    job_id = generate_job_id("higgsfield")
-    asset_id = generate_asset_id("higgsfield", "video")
-    created_at = generate_timestamp()
-    
-    logger.info(f"Generating video: job_id={job_id}, prompt={prompt is not None}, image_url={image_url is not None}")
-    
+    ctx = _prepare(payload)
+
+    logger.info(
+        f"Generating video: job_id={ctx['job_id']}, prompt={ctx['prompt'] is not None}, "
+        f"image_url={ctx['image_url'] is not None}"
+    )
+
     try:
         # Call Higgsfield API
         client = get_client()
-        
-        # Extract optional parameters
-        optional_params = {}
-        for key in ["duration", "fps", "width", "height", "steps", "seed"]:
-            if key in payload:
-                optional_params[key] = payload[key]
-        
-        response = client.generate_video(
-            prompt=prompt,
-            image_url=image_url,
-            model=model,
-            **optional_params
+        response = resumed_submission(payload) or client.generate_video(
+            prompt=ctx["prompt"],
+            image_url=ctx["image_url"],
+            model=ctx["model"],
+            **ctx["optional_params"]
         )
-        
+
         # Check if response contains job_id (async) or direct result
         if "job_id" in response:
             job_id = response["job_id"]
+            report_progress(payload, "submitted", provider="higgsfield", provider_job_id=job_id)
             status = "pending"
             completed_at = None
             links = []
-            
+
             # Poll for completion if requested
-            if wait_for_completion:
+            if ctx["wait_for_completion"]:
                 logger.info(f"Polling for job completion: job_id={job_id}")
                 final_status = client.poll_job(job_id)
                 status = final_status.get("status", "pending").lower()
-                
+
                 if status == "completed":
                     completed_at = generate_timestamp()
-                    video_url = final_status.get("result_url") or final_status.get("url")
-                    if video_url:
-                        asset_link = AssetLink(
-                            url=video_url,
-                            asset_id=asset_id,
-                            asset_type="video",
-                            provider="higgsfield",
-                            created_at=completed_at
-                        )
-                        links = [asset_link.model_dump() if hasattr(asset_link, 'model_dump') else asset_link.dict()]
+                    links = _completed_links(ctx, final_status, completed_at)
+                    if links:
+                        report_progress(payload, "downloading", provider_job_id=job_id)
                         # Download and store locally
-                        links = process_asset_links(links, project_name, "video", completed_at)
+                        links = process_asset_links(links, ctx["project_name"], "video", completed_at)
                 elif status in ["failed", "error"]:
-                    error_msg = final_status.get("error", {}).get("message", "Job failed")
-                    return {
-                        "job_id": job_id,
-                        "status": "failed",
-                        "provider": "higgsfield",
-                        "model": model or "default",
-                        "params": {
-                            "prompt": prompt,
-                            "image_url": image_url,
-                            **optional_params
-                        },
-                        "created_at": created_at,
-                        "completed_at": generate_timestamp(),
-                        "links": [],
-                        "error": {
-                            "code": "JOB_FAILED",
-                            "message": error_msg,
-                            "retryable": True
-                        }
-                    }
-            
-            return {
-                "job_id": job_id,
-                "status": status,
-                "provider": "higgsfield",
-                "model": model or "default",
-                "params": {
-                    "prompt": prompt,
-                    "image_url": image_url,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-        else:
-            # Synchronous response with video
-            video_url = response.get("video_url") or response.get("url") or response.get("result_url")
-            if not video_url and "video" in response:
-                video_url = f"data:video/mp4;base64,{response.get('video', '')[:50]}..."
-            
-            completed_at = generate_timestamp()
-            
-            asset_link = AssetLink(
-                url=video_url or "pending",
-                asset_id=asset_id,
-                asset_type="video",
-                provider="higgsfield",
-                created_at=completed_at
-            )
-            
-            # Process links (download and store if enabled)
-            links = process_asset_links([asset_link], project_name, "video", completed_at)
-            
-            return {
-                "job_id": job_id,
-                "status": "completed",
-                "provider": "higgsfield",
-                "model": model or "default",
-                "params": {
-                    "prompt": prompt,
-                    "image_url": image_url,
-                    **optional_params
-                },
-                "created_at": created_at,
-                "completed_at": completed_at,
-                "links": links,
-                "error": None
-            }
-    
+                    return _failed_result(ctx, job_id, final_status)
+
+            return _result(ctx, job_id, status, completed_at, links)
+
+        # Synchronous response with video
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+
+        # Process links (download and store if enabled)
+        links = process_asset_links([asset_link], ctx["project_name"], "video", completed_at)
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
+    except Exception as e:
+        logger.error(f"Error generating video: {e}", exc_info=True)
+        raise
+
+
+@cached_generation("higgsfield_video")
+async def generate_video_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `generate_video`: provider calls and polling run on the
+    event loop, local download/upload runs in a worker thread.
+    """
+    ctx = _prepare(payload)
+
+    logger.info(
+        f"Generating video (async): job_id={ctx['job_id']}, prompt={ctx['prompt'] is not None}, "
+        f"image_url={ctx['image_url'] is not None}"
+    )
+
+    try:
+        client = get_client()
+        response = resumed_submission(payload) or await client.generate_video_async(
+            prompt=ctx["prompt"],
+            image_url=ctx["image_url"],
+            model=ctx["model"],
+            **ctx["optional_params"]
+        )
+
+        if "job_id" in response:
+            job_id = response["job_id"]
+            report_progress(payload, "submitted", provider="higgsfield", provider_job_id=job_id)
+            status = "pending"
+            completed_at = None
+            links = []
+
+            if ctx["wait_for_completion"]:
+                logger.info(f"Polling for job completion: job_id={job_id}")
+                final_status = await client.poll_job_async(job_id)
+                status = final_status.get("status", "pending").lower()
+
+                if status == "completed":
+                    completed_at = generate_timestamp()
+                    links = _completed_links(ctx, final_status, completed_at)
+                    if links:
+                        report_progress(payload, "downloading", provider_job_id=job_id)
+                        links = await asyncio.to_thread(
+                            process_asset_links, links, ctx["project_name"], "video", completed_at
+                        )
+                elif status in ["failed", "error"]:
+                    return _failed_result(ctx, job_id, final_status)
+
+            return _result(ctx, job_id, status, completed_at, links)
+
+        completed_at = generate_timestamp()
+        asset_link = _direct_asset_link(ctx, response, completed_at)
+        links = await asyncio.to_thread(
+            process_asset_links, [asset_link], ctx["project_name"], "video", completed_at
+        )
+        return _result(ctx, ctx["job_id"], "completed", completed_at, links)
+
     except Exception as e:
         logger.error(f"Error generating video: {e}", exc_info=True)
         raise
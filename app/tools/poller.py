@@ -0,0 +1,354 @@
+"""
+Centralized job poller shared by all providers.
+
+Instead of one sleeping loop per pending job, every waiter registers its
+job with the poller. A single background thread dispatches the status
+requests of all due jobs and each result is handled as soon as it arrives,
+so one slow status call never holds back the others. Sync status functions
+run on a small thread pool; async ones (from `wait_async`) run on the
+waiter's event loop. Each job's interval starts short and backs off per
+provider settings, so quick images resolve fast and long video jobs do not
+hammer the API.
+"""
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from app.config.settings import settings
+from app.utils.logging import logger
+
+
+StatusFn = Callable[[], Dict[str, Any]]
+AsyncStatusFn = Callable[[], Awaitable[Dict[str, Any]]]
+JobKey = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class PollSchedule:
+    """Adaptive polling interval for one provider."""
+    initial_interval: float
+    max_interval: float
+    backoff_factor: float
+
+    def next_interval(self, current: float) -> float:
+        return min(self.max_interval, current * self.backoff_factor)
+
+
+def get_schedule(provider: str) -> PollSchedule:
+    """
+    Polling schedule for a provider, from settings:
+    `<PROVIDER>_POLL_INITIAL_INTERVAL`, `<PROVIDER>_POLL_MAX_INTERVAL`, `POLL_BACKOFF_FACTOR`.
+    """
+    prefix = provider.upper()
+    return PollSchedule(
+        initial_interval=float(getattr(settings, f"{prefix}_POLL_INITIAL_INTERVAL", 1.0)),
+        max_interval=float(getattr(settings, f"{prefix}_POLL_MAX_INTERVAL", 15.0)),
+        backoff_factor=max(1.0, float(settings.POLL_BACKOFF_FACTOR))
+    )
+
+
+@dataclass
+class _PolledJob:
+    key: JobKey
+    status_fn: Union[StatusFn, AsyncStatusFn]
+    terminal_statuses: frozenset
+    interval: float
+    schedule: PollSchedule
+    next_poll_at: float
+    waiters: List[Future] = field(default_factory=list)
+    last_status: Optional[Dict[str, Any]] = None
+    polls: int = 0
+    # Event loop running an async status_fn (None: status_fn is sync)
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class JobPoller:
+    """Polls every pending provider job from one background thread."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Concurrent sync status requests (default: settings.POLLER_MAX_WORKERS)
+        """
+        self.max_workers = max_workers or settings.POLLER_MAX_WORKERS
+        self._jobs: Dict[JobKey, _PolledJob] = {}
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopped = False
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def watch(
+        self,
+        provider: str,
+        job_id: str,
+        status_fn: Union[StatusFn, AsyncStatusFn],
+        terminal_statuses: Iterable[str],
+        kind: str = "jobs",
+        poll_interval: Optional[float] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Future:
+        """
+        Start tracking a job and return a future resolved with its final status.
+
+        Watching a job that is already tracked shares the same polls.
+
+        Args:
+            provider: Provider name (selects the backoff schedule)
+            job_id: Provider job/request ID
+            status_fn: Callable returning the current status dict (a coroutine
+                function when `loop` is given)
+            terminal_statuses: Lowercase statuses that end polling
+            kind: Status endpoint family ("jobs", "requests", ...), part of the job key
+            poll_interval: Fixed interval in seconds (disables backoff)
+            loop: Event loop on which the async status_fn is run
+
+        Returns:
+            Future resolved with the terminal status dict (or the error raised by status_fn)
+        """
+        schedule = get_schedule(provider)
+        if poll_interval:
+            schedule = PollSchedule(poll_interval, poll_interval, 1.0)
+        key = (provider, kind, job_id)
+        future: Future = Future()
+        with self._lock:
+            self._ensure_running()
+            job = self._jobs.get(key)
+            if job is None:
+                job = _PolledJob(
+                    key=key,
+                    status_fn=status_fn,
+                    terminal_statuses=frozenset(terminal_statuses),
+                    interval=schedule.initial_interval,
+                    schedule=schedule,
+                    # First poll right away: the job may already be done
+                    next_poll_at=time.monotonic(),
+                    loop=loop
+                )
+                self._jobs[key] = job
+                logger.debug(f"Poller tracking {provider}/{kind}/{job_id}")
+            elif job.loop is not None and job.loop.is_closed():
+                # The loop that ran the status calls is gone: poll with the newcomer's
+                job.status_fn, job.loop = status_fn, loop
+            job.waiters.append(future)
+            self._lock.notify()
+        return future
+
+    def wait(
+        self,
+        provider: str,
+        job_id: str,
+        status_fn: StatusFn,
+        terminal_statuses: Iterable[str],
+        kind: str = "jobs",
+        max_wait: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Block until the job reaches a terminal status.
+
+        On timeout the last known status is returned (same contract as the
+        former per-job polling loops).
+        """
+        future = self.watch(provider, job_id, status_fn, terminal_statuses, kind, poll_interval)
+        try:
+            return future.result(timeout=max_wait)
+        except FutureTimeoutError:
+            logger.warning(f"Job {job_id} polling timeout after {max_wait}s")
+            return self._detach(future, (provider, kind, job_id), status_fn)
+
+    async def wait_async(
+        self,
+        provider: str,
+        job_id: str,
+        status_fn: Union[StatusFn, AsyncStatusFn],
+        terminal_statuses: Iterable[str],
+        kind: str = "jobs",
+        max_wait: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of `wait`: awaits the future without holding a thread.
+
+        `status_fn` may be a coroutine function; its calls then run on the
+        current event loop instead of the poller's thread pool.
+        """
+        loop = asyncio.get_running_loop() if inspect.iscoroutinefunction(status_fn) else None
+        future = self.watch(provider, job_id, status_fn, terminal_statuses, kind, poll_interval, loop)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), max_wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"Job {job_id} polling timeout after {max_wait}s")
+            return self._detach(future, (provider, kind, job_id), None)
+        except asyncio.CancelledError:
+            self._detach(future, (provider, kind, job_id), None)
+            raise
+
+    def pending(self) -> Dict[str, int]:
+        """Number of tracked jobs per provider."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for provider, _, _ in self._jobs:
+                counts[provider] = counts.get(provider, 0) + 1
+            return counts
+
+    def stop(self) -> None:
+        """Stop the polling thread; pending waiters are cancelled."""
+        with self._lock:
+            self._stopped = True
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._lock.notify()
+        for job in jobs:
+            for waiter in job.waiters:
+                waiter.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._stopped = False
+
+    # ---------------------------------------------
+    # Polling loop
+    # ---------------------------------------------
+
+    def _ensure_running(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="job-poller"
+            )
+            self._thread = threading.Thread(target=self._loop, name="job-poller", daemon=True)
+            self._thread.start()
+
+    def _detach(
+        self,
+        future: Future,
+        key: JobKey,
+        status_fn: Optional[StatusFn]
+    ) -> Dict[str, Any]:
+        """Remove a timed-out waiter; return the last known status."""
+        with self._lock:
+            job = self._jobs.get(key)
+            last_status = job.last_status if job else None
+            if job and future in job.waiters:
+                job.waiters.remove(future)
+                if not job.waiters:
+                    self._jobs.pop(key, None)
+        if future.done() and not future.cancelled() and future.exception() is None:
+            return future.result()
+        if last_status is None and status_fn is not None:
+            return status_fn()
+        return last_status or {}
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = [job for job in self._jobs.values() if job.next_poll_at <= now]
+                if not due:
+                    # In-flight jobs (next_poll_at = inf) are rescheduled by their result handler
+                    next_at = min(
+                        (job.next_poll_at for job in self._jobs.values() if job.next_poll_at != float("inf")),
+                        default=None
+                    )
+                    self._lock.wait(timeout=None if next_at is None else max(0.0, next_at - now))
+                    continue
+                for job in due:
+                    # Not due again until this poll has been handled
+                    job.next_poll_at = float("inf")
+                executor = self._executor
+
+            for job in due:
+                self._dispatch(job, executor)
+
+    def _dispatch(self, job: _PolledJob, executor: ThreadPoolExecutor) -> None:
+        """Start one status request; its result is handled as soon as it completes."""
+        try:
+            if job.loop is not None:
+                coro = job.status_fn()
+                try:
+                    future = asyncio.run_coroutine_threadsafe(coro, job.loop)
+                except RuntimeError:
+                    coro.close()  # Loop closed: never awaited
+                    raise
+            else:
+                future = executor.submit(job.status_fn)
+        except Exception as e:
+            with self._lock:
+                self._handle_result(job, None, e)
+            return
+        future.add_done_callback(lambda done, job=job: self._on_polled(job, done))
+
+    def _on_polled(self, job: _PolledJob, future: Future) -> None:
+        if future.cancelled():
+            # The status call's event loop shut down: poll again on the next interval
+            status, error = job.last_status, None
+        else:
+            status, error = None, future.exception()
+            if error is None:
+                status = future.result()
+        with self._lock:
+            self._handle_result(job, status, error)
+            self._lock.notify()
+
+    def _handle_result(
+        self,
+        job: _PolledJob,
+        status: Optional[Dict[str, Any]],
+        error: Optional[BaseException]
+    ) -> None:
+        """Resolve waiters or reschedule; caller holds the lock."""
+        job.polls += 1
+        if self._jobs.get(job.key) is not job:
+            return  # All waiters left while the poll was in flight
+        waiters = [waiter for waiter in job.waiters if not waiter.done()]
+
+        if error is not None:
+            self._jobs.pop(job.key, None)
+            for waiter in waiters:
+                waiter.set_exception(error)
+            return
+
+        job.last_status = status
+        job_status = str((status or {}).get("status", "")).lower()
+        if job_status in job.terminal_statuses:
+            self._jobs.pop(job.key, None)
+            provider, kind, job_id = job.key
+            logger.info(
+                f"Poller resolved {provider}/{kind}/{job_id}: status={job_status}, polls={job.polls}"
+            )
+            for waiter in waiters:
+                waiter.set_result(status)
+            return
+
+        job.next_poll_at = time.monotonic() + job.interval
+        job.interval = job.schedule.next_interval(job.interval)
+
+
+# Global poller instance
+_poller: Optional[JobPoller] = None
+
+
+def get_poller() -> JobPoller:
+    """Get or create the job poller instance."""
+    global _poller
+    if _poller is None:
+        _poller = JobPoller()
+    return _poller
+
+
+def stop_poller() -> None:
+    """Stop the poller thread, if the poller was created."""
+    if _poller is not None:
+        _poller.stop()
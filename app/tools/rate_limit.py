@@ -0,0 +1,322 @@
+"""
+Per-provider rate limiting and concurrency governor.
+
+Every Higgsfield/ElevenLabs HTTP request goes through the provider's
+`ProviderLimiter`:
+
+- a token bucket per (provider, model) smooths bursts of submits
+  (status polls share the provider-wide bucket);
+- a concurrency gate caps in-flight requests per provider, shared by sync
+  and async callers;
+- a 429 `Retry-After` pauses the whole provider, so queued requests wait
+  instead of turning into a 429 storm.
+
+`retry_delay` gives the client retry loops a backoff that honors
+`Retry-After` / rate-limit reset headers, like `LLMClient._retry_delay_seconds`.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+import httpx
+from app.config.settings import settings
+from app.utils.logging import logger
+
+
+# Provider statuses worth retrying (after a delay)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+
+def _parse_reset_seconds(value: str) -> float:
+    """Parse "12", "1.5", "250ms" or "1m30s" style reset headers."""
+    text = (value or "").strip().lower()
+    if not text:
+        return 0.0
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    total = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", text):
+        total += float(amount) * {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}[unit]
+    return total
+
+
+def _retry_after_seconds(value: str) -> Optional[float]:
+    """`Retry-After` as delay-seconds or HTTP date."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Delay before retry number `attempt` (1-based).
+
+    Honors `Retry-After` and `x-ratelimit-reset*` headers when the provider
+    sends them; otherwise exponential backoff with jitter.
+    """
+    max_delay = settings.PROVIDER_RETRY_MAX_DELAY
+    if response is not None:
+        retry_after = _retry_after_seconds(response.headers.get("Retry-After", ""))
+        if retry_after is not None:
+            return min(max_delay, retry_after)
+        for header in ("x-ratelimit-reset-requests", "x-ratelimit-reset", "ratelimit-reset"):
+            reset = _parse_reset_seconds(response.headers.get(header, ""))
+            if reset > 0:
+                return min(max_delay, reset + random.uniform(0.05, 0.5))
+    base = min(max_delay, settings.PROVIDER_RETRY_BASE_DELAY * 2 ** max(0, attempt - 1))
+    return min(max_delay, base + random.uniform(0, 0.5 * base))
+
+
+def rate_key(method: str, endpoint: str, json_payload: Any = None) -> Optional[str]:
+    """
+    Bucket key of a request: the model for submits, None (provider-wide) for polls.
+    """
+    if method.upper() == "GET":
+        return None
+    if isinstance(json_payload, dict):
+        model = json_payload.get("model") or json_payload.get("model_id")
+        if model:
+            return str(model)
+    return endpoint.strip("/").split("/", 1)[0] or None
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and sleep the returned delay."""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Tokens added per second (<= 0 disables the bucket)
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; return how long to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ConcurrencyGate:
+    """
+    Counting semaphore usable from threads and event loops alike.
+
+    Released slots are handed to waiters in FIFO order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: Deque[Union[threading.Event, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # The releasing thread hands its slot over (active stays the same)
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        future = waiter[1]
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            # Otherwise _hand_over sees the cancelled future and releases
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if loop.is_closed():
+                    continue
+                loop.call_soon_threadsafe(self._hand_over, future)
+                return
+            self.active -= 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Waiter was cancelled meanwhile: pass the slot on
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class ProviderLimiter:
+    """Token buckets (per model) and in-flight cap for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ):
+        """
+        Args:
+            provider: Provider name
+            rate: Requests per second per bucket (default: `<PROVIDER>_RATE_LIMIT`)
+            burst: Bucket capacity (default: `<PROVIDER>_RATE_BURST`)
+            max_in_flight: Concurrent requests (default: `<PROVIDER>_MAX_IN_FLIGHT`)
+        """
+        prefix = provider.upper()
+        self.provider = provider
+        self.rate = rate if rate is not None else float(getattr(settings, f"{prefix}_RATE_LIMIT", 0))
+        self.burst = burst or int(getattr(settings, f"{prefix}_RATE_BURST", 1))
+        self.gate = ConcurrencyGate(
+            max_in_flight or int(getattr(settings, f"{prefix}_MAX_IN_FLIGHT", settings.BATCH_MAX_CONCURRENCY))
+        )
+        self._buckets: Dict[Optional[str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._waiting_tokens = 0
+        self.throttled = 0
+
+    def bucket(self, key: Optional[str]) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _reserve(self, key: Optional[str]) -> float:
+        delay = self.bucket(key).reserve()
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+            if delay > 0:
+                self.throttled += 1
+        return delay
+
+    def _track_waiting(self, delta: int) -> None:
+        with self._lock:
+            self._waiting_tokens += delta
+
+    @contextmanager
+    def slot(self, key: Optional[str] = None):
+        """Wait for a token and an in-flight slot (blocking)."""
+        delay = self._reserve(key)
+        if delay > 0:
+            self._track_waiting(1)
+            try:
+                time.sleep(delay)
+            finally:
+                self._track_waiting(-1)
+        self.gate.acquire()
+        try:
+            yield
+        finally:
+            self.gate.release()
+
+    @asynccontextmanager
+    async def slot_async(self, key: Optional[str] = None):
+        """Async counterpart of `slot` (never blocks the event loop)."""
+        delay = self._reserve(key)
+        if delay > 0:
+            self._track_waiting(1)
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._track_waiting(-1)
+        await self.gate.acquire_async()
+        try:
+            yield
+        finally:
+            self.gate.release()
+
+    def pause(self, seconds: float) -> None:
+        """Back off every bucket of this provider (after a 429)."""
+        if seconds <= 0:
+            return
+        logger.warning(f"Rate limited by {self.provider}: pausing requests for {seconds:.1f}s")
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth and limits."""
+        with self._lock:
+            waiting_tokens = self._waiting_tokens
+            throttled = self.throttled
+        return {
+            "in_flight": self.gate.active,
+            "max_in_flight": self.gate.limit,
+            "queued": waiting_tokens + self.gate.queued,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "throttled_total": throttled
+        }
+
+
+# Global limiter instances
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Get or create the limiter of a provider."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = ProviderLimiter(provider)
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Queue depth and limits of every provider limiter created so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {provider: limiter.stats() for provider, limiter in limiters.items()}
@@ -1,7 +1,15 @@
 """
 Action registry for dispatching MCP actions to handlers.
+
+Every action has a sync handler. Actions that do long-running provider I/O can
+also register an async handler with `register_async_action`;
+`dispatch_action_async` prefers it and falls back to running the sync handler
+in a worker thread. Actions can register a payload validator with
+`register_validator`, so a batch is checked item by item before any item runs.
 """
-from typing import Dict, Callable, Any, Optional
+import asyncio
+import importlib
+from typing import Dict, Callable, Any, Awaitable, Optional
 from app.utils.errors import ActionNotFoundError, ValidationError
 from app.utils.logging import logger
 
@@ -12,23 +20,36 @@ def _import_handlers():
     from app.tools.higgsfield import image, video
     from app.tools.elevenlabs.client import get_client as get_elevenlabs_client
     from app.tools.higgsfield.client import get_client as get_higgsfield_client
-    from app.pipelines.image_to_video import image_to_video
-    from app.pipelines.audio_stack import audio_stack
+    from app.pipelines.image_to_video import image_to_video, image_to_video_async
+    from app.pipelines.custom import run_pipeline, run_pipeline_async
+    from app.pipelines.resume import resume_pipeline, resume_pipeline_async
+    from app.pipelines.audio_stack import audio_stack, audio_stack_async
     return {
         "elevenlabs": {
             "voice": voice.generate_voice,
             "music": music.generate_music,
             "soundfx": soundfx.generate_soundfx,
+            "voice_async": voice.generate_voice_async,
+            "music_async": music.generate_music_async,
+            "soundfx_async": soundfx.generate_soundfx_async,
             "client": get_elevenlabs_client
         },
         "higgsfield": {
             "image": image.generate_image,
             "video": video.generate_video,
+            "image_async": image.generate_image_async,
+            "video_async": video.generate_video_async,
             "client": get_higgsfield_client
         },
         "pipelines": {
             "image_to_video": image_to_video,
-            "audio_stack": audio_stack
+            "image_to_video_async": image_to_video_async,
+            "run": run_pipeline,
+            "run_async": run_pipeline_async,
+            "resume": resume_pipeline,
+            "resume_async": resume_pipeline_async,
+            "audio_stack": audio_stack,
+            "audio_stack_async": audio_stack_async
         }
     }
 
@@ -36,6 +57,19 @@ def _import_handlers():
 # Registry mapping action names to handler functions
 _action_registry: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
 
+# Optional async handlers, keyed by the same action names
+_async_action_registry: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {}
+
+# Payload validators (the handler's checks, without running it), by action name
+_validator_registry: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+# Upstream provider for actions whose name does not start with it
+_ACTION_PROVIDERS: Dict[str, str] = {
+    "pipeline_image_to_video": "higgsfield",
+    "pipeline_audio_stack": "elevenlabs",
+}
+_PROVIDERS = ("higgsfield", "elevenlabs")
+
 
 def register_action(action: str) -> Callable:
     """
@@ -55,6 +89,65 @@ def register_action(action: str) -> Callable:
     return decorator
 
 
+def register_async_action(action: str) -> Callable:
+    """
+    Decorator to register an async handler for an action.
+    
+    The sync handler registered with `register_action` stays the reference
+    implementation (used by `dispatch_action`); the async one is used by
+    `dispatch_action_async`.
+    
+    Usage:
+        @register_async_action("higgsfield_video")
+        async def handle_higgsfield_video_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+            ...
+    """
+    def decorator(func: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Callable:
+        if action in _async_action_registry:
+            logger.warning(f"Async action '{action}' is being overwritten")
+        _async_action_registry[action] = func
+        logger.debug(f"Registered async action: {action}")
+        return func
+    return decorator
+
+
+def register_validator(action: str) -> Callable:
+    """
+    Decorator to register a payload validator for an action.
+    
+    The validator raises `ValidationError` for a payload the handler would
+    reject, and must have no side effects (it runs before dispatch).
+    """
+    def decorator(func: Callable[[Dict[str, Any]], Any]) -> Callable:
+        _validator_registry[action] = func
+        return func
+    return decorator
+
+
+def validate_action_payload(action: str, payload: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Check a payload the way the action's handler would, without running it.
+    
+    Args:
+        action: Action name
+        payload: Action payload (not modified)
+    
+    Raises:
+        ActionNotFoundError: If action is not registered
+        ValidationError: If the payload is invalid
+    """
+    if action not in _action_registry and action not in _async_action_registry:
+        raise ActionNotFoundError(action)
+    validator = _validator_registry.get(action)
+    if validator is None:
+        return
+    try:
+        validator(dict(payload or {}))
+    except (TypeError, ValueError) as e:
+        # e.g. int("abc") on a numeric field
+        raise ValidationError(f"Invalid payload: {e}")
+
+
 def get_action_handler(action: str) -> Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]:
     """
     Get handler for an action.
@@ -68,6 +161,21 @@ def get_action_handler(action: str) -> Optional[Callable[[Dict[str, Any]], Dict[
     return _action_registry.get(action)
 
 
+def get_async_action_handler(
+    action: str
+) -> Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]]:
+    """
+    Get the async handler for an action.
+    
+    Args:
+        action: Action name
+    
+    Returns:
+        Async handler function or None if the action has no async handler
+    """
+    return _async_action_registry.get(action)
+
+
 def list_actions() -> list[str]:
     """
     List all registered actions.
@@ -75,7 +183,23 @@ def list_actions() -> list[str]:
     Returns:
         List of action names
     """
-    return sorted(_action_registry.keys())
+    return sorted(set(_action_registry) | set(_async_action_registry))
+
+
+def get_action_provider(action: str) -> str:
+    """
+    Get the upstream provider an action talks to.
+    
+    Args:
+        action: Action name
+    
+    Returns:
+        "higgsfield", "elevenlabs", or "local" for actions without provider I/O
+    """
+    if action in _ACTION_PROVIDERS:
+        return _ACTION_PROVIDERS[action]
+    prefix = action.split("_", 1)[0]
+    return prefix if prefix in _PROVIDERS else "local"
 
 
 def dispatch_action(action: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -100,6 +224,39 @@ def dispatch_action(action: str, payload: Optional[Dict[str, Any]] = None) -> Di
     return handler(payload or {})
 
 
+async def dispatch_action_async(
+    action: str,
+    payload: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Dispatch an action from an event loop.
+    
+    Uses the async handler when one is registered; otherwise runs the sync
+    handler in a worker thread so the loop is never blocked.
+    
+    Args:
+        action: Action name
+        payload: Action payload
+    
+    Returns:
+        Response data from handler
+    
+    Raises:
+        ActionNotFoundError: If action is not registered
+    """
+    async_handler = get_async_action_handler(action)
+    if async_handler:
+        logger.info(f"Dispatching action (async): {action}")
+        return await async_handler(payload or {})
+    
+    handler = get_action_handler(action)
+    if not handler:
+        raise ActionNotFoundError(action)
+    
+    logger.info(f"Dispatching action (thread): {action}")
+    return await asyncio.to_thread(handler, payload or {})
+
+
 # Register built-in actions
 @register_action("ping")
 def handle_ping(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -115,7 +272,7 @@ def handle_list_tools(payload: Dict[str, Any]) -> Dict[str, Any]:
     """Handle list_tools action."""
     return {
         "actions": list_actions(),
-        "count": len(_action_registry)
+        "count": len(list_actions())
     }
 
 
@@ -156,30 +313,118 @@ def handle_higgsfield_video(payload: Dict[str, Any]) -> Dict[str, Any]:
     return handlers["higgsfield"]["video"](payload)
 
 
+# Async variants of the provider actions (used by dispatch_action_async)
+@register_async_action("elevenlabs_voice")
+async def handle_elevenlabs_voice_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle ElevenLabs voice generation without blocking the event loop."""
+    handlers = _import_handlers()
+    return await handlers["elevenlabs"]["voice_async"](payload)
+
+
+@register_async_action("elevenlabs_music")
+async def handle_elevenlabs_music_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle ElevenLabs music generation without blocking the event loop."""
+    handlers = _import_handlers()
+    return await handlers["elevenlabs"]["music_async"](payload)
+
+
+@register_async_action("elevenlabs_soundfx")
+async def handle_elevenlabs_soundfx_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle ElevenLabs sound effect generation without blocking the event loop."""
+    handlers = _import_handlers()
+    return await handlers["elevenlabs"]["soundfx_async"](payload)
+
+
+@register_async_action("higgsfield_image")
+async def handle_higgsfield_image_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle Higgsfield image generation without blocking the event loop."""
+    handlers = _import_handlers()
+    return await handlers["higgsfield"]["image_async"](payload)
+
+
+@register_async_action("higgsfield_video")
+async def handle_higgsfield_video_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle Higgsfield video generation without blocking the event loop."""
+    handlers = _import_handlers()
+    return await handlers["higgsfield"]["video_async"](payload)
+
+
 # Register job status check actions
-@register_action("check_job_status")
-def handle_check_job_status(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Check status of a job from any provider."""
+@register_validator("check_job_status")
+def _job_status_target(payload: Dict[str, Any]) -> tuple[str, str]:
     if not payload.get("job_id"):
         raise ValidationError("job_id is required")
     if not payload.get("provider"):
         raise ValidationError("provider is required")
-    
-    job_id = payload["job_id"]
     provider = payload["provider"].lower()
-    
-    handlers = _import_handlers()
-    
-    if provider == "elevenlabs":
-        client = handlers["elevenlabs"]["client"]()
-        status = client.get_job_status(job_id)
-    elif provider == "higgsfield":
-        client = handlers["higgsfield"]["client"]()
-        status = client.get_job_status(job_id)
-    else:
+    if provider not in {"elevenlabs", "higgsfield", "engine"}:
         raise ValidationError(f"Unknown provider: {provider}")
-    
-    return status
+    return provider, payload["job_id"]
+
+
+async def _engine_job_status(job_id: str) -> Dict[str, Any]:
+    from app.jobs.engine import get_job_engine
+    from app.utils.upload_queue import apply_uploaded_urls
+
+    job = await get_job_engine().get(job_id)
+    if not job:
+        raise ValidationError(f"Unknown background job: {job_id}")
+    apply_uploaded_urls(job.get("result"))
+    return job
+
+
+@register_action("check_job_status")
+def handle_check_job_status(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Check status of a job from any provider (or a background engine job)."""
+    provider, job_id = _job_status_target(payload)
+    if provider == "engine":
+        from app.jobs.engine import get_job_engine
+        # Engine state belongs to the event loop: read it there
+        return get_job_engine().run_from_thread(_engine_job_status(job_id))
+    handlers = _import_handlers()
+    client = handlers[provider]["client"]()
+    return client.get_job_status(job_id)
+
+
+@register_async_action("check_job_status")
+async def handle_check_job_status_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Check status of a job from any provider without blocking the event loop."""
+    provider, job_id = _job_status_target(payload)
+    if provider == "engine":
+        return await _engine_job_status(job_id)
+    handlers = _import_handlers()
+    client = handlers[provider]["client"]()
+    return await client.get_job_status_async(job_id)
+
+
+@register_validator("storage_upload_status")
+def _upload_id(payload: Dict[str, Any]) -> str:
+    if not payload.get("upload_id"):
+        raise ValidationError("upload_id is required")
+    return payload["upload_id"]
+
+
+@register_action("storage_upload_status")
+def handle_storage_upload_status(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Check a background SFTP upload (FTP URL once uploaded)."""
+    from app.utils.upload_queue import get_upload_queue
+
+    upload_id = _upload_id(payload)
+    entry = get_upload_queue().get(upload_id)
+    if not entry:
+        raise ValidationError(f"Unknown upload: {upload_id}")
+    return entry
+
+
+@register_action("storage_gc")
+def handle_storage_gc(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove media blobs no file references any more."""
+    from app.utils.blob_store import get_blob_store
+
+    return get_blob_store().gc(
+        grace_seconds=payload.get("grace_seconds"),
+        dry_run=bool(payload.get("dry_run", False))
+    )
 
 
 # Register pipeline actions
@@ -195,3 +440,80 @@ def handle_pipeline_audio_stack(payload: Dict[str, Any]) -> Dict[str, Any]:
     """Handle audio_stack pipeline."""
     handlers = _import_handlers()
     return handlers["pipelines"]["audio_stack"](payload)
+
+
+@register_async_action("pipeline_audio_stack")
+async def handle_pipeline_audio_stack_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle audio_stack pipeline (parallel mode runs on the event loop)."""
+    handlers = _import_handlers()
+    return await handlers["pipelines"]["audio_stack_async"](payload)
+
+
+@register_async_action("pipeline_image_to_video")
+async def handle_pipeline_image_to_video_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle image_to_video pipeline on the event loop."""
+    handlers = _import_handlers()
+    return await handlers["pipelines"]["image_to_video_async"](payload)
+
+
+@register_action("pipeline_run")
+def handle_pipeline_run(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle a declarative pipeline (DAG of actions)."""
+    handlers = _import_handlers()
+    return handlers["pipelines"]["run"](payload)
+
+
+@register_async_action("pipeline_run")
+async def handle_pipeline_run_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle a declarative pipeline on the event loop."""
+    handlers = _import_handlers()
+    return await handlers["pipelines"]["run_async"](payload)
+
+
+@register_action("pipeline_resume")
+def handle_pipeline_resume(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Resume an interrupted pipeline from its checkpoint."""
+    handlers = _import_handlers()
+    return handlers["pipelines"]["resume"](payload)
+
+
+@register_async_action("pipeline_resume")
+async def handle_pipeline_resume_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Resume an interrupted pipeline on the event loop."""
+    handlers = _import_handlers()
+    return await handlers["pipelines"]["resume_async"](payload)
+
+
+# Register payload validators of the handlers that check in `_prepare`
+_PREPARE_MODULES = {
+    "elevenlabs_voice": "app.tools.elevenlabs.voice",
+    "elevenlabs_music": "app.tools.elevenlabs.music",
+    "elevenlabs_soundfx": "app.tools.elevenlabs.soundfx",
+    "higgsfield_image": "app.tools.higgsfield.image",
+    "higgsfield_video": "app.tools.higgsfield.video",
+    "pipeline_image_to_video": "app.pipelines.image_to_video",
+    "pipeline_audio_stack": "app.pipelines.audio_stack",
+    "pipeline_run": "app.pipelines.custom",
+}
+
+
+def _prepare_validator(action: str, module_name: str) -> Callable[[Dict[str, Any]], None]:
+    def validate(payload: Dict[str, Any]) -> None:
+        from app.tools.result_cache import _cache_mode
+
+        if not action.startswith("pipeline_"):
+            # Generation handlers are wrapped by the result cache
+            _cache_mode(payload)
+        importlib.import_module(module_name)._prepare(payload)
+    return validate
+
+
+for _action, _module_name in _PREPARE_MODULES.items():
+    register_validator(_action)(_prepare_validator(_action, _module_name))
+
+
+@register_validator("pipeline_resume")
+def _validate_pipeline_resume(payload: Dict[str, Any]) -> None:
+    from app.pipelines.resume import _load
+
+    _load(payload)
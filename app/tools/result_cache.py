@@ -0,0 +1,334 @@
+"""
+Content-addressed cache of generation results.
+
+Identical generation requests (same action, model, prompt, params, seed)
+for the same project are answered from the result of the first completed
+one, whose assets were already stored by `process_asset_links` in that
+project, instead of being sent (and paid for) again. Actions taking a seed
+are only cached when the request sets one: without it, sending the same
+prompt again asks for a new variation. The key is the sha256 of the
+canonical JSON of the normalized request; entries live under
+`data/_system/result_cache` and are evicted by age, by count and by the
+total size of their linked assets (least recently used first).
+
+Per request, `cache` selects the behaviour:
+    - "use" (default): return a cached result if any, store new results
+    - "refresh": always call the provider, replace the cached result
+    - "bypass": call the provider, leave the cache untouched
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from app.config.settings import settings
+from app.utils.errors import ValidationError
+from app.utils.logging import logger
+from app.utils.media_storage import get_project_name
+from app.utils.project_storage import get_data_root
+from app.utils.storage import get_storage_path
+from app.utils.upload_queue import apply_uploaded_urls
+
+
+CACHE_MODES = {"use", "refresh", "bypass"}
+
+# Payload keys that do not change the generated asset (the project is
+# keyed separately, once resolved from the payload or the trace)
+IGNORED_KEYS = {"wait_for_completion", "project", "project_name", "cache"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {
+            str(key): _normalize(item)
+            for key, item in value.items()
+            if item is not None
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def cache_key(action: str, payload: Dict[str, Any]) -> str:
+    """
+    Canonical hash of a generation request.
+
+    Runtime keys (`_trace`, ...), delivery options (wait_for_completion,
+    cache) and None values are ignored; whitespace in strings is collapsed.
+    The resolved project is part of the key: cached links point into the
+    Media directory of the project that generated them.
+    """
+    project = get_project_name(payload, payload.get("_trace"))
+    request = {
+        key: value
+        for key, value in payload.items()
+        if not key.startswith("_") and key not in IGNORED_KEYS
+    }
+    canonical = json.dumps(
+        {"action": action, "project": project, "request": _normalize(request)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _local_asset_path(url: str) -> Optional[Path]:
+    if not isinstance(url, str) or not url.startswith("/assets/"):
+        return None
+    return get_storage_path() / url[len("/assets/"):]
+
+
+class ResultCache:
+    """Generation results by request hash, persisted one file per entry."""
+
+    def __init__(
+        self,
+        store_dir: Optional[Path] = None,
+        max_entries: Optional[int] = None,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            store_dir: Cache directory (default: data/_system/result_cache)
+            max_entries: Entries kept, least recently used evicted first
+                (default: settings.RESULT_CACHE_MAX_ENTRIES)
+            max_age: Entry lifetime in seconds (default: settings.RESULT_CACHE_MAX_AGE)
+            max_bytes: Total size of the local assets linked by entries, least
+                recently used evicted first (default: settings.RESULT_CACHE_MAX_BYTES)
+        """
+        self.store_dir = store_dir or get_data_root() / "_system" / "result_cache"
+        self.max_entries = max_entries if max_entries is not None else settings.RESULT_CACHE_MAX_ENTRIES
+        self.max_age = max_age if max_age is not None else settings.RESULT_CACHE_MAX_AGE
+        self.max_bytes = max_bytes if max_bytes is not None else settings.RESULT_CACHE_MAX_BYTES
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+
+    def _entry_path(self, key: str) -> Path:
+        return self.store_dir / f"{key}.json"
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Index of entry metadata; caller holds the lock."""
+        if self._index is None:
+            self._index = {}
+            if self.store_dir.exists():
+                for path in self.store_dir.glob("*.json"):
+                    try:
+                        entry = json.loads(path.read_text(encoding="utf-8"))
+                        self._index[entry["key"]] = entry
+                    except Exception as e:
+                        logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+                        path.unlink(missing_ok=True)
+        return self._index
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(entry["key"])
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=True, default=str), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _drop(self, key: str) -> None:
+        """Remove an entry; caller holds the lock."""
+        self._load_index().pop(key, None)
+        self._entry_path(key).unlink(missing_ok=True)
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for a key, or None.
+
+        Expired entries and entries whose local asset files are gone are dropped.
+        """
+        with self._lock:
+            entry = self._load_index().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - entry["stored_at"] > self.max_age or not self._assets_exist(entry["result"]):
+                self._drop(key)
+                self.misses += 1
+                return None
+            # LRU bookkeeping stays in memory: a hit never touches the disk
+            entry["last_used_at"] = now
+            self.hits += 1
+            return json.loads(json.dumps(entry["result"]))
+
+    def put(self, key: str, action: str, result: Dict[str, Any]) -> None:
+        """Store a completed result and apply eviction."""
+        now = time.time()
+        entry = {
+            "key": key,
+            "action": action,
+            "result": json.loads(json.dumps(result, default=str)),
+            "size": self._assets_size(result),
+            "stored_at": now,
+            "last_used_at": now
+        }
+        with self._lock:
+            self._write(entry)
+            self._load_index()[key] = entry
+            self._evict(now)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_index()):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "entries": len(index),
+                "bytes": sum(entry.get("size", 0) for entry in index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "max_entries": self.max_entries,
+                "max_age": self.max_age,
+                "max_bytes": self.max_bytes
+            }
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries or max_bytes."""
+        index = self._load_index()
+        for key in [key for key, entry in index.items() if now - entry["stored_at"] > self.max_age]:
+            self._drop(key)
+        total = sum(entry.get("size", 0) for entry in index.values())
+        for entry in sorted(index.values(), key=lambda entry: entry["last_used_at"]):
+            if len(index) <= self.max_entries and total <= self.max_bytes:
+                break
+            total -= entry.get("size", 0)
+            self._drop(entry["key"])
+
+    @staticmethod
+    def _assets_size(result: Dict[str, Any]) -> int:
+        """Bytes of the local assets a result links to (remote links count as 0)."""
+        size = 0
+        for link in result.get("links") or []:
+            path = _local_asset_path((link or {}).get("url"))
+            if path is not None and path.is_file():
+                size += path.stat().st_size
+        return size
+
+    @staticmethod
+    def _assets_exist(result: Dict[str, Any]) -> bool:
+        for link in result.get("links") or []:
+            path = _local_asset_path((link or {}).get("url"))
+            if path is not None and not path.exists():
+                return False
+        return True
+
+
+# Global cache instance
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get or create the result cache instance."""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
+
+def _cache_mode(payload: Dict[str, Any]) -> str:
+    mode = payload.get("cache") or "use"
+    if mode not in CACHE_MODES:
+        raise ValidationError(f"cache must be one of: {', '.join(sorted(CACHE_MODES))}")
+    return mode
+
+
+def _cacheable(result: Any) -> bool:
+    return (
+        isinstance(result, dict)
+        and result.get("status") == "completed"
+        and bool(result.get("links"))
+    )
+
+
+def _lookup(action: str, payload: Dict[str, Any], seeded: bool):
+    """Return (key, cached result) for a request; key is None when caching is off."""
+    mode = _cache_mode(payload)
+    if not settings.RESULT_CACHE_ENABLED or mode == "bypass":
+        return None, None
+    if seeded and payload.get("seed") is None:
+        # No seed: the caller wants a new variation, not the stored one
+        return None, None
+    key = cache_key(action, payload)
+    cached = get_result_cache().get(key) if mode == "use" else None
+    if cached is not None:
+        logger.info(f"Result cache hit for {action}: key={key[:12]}")
+        apply_uploaded_urls(cached)
+        cached["cache"] = "hit"
+    return key, cached
+
+
+def _store(action: str, key: Optional[str], result: Any) -> None:
+    if key is None or not _cacheable(result):
+        return
+    try:
+        get_result_cache().put(key, action, result)
+    except Exception as e:
+        logger.warning(f"Failed to cache {action} result: {e}")
+
+
+def cached_generation(action: str, seeded: bool = True) -> Callable:
+    """
+    Decorate a generation handler (sync or async) with the result cache.
+
+    Args:
+        action: Action name, part of the cache key
+        seeded: The action takes a `seed`; requests without one are not cached
+    """
+    def decorator(handler: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(payload: Dict[str, Any]) -> Dict[str, Any]:
+                # A cold lookup reads the cache directory and stats linked assets
+                key, cached = await asyncio.to_thread(_lookup, action, payload, seeded)
+                if cached is not None:
+                    return cached
+                result = await handler(payload)
+                await asyncio.to_thread(_store, action, key, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(payload: Dict[str, Any]) -> Dict[str, Any]:
+            key, cached = _lookup(action, payload, seeded)
+            if cached is not None:
+                return cached
+            result = handler(payload)
+            _store(action, key, result)
+            return result
+        return wrapper
+
+    return decorator
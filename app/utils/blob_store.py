@@ -0,0 +1,402 @@
+"""
+Content-addressed blob store for media files.
+
+Every stored media file (provider downloads under `Media/`, project uploads
+under `data/<project>/Media`) is adopted into `data/_system/blobs`, keyed
+by its sha256. The store lives outside the media root served by `/assets`.
+The visible file becomes a hardlink to the blob, so identical bytes take
+disk space once whatever their names. An append-only reference log
+(`refs.jsonl`) maps asset ids (or project-relative media paths) to their
+blob: adopting or forgetting a file appends one line, and every process
+replays only the lines it has not seen yet. `gc` compacts the log and
+removes blobs that no file and no reference points to any more.
+
+Views stay writable, and writing one in place also rewrites the blob
+inode. Each reference therefore records the size and mtime of its file:
+`digest_of` only vouches for a file whose stat still matches. A blob is
+re-hashed before a new file is deduplicated against it. A blob whose
+content no longer matches its name is retired (its views keep their
+bytes) and replaced by the file being adopted.
+
+Hardlinks need the visible file and the store on the same filesystem;
+otherwise the file is kept as a copy and only the log records the blob.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.utils.ids import generate_timestamp
+from app.utils.locking import FileLock, get_file_lock
+from app.utils.logging import logger
+from app.utils.project_storage import atomic_write_text, get_data_root
+from app.utils.storage import get_storage_path
+
+
+BLOB_DIR = "blobs"  # Under data/_system
+LEGACY_BLOB_DIR = ".blobs"  # Former location inside the media root
+REFS_FILE = "refs.jsonl"
+REFS_LOCK_FILE = "refs.lock"
+LEGACY_MANIFEST_FILE = "manifest.json"
+
+
+def hash_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class BlobStore:
+    """sha256-addressed blobs with hardlinked views and an append-only reference log."""
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        Args:
+            root: Blob directory (default: data/_system/blobs)
+        """
+        self.root = root or get_blob_root()
+        self._refs: Dict[str, Dict[str, Any]] = {}
+        self._by_path: Dict[str, Dict[str, Any]] = {}
+        self._log_id: Optional[Tuple[int, int]] = None  # (st_dev, st_ino) of the replayed log
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _log_path(self) -> Path:
+        return self.root / REFS_FILE
+
+    def _file_lock(self) -> FileLock:
+        return get_file_lock(self.root / REFS_LOCK_FILE)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        ref = record.get("ref")
+        previous = self._refs.pop(ref, None)
+        if previous is not None:
+            self._by_path.pop(os.path.abspath(previous["path"]), None)
+        if record.get("forget"):
+            return
+        entry = {key: record[key] for key in ("sha256", "path", "size", "mtime_ns", "created_at") if key in record}
+        self._refs[ref] = entry
+        self._by_path[os.path.abspath(entry["path"])] = entry
+
+    def _sync(self) -> None:
+        """
+        Replay records appended since the last call; caller holds the lock.
+
+        Only complete lines are applied, so a record being appended by
+        another worker is picked up on the next call. The log is replayed
+        from scratch after gc replaced it.
+        """
+        path = self._log_path()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if self._import_legacy_manifest():
+                self._sync()
+            return
+        log_id = (stat.st_dev, stat.st_ino)
+        if log_id != self._log_id or stat.st_size < self._offset:
+            self._refs, self._by_path = {}, {}
+            self._log_id, self._offset = log_id, 0
+        if stat.st_size == self._offset:
+            return
+        with open(path, "rb") as handle:
+            handle.seek(self._offset)
+            data = handle.read(stat.st_size - self._offset)
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping unreadable blob ref in {path}: {e}")
+        self._offset += complete
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        """Append reference records to the log; caller holds the lock."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(record, ensure_ascii=True) + "\n" for record in records)
+        with self._file_lock():
+            with open(self._log_path(), "a", encoding="utf-8") as handle:
+                handle.write(data)
+            self._sync()
+
+    def _import_legacy_manifest(self) -> bool:
+        """Convert a `manifest.json` written by older versions into the log."""
+        manifest_path = self.root / LEGACY_MANIFEST_FILE
+        if not manifest_path.exists():
+            return False
+        with self._file_lock():
+            if self._log_path().exists():
+                return True
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"Unreadable blob manifest {manifest_path}, starting empty: {e}")
+                manifest = {}
+            lines = [
+                json.dumps(dict(entry, ref=ref), ensure_ascii=True) + "\n"
+                for ref, entry in manifest.items()
+            ]
+            atomic_write_text(self._log_path(), "".join(lines))
+            manifest_path.unlink(missing_ok=True)
+        return True
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def adopt(self, path: Path, ref: str, digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store a file's content as a blob and make the file a view of it.
+
+        If a blob with the same content exists (checked by re-hashing it),
+        the file is replaced by a hardlink to it (the duplicate bytes are freed).
+
+        Args:
+            path: File to adopt
+            ref: Reference key (asset id or project-relative media path)
+            digest: sha256 of the file, if already known
+
+        Returns:
+            Dict with sha256, size, deduplicated (bool) and linked (bool)
+        """
+        path = Path(path)
+        digest = digest or hash_file(path)
+        blob = self.blob_path(digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        deduplicated = False
+        linked = True
+        try:
+            # First copy of this content: the file itself becomes the blob
+            os.link(path, blob)
+        except FileExistsError:
+            if os.path.samefile(path, blob):
+                pass
+            elif self._intact(blob, digest):
+                deduplicated = True
+                linked = self._relink(blob, path)
+            else:
+                # A view of the blob was written in place: this file takes its place
+                logger.warning(f"Blob {digest[:12]} no longer matches its content, replacing it")
+                self._relink(path, blob)
+        except OSError:
+            # Different filesystem: keep the file, store a copy as the blob
+            linked = False
+            if not blob.exists():
+                tmp_blob = blob.with_name(f".{digest}.{threading.get_ident()}.tmp")
+                shutil.copyfile(path, tmp_blob)
+                os.replace(tmp_blob, blob)
+
+        stat = path.stat()
+        size = stat.st_size
+        with self._lock:
+            self._append([{
+                "ref": ref,
+                "sha256": digest,
+                "path": str(path),
+                "size": size,
+                "mtime_ns": stat.st_mtime_ns,
+                "created_at": generate_timestamp()
+            }])
+        if deduplicated:
+            logger.info(f"Deduplicated {path.name} ({size} bytes) against blob {digest[:12]}")
+        return {"sha256": digest, "size": size, "deduplicated": deduplicated, "linked": linked}
+
+    def link_to(self, digest: str, destination: Path) -> bool:
+        """
+        Materialize a blob at `destination` (hardlink, copy across filesystems).
+
+        Returns:
+            False if there is no such blob (or its content no longer matches)
+        """
+        blob = self.blob_path(digest)
+        if not blob.exists() or not self._intact(blob, digest):
+            return False
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        self._relink(blob, Path(destination))
+        return True
+
+    def lookup(self, ref: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            entry = self._refs.get(ref)
+            return dict(entry) if entry else None
+
+    def digest_of(self, path: Path) -> Optional[str]:
+        """
+        sha256 recorded for a stored file, if it is still the adopted content.
+
+        Returns:
+            Hex digest, or None if the file was never adopted or has changed since
+        """
+        path = Path(path)
+        with self._lock:
+            self._sync()
+            entry = self._by_path.get(os.path.abspath(path))
+        if entry is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if entry.get("mtime_ns") is None:
+            # Recorded by older versions: only a hardlinked view can be vouched for
+            try:
+                return entry["sha256"] if os.path.samefile(path, self.blob_path(entry["sha256"])) else None
+            except OSError:
+                return None
+        # An in-place write (to this file or any hardlinked view) changes the shared stat
+        if (stat.st_size, stat.st_mtime_ns) != (entry.get("size"), entry["mtime_ns"]):
+            return None
+        return entry["sha256"]
+
+    def forget(self, ref: str) -> None:
+        """Drop a reference (the blob is freed by the next gc)."""
+        with self._lock:
+            self._sync()
+            if ref in self._refs:
+                self._append([{"ref": ref, "forget": True}])
+
+    def gc(self, grace_seconds: Optional[float] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Remove blobs no file or reference references.
+
+        References whose file is gone are dropped first, and the reference
+        log is compacted to the live entries. A blob is still referenced
+        while a hardlinked view exists (link count > 1) or a live reference
+        points to it.
+
+        Args:
+            grace_seconds: Keep blobs younger than this (default: settings.BLOB_GC_GRACE_SECONDS)
+            dry_run: Report without deleting
+
+        Returns:
+            Dict with removed, freed_bytes, kept and dropped_refs
+        """
+        grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        with self._lock:
+            with self._file_lock():
+                self._sync()
+                stale_refs = [ref for ref, entry in self._refs.items() if not Path(entry["path"]).exists()]
+                live = {ref: entry for ref, entry in self._refs.items() if ref not in stale_refs}
+                if not dry_run and self._log_path().exists():
+                    lines = [json.dumps(dict(entry, ref=ref), ensure_ascii=True) + "\n" for ref, entry in live.items()]
+                    atomic_write_text(self._log_path(), "".join(lines))
+                    self._sync()
+            referenced = {entry["sha256"] for entry in live.values()}
+
+        removed = 0
+        freed = 0
+        kept = 0
+        now = time.time()
+        if self.root.exists():
+            for blob in self.root.glob("??/*"):
+                if blob.name.startswith("."):
+                    continue
+                stat = blob.stat()
+                if stat.st_nlink > 1 or blob.name in referenced or now - stat.st_mtime < grace:
+                    kept += 1
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if not dry_run:
+                    blob.unlink(missing_ok=True)
+        logger.info(f"Blob GC: removed {removed} blob(s), freed {freed} bytes, kept {kept}")
+        return {"removed": removed, "freed_bytes": freed, "kept": kept, "dropped_refs": len(stale_refs)}
+
+    # ---------------------------------------------
+    # Internals
+    # ---------------------------------------------
+
+    @staticmethod
+    def _intact(blob: Path, digest: str) -> bool:
+        """Whether a blob still holds the content its name claims."""
+        try:
+            return hash_file(blob) == digest
+        except OSError:
+            return False
+
+    @staticmethod
+    def _relink(blob: Path, path: Path) -> bool:
+        """Atomically replace `path` by a hardlink to `blob` (or a copy)."""
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.link")
+        try:
+            os.link(blob, tmp_path)
+            linked = True
+        except OSError:
+            shutil.copyfile(blob, tmp_path)
+            linked = False
+        os.replace(tmp_path, path)
+        return linked
+
+
+def get_blob_root() -> Path:
+    return get_data_root() / "_system" / BLOB_DIR
+
+
+def _migrate_legacy_root(root: Path) -> None:
+    """Move a store left in the served media root (`Media/.blobs`) to `root`."""
+    legacy = get_storage_path() / LEGACY_BLOB_DIR
+    if root.exists() or not legacy.is_dir():
+        return
+    try:
+        root.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(legacy, root)
+        logger.info(f"Moved blob store {legacy} to {root}")
+    except OSError as e:
+        # Other filesystem: views keep their bytes, the store starts over
+        logger.warning(f"Could not move blob store {legacy} to {root}, remove it manually: {e}")
+
+
+# Global store instance
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Get the blob store of the current data root."""
+    global _store
+    with _store_lock:
+        root = get_blob_root()
+        if _store is None or _store.root != root:
+            _migrate_legacy_root(root)
+            _store = BlobStore(root)
+        return _store
+
+
+def forget_file(ref: str) -> None:
+    """Drop the blob reference of a deleted media file, if the store is enabled."""
+    if not settings.BLOB_STORE_ENABLED:
+        return
+    try:
+        get_blob_store().forget(ref)
+    except Exception as e:
+        logger.warning(f"Failed to forget blob reference {ref}: {e}")
+
+
+def adopt_file(path: Path, ref: str, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Adopt a stored media file into the blob store, if enabled.
+
+    Failures are logged and ignored: the file stays in place as a plain copy.
+    """
+    if not settings.BLOB_STORE_ENABLED:
+        return None
+    try:
+        return get_blob_store().adopt(path, ref, digest)
+    except Exception as e:
+        logger.warning(f"Failed to adopt {path} into the blob store: {e}")
+        return None
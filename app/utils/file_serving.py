@@ -0,0 +1,100 @@
+"""
+HTTP delivery of stored media files.
+
+`file_response` serves a file with its real content type, a strong ETag
+(the sha256 when the blob store or the media index knows it, otherwise
+derived from inode, size and mtime), `Last-Modified`, conditional requests
+(`If-None-Match` / `If-Modified-Since` -> 304) and byte ranges (206/416,
+handled by Starlette's FileResponse), so players can seek and browsers can
+revalidate instead of downloading the file again.
+"""
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from app.config.settings import settings
+
+
+# Media types missing from some platforms' mimetypes tables
+for _type, _ext in (
+    ("image/webp", ".webp"),
+    ("audio/mp4", ".m4a"),
+    ("audio/ogg", ".ogg"),
+    ("audio/opus", ".opus"),
+    ("audio/flac", ".flac"),
+    ("audio/wav", ".wav"),
+    ("video/webm", ".webm"),
+    ("video/quicktime", ".mov"),
+):
+    mimetypes.add_type(_type, _ext)
+
+
+def guess_media_type(path: Path) -> str:
+    media_type, _ = mimetypes.guess_type(path.name)
+    return media_type or "application/octet-stream"
+
+
+def make_etag(stat_result: os.stat_result, digest: Optional[str] = None) -> str:
+    """Strong ETag: content hash if known, else inode/size/mtime (files are replaced, never rewritten in place)."""
+    if digest:
+        return f'"{digest}"'
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match."""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(header: str, stat_result: os.stat_result) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None or since.tzinfo is None:
+        return False
+    # HTTP dates have second precision
+    return int(stat_result.st_mtime) <= since.timestamp()
+
+
+def file_response(request: Request, path: Path, digest: Optional[str] = None) -> Response:
+    """
+    Serve a file with validators and range support.
+
+    Args:
+        request: Incoming request (conditional and Range headers)
+        path: File to serve (must exist)
+        digest: sha256 of the content, if known
+
+    Returns:
+        304 response if the client copy is current, else a (partial) FileResponse
+    """
+    stat_result = os.stat(path)
+    headers: Dict[str, str] = {
+        "etag": make_etag(stat_result, digest),
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": f"public, max-age={settings.ASSET_CACHE_MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        not_modified = _etag_matches(if_none_match, headers["etag"])
+    else:
+        not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, stat_result)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path=str(path),
+        media_type=guess_media_type(path),
+        headers=headers,
+        stat_result=stat_result,
+    )
@@ -1,10 +1,18 @@
 """
 SFTP storage utilities for uploading media files.
+
+Uploads go through a pool of long-lived SFTP sessions (one SSH handshake per
+session, not per file) and a cache of remote directories already known to
+exist, so publishing a batch costs one `put` per file.
 """
+import errno
 import os
 import posixpath
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 import paramiko
 from app.config.settings import settings
 from app.utils.logging import logger
@@ -29,6 +37,205 @@ def is_ftp_enabled() -> bool:
     )
 
 
+class _Session:
+    """One authenticated SSH transport and its SFTP channel."""
+
+    def __init__(self, transport: paramiko.Transport, sftp: paramiko.SFTPClient):
+        self.transport = transport
+        self.sftp = sftp
+        self.last_used = time.monotonic()
+
+    def alive(self, idle_timeout: float) -> bool:
+        return self.transport.is_active() and time.monotonic() - self.last_used < idle_timeout
+
+    def close(self) -> None:
+        for closable in (self.sftp, self.transport):
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+
+class SFTPSessionPool:
+    """Bounded pool of reusable SFTP sessions plus a remote directory cache."""
+
+    def __init__(self, max_sessions: Optional[int] = None, idle_timeout: Optional[float] = None):
+        """
+        Args:
+            max_sessions: Concurrent SFTP sessions (default: settings.FTP_MAX_SESSIONS)
+            idle_timeout: Seconds before an idle session is reopened (default: settings.FTP_SESSION_IDLE_TIMEOUT)
+        """
+        self.max_sessions = max(1, max_sessions or settings.FTP_MAX_SESSIONS)
+        self.idle_timeout = idle_timeout or settings.FTP_SESSION_IDLE_TIMEOUT
+        self._idle: List[_Session] = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._known_dirs: Set[str] = set()
+        self._dirs_lock = threading.Lock()
+
+    def _connect(self) -> _Session:
+        transport = paramiko.Transport((settings.FTP_HOST, settings.FTP_PORT or 22))
+        try:
+            transport.set_keepalive(30)
+            transport.connect(
+                username=settings.FTP_USER,
+                password=settings.FTP_PASSWORD,
+            )
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        except Exception:
+            transport.close()
+            raise
+        logger.debug(f"Opened SFTP session to {settings.FTP_HOST}")
+        return _Session(transport, sftp)
+
+    def _acquire(self) -> _Session:
+        with self._cond:
+            while True:
+                while self._idle:
+                    session = self._idle.pop()
+                    if session.alive(self.idle_timeout):
+                        return session
+                    session.close()
+                    self._open -= 1
+                if self._open < self.max_sessions:
+                    self._open += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._connect()
+        except Exception:
+            self._closed()
+            raise
+
+    def _closed(self) -> None:
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def session(self):
+        """Borrow an SFTP client; a session that fails is closed, not reused."""
+        session = self._acquire()
+        try:
+            yield session.sftp
+        except Exception:
+            session.close()
+            self._closed()
+            raise
+        session.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def ensure_dir(self, sftp: paramiko.SFTPClient, remote_dir: str) -> None:
+        """Create `remote_dir` and its parents, skipping directories already seen."""
+        current = ""
+        for part in remote_dir.strip("/").split("/"):
+            current = f"{current}/{part}"
+            with self._dirs_lock:
+                if current in self._known_dirs:
+                    continue
+            try:
+                sftp.stat(current)
+            except IOError:
+                try:
+                    sftp.mkdir(current)
+                except IOError:
+                    # Created meanwhile by a concurrent upload
+                    sftp.stat(current)
+            with self._dirs_lock:
+                self._known_dirs.add(current)
+
+    def forget_dir(self, remote_dir: str) -> None:
+        """Drop a directory (and its children) from the cache, e.g. after a failed put."""
+        prefix = "/" + remote_dir.strip("/")
+        with self._dirs_lock:
+            self._known_dirs = {
+                path for path in self._known_dirs
+                if path != prefix and not path.startswith(prefix + "/")
+            }
+
+    def close(self) -> None:
+        """Close idle sessions (sessions in use are closed when returned)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for session in idle:
+            session.close()
+
+
+# Global pool instance
+_pool: Optional[SFTPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sftp_pool() -> SFTPSessionPool:
+    """Get or create the SFTP session pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SFTPSessionPool()
+        return _pool
+
+
+def close_sftp_pool() -> None:
+    """Close the pooled SFTP sessions, if any."""
+    if _pool is not None:
+        _pool.close()
+
+
+def get_remote_location(project_name: str, asset_type: str, filename: str) -> Dict[str, str]:
+    """Remote path and public URL of an uploaded file."""
+    safe_project = _sanitize_project_name(project_name)
+    remote_base = settings.FTP_BASE_DIR.rstrip("/") if settings.FTP_BASE_DIR else ""
+    remote_dir = posixpath.join(remote_base, safe_project, asset_type)
+    remote_path = posixpath.join(remote_dir, filename)
+    public_url = None
+    if settings.FTP_PUBLIC_BASE_URL:
+        public_url = f"{settings.FTP_PUBLIC_BASE_URL.rstrip('/')}/{safe_project}/{asset_type}/{filename}"
+    return {"remote_dir": remote_dir, "remote_path": remote_path, "url": public_url or remote_path}
+
+
+def sftp_upload(
+    local_path: str,
+    project_name: str,
+    asset_type: str,
+    filename: str
+) -> Dict[str, Any]:
+    """
+    Upload a local file over a pooled SFTP session.
+
+    Args:
+        local_path: Path to local file
+        project_name: Project name for directory structure
+        asset_type: Type of asset (image, video, audio)
+        filename: Filename to use on remote
+
+    Returns:
+        Dict with remote_path and url (public URL if configured)
+
+    Raises:
+        FileNotFoundError: If the local file does not exist
+        Exception: Any SSH/SFTP error
+    """
+    if not os.path.isfile(local_path):
+        raise FileNotFoundError(errno.ENOENT, "Local file not found", local_path)
+
+    location = get_remote_location(project_name, asset_type, filename)
+    pool = get_sftp_pool()
+    with pool.session() as sftp:
+        pool.ensure_dir(sftp, location["remote_dir"])
+        try:
+            sftp.put(local_path, "/" + location["remote_path"].lstrip("/"))
+        except IOError:
+            # The cached directory may have been removed remotely
+            pool.forget_dir(location["remote_dir"])
+            raise
+
+    logger.info(f"SFTP upload successful: {location['remote_path']}")
+    return {"remote_path": location["remote_path"], "url": location["url"]}
+
+
 def upload_to_ftp(
     local_path: str,
     project_name: str,
@@ -54,45 +261,8 @@ def upload_to_ftp(
         logger.warning(f"SFTP upload skipped: file not found {local_path}")
         return None
 
-    safe_project = _sanitize_project_name(project_name)
-    remote_base = settings.FTP_BASE_DIR.rstrip("/") if settings.FTP_BASE_DIR else ""
-    remote_dir = posixpath.join(remote_base, safe_project, asset_type)
-    remote_path = posixpath.join(remote_dir, filename)
-
     try:
-        transport = paramiko.Transport((settings.FTP_HOST, settings.FTP_PORT or 22))
-        transport.connect(
-            username=settings.FTP_USER,
-            password=settings.FTP_PASSWORD,
-        )
-        sftp = paramiko.SFTPClient.from_transport(transport)
-
-        # Ensure remote directories exist
-        path_parts = remote_dir.strip("/").split("/")
-        current = ""
-        for part in path_parts:
-            current = posixpath.join(current, part)
-            try:
-                sftp.stat("/" + current)
-            except IOError:
-                sftp.mkdir("/" + current)
-
-        # Upload file
-        sftp.put(local_path, "/" + remote_path)
-        sftp.close()
-        transport.close()
-
-        public_url = None
-        if settings.FTP_PUBLIC_BASE_URL:
-            public_url = f"{settings.FTP_PUBLIC_BASE_URL.rstrip('/')}/{safe_project}/{asset_type}/{filename}"
-
-        logger.info(f"SFTP upload successful: {remote_path}")
-
-        return {
-            "remote_path": remote_path,
-            "url": public_url or remote_path
-        }
-
+        return sftp_upload(local_path, project_name, asset_type, filename)
     except Exception as e:
         logger.error(f"SFTP upload failed for {local_path}: {e}", exc_info=True)
         return None
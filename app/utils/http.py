@@ -0,0 +1,116 @@
+"""
+Shared pooled HTTP transport for provider clients.
+
+Each provider client owns one `PooledTransport`. It lazily creates a
+long-lived `httpx.Client` (and an `httpx.AsyncClient` per event loop), so
+status polls reuse keep-alive connections instead of paying a TCP+TLS
+handshake per request. Code that runs a private event loop (`asyncio.run`
+from a sync caller) closes that loop's clients with `aclose_loop_clients`
+before the loop ends.
+"""
+import asyncio
+import importlib.util
+import threading
+import weakref
+from typing import Optional
+import httpx
+from app.config.settings import settings
+from app.utils.logging import logger
+
+
+def http2_available() -> bool:
+    """HTTP/2 is used when enabled in settings and the `h2` package is installed."""
+    return bool(settings.HTTP2_ENABLED) and importlib.util.find_spec("h2") is not None
+
+
+def build_limits() -> httpx.Limits:
+    """Connection pool limits from settings."""
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+class PooledTransport:
+    """Long-lived sync/async httpx clients for one provider."""
+
+    def __init__(self, name: str, timeout: float, follow_redirects: bool = False):
+        """
+        Args:
+            name: Provider name (for logs)
+            timeout: Default request timeout in seconds
+            follow_redirects: Follow redirects (CDN asset URLs)
+        """
+        self.name = name
+        self.timeout = timeout
+        self.follow_redirects = follow_redirects
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        # One async client per loop: connections are bound to the loop that opened them
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        _transports.add(self)
+
+    def _client_kwargs(self) -> dict:
+        return {
+            "timeout": self.timeout,
+            "follow_redirects": self.follow_redirects,
+            "limits": build_limits(),
+            "http2": http2_available()
+        }
+
+    def client(self) -> httpx.Client:
+        """Get the shared sync client (thread-safe)."""
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(**self._client_kwargs())
+                logger.debug(f"Opened pooled HTTP client for {self.name}")
+            return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared async client for the running event loop.
+
+        Each loop gets its own client; clients of other loops are left alone.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = self._async_clients[loop] = httpx.AsyncClient(**self._client_kwargs())
+                logger.debug(f"Opened pooled async HTTP client for {self.name}")
+            return client
+
+    def close(self) -> None:
+        """Close the sync client."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose_loop_client(self) -> None:
+        """Close the async client of the running loop, if any."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        """Close the sync client and the async client of the running loop."""
+        self.close()
+        await self.aclose_loop_client()
+
+
+# Every transport, so private loops can close their clients before ending
+_transports: "weakref.WeakSet[PooledTransport]" = weakref.WeakSet()
+
+
+async def aclose_loop_clients() -> None:
+    """Close the async clients every transport opened on the running loop."""
+    for transport in list(_transports):
+        try:
+            await transport.aclose_loop_client()
+        except Exception as e:
+            logger.warning(f"Failed to close async HTTP client for {transport.name}: {e}")
@@ -0,0 +1,90 @@
+"""
+Named locks shared by threads and worker processes.
+
+A `FileLock` combines a re-entrant in-process lock with an advisory
+`fcntl.flock` on a lock file, so read-modify-write cycles are serialized
+both across the FastAPI threadpool and across uvicorn/gunicorn workers
+sharing the same data directory. The file lock is taken once per outermost
+acquisition (flock is per open file, so nested acquisitions by the owning
+thread must not reopen it). On platforms without fcntl, or with
+STORAGE_FILE_LOCKS disabled, only the in-process lock is used.
+"""
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional
+from app.config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class FileLock:
+    """Re-entrant lock backed by an advisory lock file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle: Optional[IO[str]] = None
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._handle is None and settings.STORAGE_FILE_LOCKS and fcntl is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                handle = open(self.path, "a+", encoding="utf-8")
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                except BaseException:
+                    handle.close()
+                    raise
+            except BaseException:
+                self._lock.release()
+                raise
+            self._handle = handle
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            handle, self._handle = self._handle, None
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            finally:
+                handle.close()
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    @contextmanager
+    def local(self) -> Iterator[None]:
+        """
+        Hold the in-process lock only.
+
+        For readers of files that are replaced atomically or only appended to:
+        they cannot observe a torn state, so they need not wait on other workers.
+        """
+        with self._lock:
+            yield
+
+
+_locks: Dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_file_lock(path: Path) -> FileLock:
+    """Process-wide lock object for a lock file path."""
+    key = str(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(path)
+        return lock
@@ -0,0 +1,236 @@
+"""
+Per-project media manifest.
+
+`data/<project>/Media/index.json` records every project media file (category,
+kind, owner, sequence number, size, hash, timestamps) and the next sequence
+number of each filename prefix. Uploads allocate their index from the
+manifest under a per-project file lock (shared by all worker processes)
+instead of scanning and regex-matching the media directory, so concurrent
+uploads never pick the same filename and listing is a lookup rather than a
+directory walk.
+
+A project without a manifest gets one built from its existing files on
+first use.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.ids import generate_timestamp
+from app.utils.logging import logger
+from app.utils.project_storage import atomic_write_text, project_lock
+
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+# Filename prefix -> (kind, owner keys), most specific first
+_KNOWN_PREFIXES = [
+    (re.compile(r"^N1_cos_(\d+)_char_(\d+)_image_(\d+)"), "costume_image", ("costume", "character")),
+    (re.compile(r"^N1_char_(\d+)_image_(\d+)"), "character_image", ("character",)),
+    (re.compile(r"^N1_motif_(\d+)_image_(\d+)"), "motif_image", ("motif",)),
+    (re.compile(r"^N1_motif_(\d+)_audio_(\d+)"), "motif_audio", ("motif",)),
+    (re.compile(r"^.+_N0_image_(\d+)"), "project_image", ()),
+    (re.compile(r"^.+_N0_audio_(\d+)"), "project_audio", ()),
+]
+
+# Parsed manifests by path, valid while the file's (mtime_ns, size) is unchanged
+_loaded: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def parse_media_filename(filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Kind, owner, prefix and sequence encoded in a media filename.
+
+    Returns:
+        Dict with kind, owner, prefix and sequence, or None for unknown names
+    """
+    for pattern, kind, owner_keys in _KNOWN_PREFIXES:
+        match = pattern.match(filename)
+        if not match:
+            continue
+        numbers = [int(group) for group in match.groups()]
+        sequence = numbers[-1]
+        prefix = filename[:match.start(len(numbers))]
+        return {
+            "kind": kind,
+            "owner": dict(zip(owner_keys, numbers[:-1])),
+            "prefix": prefix,
+            "sequence": sequence
+        }
+    return None
+
+
+class MediaIndex:
+    """Manifest of one project's media files."""
+
+    def __init__(self, media_root: Path, project_id: str):
+        """
+        Args:
+            media_root: Project media directory (`data/<project>/Media`)
+            project_id: Project id (names the manifest's lock)
+        """
+        self.media_root = media_root
+        self.path = media_root / INDEX_FILE
+        self._lock = project_lock(project_id, "media_index")
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+
+    def _load(self) -> Dict[str, Any]:
+        """Read the manifest; caller holds the lock."""
+        if not self.media_root.exists():
+            return {"version": INDEX_VERSION, "counters": {}, "entries": {}}
+        if self.path.exists():
+            try:
+                stat = self.path.stat()
+                cached = _loaded.get(str(self.path))
+                if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+                    return cached[1]
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == INDEX_VERSION:
+                    _loaded[str(self.path)] = ((stat.st_mtime_ns, stat.st_size), data)
+                    return data
+            except Exception as e:
+                logger.warning(f"Unreadable media index {self.path}, rebuilding: {e}")
+        data = self._rebuild()
+        self._save(data)
+        return data
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        self.media_root.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=True, separators=(",", ":")))
+        stat = self.path.stat()
+        _loaded[str(self.path)] = ((stat.st_mtime_ns, stat.st_size), data)
+
+    def _rebuild(self) -> Dict[str, Any]:
+        """Index the files already on disk (projects created before the manifest)."""
+        data: Dict[str, Any] = {"version": INDEX_VERSION, "counters": {}, "entries": {}}
+        if not self.media_root.exists():
+            return data
+        for category_dir in self.media_root.iterdir():
+            if not category_dir.is_dir() or category_dir.name.startswith("."):
+                continue
+            for file_path in category_dir.iterdir():
+                if not file_path.is_file() or file_path.name.startswith("."):
+                    continue
+                parsed = parse_media_filename(file_path.name) or {}
+                stat = file_path.stat()
+                entry = self._entry(
+                    category_dir.name,
+                    file_path.name,
+                    kind=parsed.get("kind"),
+                    owner=parsed.get("owner"),
+                    sequence=parsed.get("sequence"),
+                    size=stat.st_size
+                )
+                data["entries"][entry["key"]] = entry
+                if parsed:
+                    counter_key = f"{category_dir.name}/{parsed['prefix']}"
+                    data["counters"][counter_key] = max(
+                        data["counters"].get(counter_key, 0), parsed["sequence"]
+                    )
+        logger.info(f"Built media index for {self.media_root} ({len(data['entries'])} files)")
+        return data
+
+    @staticmethod
+    def _entry(
+        category: str,
+        filename: str,
+        kind: Optional[str] = None,
+        owner: Optional[Dict[str, int]] = None,
+        sequence: Optional[int] = None,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        now = generate_timestamp()
+        return {
+            "key": f"{category}/{filename}",
+            "category": category,
+            "filename": filename,
+            "kind": kind,
+            "owner": owner or {},
+            "sequence": sequence,
+            "size": size,
+            "sha256": sha256,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def allocate(self, category: str, prefix: str) -> int:
+        """
+        Reserve the next sequence number of a filename prefix.
+
+        The counter is persisted before returning, so a concurrent upload
+        (or a later one after a failed write) never gets the same number.
+        """
+        with self._lock:
+            data = self._load()
+            counter_key = f"{category}/{prefix}"
+            sequence = data["counters"].get(counter_key, 0) + 1
+            data["counters"][counter_key] = sequence
+            self._save(data)
+            return sequence
+
+    def add(
+        self,
+        category: str,
+        filename: str,
+        kind: Optional[str] = None,
+        owner: Optional[Dict[str, int]] = None,
+        sequence: Optional[int] = None,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Record a stored file."""
+        entry = self._entry(category, filename, kind, owner, sequence, size, sha256)
+        with self._lock:
+            data = self._load()
+            data["entries"][entry["key"]] = entry
+            self._save(data)
+        return dict(entry)
+
+    def get(self, category: str, filename: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._load()["entries"].get(f"{category}/{filename}")
+            return dict(entry) if entry else None
+
+    def remove(self, category: str, filename: str) -> Optional[Dict[str, Any]]:
+        """Forget a file (sequence counters are kept: numbers are never reused)."""
+        with self._lock:
+            data = self._load()
+            entry = data["entries"].pop(f"{category}/{filename}", None)
+            if entry is not None:
+                self._save(data)
+            return entry
+
+    def list(
+        self,
+        category: Optional[str] = None,
+        kind: Optional[str] = None,
+        owner: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries matching the filters, ordered by category, kind, owner and sequence."""
+        with self._lock:
+            entries = list(self._load()["entries"].values())
+        selected = [
+            dict(entry) for entry in entries
+            if (category is None or entry["category"] == category)
+            and (kind is None or entry["kind"] == kind)
+            and all(entry["owner"].get(key) == value for key, value in (owner or {}).items())
+        ]
+        return sorted(
+            selected,
+            key=lambda entry: (
+                entry["category"],
+                entry["kind"] or "",
+                sorted(entry["owner"].items()),
+                entry["sequence"] or 0,
+                entry["filename"]
+            )
+        )
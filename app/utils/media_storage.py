@@ -1,14 +1,34 @@
 """
 Helper functions for downloading and storing media files in handlers.
 """
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from app.utils.storage import download_file, get_storage_path
 from app.utils.ftp_storage import upload_to_ftp, is_ftp_enabled
+from app.utils.upload_queue import get_upload_queue
 from app.utils.logging import logger
 from app.config.settings import settings
 from app.mcp.schemas import AssetLink
 
 
+# Download/upload workers shared by every handler (bounds concurrent asset I/O)
+_asset_pool: Optional[ThreadPoolExecutor] = None
+_asset_pool_lock = threading.Lock()
+
+
+def get_asset_pool() -> ThreadPoolExecutor:
+    """Get or create the asset post-processing worker pool."""
+    global _asset_pool
+    with _asset_pool_lock:
+        if _asset_pool is None:
+            _asset_pool = ThreadPoolExecutor(
+                max_workers=settings.STORAGE_MAX_CONCURRENCY,
+                thread_name_prefix="asset-io"
+            )
+        return _asset_pool
+
+
 def get_project_name(payload: Dict[str, Any], trace: Optional[Any] = None) -> str:
     """
     Extract project name from payload or trace.
@@ -43,6 +63,9 @@ def download_and_store_asset(
 ) -> Optional[AssetLink]:
     """
     Download asset from provider URL and store it locally; optionally upload to SFTP.
+
+    With `FTP_BACKGROUND_UPLOADS`, the upload is queued and the local link is
+    returned at once, tagged with its `upload_id`.
     
     Returns:
         AssetLink with local or FTP URL, or None if download disabled/failed
@@ -74,7 +97,16 @@ def download_and_store_asset(
         )
 
         # Optional: upload to SFTP if enabled
-        if is_ftp_enabled():
+        if is_ftp_enabled() and settings.FTP_BACKGROUND_UPLOADS:
+            upload = get_upload_queue().enqueue(
+                local_path=storage_info["local_path"],
+                project_name=project_name,
+                asset_type=asset_type,
+                filename=storage_info["filename"],
+                asset_id=asset_id
+            )
+            link.upload_id = upload["upload_id"]
+        elif is_ftp_enabled():
             ftp_info = upload_to_ftp(
                 local_path=storage_info["local_path"],
                 project_name=project_name,
@@ -98,6 +130,33 @@ def download_and_store_asset(
         return None
 
 
+def _link_to_dict(link: Any) -> Dict[str, Any]:
+    if hasattr(link, 'model_dump'):
+        return link.model_dump(exclude_none=True)
+    if hasattr(link, 'dict'):
+        return link.dict()  # Fallback for Pydantic v1
+    return link if isinstance(link, dict) else {}
+
+
+def _process_link(
+    link_dict: Dict[str, Any],
+    project_name: str,
+    asset_type: str,
+    created_at: str
+) -> Dict[str, Any]:
+    """Store one link; fall back to the provider URL on failure."""
+    local_link = download_and_store_asset(
+        provider_url=link_dict.get("url", ""),
+        project_name=project_name,
+        asset_type=asset_type,
+        asset_id=link_dict.get("asset_id", ""),
+        created_at=created_at
+    )
+    if local_link:
+        return _link_to_dict(local_link)
+    return link_dict
+
+
 def process_asset_links(
     links: List[Any],
     project_name: str,
@@ -106,6 +165,9 @@ def process_asset_links(
 ) -> List[Dict[str, Any]]:
     """
     Process asset links: download and store if enabled, or keep provider URLs.
+
+    Links are downloaded (and uploaded) concurrently on the shared asset
+    pool; the result keeps the order of `links`.
     
     Args:
         links: List of AssetLink objects or dicts
@@ -116,36 +178,23 @@ def process_asset_links(
     Returns:
         List of processed asset links (as dicts)
     """
+    link_dicts = [_link_to_dict(link) for link in links]
+    if len(link_dicts) <= 1 or not settings.STORAGE_DOWNLOAD_ENABLED:
+        return [
+            _process_link(link_dict, project_name, asset_type, created_at)
+            for link_dict in link_dicts
+        ]
+
+    futures = [
+        get_asset_pool().submit(_process_link, link_dict, project_name, asset_type, created_at)
+        for link_dict in link_dicts
+    ]
     processed_links = []
-    
-    for link in links:
-        # Convert to dict if needed
-        if hasattr(link, 'model_dump'):
-            link_dict = link.model_dump()
-        elif hasattr(link, 'dict'):
-            link_dict = link.dict()  # Fallback for Pydantic v1
-        else:
-            link_dict = link if isinstance(link, dict) else {}
-        
-        provider_url = link_dict.get("url", "")
-        asset_id = link_dict.get("asset_id", "")
-        
-        # Try to download and store
-        local_link = download_and_store_asset(
-            provider_url=provider_url,
-            project_name=project_name,
-            asset_type=asset_type,
-            asset_id=asset_id,
-            created_at=created_at
-        )
-        
-        if local_link:
-            # Use local storage
-            processed_links.append(
-                local_link.model_dump() if hasattr(local_link, 'model_dump') else local_link.dict()
-            )
-        else:
+    for link_dict, future in zip(link_dicts, futures):
+        try:
+            processed_links.append(future.result())
+        except Exception as e:
             # Fall back to provider URL
+            logger.error(f"Failed to process {asset_type} link {link_dict.get('url')}: {e}")
             processed_links.append(link_dict)
-    
     return processed_links
@@ -3,14 +3,24 @@ Helpers for storing project media files under project folders.
 """
 from __future__ import annotations
 
-import re
+import asyncio
+import hashlib
+import os
+import uuid
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-import httpx
 from fastapi import UploadFile
 
-from app.utils.storage import get_file_extension_from_url
+from app.config.settings import settings
+from app.utils.blob_store import adopt_file, forget_file
+from app.utils.media_index import MediaIndex, parse_media_filename
+from app.utils.storage import (
+    DownloadTooLargeError,
+    _stream_to_file,
+    get_download_client,
+    get_file_extension_from_url,
+)
 from app.utils.project_storage import get_data_root
 
 
@@ -43,37 +53,118 @@ def ensure_project_media_folders(project_id: str) -> None:
         get_project_media_dir(project_id, category)
 
 
-def _next_media_index(directory: Path, prefix: str) -> int:
-    pattern = re.compile(rf"^{re.escape(prefix)}(\d+)")
-    max_index = 0
-    for entry in directory.iterdir():
-        if not entry.is_file():
-            continue
-        match = pattern.match(entry.name)
-        if not match:
-            continue
-        try:
-            max_index = max(max_index, int(match.group(1)))
-        except ValueError:
-            continue
-    return max_index + 1
+def get_project_media_index(project_id: str) -> MediaIndex:
+    safe_project_id = _sanitize_project_id(project_id)
+    return MediaIndex(get_data_root() / safe_project_id / "Media", safe_project_id)
 
 
-async def save_project_image_upload(
+class MediaTooLargeError(ValueError):
+    """Upload above MEDIA_UPLOAD_MAX_BYTES."""
+
+
+def _temp_media_path(directory: Path) -> Path:
+    return directory / f".upload-{uuid.uuid4().hex}.part"
+
+
+def _blob_ref(project_id: str, category: str, filename: str) -> str:
+    return f"{_sanitize_project_id(project_id)}/{category}/{filename}"
+
+
+def _commit_media(
+    project_id: str,
+    category: str,
+    prefix: str,
+    ext: str,
+    tmp_path: Path,
+    size: int,
+    digest: str,
+) -> Dict[str, Any]:
+    """Move a complete temp file to the next free index of `prefix` and record it."""
+    index = get_project_media_index(project_id)
+    directory = get_project_media_dir(project_id, category)
+    sequence = index.allocate(category, prefix)
+    filename = f"{prefix}{sequence:02d}{ext}"
+    destination = directory / filename
+    os.replace(tmp_path, destination)
+    # Identical bytes are stored once (the file becomes a hardlink to the blob)
+    adopt_file(destination, _blob_ref(project_id, category, filename), digest)
+    parsed = parse_media_filename(filename) or {}
+    index.add(
+        category,
+        filename,
+        kind=parsed.get("kind"),
+        owner=parsed.get("owner"),
+        sequence=sequence,
+        size=size,
+        sha256=digest
+    )
+    return {"filename": filename, "local_path": str(destination)}
+
+
+def _too_large(size: int) -> MediaTooLargeError:
+    limit = settings.MEDIA_UPLOAD_MAX_BYTES
+    return MediaTooLargeError(f"File too large: {size} bytes (max {limit})")
+
+
+async def _store_upload(
     project_id: str,
+    category: str,
+    prefix: str,
     file: UploadFile,
 ) -> Dict[str, Any]:
-    directory = get_project_n1_pix_dir(project_id)
-    prefix = f"{_sanitize_project_id(project_id)}_N0_image_"
-    index = _next_media_index(directory, prefix)
+    """Stream an upload to disk in chunks, hashing it on the way."""
+    max_bytes = settings.MEDIA_UPLOAD_MAX_BYTES
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise _too_large(file.size)
     ext = Path(file.filename or "").suffix
     if not ext:
         ext = get_file_extension_from_url("", file.content_type or "") or ".bin"
-    filename = f"{prefix}{index:02d}{ext}"
-    destination = directory / filename
-    content = await file.read()
-    destination.write_bytes(content)
-    return {"filename": filename, "local_path": str(destination)}
+
+    tmp_path = _temp_media_path(get_project_media_dir(project_id, category))
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as handle:
+            while True:
+                chunk = await file.read(settings.MEDIA_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise _too_large(size)
+                hasher.update(chunk)
+                await asyncio.to_thread(handle.write, chunk)
+        return await asyncio.to_thread(
+            _commit_media, project_id, category, prefix, ext, tmp_path, size, hasher.hexdigest()
+        )
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _store_url(project_id: str, category: str, prefix: str, url: str) -> Dict[str, Any]:
+    """Stream a URL to disk in chunks (resumable, hashed, capped like uploads)."""
+    tmp_path = _temp_media_path(get_project_media_dir(project_id, category))
+    try:
+        try:
+            download = _stream_to_file(
+                get_download_client(), url, tmp_path, settings.MEDIA_UPLOAD_MAX_BYTES
+            )
+        except DownloadTooLargeError as e:
+            raise MediaTooLargeError(e.message) from e
+        ext = get_file_extension_from_url(url, download["content_type"])
+        return _commit_media(
+            project_id, category, prefix, ext, tmp_path, download["size"], download["sha256"]
+        )
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+async def save_project_image_upload(
+    project_id: str,
+    file: UploadFile,
+) -> Dict[str, Any]:
+    prefix = f"{_sanitize_project_id(project_id)}_N0_image_"
+    return await _store_upload(project_id, "pix", prefix, file)
 
 
 async def save_project_n1_character_image_upload(
@@ -83,17 +174,8 @@ async def save_project_n1_character_image_upload(
 ) -> Dict[str, Any]:
     if character_index < 1:
         raise ValueError("character_index must be >= 1")
-    directory = get_project_n1_pix_dir(project_id)
     prefix = f"N1_char_{character_index:02d}_image_"
-    index = _next_media_index(directory, prefix)
-    ext = Path(file.filename or "").suffix
-    if not ext:
-        ext = get_file_extension_from_url("", file.content_type or "") or ".bin"
-    filename = f"{prefix}{index:02d}{ext}"
-    destination = directory / filename
-    content = await file.read()
-    destination.write_bytes(content)
-    return {"filename": filename, "local_path": str(destination)}
+    return await _store_upload(project_id, "pix", prefix, file)
 
 
 async def save_project_n1_costume_image_upload(
@@ -106,17 +188,8 @@ async def save_project_n1_costume_image_upload(
         raise ValueError("character_index must be >= 1")
     if costume_index < 1:
         raise ValueError("costume_index must be >= 1")
-    directory = get_project_n1_pix_dir(project_id)
     prefix = f"N1_cos_{costume_index:02d}_char_{character_index:02d}_image_"
-    index = _next_media_index(directory, prefix)
-    ext = Path(file.filename or "").suffix
-    if not ext:
-        ext = get_file_extension_from_url("", file.content_type or "") or ".bin"
-    filename = f"{prefix}{index:02d}{ext}"
-    destination = directory / filename
-    content = await file.read()
-    destination.write_bytes(content)
-    return {"filename": filename, "local_path": str(destination)}
+    return await _store_upload(project_id, "pix", prefix, file)
 
 
 async def save_project_n1_motif_image_upload(
@@ -126,17 +199,8 @@ async def save_project_n1_motif_image_upload(
 ) -> Dict[str, Any]:
     if motif_index < 1:
         raise ValueError("motif_index must be >= 1")
-    directory = get_project_n1_pix_dir(project_id)
     prefix = f"N1_motif_{motif_index:02d}_image_"
-    index = _next_media_index(directory, prefix)
-    ext = Path(file.filename or "").suffix
-    if not ext:
-        ext = get_file_extension_from_url("", file.content_type or "") or ".bin"
-    filename = f"{prefix}{index:02d}{ext}"
-    destination = directory / filename
-    content = await file.read()
-    destination.write_bytes(content)
-    return {"filename": filename, "local_path": str(destination)}
+    return await _store_upload(project_id, "pix", prefix, file)
 
 
 async def save_project_n1_motif_audio_upload(
@@ -146,44 +210,58 @@ async def save_project_n1_motif_audio_upload(
 ) -> Dict[str, Any]:
     if motif_index < 1:
         raise ValueError("motif_index must be >= 1")
-    directory = get_project_n1_pix_dir(project_id)
     prefix = f"N1_motif_{motif_index:02d}_audio_"
-    index = _next_media_index(directory, prefix)
-    ext = Path(file.filename or "").suffix
-    if not ext:
-        ext = get_file_extension_from_url("", file.content_type or "") or ".bin"
-    filename = f"{prefix}{index:02d}{ext}"
-    destination = directory / filename
-    content = await file.read()
-    destination.write_bytes(content)
-    return {"filename": filename, "local_path": str(destination)}
+    return await _store_upload(project_id, "pix", prefix, file)
 
 
 def save_project_image_url(project_id: str, url: str) -> Dict[str, Any]:
-    directory = get_project_n1_pix_dir(project_id)
     prefix = f"{_sanitize_project_id(project_id)}_N0_image_"
-    index = _next_media_index(directory, prefix)
-    with httpx.Client(timeout=60, follow_redirects=True) as client:
-        response = client.get(url)
-        response.raise_for_status()
-        content_type = response.headers.get("content-type", "")
-        ext = get_file_extension_from_url(url, content_type)
-        filename = f"{prefix}{index:02d}{ext}"
-        destination = directory / filename
-        destination.write_bytes(response.content)
-    return {"filename": filename, "local_path": str(destination)}
+    return _store_url(project_id, "pix", prefix, url)
 
 
 def save_project_audio_url(project_id: str, url: str) -> Dict[str, Any]:
-    directory = get_project_media_dir(project_id, "music")
     prefix = f"{_sanitize_project_id(project_id)}_N0_audio_"
-    index = _next_media_index(directory, prefix)
-    with httpx.Client(timeout=60, follow_redirects=True) as client:
-        response = client.get(url)
-        response.raise_for_status()
-        content_type = response.headers.get("content-type", "")
-        ext = get_file_extension_from_url(url, content_type)
-        filename = f"{prefix}{index:02d}{ext}"
-        destination = directory / filename
-        destination.write_bytes(response.content)
-    return {"filename": filename, "local_path": str(destination)}
+    return _store_url(project_id, "music", prefix, url)
+
+
+def list_project_media(
+    project_id: str,
+    category: Optional[str] = None,
+    kind: Optional[str] = None,
+    owner: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    return get_project_media_index(project_id).list(category, kind, owner)
+
+
+def delete_project_media(
+    project_id: str,
+    category: str,
+    filename: str,
+    kind: str,
+    owner: Dict[str, int],
+) -> bool:
+    """
+    Delete a media file recorded for `kind`/`owner`.
+
+    Returns:
+        False if there is no such file
+
+    Raises:
+        ValueError: If the file belongs to another kind or owner
+    """
+    index = get_project_media_index(project_id)
+    safe_name = Path(filename).name
+    path = get_project_media_dir(project_id, category) / safe_name
+    entry = index.get(category, safe_name)
+    if entry is None:
+        # File added outside the manifest: the caller validated its name
+        if not path.is_file():
+            return False
+        path.unlink()
+        return True
+    if entry["kind"] != kind or any(entry["owner"].get(key) != value for key, value in owner.items()):
+        raise ValueError("Invalid filename prefix")
+    path.unlink(missing_ok=True)
+    index.remove(category, safe_name)
+    forget_file(_blob_ref(project_id, category, safe_name))
+    return True
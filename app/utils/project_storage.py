@@ -1,13 +1,40 @@
 """
 Storage helpers for project strata JSON files.
-"""
-from pathlib import Path
-from typing import Any, Dict, List
 
+Strata are cached in-process: `read_strata` parses a file once and serves
+later reads from memory while its (mtime, size) is unchanged, and
+`write_strata` refreshes the cached copy. The cached state is serialized
+once per change and every read parses that text, so callers get their own
+copy (mutating a returned state never alters the cache) for the price of a
+json.loads, without touching the disk.
+
+Writer patches do not rewrite the strata file: `append_strata_patch`
+appends them to `<strata>.journal.jsonl` (seq, target path, patch,
+timestamp) and the state is the strata file (the snapshot) plus its journal
+replayed. The journal is folded into a new snapshot once it grows past
+STRATA_JOURNAL_MAX_ENTRIES / STRATA_JOURNAL_MAX_BYTES, and its entries move
+to `<strata>.journal.archive.jsonl` as an audit trail.
+
+Writes are serialized per project and strata by `strata_lock` (in-process
+plus an advisory lock file under data/_system/locks, so several workers can
+share a data directory), and every JSON file is replaced atomically
+(temporary file + rename): readers never see a torn file. Callers doing
+their own read-modify-write of a strata hold `strata_lock` around it.
+"""
+import json
+import os
 import shutil
-
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from app.config.settings import settings
 from app.utils.ids import generate_timestamp
+from app.utils.locking import FileLock, get_file_lock
+from app.utils.logging import logger
+from app.utils.strata_patch import apply_journal_entry
+
+if TYPE_CHECKING:
+    from app.utils.storage_backend import StorageBackend
 
 
 STRATA_FILES = {
@@ -19,6 +46,16 @@ STRATA_FILES = {
     "n5": "project_id_N5.json",
 }
 
+# Materialized strata by path: (signature, payload, snapshot journal_seq,
+# journal offset replayed). The signature is the (mtime_ns, size) of the
+# strata file and of its journal.
+_Signature = Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]
+_strata_cache: Dict[str, Tuple[_Signature, Dict[str, Any], int, int]] = {}
+# Serialized form of a cached payload, by path: readers get their own copy
+# from json.loads, which is several times cheaper than copy.deepcopy
+_strata_text_cache: Dict[str, Tuple[_Signature, str]] = {}
+_strata_cache_lock = threading.Lock()
+
 
 def _safe_project_id(project_id: str) -> str:
     safe_project_id = "".join(
@@ -48,32 +85,75 @@ def get_project_root(project_id: str) -> Path:
     return get_data_root() / safe_project_id
 
 
+def project_lock(project_id: str, name: str) -> FileLock:
+    """
+    Lock serializing one kind of update of a project, across threads and workers.
+
+    Args:
+        project_id: Project id
+        name: Lock name within the project (e.g. "strata_n1", "chat_<session>")
+
+    Returns:
+        Re-entrant FileLock (use as a context manager)
+    """
+    if not project_id:
+        raise ValueError("project_id is required")
+    path = get_data_root() / "_system" / "locks" / _safe_project_id(project_id) / f"{name}.lock"
+    return get_file_lock(path)
+
+
+def strata_lock(project_id: str, strata: str) -> FileLock:
+    """Lock to hold around a read-modify-write of a strata."""
+    return project_lock(project_id, f"strata_{strata}")
+
+
+def _backend() -> Optional["StorageBackend"]:
+    """Configured database backend, or None for the JSON file layout implemented here."""
+    if settings.STORAGE_BACKEND == "file":
+        return None
+    from app.utils.storage_backend import get_storage_backend
+
+    return get_storage_backend()
+
+
 def list_projects() -> List[Dict[str, Any]]:
     data_root = get_data_root()
-    if not data_root.exists():
-        return []
-    projects = []
-    for entry in data_root.iterdir():
-        if not entry.is_dir():
-            continue
-        metadata_dir = entry / "metadata"
-        media_dir = entry / "Media"
-        if metadata_dir.exists() or media_dir.exists():
-            projects.append(
-                {
+    backend = _backend()
+    with_metadata = set(backend.list_projects()) if backend else set()
+    projects = {}
+    if data_root.exists():
+        for entry in data_root.iterdir():
+            if not entry.is_dir() or entry.name.startswith("_"):
+                continue
+            metadata_dir = entry / "metadata"
+            media_dir = entry / "Media"
+            has_metadata = entry.name in with_metadata if backend else metadata_dir.exists()
+            if has_metadata or media_dir.exists():
+                projects[entry.name] = {
                     "project_id": entry.name,
-                    "has_metadata": metadata_dir.exists(),
+                    "has_metadata": has_metadata,
                     "has_media": media_dir.exists(),
                 }
-            )
-    return sorted(projects, key=lambda item: item["project_id"])
+    for project_id in with_metadata - set(projects):
+        projects[project_id] = {"project_id": project_id, "has_metadata": True, "has_media": False}
+    return sorted(projects.values(), key=lambda item: item["project_id"])
 
 
 def delete_project(project_id: str) -> None:
     project_root = get_project_root(project_id)
-    if not project_root.exists():
+    backend = _backend()
+    in_backend = bool(backend and backend.list_keys(project_id, "strata"))
+    if not project_root.exists() and not in_backend:
         raise FileNotFoundError(str(project_root))
-    shutil.rmtree(project_root)
+    if backend:
+        backend.delete_project(_safe_project_id(project_id))
+    if project_root.exists():
+        shutil.rmtree(project_root)
+    prefix = str(project_root)
+    with _strata_cache_lock:
+        for key in [key for key in _strata_cache if Path(key).is_relative_to(prefix)]:
+            _strata_cache.pop(key)
+            _strata_text_cache.pop(key, None)
 
 
 def get_strata_path(project_id: str, strata: str) -> Path:
@@ -117,32 +197,351 @@ def _load_state_template(strata: str) -> Dict[str, Any]:
     return {}
 
 
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_strata_journal_path(project_id: str, strata: str) -> Path:
+    return _journal_path(get_strata_path(project_id, strata))
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.journal.jsonl")
+
+
+def _journal_archive_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.journal.archive.jsonl")
+
+
+def _replay_journal(path: Path, payload: Dict[str, Any], offset: int = 0) -> int:
+    """
+    Apply journal entries from `offset` to the materialized payload (in place).
+
+    Stops at an incomplete line (an append in progress in another worker, or
+    a crash mid-write) and returns the offset after the last applied entry.
+    """
+    journal = _journal_path(path)
+    try:
+        handle = open(journal, "rb")
+    except FileNotFoundError:
+        return 0
+    with handle:
+        handle.seek(offset)
+        good_offset = offset
+        for raw_line in handle:
+            try:
+                if not raw_line.endswith(b"\n"):
+                    raise ValueError("incomplete line")
+                entry = json.loads(raw_line)
+            except ValueError:
+                break
+            good_offset += len(raw_line)
+            apply_journal_entry(payload, entry)
+    return good_offset
+
+
+def _materialize(path: Path) -> Dict[str, Any]:
+    """
+    Current state of a strata: snapshot plus journal, from the cache when valid.
+
+    Caller holds the strata lock (in-process at least). The returned payload
+    is the cached object itself.
+    """
+    snapshot_signature = _file_signature(path)
+    if snapshot_signature is None:
+        raise FileNotFoundError(str(path))
+    journal_signature = _file_signature(_journal_path(path))
+    signature = (snapshot_signature, journal_signature)
+    key = str(path)
+    with _strata_cache_lock:
+        cached = _strata_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    if (
+        cached is not None
+        and cached[0][0] == snapshot_signature
+        and journal_signature is not None
+        and journal_signature[1] >= cached[3]
+    ):
+        # Same snapshot, journal appended to (e.g. by another process): replay the tail only
+        payload = cached[1]
+        offset = _replay_journal(path, payload, offset=cached[3])
+        base_seq = cached[2]
+    else:
+        payload = _read_json(path)
+        base_seq = payload.get("journal_seq", 0)
+        offset = _replay_journal(path, payload)
+    with _strata_cache_lock:
+        _strata_cache[key] = (signature, payload, base_seq, offset)
+    return payload
+
+
 def read_strata(project_id: str, strata: str) -> Dict[str, Any]:
+    backend = _backend()
+    if backend:
+        payload = backend.get(project_id, "strata", strata)
+        if payload is None:
+            raise FileNotFoundError(f"{project_id}/{strata}")
+        return payload
+    return _read_strata_file(project_id, strata)
+
+
+def _read_strata_file(project_id: str, strata: str) -> Dict[str, Any]:
     path = get_strata_path(project_id, strata)
-    if not path.exists():
-        raise FileNotFoundError(str(path))
-    return _read_json(path)
+    # Snapshots are replaced atomically and the journal is append-only, so
+    # readers only wait on this process' writers, not on other workers
+    key = str(path)
+    with strata_lock(project_id, strata).local():
+        payload = _materialize(path)
+        with _strata_cache_lock:
+            signature = _strata_cache[key][0]
+            cached_text = _strata_text_cache.get(key)
+        if cached_text is None or cached_text[0] != signature:
+            # Serialized once per change of the strata, not per read
+            cached_text = (signature, json.dumps(payload, ensure_ascii=True))
+            with _strata_cache_lock:
+                _strata_text_cache[key] = cached_text
+    return json.loads(cached_text[1])
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Replace `path` with `text` atomically (temporary file + rename).
+
+    Readers see either the previous or the new content, never a partial
+    write; the data is flushed to disk before the rename.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_snapshot(path: Path, payload: Dict[str, Any]) -> None:
+    """Atomically replace the strata file and cache what a reader would parse back."""
+    text = json.dumps(payload, indent=2, ensure_ascii=True)
+    atomic_write_text(path, text)
+    # JSON turns tuples into lists and keys into str; the journal is reset right after
+    signature = (_file_signature(path), _file_signature(_journal_path(path)))
+    with _strata_cache_lock:
+        _strata_cache[str(path)] = (signature, json.loads(text), payload.get("journal_seq", 0), 0)
+
+
+def _reset_journal(path: Path) -> None:
+    """Move journal entries (already in the snapshot) to the archive and empty the journal."""
+    journal = _journal_path(path)
+    try:
+        content = journal.read_bytes()
+    except FileNotFoundError:
+        return
+    if content and settings.STRATA_JOURNAL_ARCHIVE:
+        with open(_journal_archive_path(path), "ab") as archive:
+            archive.write(content)
+    journal.unlink(missing_ok=True)
+
+
+def _last_journal_seq(path: Path) -> int:
+    try:
+        return _materialize(path).get("journal_seq", 0)
+    except (FileNotFoundError, ValueError):
+        return 0
 
 
 def write_strata(project_id: str, strata: str, data: Dict[str, Any]) -> Dict[str, Any]:
-    path = get_strata_path(project_id, strata)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    if strata not in STRATA_FILES:
+        raise ValueError(f"Unknown strata: {strata}")
     payload = {
         "project_id": project_id,
         "strata": strata,
         "updated_at": generate_timestamp(),
         "data": data,
     }
-    _write_json(path, payload)
+    backend = _backend()
+    if backend:
+        backend.put(project_id, "strata", strata, payload)
+    else:
+        _write_strata_file(project_id, strata, payload)
     return payload
 
 
+def _write_strata_file(project_id: str, strata: str, payload: Dict[str, Any]) -> None:
+    path = get_strata_path(project_id, strata)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with strata_lock(project_id, strata):
+        # A full write supersedes pending patches: keep their seq covered by the snapshot
+        last_seq = _last_journal_seq(path)
+        _drop_torn_tail(path)
+        snapshot = dict(payload, journal_seq=last_seq) if last_seq else payload
+        _write_snapshot(path, snapshot)
+        _reset_journal(path)
+        _refresh_signature(path)
+
+
+def append_strata_patch(
+    project_id: str,
+    strata: str,
+    target_path: str,
+    patch: Any,
+) -> Dict[str, Any]:
+    """
+    Record a patch at `target_path` in the strata journal.
+
+    The patch is appended to `<strata>.journal.jsonl` and applied to the
+    cached state; the strata file itself is only rewritten when the journal
+    is compacted (STRATA_JOURNAL_MAX_ENTRIES / STRATA_JOURNAL_MAX_BYTES).
+
+    Args:
+        project_id: Project id
+        strata: Strata name (n0..n5)
+        target_path: Patch location (e.g. "n1.characters.main[0]")
+        patch: JSON-serializable patch
+
+    Returns:
+        Dict with project_id, strata, target_path, seq and updated_at
+
+    Raises:
+        FileNotFoundError: If the strata does not exist
+    """
+    backend = _backend()
+    if backend:
+        return backend.append_patch(project_id, strata, target_path, patch)
+    return _append_strata_patch_file(project_id, strata, target_path, patch)
+
+
+def _append_strata_patch_file(
+    project_id: str,
+    strata: str,
+    target_path: str,
+    patch: Any,
+) -> Dict[str, Any]:
+    path = get_strata_path(project_id, strata)
+    with strata_lock(project_id, strata):
+        payload = _materialize(path)
+        journal = _journal_path(path)
+        _drop_torn_tail(path)
+        entry = {
+            "seq": payload.get("journal_seq", 0) + 1,
+            "target_path": target_path,
+            "patch": patch,
+            "ts": generate_timestamp(),
+        }
+        line = json.dumps(entry, ensure_ascii=True) + "\n"
+        with open(journal, "a", encoding="utf-8") as handle:
+            handle.write(line)
+        # Apply the serialized form: the cache never aliases the caller's patch object
+        apply_journal_entry(payload, json.loads(line))
+        _refresh_signature(path)
+        if (
+            entry["seq"] - _snapshot_seq(path) >= settings.STRATA_JOURNAL_MAX_ENTRIES
+            or journal.stat().st_size >= settings.STRATA_JOURNAL_MAX_BYTES
+        ):
+            _compact(path, payload)
+    return {
+        "project_id": project_id,
+        "strata": strata,
+        "target_path": target_path,
+        "seq": entry["seq"],
+        "updated_at": entry["ts"],
+    }
+
+
+def compact_strata(project_id: str, strata: str) -> Dict[str, Any]:
+    """
+    Fold the journal into a new strata snapshot.
+
+    Returns:
+        Dict with strata, journal_seq and compacted (False if the journal was empty)
+    """
+    if _backend():
+        # Database backends apply patches in place (their journal is audit only)
+        return {"strata": strata, "journal_seq": None, "compacted": False}
+    path = get_strata_path(project_id, strata)
+    with strata_lock(project_id, strata):
+        payload = _materialize(path)
+        journal_signature = _file_signature(_journal_path(path))
+        compacted = bool(journal_signature and journal_signature[1])
+        if compacted:
+            _compact(path, payload)
+    return {"strata": strata, "journal_seq": payload.get("journal_seq", 0), "compacted": compacted}
+
+
+def _compact(path: Path, payload: Dict[str, Any]) -> None:
+    # Snapshot first: if interrupted, replay skips entries up to its journal_seq
+    _write_snapshot(path, payload)
+    _reset_journal(path)
+    _refresh_signature(path)
+    logger.info(f"Compacted strata journal of {path.name} at seq {payload.get('journal_seq', 0)}")
+
+
+def _drop_torn_tail(path: Path) -> None:
+    """
+    Truncate an incomplete last journal line so the next append starts clean.
+
+    Only called with the strata file lock held after `_materialize`: every
+    complete entry has been replayed, so remaining bytes were left by a crash.
+    """
+    journal = _journal_path(path)
+    with _strata_cache_lock:
+        cached = _strata_cache.get(str(path))
+    size = (_file_signature(journal) or (0, 0))[1]
+    if cached is None or size <= cached[3]:
+        return
+    logger.warning(f"Truncating torn entry at byte {cached[3]} of {journal}")
+    os.truncate(journal, cached[3])
+    _refresh_signature(path)
+
+
+def _snapshot_seq(path: Path) -> int:
+    """journal_seq stored in the strata file (entries above it live in the journal)."""
+    with _strata_cache_lock:
+        cached = _strata_cache.get(str(path))
+        return cached[2] if cached else 0
+
+
+def _refresh_signature(path: Path) -> None:
+    """Re-stamp the cached state after this process changed the files."""
+    key = str(path)
+    with _strata_cache_lock:
+        cached = _strata_cache.get(key)
+        if cached is not None:
+            journal_signature = _file_signature(_journal_path(path))
+            _strata_cache[key] = (
+                (_file_signature(path), journal_signature),
+                cached[1],
+                cached[2],
+                journal_signature[1] if journal_signature else 0,
+            )
+
+
+def clear_strata_cache() -> None:
+    """Drop all cached strata (the next reads go to disk)."""
+    with _strata_cache_lock:
+        _strata_cache.clear()
+        _strata_text_cache.clear()
+
+
 def get_ui_strata_path(project_id: str, strata: str) -> Path:
     safe_project_id = _safe_project_id(project_id)
     return get_project_dir(project_id) / f"{safe_project_id}_{strata.upper()}_UI.json"
 
 
 def read_ui_strata(project_id: str, strata: str) -> Dict[str, Any]:
+    backend = _backend()
+    if backend:
+        payload = backend.get(project_id, "ui_strata", strata)
+        if payload is None:
+            raise FileNotFoundError(f"{project_id}/{strata}_ui")
+        return payload
     path = get_ui_strata_path(project_id, strata)
     if not path.exists():
         raise FileNotFoundError(str(path))
@@ -156,7 +555,6 @@ def write_ui_strata(
     source_updated_at: str = "",
 ) -> Dict[str, Any]:
     path = get_ui_strata_path(project_id, strata)
-    path.parent.mkdir(parents=True, exist_ok=True)
     payload = {
         "project_id": project_id,
         "strata": f"{strata}_ui",
@@ -164,18 +562,28 @@ def write_ui_strata(
         "source_updated_at": source_updated_at,
         "data": data,
     }
-    _write_json(path, payload)
+    backend = _backend()
+    if backend:
+        backend.put(project_id, "ui_strata", strata, payload)
+    else:
+        with project_lock(project_id, f"ui_{strata}"):
+            _write_json(path, payload)
     return payload
 
 
 def create_project(project_id: str) -> None:
     project_dir = get_project_dir(project_id)
-    if project_dir.exists() and any(project_dir.iterdir()):
-        raise ValueError("Project already exists")
-    project_dir.mkdir(parents=True, exist_ok=True)
-    for strata in STRATA_FILES:
-        payload = _load_state_template(strata)
-        write_strata(project_id, strata, payload)
+    backend = _backend()
+    with project_lock(project_id, "project"):
+        if backend:
+            if backend.list_keys(project_id, "strata"):
+                raise ValueError("Project already exists")
+        elif project_dir.exists() and any(project_dir.iterdir()):
+            raise ValueError("Project already exists")
+        project_dir.mkdir(parents=True, exist_ok=True)
+        for strata in STRATA_FILES:
+            payload = _load_state_template(strata)
+            write_strata(project_id, strata, payload)
 
 
 def reset_strata(project_id: str, strata: str) -> Dict[str, Any]:
@@ -186,13 +594,10 @@ def reset_strata(project_id: str, strata: str) -> Dict[str, Any]:
 
 
 def _read_json(path: Path) -> Dict[str, Any]:
-    import json
-
     text = path.read_text(encoding="utf-8")
     return json.loads(text) if text else {}
 
 
 def _write_json(path: Path, data: Dict[str, Any]) -> None:
-    import json
-
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=True), encoding="utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=True))
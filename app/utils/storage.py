@@ -9,6 +9,7 @@ from typing import Optional, Dict, Any
 from urllib.parse import urlparse
 from app.config.settings import settings
 from app.utils.errors import InternalError
+from app.utils.http import PooledTransport
 from app.utils.logging import logger
 from app.utils.ids import generate_asset_id
 
@@ -16,6 +17,23 @@ from app.utils.ids import generate_asset_id
 # Default storage path
 STORAGE_ROOT = Path(__file__).parent.parent.parent / "Media"
 
+class DownloadTooLargeError(InternalError):
+    """Download above its byte cap."""
+
+
+# Keep-alive connections shared by every asset download
+_download_transport = PooledTransport("downloads", timeout=300, follow_redirects=True)
+
+
+def get_download_client() -> httpx.Client:
+    """Get the shared pooled client used for asset downloads (thread-safe)."""
+    return _download_transport.client()
+
+
+def close_download_client() -> None:
+    """Close the pooled download connections."""
+    _download_transport.close()
+
 
 def get_storage_path() -> Path:
     """Get the root storage path."""
@@ -108,15 +126,108 @@ def get_file_extension_from_url(url: str, content_type: Optional[str] = None) ->
     return '.bin'  # Generic binary
 
 
+def _unique_path(project_dir: Path, file_name: str) -> Path:
+    """First free `name`, `name_1`, `name_2`... in the directory."""
+    local_path = project_dir / file_name
+    counter = 1
+    while local_path.exists():
+        name_part = file_name.rsplit('.', 1)[0]
+        ext_part = file_name.rsplit('.', 1)[1] if '.' in file_name else ''
+        candidate = f"{name_part}_{counter}.{ext_part}" if ext_part else f"{name_part}_{counter}"
+        local_path = project_dir / candidate
+        counter += 1
+    return local_path
+
+
+def _content_range_start(response: httpx.Response) -> Optional[int]:
+    """Start offset of a `Content-Range: bytes start-end/total` header."""
+    value = response.headers.get("content-range", "")
+    try:
+        return int(value.split(" ", 1)[1].split("-", 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _expected_size(response: httpx.Response, offset: int) -> Optional[int]:
+    """Total file size announced by the response, if any."""
+    if response.status_code == 206:
+        total = response.headers.get("content-range", "").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("content-length", "")
+    return offset + int(length) if length.isdigit() else None
+
+
+def _stream_to_file(client: httpx.Client, url: str, tmp_path: Path, max_bytes: int) -> Dict[str, Any]:
+    """
+    Stream a download to `tmp_path` in constant memory, hashing on the fly.
+
+    A transfer interrupted after receiving data continues with a `Range`
+    request from the bytes already written; a server that ignores the range
+    restarts from scratch.
+
+    Returns:
+        Dict with content_type, size and sha256 of the written file
+    """
+    resume_attempts = settings.STORAGE_DOWNLOAD_RESUME_ATTEMPTS
+    hasher = hashlib.sha256()
+    written = 0
+    content_type = ""
+
+    with open(tmp_path, "wb") as handle:
+        for attempt in range(resume_attempts + 1):
+            headers = {"Range": f"bytes={written}-"} if written else {}
+            received = written
+            try:
+                with client.stream("GET", url, headers=headers) as response:
+                    response.raise_for_status()
+                    if written and (response.status_code != 206 or _content_range_start(response) != written):
+                        logger.warning(f"Range not honored for {url}, restarting download")
+                        handle.seek(0)
+                        handle.truncate()
+                        hasher = hashlib.sha256()
+                        written = 0
+                    content_type = content_type or response.headers.get("content-type", "")
+
+                    expected = _expected_size(response, written)
+                    if max_bytes and expected and expected > max_bytes:
+                        raise DownloadTooLargeError(f"File too large: {expected} bytes (max {max_bytes})")
+
+                    # Chunks as received: nothing read is held back if the transfer drops
+                    for chunk in response.iter_bytes():
+                        written += len(chunk)
+                        if max_bytes and written > max_bytes:
+                            raise DownloadTooLargeError(f"File too large: exceeds {max_bytes} bytes")
+                        handle.write(chunk)
+                        hasher.update(chunk)
+                break
+            except httpx.TransportError as e:
+                # Only resume transfers that were making progress
+                if attempt == resume_attempts or written <= received:
+                    raise
+                logger.warning(
+                    f"Download of {url} interrupted at {written} bytes "
+                    f"(attempt {attempt + 1}/{resume_attempts + 1}), resuming: {e}"
+                )
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    return {"content_type": content_type, "size": written, "sha256": hasher.hexdigest()}
+
+
 def download_file(
     url: str,
     project_name: str,
     asset_type: str,
     asset_id: Optional[str] = None,
-    filename: Optional[str] = None
+    filename: Optional[str] = None,
+    max_bytes: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Download a file from URL and save it to project directory.
+
+    The body is streamed to a temporary file (constant memory, resumed with
+    `Range` requests after an interruption) and renamed into place once
+    complete, so a partial download never shows up under /assets.
     
     Args:
         url: URL of the file to download
@@ -124,6 +235,7 @@ def download_file(
         asset_type: Type of asset (image, video, audio)
         asset_id: Optional asset ID (used in filename if provided)
         filename: Optional custom filename (without extension)
+        max_bytes: Maximum file size (default: settings.STORAGE_DOWNLOAD_MAX_BYTES, 0 = no limit)
     
     Returns:
         Dict with:
@@ -131,65 +243,62 @@ def download_file(
             - url: Local URL path (relative to storage root)
             - filename: Name of the saved file
             - size: File size in bytes
+            - sha256: Hex digest of the file content
     """
     if not url or url == "pending":
         raise ValueError("Invalid URL provided")
+    if max_bytes is None:
+        max_bytes = settings.STORAGE_DOWNLOAD_MAX_BYTES
     
     logger.info(f"Downloading {asset_type} from {url} for project '{project_name}'")
     
+    tmp_path: Optional[Path] = None
     try:
         # Ensure project directory exists
         project_dir = ensure_project_directory(project_name, asset_type)
+        tmp_path = project_dir / f".{generate_asset_id()}.part"
         
         # Download file
-        with httpx.Client(timeout=300, follow_redirects=True) as client:
-            response = client.get(url)
-            response.raise_for_status()
-            
-            # Get content type
-            content_type = response.headers.get("content-type", "")
-            
-            # Determine filename
-            if filename:
-                file_ext = get_file_extension_from_url(url, content_type)
-                file_name = f"{filename}{file_ext}"
-            elif asset_id:
-                file_ext = get_file_extension_from_url(url, content_type)
-                file_name = f"{asset_id}{file_ext}"
-            else:
-                # Generate filename from URL hash
-                url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
-                file_ext = get_file_extension_from_url(url, content_type)
-                file_name = f"{url_hash}{file_ext}"
-            
-            # Ensure unique filename
-            local_path = project_dir / file_name
-            counter = 1
-            while local_path.exists():
-                name_part = file_name.rsplit('.', 1)[0]
-                ext_part = file_name.rsplit('.', 1)[1] if '.' in file_name else ''
-                file_name = f"{name_part}_{counter}.{ext_part}" if ext_part else f"{name_part}_{counter}"
-                local_path = project_dir / file_name
-                counter += 1
-            
-            # Save file
-            local_path.write_bytes(response.content)
-            file_size = local_path.stat().st_size
-            
-            # Generate relative URL path
-            storage_root = get_storage_path()
-            relative_path = local_path.relative_to(storage_root)
-            url_path = f"/assets/{relative_path.as_posix()}"
-            
-            logger.info(f"Downloaded {asset_type} to {local_path} ({file_size} bytes)")
-            
-            return {
-                "local_path": str(local_path),
-                "url": url_path,
-                "filename": file_name,
-                "size": file_size,
-                "content_type": content_type
-            }
+        download = _stream_to_file(get_download_client(), url, tmp_path, max_bytes)
+        content_type = download["content_type"]
+        
+        # Determine filename
+        file_ext = get_file_extension_from_url(url, content_type)
+        if filename:
+            file_name = f"{filename}{file_ext}"
+        elif asset_id:
+            file_name = f"{asset_id}{file_ext}"
+        else:
+            # Generate filename from URL hash
+            url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
+            file_name = f"{url_hash}{file_ext}"
+        
+        # Ensure unique filename, then move the complete file into place
+        local_path = _unique_path(project_dir, file_name)
+        file_name = local_path.name
+        os.replace(tmp_path, local_path)
+        tmp_path = None
+        file_size = download["size"]
+        
+        # Generate relative URL path
+        storage_root = get_storage_path()
+        relative_path = local_path.relative_to(storage_root)
+        url_path = f"/assets/{relative_path.as_posix()}"
+
+        # Identical bytes are stored once (the file becomes a hardlink to the blob)
+        from app.utils.blob_store import adopt_file
+        adopt_file(local_path, asset_id or relative_path.as_posix(), download["sha256"])
+        
+        logger.info(f"Downloaded {asset_type} to {local_path} ({file_size} bytes)")
+        
+        return {
+            "local_path": str(local_path),
+            "url": url_path,
+            "filename": file_name,
+            "size": file_size,
+            "sha256": download["sha256"],
+            "content_type": content_type
+        }
     
     except httpx.HTTPError as e:
         logger.error(f"HTTP error downloading {url}: {e}")
@@ -197,6 +306,9 @@ def download_file(
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}", exc_info=True)
         raise InternalError(f"Failed to download file: {str(e)}")
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
 
 
 def get_asset_url(project_name: str, asset_type: str, filename: str) -> str:
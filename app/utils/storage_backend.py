@@ -0,0 +1,674 @@
+"""
+Storage backends for project state documents.
+
+Project state is a set of JSON documents addressed by (project, kind, key):
+strata and UI strata (key = n0..n5), chat sessions, edit sessions and state
+snapshots (key = session id) and the RAG conversation metadata (key =
+"rag_meta"). Chat messages are append-only logs (`append_log` / `read_log`)
+next to their session document, so a new message costs O(1) I/O whatever
+the session length. `STORAGE_BACKEND` selects where they live:
+
+- `file` (default): the historical layout of JSON files under
+  `data/<project>/metadata` and `data/<project>/chat_states`, with the strata
+  cache and patch journal of `project_storage`. Logs are JSONL files with a
+  small index sidecar (entry count and a byte offset every LOG_INDEX_STRIDE
+  entries) for tail reads and paging without scanning the log.
+- `sqlite`: one embedded SQLite database in WAL mode
+  (`data/_system/narrations.sqlite3`), indexed by project, with patches
+  applied transactionally and recorded in a `strata_journal` audit table,
+  and log entries as rows of a `logs` table.
+
+`python -m app.utils.storage_tools` migrates between backends and benchmarks
+them. Media files and run logs stay on disk with either backend.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from app.config.settings import settings
+from app.utils import project_storage
+from app.utils.ids import generate_timestamp
+from app.utils.logging import logger
+from app.utils.strata_patch import apply_journal_entry
+
+
+DOCUMENT_KINDS = (
+    "strata",
+    "ui_strata",
+    "chat_session",
+    "chat_edit",
+    "chat_state",
+    "chat_output_state",
+    "rag_meta",
+)
+
+# Append-only logs, keyed like the documents of the kind they belong to
+LOG_KINDS = ("chat_messages",)
+
+RAG_META_KEY = "rag_meta"
+
+LOG_INDEX_STRIDE = 64  # Entries between two byte offsets in a file log index
+
+SQLITE_FILE = "narrations.sqlite3"
+
+
+def _check_kind(kind: str) -> None:
+    if kind not in DOCUMENT_KINDS:
+        raise ValueError(f"Unknown document kind: {kind}")
+
+
+def _check_log_kind(kind: str) -> None:
+    if kind not in LOG_KINDS:
+        raise ValueError(f"Unknown log kind: {kind}")
+
+
+def _log_window(length: int, offset: int, limit: Optional[int]) -> tuple:
+    """[start, end) of a log read; a negative offset counts from the end."""
+    start = max(length + offset, 0) if offset < 0 else min(offset, length)
+    end = length if limit is None else min(length, start + max(limit, 0))
+    return start, end
+
+
+class StorageBackend(ABC):
+    """JSON documents addressed by (project, kind, key)."""
+
+    name: str = ""
+
+    @abstractmethod
+    def get(self, project_id: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Document, or None if missing. The caller owns the returned object."""
+
+    @abstractmethod
+    def put(self, project_id: str, kind: str, key: str, payload: Dict[str, Any]) -> None:
+        """Create or replace a document."""
+
+    @abstractmethod
+    def delete(self, project_id: str, kind: str, key: str) -> bool:
+        """Remove a document; False if it did not exist."""
+
+    @abstractmethod
+    def list_keys(self, project_id: str, kind: str) -> List[str]:
+        """Keys of a project's documents of one kind, sorted."""
+
+    @abstractmethod
+    def list_projects(self) -> List[str]:
+        """Projects with at least one document, sorted."""
+
+    @abstractmethod
+    def delete_project(self, project_id: str) -> None:
+        """Remove every document of a project."""
+
+    @abstractmethod
+    def append_patch(self, project_id: str, strata: str, target_path: str, patch: Any) -> Dict[str, Any]:
+        """
+        Apply a writer patch to a strata and record it.
+
+        Returns:
+            Dict with project_id, strata, target_path, seq and updated_at
+
+        Raises:
+            FileNotFoundError: If the strata does not exist
+        """
+
+    @abstractmethod
+    def append_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> int:
+        """Append JSON entries to a log; returns the new log length."""
+
+    @abstractmethod
+    def read_log(
+        self,
+        project_id: str,
+        kind: str,
+        key: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Entries of a log, oldest first.
+
+        Args:
+            offset: First entry (negative: counted from the end, -N = last N)
+            limit: Maximum number of entries (None: up to the end)
+        """
+
+    @abstractmethod
+    def log_length(self, project_id: str, kind: str, key: str) -> int:
+        """Number of entries in a log (0 if missing)."""
+
+    @abstractmethod
+    def replace_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> None:
+        """Rewrite a log with `entries`."""
+
+    def close(self) -> None:
+        """Release resources (connections)."""
+
+
+# ---------------------------------------------
+# File layout
+# ---------------------------------------------
+
+def file_document_path(project_id: str, kind: str, key: str) -> Path:
+    """Path of a document in the file layout."""
+    _check_kind(kind)
+    if kind == "strata":
+        return project_storage.get_strata_path(project_id, key)
+    if kind == "ui_strata":
+        return project_storage.get_ui_strata_path(project_id, key)
+    if kind == "rag_meta":
+        safe_project = project_storage._safe_project_id(project_id)
+        return project_storage.get_project_dir(project_id) / f"{safe_project}_RAG_META.json"
+    chat_dir = project_storage.get_project_root(project_id) / "chat_states"
+    if kind == "chat_edit":
+        return chat_dir / f"edit_{key}.json"
+    if kind == "chat_state":
+        return chat_dir / f"{key}_state.json"
+    if kind == "chat_output_state":
+        return chat_dir / f"output_{key}_state.json"
+    return chat_dir / f"{key}.json"
+
+
+def file_log_path(project_id: str, kind: str, key: str) -> Path:
+    """Path of a log in the file layout (its index sits next to it)."""
+    _check_log_kind(kind)
+    return project_storage.get_project_root(project_id) / "chat_states" / f"{key}.messages.jsonl"
+
+
+def _log_index_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.index")
+
+
+def _chat_kind(filename: str) -> Optional[tuple]:
+    """(kind, key) of a chat_states file name."""
+    if not filename.endswith(".json"):
+        return None
+    stem = filename[: -len(".json")]
+    if stem.startswith("edit_"):
+        return "chat_edit", stem[len("edit_"):]
+    if stem.startswith("output_") and stem.endswith("_state"):
+        return "chat_output_state", stem[len("output_"): -len("_state")]
+    if stem.endswith("_state"):
+        return "chat_state", stem[: -len("_state")]
+    return "chat_session", stem
+
+
+class FileBackend(StorageBackend):
+    """JSON files under data/<project> (the default layout)."""
+
+    name = "file"
+
+    def get(self, project_id: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        _check_kind(kind)
+        try:
+            if kind == "strata":
+                return project_storage._read_strata_file(project_id, key)
+            path = file_document_path(project_id, kind, key)
+            if not path.exists():
+                return None
+            return project_storage._read_json(path)
+        except FileNotFoundError:
+            return None
+
+    def put(self, project_id: str, kind: str, key: str, payload: Dict[str, Any]) -> None:
+        _check_kind(kind)
+        if kind == "strata":
+            project_storage._write_strata_file(project_id, key, payload)
+        else:
+            project_storage._write_json(file_document_path(project_id, kind, key), payload)
+
+    def delete(self, project_id: str, kind: str, key: str) -> bool:
+        path = file_document_path(project_id, kind, key)
+        if not path.exists():
+            return False
+        path.unlink(missing_ok=True)
+        return True
+
+    def list_keys(self, project_id: str, kind: str) -> List[str]:
+        _check_kind(kind)
+        if kind in ("strata", "ui_strata"):
+            return [
+                strata for strata in project_storage.STRATA_FILES
+                if file_document_path(project_id, kind, strata).exists()
+            ]
+        if kind == "rag_meta":
+            return [RAG_META_KEY] if file_document_path(project_id, kind, RAG_META_KEY).exists() else []
+        chat_dir = project_storage.get_project_root(project_id) / "chat_states"
+        if not chat_dir.exists():
+            return []
+        keys = []
+        for path in chat_dir.iterdir():
+            parsed = _chat_kind(path.name)
+            if parsed and parsed[0] == kind:
+                keys.append(parsed[1])
+        return sorted(keys)
+
+    def list_projects(self) -> List[str]:
+        data_root = project_storage.get_data_root()
+        if not data_root.exists():
+            return []
+        return sorted(
+            entry.name for entry in data_root.iterdir()
+            if entry.is_dir() and not entry.name.startswith("_") and (entry / "metadata").is_dir()
+        )
+
+    def delete_project(self, project_id: str) -> None:
+        root = project_storage.get_project_root(project_id)
+        for directory in (root / "metadata", root / "chat_states"):
+            if directory.exists():
+                shutil.rmtree(directory)
+        project_storage.clear_strata_cache()
+
+    def append_patch(self, project_id: str, strata: str, target_path: str, patch: Any) -> Dict[str, Any]:
+        return project_storage._append_strata_patch_file(project_id, strata, target_path, patch)
+
+    # Logs: <key>.messages.jsonl plus <key>.messages.jsonl.index, the index being
+    # {"count", "size", "offsets"} with offsets[i] = byte offset of entry i * LOG_INDEX_STRIDE.
+    # Entries past the indexed size are ignored by readers (an append in
+    # progress) and re-indexed, or truncated if torn, by the next writer.
+
+    def _log_lock(self, project_id: str, kind: str, key: str):
+        return project_storage.project_lock(project_id, f"log_{kind}_{key}")
+
+    @staticmethod
+    def _empty_index() -> Dict[str, Any]:
+        return {"count": 0, "size": 0, "offsets": []}
+
+    def _load_index(self, path: Path) -> Dict[str, Any]:
+        """Index of a log, rebuilt in memory if missing or behind a rewrite."""
+        size = path.stat().st_size if path.exists() else 0
+        try:
+            index = json.loads(_log_index_path(path).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            index = None
+        if not isinstance(index, dict) or index.get("size", 0) > size:
+            index = self._scan_log(path, self._empty_index())
+        return index
+
+    @staticmethod
+    def _scan_log(path: Path, index: Dict[str, Any]) -> Dict[str, Any]:
+        """Extend `index` with the complete entries written after its size."""
+        index = dict(index, offsets=list(index["offsets"]))
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return index
+        with handle:
+            handle.seek(index["size"])
+            for raw_line in handle:
+                if not raw_line.endswith(b"\n"):
+                    break
+                if index["count"] % LOG_INDEX_STRIDE == 0:
+                    index["offsets"].append(index["size"])
+                index["count"] += 1
+                index["size"] += len(raw_line)
+        return index
+
+    def append_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> int:
+        path = file_log_path(project_id, kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._log_lock(project_id, kind, key):
+            index = self._load_index(path)
+            size = path.stat().st_size if path.exists() else 0
+            if size > index["size"]:
+                # Interrupted writer: keep its complete entries, drop a torn one
+                index = self._scan_log(path, index)
+                if size > index["size"]:
+                    logger.warning(f"Truncating torn entry at byte {index['size']} of {path}")
+                    os.truncate(path, index["size"])
+            lines = []
+            for entry in entries:
+                if index["count"] % LOG_INDEX_STRIDE == 0:
+                    index["offsets"].append(index["size"] + sum(len(line) for line in lines))
+                lines.append((json.dumps(entry, ensure_ascii=True) + "\n").encode("utf-8"))
+                index["count"] += 1
+            with open(path, "ab") as handle:
+                handle.write(b"".join(lines))
+            index["size"] += sum(len(line) for line in lines)
+            project_storage.atomic_write_text(_log_index_path(path), json.dumps(index))
+            return index["count"]
+
+    def read_log(
+        self,
+        project_id: str,
+        kind: str,
+        key: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        path = file_log_path(project_id, kind, key)
+        with self._log_lock(project_id, kind, key).local():
+            index = self._load_index(path)
+            start, end = _log_window(index["count"], offset, limit)
+            if start >= end:
+                return []
+            position = (start // LOG_INDEX_STRIDE) * LOG_INDEX_STRIDE
+            entries = []
+            with open(path, "rb") as handle:
+                handle.seek(index["offsets"][start // LOG_INDEX_STRIDE])
+                for raw_line in handle:
+                    if position >= end:
+                        break
+                    if position >= start:
+                        entries.append(json.loads(raw_line))
+                    position += 1
+        return entries
+
+    def log_length(self, project_id: str, kind: str, key: str) -> int:
+        return self._load_index(file_log_path(project_id, kind, key))["count"]
+
+    def replace_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> None:
+        path = file_log_path(project_id, kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = "".join(json.dumps(entry, ensure_ascii=True) + "\n" for entry in entries)
+        with self._log_lock(project_id, kind, key):
+            project_storage.atomic_write_text(path, text)
+            index = self._scan_log(path, self._empty_index())
+            project_storage.atomic_write_text(_log_index_path(path), json.dumps(index))
+
+
+# ---------------------------------------------
+# SQLite
+# ---------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    project_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (project_id, kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS strata_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id TEXT NOT NULL,
+    strata TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    target_path TEXT NOT NULL,
+    patch TEXT NOT NULL,
+    ts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS strata_journal_by_strata ON strata_journal (project_id, strata, seq);
+CREATE TABLE IF NOT EXISTS logs (
+    project_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (project_id, kind, key, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """Documents in one SQLite database (WAL mode, one connection per thread)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Database file (default: settings.STORAGE_SQLITE_PATH or data/_system/narrations.sqlite3)
+        """
+        self.path = Path(path) if path else sqlite_path()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction (takes the database write lock up front)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _project(project_id: str) -> str:
+        return project_storage._safe_project_id(project_id)
+
+    def get(self, project_id: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        _check_kind(kind)
+        row = self._connection().execute(
+            "SELECT payload FROM documents WHERE project_id = ? AND kind = ? AND key = ?",
+            (self._project(project_id), kind, key),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, project_id: str, kind: str, key: str, payload: Dict[str, Any]) -> None:
+        _check_kind(kind)
+        with self._transaction() as conn:
+            self._put(conn, project_id, kind, key, payload)
+
+    def _put(self, conn: sqlite3.Connection, project_id: str, kind: str, key: str, payload: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO documents (project_id, kind, key, payload, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (project_id, kind, key) DO UPDATE SET payload = excluded.payload, "
+            "updated_at = excluded.updated_at",
+            (
+                self._project(project_id),
+                kind,
+                key,
+                json.dumps(payload, ensure_ascii=True, separators=(",", ":")),
+                generate_timestamp(),
+            ),
+        )
+
+    def delete(self, project_id: str, kind: str, key: str) -> bool:
+        _check_kind(kind)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM documents WHERE project_id = ? AND kind = ? AND key = ?",
+                (self._project(project_id), kind, key),
+            )
+        return cursor.rowcount > 0
+
+    def list_keys(self, project_id: str, kind: str) -> List[str]:
+        _check_kind(kind)
+        rows = self._connection().execute(
+            "SELECT key FROM documents WHERE project_id = ? AND kind = ? ORDER BY key",
+            (self._project(project_id), kind),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def list_projects(self) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT DISTINCT project_id FROM documents ORDER BY project_id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_project(self, project_id: str) -> None:
+        project = self._project(project_id)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM documents WHERE project_id = ?", (project,))
+            conn.execute("DELETE FROM strata_journal WHERE project_id = ?", (project,))
+            conn.execute("DELETE FROM logs WHERE project_id = ?", (project,))
+
+    def append_patch(self, project_id: str, strata: str, target_path: str, patch: Any) -> Dict[str, Any]:
+        project = self._project(project_id)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT payload FROM documents WHERE project_id = ? AND kind = 'strata' AND key = ?",
+                (project, strata),
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"{project_id}/{strata}")
+            payload = json.loads(row[0])
+            patch_text = json.dumps(patch, ensure_ascii=True)
+            entry = {
+                "seq": payload.get("journal_seq", 0) + 1,
+                "target_path": target_path,
+                "patch": json.loads(patch_text),
+                "ts": generate_timestamp(),
+            }
+            apply_journal_entry(payload, entry)
+            self._put(conn, project_id, "strata", strata, payload)
+            conn.execute(
+                "INSERT INTO strata_journal (project_id, strata, seq, target_path, patch, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (project, strata, entry["seq"], target_path, patch_text, entry["ts"]),
+            )
+        return {
+            "project_id": project_id,
+            "strata": strata,
+            "target_path": target_path,
+            "seq": entry["seq"],
+            "updated_at": entry["ts"],
+        }
+
+    def journal(self, project_id: str, strata: str) -> List[Dict[str, Any]]:
+        """Recorded patches of a strata, oldest first."""
+        rows = self._connection().execute(
+            "SELECT seq, target_path, patch, ts FROM strata_journal "
+            "WHERE project_id = ? AND strata = ? ORDER BY seq",
+            (self._project(project_id), strata),
+        ).fetchall()
+        return [
+            {"seq": seq, "target_path": target_path, "patch": json.loads(patch), "ts": ts}
+            for seq, target_path, patch, ts in rows
+        ]
+
+    def _log_length(self, conn: sqlite3.Connection, project_id: str, kind: str, key: str) -> int:
+        row = conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM logs WHERE project_id = ? AND kind = ? AND key = ?",
+            (self._project(project_id), kind, key),
+        ).fetchone()
+        return row[0]
+
+    def _insert_log(
+        self, conn: sqlite3.Connection, project_id: str, kind: str, key: str, first_seq: int, entries: List[Any]
+    ) -> None:
+        project = self._project(project_id)
+        conn.executemany(
+            "INSERT INTO logs (project_id, kind, key, seq, entry) VALUES (?, ?, ?, ?, ?)",
+            [
+                (project, kind, key, first_seq + index, json.dumps(entry, ensure_ascii=True))
+                for index, entry in enumerate(entries)
+            ],
+        )
+
+    def append_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> int:
+        _check_log_kind(kind)
+        with self._transaction() as conn:
+            length = self._log_length(conn, project_id, kind, key)
+            self._insert_log(conn, project_id, kind, key, length, entries)
+        return length + len(entries)
+
+    def read_log(
+        self,
+        project_id: str,
+        kind: str,
+        key: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        _check_log_kind(kind)
+        params = (self._project(project_id), kind, key)
+        conn = self._connection()
+        if offset < 0:
+            # Tail: newest first in one statement, so concurrent appends cannot shift the window
+            rows = conn.execute(
+                "SELECT entry FROM logs WHERE project_id = ? AND kind = ? AND key = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                params + (-offset,),
+            ).fetchall()
+            entries = [json.loads(row[0]) for row in reversed(rows)]
+            return entries if limit is None else entries[: max(limit, 0)]
+        rows = conn.execute(
+            "SELECT entry FROM logs WHERE project_id = ? AND kind = ? AND key = ? AND seq >= ? "
+            "ORDER BY seq LIMIT ?",
+            params + (offset, -1 if limit is None else max(limit, 0)),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def log_length(self, project_id: str, kind: str, key: str) -> int:
+        _check_log_kind(kind)
+        return self._log_length(self._connection(), project_id, kind, key)
+
+    def replace_log(self, project_id: str, kind: str, key: str, entries: List[Any]) -> None:
+        _check_log_kind(kind)
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM logs WHERE project_id = ? AND kind = ? AND key = ?",
+                (self._project(project_id), kind, key),
+            )
+            self._insert_log(conn, project_id, kind, key, 0, entries)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+def sqlite_path() -> Path:
+    if settings.STORAGE_SQLITE_PATH:
+        return Path(settings.STORAGE_SQLITE_PATH)
+    return project_storage.get_data_root() / "_system" / SQLITE_FILE
+
+
+# Global backend instance
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str, path: Optional[Path] = None) -> StorageBackend:
+    """New backend instance by name ("file" or "sqlite")."""
+    if name == "file":
+        return FileBackend()
+    if name == "sqlite":
+        return SQLiteBackend(path)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_storage_backend() -> StorageBackend:
+    """Get the backend selected by settings.STORAGE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        name = settings.STORAGE_BACKEND
+        stale = (
+            _backend is None
+            or _backend.name != name
+            or (isinstance(_backend, SQLiteBackend) and _backend.path != sqlite_path())
+        )
+        if stale:
+            if _backend is not None:
+                _backend.close()
+            _backend = create_backend(name)
+            logger.info(f"Using {name} storage backend")
+        return _backend
+
+
+def close_storage_backend() -> None:
+    """Close the backend connections, if any."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
@@ -0,0 +1,195 @@
+"""Migrate project state between storage backends and benchmark them.
+
+Usage examples:
+  python -m app.utils.storage_tools migrate --from file --to sqlite
+  python -m app.utils.storage_tools migrate --from file --to sqlite --project my_project
+  python -m app.utils.storage_tools bench --projects 50 --reads 20 --patches 20
+
+After migrating, set STORAGE_BACKEND=sqlite. The source is left untouched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config.settings import settings
+from app.utils import project_storage
+from app.utils.ids import generate_timestamp
+from app.utils.storage_backend import DOCUMENT_KINDS, LOG_KINDS, SQLITE_FILE, StorageBackend, create_backend
+
+
+def migrate_storage(
+    source: StorageBackend,
+    target: StorageBackend,
+    project_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Copy every document of the selected projects from `source` to `target`.
+
+    Strata are copied as their current state (a file journal is folded in).
+    Logs (chat messages) are copied for every chat session.
+
+    Args:
+        source: Backend to read
+        target: Backend to write (existing documents are replaced)
+        project_ids: Projects to copy (default: all projects of the source)
+
+    Returns:
+        Dict with projects, documents and per-kind counts
+    """
+    projects = project_ids or source.list_projects()
+    counts = {kind: 0 for kind in DOCUMENT_KINDS + LOG_KINDS}
+    for project_id in projects:
+        for kind in DOCUMENT_KINDS:
+            for key in source.list_keys(project_id, kind):
+                payload = source.get(project_id, kind, key)
+                if payload is None:
+                    continue
+                target.put(project_id, kind, key, payload)
+                counts[kind] += 1
+        for key in source.list_keys(project_id, "chat_session"):
+            for kind in LOG_KINDS:
+                entries = source.read_log(project_id, kind, key)
+                if entries:
+                    target.replace_log(project_id, kind, key, entries)
+                    counts[kind] += 1
+    return {"projects": len(projects), "documents": sum(counts.values()), "by_kind": counts}
+
+
+@contextmanager
+def _data_root(path: Path) -> Iterator[None]:
+    """Point the file layout at a scratch directory."""
+    previous = settings.DATA_PATH
+    settings.DATA_PATH = str(path)
+    project_storage.clear_strata_cache()
+    try:
+        yield
+    finally:
+        settings.DATA_PATH = previous
+        project_storage.clear_strata_cache()
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def benchmark_backends(
+    projects: int = 20,
+    reads: int = 10,
+    patches: int = 10,
+    backends: tuple = ("file", "sqlite"),
+) -> Dict[str, Any]:
+    """
+    Time the same workload on each backend, in a scratch data directory.
+
+    Workload per backend: create `projects` projects (six strata each),
+    read every strata `reads` times (cold first pass, then warm), append
+    `patches` writer patches per project, list projects, and append 20 chat
+    messages (one turn at a time) then read the last 10, per project.
+
+    Returns:
+        Dict of backend name -> {operation: milliseconds}
+    """
+    project_ids = [f"bench_{index:04d}" for index in range(projects)]
+    results: Dict[str, Any] = {}
+    for name in backends:
+        with tempfile.TemporaryDirectory() as tmp_dir, _data_root(Path(tmp_dir)):
+            backend = create_backend(name, Path(tmp_dir) / "_system" / SQLITE_FILE)
+            try:
+                template = {
+                    strata: {
+                        "strata": strata,
+                        "updated_at": generate_timestamp(),
+                        "data": project_storage._load_state_template(strata),
+                    }
+                    for strata in project_storage.STRATA_FILES
+                }
+
+                def create() -> None:
+                    for project_id in project_ids:
+                        for strata, payload in template.items():
+                            backend.put(project_id, "strata", strata, dict(payload, project_id=project_id))
+
+                def read() -> None:
+                    for project_id in project_ids:
+                        for strata in project_storage.STRATA_FILES:
+                            backend.get(project_id, "strata", strata)
+
+                def append() -> None:
+                    for project_id in project_ids:
+                        for index in range(patches):
+                            backend.append_patch(project_id, "n0", "n0.bench_note", f"note {index}")
+
+                def chat() -> None:
+                    for project_id in project_ids:
+                        for index in range(0, 20, 2):
+                            turn = [
+                                {"role": "user", "content": f"message {index}"},
+                                {"role": "assistant", "content": f"message {index + 1}"},
+                            ]
+                            backend.append_log(project_id, "chat_messages", "bench", turn)
+                        backend.read_log(project_id, "chat_messages", "bench", offset=-10)
+
+                timings = {"create": _timed(create)}
+                project_storage.clear_strata_cache()
+                timings["read_cold"] = _timed(read)
+                timings["read_warm"] = sum(_timed(read) for _ in range(max(reads - 1, 0)))
+                timings["append_patch"] = _timed(append)
+                timings["list_projects"] = _timed(backend.list_projects)
+                timings["chat_append_tail"] = _timed(chat)
+            finally:
+                backend.close()
+        results[name] = {operation: round(seconds * 1000, 2) for operation, seconds in timings.items()}
+    return {
+        "projects": projects,
+        "reads_per_strata": reads,
+        "patches_per_project": patches,
+        "measured_at": generate_timestamp(),
+        "milliseconds": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Project storage backend tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Copy project state between backends")
+    migrate.add_argument("--from", dest="source", default="file", choices=["file", "sqlite"])
+    migrate.add_argument("--to", dest="target", default="sqlite", choices=["file", "sqlite"])
+    migrate.add_argument("--project", action="append", default=None, help="Project id (repeatable)")
+    migrate.add_argument("--sqlite-path", default=None, help="Database file (default: STORAGE_SQLITE_PATH)")
+
+    bench = subparsers.add_parser("bench", help="Compare backends on a synthetic workload")
+    bench.add_argument("--projects", type=int, default=20)
+    bench.add_argument("--reads", type=int, default=10)
+    bench.add_argument("--patches", type=int, default=10)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        if args.source == args.target:
+            parser.error("--from and --to must differ")
+        sqlite_path = Path(args.sqlite_path) if args.sqlite_path else None
+        source = create_backend(args.source, sqlite_path)
+        target = create_backend(args.target, sqlite_path)
+        try:
+            result = migrate_storage(source, target, args.project)
+        finally:
+            source.close()
+            target.close()
+        result.update({"from": args.source, "to": args.target})
+    else:
+        result = benchmark_backends(args.projects, args.reads, args.patches)
+    print(json.dumps(result, indent=2, ensure_ascii=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""
+Target-path patches on strata data.
+
+A target path is `<strata>.<key>[<index>]...` (e.g. `n1.characters.main[0]`);
+`apply_patch` merges a patch at that location, creating intermediate
+containers as needed. Shared by the writer's state merger and the strata
+journal replay.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple, Union
+
+PathSegment = Union[str, int]
+
+
+def parse_target_path(target_path: str) -> Tuple[str, List[PathSegment]]:
+    parts = target_path.split(".")
+    if not parts:
+        return "", []
+    strata = parts[0].strip().lower()
+    segments: List[PathSegment] = []
+    for part in parts[1:]:
+        segments.extend(_parse_part(part))
+    return strata, segments
+
+
+def _parse_part(part: str) -> List[PathSegment]:
+    segments: List[PathSegment] = []
+    remaining = part
+    while remaining:
+        if "[" in remaining:
+            before, rest = remaining.split("[", 1)
+            if before:
+                segments.append(before)
+            if "]" not in rest:
+                if rest:
+                    segments.append(rest)
+                break
+            index_str, remaining = rest.split("]", 1)
+            if index_str.isdigit():
+                segments.append(int(index_str))
+            elif index_str:
+                segments.append(index_str)
+        else:
+            segments.append(remaining)
+            break
+    return segments
+
+
+def apply_patch(data: dict, path: List[PathSegment], patch: Any) -> dict:
+    if not path:
+        if isinstance(data, dict) and isinstance(patch, dict):
+            return _deep_merge(data, patch)
+        return patch if isinstance(patch, dict) else data
+
+    current: Any = data
+    parent: Any = None
+    parent_key: PathSegment | None = None
+
+    for idx, segment in enumerate(path[:-1]):
+        next_segment = path[idx + 1]
+        if isinstance(segment, str):
+            if not isinstance(current, dict):
+                current = _replace_container(parent, parent_key, {})
+            if segment not in current or current[segment] is None:
+                current[segment] = [] if isinstance(next_segment, int) else {}
+            parent, parent_key = current, segment
+            current = current[segment]
+        else:
+            if not isinstance(current, list):
+                current = _replace_container(parent, parent_key, [])
+            while len(current) <= segment:
+                current.append({} if isinstance(next_segment, str) else [])
+            parent, parent_key = current, segment
+            current = current[segment]
+
+    last = path[-1]
+    if isinstance(last, str):
+        if not isinstance(current, dict):
+            current = _replace_container(parent, parent_key, {})
+        if isinstance(patch, dict) and len(patch) == 1 and last in patch:
+            current[last] = _merge_value(current.get(last), patch.get(last))
+        else:
+            current[last] = _merge_value(current.get(last), patch)
+    else:
+        if not isinstance(current, list):
+            current = _replace_container(parent, parent_key, [])
+        while len(current) <= last:
+            current.append(None)
+        current[last] = _merge_value(current[last], patch)
+
+    return data
+
+
+def _replace_container(parent: Any, key: PathSegment | None, container: Any) -> Any:
+    if parent is None:
+        return container
+    if isinstance(parent, dict):
+        parent[key] = container
+    else:
+        parent[key] = container
+    return container
+
+
+def _merge_value(existing: Any, patch: Any) -> Any:
+    if isinstance(existing, dict) and isinstance(patch, dict):
+        return _deep_merge(existing, patch)
+    return patch
+
+
+def _deep_merge(base: dict, patch: dict) -> dict:
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def apply_journal_entry(payload: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Apply a strata journal entry (seq, target_path, patch, ts) to a strata payload in place."""
+    seq = entry.get("seq", 0)
+    if seq <= payload.get("journal_seq", 0):
+        # Already folded into the snapshot (compaction interrupted before truncating)
+        return
+    _, segments = parse_target_path(entry["target_path"])
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        data = {}
+    payload["data"] = apply_patch(data, segments, entry.get("patch"))
+    payload["updated_at"] = entry.get("ts") or payload.get("updated_at")
+    payload["journal_seq"] = seq
@@ -0,0 +1,288 @@
+"""
+Persistent background queue for SFTP uploads.
+
+With `FTP_BACKGROUND_UPLOADS`, generation responses return the local
+`/assets` link right away (tagged with an `upload_id`) and the upload runs
+on worker threads sharing the SFTP session pool. Every upload is persisted
+under `data/_system/uploads`, retried with backoff on failure and picked up
+again after a restart. Once it lands, `apply_uploaded_urls` upgrades stored
+results (background job records, cache hits) to the FTP URL.
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.utils.ftp_storage import sftp_upload
+from app.utils.ids import generate_job_id, generate_timestamp
+from app.utils.logging import logger
+from app.utils.project_storage import get_data_root
+
+
+PENDING_STATUSES = {"queued", "retrying"}
+ACTIVE_STATUSES = PENDING_STATUSES | {"uploading"}
+
+# Uploaded/failed records older than this are dropped at startup
+RECORD_RETENTION = 7 * 24 * 3600
+
+
+class UploadQueue:
+    """Uploads local assets to SFTP in the background, with retry."""
+
+    def __init__(
+        self,
+        store_dir: Optional[Path] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None
+    ):
+        """
+        Args:
+            store_dir: Upload records directory (default: data/_system/uploads)
+            workers: Parallel uploads (default: settings.FTP_MAX_SESSIONS)
+            max_attempts: Attempts before an upload is marked failed (default: settings.FTP_UPLOAD_MAX_ATTEMPTS)
+            retry_delay: Base retry delay in seconds, doubled per attempt (default: settings.FTP_UPLOAD_RETRY_DELAY)
+        """
+        self.store_dir = store_dir or get_data_root() / "_system" / "uploads"
+        self.workers = max(1, workers or settings.FTP_MAX_SESSIONS)
+        self.max_attempts = max_attempts or settings.FTP_UPLOAD_MAX_ATTEMPTS
+        self.retry_delay = retry_delay if retry_delay is not None else settings.FTP_UPLOAD_RETRY_DELAY
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._ready: List[Tuple[float, str]] = []  # heap of (due_at, upload_id)
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+    # ---------------------------------------------
+    # Persistence
+    # ---------------------------------------------
+
+    def _entry_path(self, upload_id: str) -> Path:
+        return self.store_dir / f"{upload_id}.json"
+
+    def _save(self, entry: Dict[str, Any]) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(entry["upload_id"])
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry, indent=2, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _load_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Upload records; caller holds the lock. Pending uploads are rescheduled."""
+        if self._entries is None:
+            self._entries = {}
+            if self.store_dir.exists():
+                now = time.time()
+                for path in self.store_dir.glob("*.json"):
+                    try:
+                        entry = json.loads(path.read_text(encoding="utf-8"))
+                    except Exception as e:
+                        logger.warning(f"Dropping unreadable upload record {path}: {e}")
+                        path.unlink(missing_ok=True)
+                        continue
+                    if entry.get("status") in ACTIVE_STATUSES:
+                        # Interrupted by a restart: upload again
+                        entry["status"] = "queued"
+                        heapq.heappush(self._ready, (0.0, entry["upload_id"]))
+                    elif now - entry.get("updated_ts", now) > RECORD_RETENTION:
+                        path.unlink(missing_ok=True)
+                        continue
+                    self._entries[entry["upload_id"]] = entry
+        return self._entries
+
+    def _update(self, entry: Dict[str, Any], **changes: Any) -> None:
+        entry.update(changes)
+        entry["updated_at"] = generate_timestamp()
+        entry["updated_ts"] = time.time()
+        self._save(entry)
+
+    # ---------------------------------------------
+    # Public API
+    # ---------------------------------------------
+
+    def enqueue(
+        self,
+        local_path: str,
+        project_name: str,
+        asset_type: str,
+        filename: str,
+        asset_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Persist an upload and schedule it.
+
+        Returns:
+            Upload record (upload_id, status, ...)
+        """
+        entry = {
+            "upload_id": generate_job_id("upload"),
+            "status": "queued",
+            "local_path": str(local_path),
+            "project_name": project_name,
+            "asset_type": asset_type,
+            "filename": filename,
+            "asset_id": asset_id,
+            "attempts": 0,
+            "url": None,
+            "error": None,
+            "created_at": generate_timestamp()
+        }
+        with self._cond:
+            self._update(entry)
+            self._load_entries()[entry["upload_id"]] = entry
+            heapq.heappush(self._ready, (0.0, entry["upload_id"]))
+            self._cond.notify()
+        self._ensure_running()
+        return dict(entry)
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            entry = self._load_entries().get(upload_id)
+            return dict(entry) if entry else None
+
+    def recover(self) -> int:
+        """Load persisted records and restart pending uploads; returns how many."""
+        with self._cond:
+            pending = sum(
+                1 for entry in self._load_entries().values()
+                if entry["status"] in ACTIVE_STATUSES
+            )
+        if pending:
+            logger.info(f"Resuming {pending} pending SFTP upload(s)")
+            self._ensure_running()
+        return pending
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the workers; pending uploads stay on disk for the next start."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+        with self._cond:
+            self._stopped = False
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            counts: Dict[str, int] = {}
+            for entry in self._load_entries().values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return counts
+
+    # ---------------------------------------------
+    # Workers
+    # ---------------------------------------------
+
+    def _ensure_running(self) -> None:
+        with self._cond:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"sftp-upload-{len(self._threads)}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        """Block until an upload is due; None when stopping."""
+        with self._cond:
+            while not self._stopped:
+                if self._ready:
+                    due_at, upload_id = self._ready[0]
+                    wait = due_at - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._ready)
+                        entry = self._load_entries().get(upload_id)
+                        if entry and entry["status"] in PENDING_STATUSES:
+                            self._update(entry, status="uploading")
+                            return entry
+                        continue
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _work(self) -> None:
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            self._upload(entry)
+
+    def _upload(self, entry: Dict[str, Any]) -> None:
+        attempts = entry["attempts"] + 1
+        try:
+            result = sftp_upload(
+                entry["local_path"],
+                entry["project_name"],
+                entry["asset_type"],
+                entry["filename"]
+            )
+        except Exception as e:
+            permanent = isinstance(e, FileNotFoundError) or attempts >= self.max_attempts
+            with self._cond:
+                if permanent:
+                    self._update(entry, status="failed", attempts=attempts, error=str(e))
+                    logger.error(f"SFTP upload {entry['upload_id']} failed after {attempts} attempt(s): {e}")
+                    return
+                delay = min(300.0, self.retry_delay * 2 ** (attempts - 1))
+                self._update(entry, status="retrying", attempts=attempts, error=str(e))
+                heapq.heappush(self._ready, (time.monotonic() + delay, entry["upload_id"]))
+                self._cond.notify()
+            logger.warning(
+                f"SFTP upload {entry['upload_id']} failed (attempt {attempts}/{self.max_attempts}), "
+                f"retry in {delay:.0f}s: {e}"
+            )
+            return
+        with self._cond:
+            self._update(entry, status="uploaded", attempts=attempts, url=result["url"], error=None)
+
+
+# Global queue instance
+_queue: Optional[UploadQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_upload_queue() -> UploadQueue:
+    """Get or create the upload queue instance."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue()
+        return _queue
+
+
+def stop_upload_queue() -> None:
+    """Stop the upload workers, if started."""
+    if _queue is not None:
+        _queue.stop()
+
+
+def apply_uploaded_urls(result: Any) -> Any:
+    """
+    Upgrade links whose background upload has landed to their FTP URL.
+
+    Args:
+        result: Action result with `links` (modified in place)
+
+    Returns:
+        The same result
+    """
+    if not isinstance(result, dict):
+        return result
+    for link in result.get("links") or []:
+        upload_id = link.get("upload_id") if isinstance(link, dict) else None
+        if not upload_id:
+            continue
+        entry = get_upload_queue().get(upload_id)
+        if entry and entry["status"] == "uploaded" and entry.get("url"):
+            link["url"] = entry["url"]
+            link["provider"] = "ftp"
+            link.pop("upload_id", None)
+    return result
@@ -0,0 +1,48 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+from contextlib import ExitStack
+from unittest.mock import patch
+from app.config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def no_result_cache():
+    """Handlers hit their (mocked) providers unless a test enables the cache."""
+    with patch.object(settings, "RESULT_CACHE_ENABLED", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breakers():
+    """Provider failures simulated by one test never open the breaker of the next."""
+    from app.tools import circuit_breaker
+    with patch.dict(circuit_breaker._breakers, clear=True):
+        yield
+
+
+@pytest.fixture
+def data_root(request, tmp_path):
+    """
+    Point project data at tmp_path/data and media at tmp_path/media.
+
+    Modules opt in with `pytestmark = pytest.mark.usefixtures("data_root")`;
+    extra settings overrides can be passed as a dict through indirect
+    parametrization. Strata caches and the storage backend are reset around
+    each test.
+    """
+    from app.utils import project_storage
+    from app.utils.storage_backend import close_storage_backend
+    overrides = {
+        "DATA_PATH": str(tmp_path / "data"),
+        "STORAGE_PATH": str(tmp_path / "media"),
+        **getattr(request, "param", {}),
+    }
+    with ExitStack() as stack:
+        for name, value in overrides.items():
+            stack.enter_context(patch.object(settings, name, value))
+        project_storage.clear_strata_cache()
+        yield tmp_path
+        close_storage_backend()
+        project_storage.clear_strata_cache()
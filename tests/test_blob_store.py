@@ -0,0 +1,124 @@
+"""
+Tests for the content-addressed media store.
+"""
+import json
+import os
+import pytest
+from app.utils.blob_store import BlobStore, get_blob_root, get_blob_store
+
+
+@pytest.fixture
+def storage_root(data_root):
+    root = data_root / "media"
+    root.mkdir()
+    return root
+
+
+class TestBlobStore:
+    """Tests for deduplication and garbage collection."""
+
+    def test_identical_files_share_one_blob(self, storage_root):
+        store = get_blob_store()
+        first = storage_root / "demo" / "Media" / "image" / "a.png"
+        second = storage_root / "other" / "Media" / "image" / "b.png"
+        for path in (first, second):
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"same pixels")
+
+        assert store.adopt(first, "asset_a")["deduplicated"] is False
+        result = store.adopt(second, "asset_b")
+
+        assert result["deduplicated"] is True
+        assert os.path.samefile(first, second)
+        assert second.read_bytes() == b"same pixels"
+        assert len(list(get_blob_root().glob("??/*"))) == 1
+        assert not (storage_root / ".blobs").exists()
+        assert store.lookup("asset_b")["sha256"] == result["sha256"]
+
+    def test_in_place_write_is_not_vouched_for_or_deduplicated_against(self, storage_root):
+        store = BlobStore(storage_root / "blobs")
+        first = storage_root / "a.png"
+        first.write_bytes(b"same pixels")
+        digest = store.adopt(first, "asset_a")["sha256"]
+        assert store.digest_of(first) == digest
+
+        with open(first, "r+b") as handle:
+            handle.write(b"edit")
+        os.utime(first, ns=(0, 0))
+
+        assert store.digest_of(first) is None
+        second = storage_root / "b.png"
+        second.write_bytes(b"same pixels")
+        result = store.adopt(second, "asset_b")
+
+        assert result["deduplicated"] is False
+        assert second.read_bytes() == b"same pixels"
+        assert store.blob_path(digest).read_bytes() == b"same pixels"
+        assert first.read_bytes() == b"edit pixels"
+        assert store.digest_of(second) == digest
+
+    def test_gc_removes_unreferenced_blobs(self, storage_root):
+        store = BlobStore(storage_root / "blobs")
+        kept = storage_root / "kept.png"
+        dropped = storage_root / "dropped.png"
+        kept.write_bytes(b"kept")
+        dropped.write_bytes(b"dropped")
+        store.adopt(kept, "kept")
+        dropped_blob = store.blob_path(store.adopt(dropped, "dropped")["sha256"])
+        dropped.unlink()
+
+        assert store.gc(grace_seconds=0, dry_run=True)["removed"] == 1
+        assert dropped_blob.exists()
+
+        result = store.gc(grace_seconds=0)
+
+        assert result["removed"] == 1
+        assert result["dropped_refs"] == 1
+        assert not dropped_blob.exists()
+        assert kept.read_bytes() == b"kept"
+        assert store.lookup("dropped") is None
+
+    def test_legacy_store_moves_out_of_media_root(self, storage_root):
+        legacy = storage_root / ".blobs"
+        view = storage_root / "demo" / "image" / "a.png"
+        view.parent.mkdir(parents=True)
+        view.write_bytes(b"pixels")
+        BlobStore(legacy).adopt(view, "asset_a")
+
+        store = get_blob_store()
+
+        assert not legacy.exists()
+        assert store.lookup("asset_a")["path"] == str(view)
+        assert store.digest_of(view) is not None
+
+    def test_refs_are_appended_and_shared_between_instances(self, storage_root):
+        root = storage_root / "blobs"
+        writer, reader = BlobStore(root), BlobStore(root)
+        path = storage_root / "a.png"
+        path.write_bytes(b"pixels")
+        writer.adopt(path, "asset_a")
+        assert os.access(path, os.W_OK)
+        assert reader.lookup("asset_a")["path"] == str(path)
+
+        writer.forget("asset_a")
+        writer.forget("asset_a")
+
+        assert reader.lookup("asset_a") is None
+        assert reader.digest_of(path) is None
+        assert len((root / "refs.jsonl").read_text().splitlines()) == 2
+
+    def test_gc_compacts_ref_log_and_imports_legacy_manifest(self, storage_root):
+        root = storage_root / "blobs"
+        root.mkdir()
+        path = storage_root / "a.png"
+        path.write_bytes(b"pixels")
+        entry = {"sha256": "0" * 64, "path": str(path), "size": 6, "created_at": "t"}
+        (root / "manifest.json").write_text(json.dumps({"asset_a": entry, "gone": dict(entry, path="/nope")}))
+        store = BlobStore(root)
+        assert store.lookup("asset_a")["sha256"] == "0" * 64
+        assert not (root / "manifest.json").exists()
+
+        assert store.gc(grace_seconds=0)["dropped_refs"] == 1
+
+        assert len((root / "refs.jsonl").read_text().splitlines()) == 1
+        assert BlobStore(root).lookup("asset_a") is not None
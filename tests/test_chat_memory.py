@@ -0,0 +1,87 @@
+"""
+Tests for chat session storage (append-only message log plus sidecar).
+"""
+import json
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
+from app.utils.storage_backend import LOG_INDEX_STRIDE, get_storage_backend
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request):
+    with patch.object(settings, "STORAGE_BACKEND", request.param):
+        yield ChatMemoryStore()
+
+
+def _turns(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(count)]
+
+
+class TestChatLog:
+    """Tests for appending, tail reads and paging."""
+
+    def test_tail_and_paging(self, store):
+        messages = _turns(2 * LOG_INDEX_STRIDE + 5)
+        for start in range(0, len(messages), 2):
+            store.append_messages("demo", "s1", messages[start:start + 2])
+
+        assert store.count_messages("demo", "s1") == len(messages)
+        assert store.load_messages("demo", "s1") == messages
+        assert store.load_messages("demo", "s1", tail=3) == messages[-3:]
+        assert store.load_messages("demo", "s1", tail=0) == []
+        assert store.load_messages("demo", "s1", offset=LOG_INDEX_STRIDE - 1, limit=4) == (
+            messages[LOG_INDEX_STRIDE - 1:LOG_INDEX_STRIDE + 3]
+        )
+        assert store.load_messages("demo", "s1", offset=len(messages)) == []
+        assert store.load_session_stats("demo", "s1")["user_messages"] == LOG_INDEX_STRIDE + 3
+
+    def test_meta_lives_in_sidecar(self, store):
+        store.append_messages("demo", "s1", _turns(4))
+        store.save_meta("demo", "s1", {"pending_rounds": 2})
+        store.append_messages("demo", "s1", _turns(2))
+
+        session = get_storage_backend().get("demo", "chat_session", "s1")
+        assert "messages" not in session
+        assert session["meta"] == {"pending_rounds": 2}
+        assert session["message_count"] == 6
+        assert store.load_meta("demo", "s1") == {"pending_rounds": 2}
+
+    def test_inline_messages_are_moved_to_the_log(self, store):
+        legacy = {"session_id": "s1", "messages": _turns(3), "meta": {"last_trigger": "auto"}}
+        get_storage_backend().put("demo", "chat_session", "s1", legacy)
+
+        assert store.load_messages("demo", "s1", tail=2) == _turns(3)[-2:]
+        assert store.load_meta("demo", "s1") == {"last_trigger": "auto"}
+        assert "messages" not in get_storage_backend().get("demo", "chat_session", "s1")
+        store.append_messages("demo", "s1", [{"role": "user", "content": "next"}])
+        assert store.count_messages("demo", "s1") == 4
+
+
+class TestFileChatLog:
+    """Tests for the JSONL log of the file backend."""
+
+    def test_append_does_not_rewrite_history(self):
+        store = ChatMemoryStore()
+        store.append_messages("demo", "s1", _turns(2))
+        path = store.get_messages_path("demo", "s1")
+        first = path.read_bytes()
+        store.append_messages("demo", "s1", _turns(2))
+        assert path.read_bytes().startswith(first)
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 4
+
+    def test_torn_append_is_ignored_then_truncated(self):
+        store = ChatMemoryStore()
+        store.append_messages("demo", "s1", _turns(2))
+        path = store.get_messages_path("demo", "s1")
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write('{"role": "user", "con')
+
+        assert store.load_messages("demo", "s1") == _turns(2)
+        store.append_messages("demo", "s1", [{"role": "user", "content": "after"}])
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["content"] for line in lines] == ["m0", "m1", "after"]
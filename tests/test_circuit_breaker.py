@@ -0,0 +1,97 @@
+"""
+Tests for the provider circuit breaker.
+"""
+import time
+import httpx
+import pytest
+from unittest.mock import Mock, patch
+from app.tools.circuit_breaker import CircuitBreaker
+from app.tools.higgsfield.client import HiggsfieldClient
+from app.tools.rate_limit import ProviderLimiter
+from app.utils.errors import ProviderError
+
+
+def _status_error(status_code):
+    request = httpx.Request("GET", "https://api.example.com/jobs/1")
+    response = httpx.Response(status_code, json={}, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def _fail(breaker, error):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_opens_after_sustained_failures_and_fails_fast(self):
+        breaker = CircuitBreaker("higgsfield", min_calls=4, failure_rate=0.5, open_seconds=60)
+        with breaker.guard():
+            pass
+        for _ in range(3):
+            _fail(breaker, _status_error(503))
+
+        assert breaker.state == "open"
+        with pytest.raises(ProviderError) as exc_info:
+            breaker.check()
+        assert exc_info.value.retryable is True
+        assert exc_info.value.details["circuit"] == "open"
+        assert breaker.stats()["error_rate"] == 0.75
+
+    def test_client_errors_and_slow_calls(self):
+        breaker = CircuitBreaker("higgsfield", min_calls=2, failure_rate=0.4, slow_call_seconds=0.01)
+        for _ in range(3):
+            _fail(breaker, _status_error(404))
+        assert breaker.state == "closed"
+
+        with breaker.guard():
+            time.sleep(0.02)
+        with breaker.guard():
+            time.sleep(0.02)
+        assert breaker.state == "open"
+
+    def test_explicit_zero_overrides_settings(self):
+        breaker = CircuitBreaker("higgsfield", min_calls=0, open_seconds=0, slow_call_seconds=0)
+        assert (breaker.min_calls, breaker.open_seconds, breaker.slow_call_seconds) == (0, 0, 0)
+
+    def test_half_open_probe_recovers_or_reopens(self):
+        breaker = CircuitBreaker("higgsfield", min_calls=1, open_seconds=0.05, half_open_probes=1)
+        _fail(breaker, httpx.ConnectError("down"))
+        assert breaker.state == "open"
+
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        _fail(breaker, httpx.ConnectError("still down"))
+        assert breaker.state == "open"
+
+        time.sleep(0.06)
+        with breaker.guard():
+            # Only one probe at a time
+            with pytest.raises(ProviderError):
+                breaker.check()
+        assert breaker.state == "closed"
+
+
+class TestClientFastFail:
+    """Tests for the breaker in the client request loop."""
+
+    @patch("app.tools.higgsfield.client.time.sleep")
+    @patch("httpx.Client")
+    def test_open_circuit_skips_upstream(self, mock_client_class, mock_sleep):
+        mock_client = Mock()
+        mock_client.request.side_effect = httpx.ConnectError("down")
+        mock_client_class.return_value = mock_client
+
+        client = HiggsfieldClient()
+        client.retries = 10
+        client.limiter = ProviderLimiter("higgsfield", rate=0, max_in_flight=2)
+        client.breaker = CircuitBreaker("higgsfield", min_calls=2, open_seconds=60)
+
+        with pytest.raises(ProviderError) as exc_info:
+            client.get_job_status("job_1")
+
+        assert exc_info.value.details["circuit"] == "open"
+        assert mock_client.request.call_count == 2
+        assert client.limiter.stats()["in_flight"] == 0
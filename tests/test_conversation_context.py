@@ -0,0 +1,114 @@
+"""
+Tests for the token-budgeted conversation context (recent turns + rolling summary).
+"""
+import json
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
+from app.narration_agent.chat.conversation_context import (
+    ConversationContextManager,
+    estimate_tokens,
+    fit_to_budget,
+    message_tokens,
+)
+from app.narration_agent.llm_client import LLMResponse
+
+
+pytestmark = [
+    pytest.mark.usefixtures("data_root"),
+    pytest.mark.parametrize(
+        "data_root",
+        [{"CHAT_CONTEXT_RECENT_TURNS": 2, "CHAT_SUMMARY_BATCH_TURNS": 2}],
+        indirect=True,
+        ids=["small_window"],
+    ),
+]
+
+
+class FakeSummarizer:
+    default_model = "fake"
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def complete(self, request):
+        payload = json.loads(request.messages[-1]["content"])
+        self.calls.append(payload)
+        if self.fail:
+            raise RuntimeError("provider down")
+        contents = [m["content"] for m in payload["new_messages"]]
+        return LLMResponse(content=" ".join(filter(None, [payload["previous_summary"], *contents])))
+
+
+def _add_turns(store, start, count):
+    for index in range(start, start + count):
+        store.append_messages(
+            "demo",
+            "s1",
+            [{"role": "user", "content": f"u{index}"}, {"role": "assistant", "content": f"a{index}"}],
+        )
+
+
+class TestConversationContext:
+    """Tests for ConversationContextManager."""
+
+    def test_summary_refreshes_only_when_window_slides_by_a_batch(self):
+        store = ChatMemoryStore()
+        llm = FakeSummarizer()
+        manager = ConversationContextManager(store, llm)
+
+        _add_turns(store, 0, 3)  # one turn past the window: below the batch
+        context = manager.build_context("demo", "s1")
+        assert llm.calls == []
+        assert context["summary"] == ""
+        assert [m["content"] for m in context["messages"]] == ["u0", "a0", "u1", "a1", "u2", "a2"]
+
+        _add_turns(store, 3, 1)  # two turns past the window
+        context = manager.build_context("demo", "s1")
+        assert [m["content"] for m in llm.calls[0]["new_messages"]] == ["u0", "a0", "u1", "a1"]
+        assert context["summary"] == "u0 a0 u1 a1"
+        assert context["summarized_through"] == 4
+        assert [m["content"] for m in context["messages"]] == ["u2", "a2", "u3", "a3"]
+
+        manager.build_context("demo", "s1")
+        assert len(llm.calls) == 1
+
+    def test_refresh_is_incremental_and_persisted(self):
+        store = ChatMemoryStore()
+        llm = FakeSummarizer()
+        _add_turns(store, 0, 4)
+        ConversationContextManager(store, llm).build_context("demo", "s1")
+        _add_turns(store, 4, 2)
+
+        context = ConversationContextManager(store, llm).build_context("demo", "s1")
+        assert llm.calls[1]["previous_summary"] == "u0 a0 u1 a1"
+        assert [m["content"] for m in llm.calls[1]["new_messages"]] == ["u2", "a2", "u3", "a3"]
+        assert store.load_summary("demo", "s1")["through"] == 8
+        assert [m["content"] for m in context["messages"]] == ["u4", "a4", "u5", "a5"]
+
+    def test_summarizer_failure_falls_back_to_excerpts(self):
+        store = ChatMemoryStore()
+        _add_turns(store, 0, 4)
+        context = ConversationContextManager(store, FakeSummarizer(fail=True)).build_context("demo", "s1")
+        assert context["summary"] == "user: u0\nassistant: a0\nuser: u1\nassistant: a1"
+        assert context["summarized_through"] == 4
+
+    def test_context_respects_token_budget(self):
+        store = ChatMemoryStore()
+        long_text = "x" * 4000
+        for _ in range(2):
+            store.append_messages("demo", "s1", [{"role": "user", "content": long_text}])
+        with patch.object(settings, "CHAT_CONTEXT_MAX_TOKENS", 600):
+            context = ConversationContextManager(store).build_context("demo", "s1")
+        assert context["estimated_tokens"] <= 600
+        assert len(context["messages"]) == 1
+        assert context["omitted"] == 1
+
+    def test_fit_to_budget_keeps_newest_messages(self):
+        messages = [{"role": "user", "content": "a" * 40} for _ in range(10)]
+        budget = estimate_tokens("s" * 40) + 3 * message_tokens(messages[0])
+        summary, kept = fit_to_budget("s" * 40, messages, budget)
+        assert summary == "s" * 40
+        assert kept == messages[-3:]
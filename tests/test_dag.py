@@ -0,0 +1,143 @@
+"""
+Tests for the pipeline DAG engine.
+"""
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app.pipelines.dag import PipelineDAG, PipelineStep, Ref
+from app.pipelines.custom import run_pipeline
+from app.utils.errors import ValidationError
+from app.utils.http import PooledTransport
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+def _completed(url):
+    return {"status": "completed", "links": [{"url": url, "asset_type": "image"}]}
+
+
+class TestPipelineDAG:
+    """Tests for dependency resolution and execution."""
+
+    def test_ref_feeds_downstream_step(self):
+        seen = {}
+
+        def video(params):
+            seen.update(params)
+            return _completed("https://example.com/video.mp4")
+
+        dag = PipelineDAG([
+            PipelineStep("image", run=lambda params: _completed("https://example.com/image.png")),
+            PipelineStep("video", run=video, params={"image_url": Ref("image", "links.0.url")}),
+        ])
+        run = dag.run()
+
+        assert run.status == "completed"
+        assert seen["image_url"] == "https://example.com/image.png"
+        assert len(run.links()) == 2
+
+    def test_independent_branches_run_concurrently(self):
+        async def slow(params):
+            await asyncio.sleep(0.2)
+            return _completed(params["url"])
+
+        dag = PipelineDAG([
+            PipelineStep(f"shot{i}", run=slow, params={"url": f"https://example.com/{i}.png"})
+            for i in range(3)
+        ])
+        start = time.monotonic()
+        run = dag.run()
+
+        assert run.status == "completed"
+        assert time.monotonic() - start < 0.5
+
+    def test_sync_run_closes_http_clients_of_its_loop(self):
+        transport = PooledTransport("test", timeout=1)
+        opened = []
+
+        async def request(params):
+            opened.append(transport.async_client())
+            return _completed("https://example.com/image.png")
+
+        for _ in range(2):
+            PipelineDAG([PipelineStep("image", run=request)]).run()
+
+        assert opened[0] is not opened[1]
+        assert all(client.is_closed for client in opened)
+
+    def test_retryable_failure_is_retried(self):
+        calls = []
+
+        def flaky(params):
+            calls.append(1)
+            if len(calls) == 1:
+                return {"status": "failed", "error": {"code": "X", "message": "boom", "retryable": True}}
+            return _completed("https://example.com/ok.png")
+
+        dag = PipelineDAG([PipelineStep("image", run=flaky, retries=1, retry_delay=0)])
+        run = dag.run()
+
+        assert run.status == "completed"
+        assert run["image"].attempts == 2
+
+    def test_failed_dependency_skips_downstream(self):
+        def failing(params):
+            raise RuntimeError("provider down")
+
+        downstream_calls = []
+        dag = PipelineDAG([
+            PipelineStep("image", run=failing),
+            PipelineStep("video", run=lambda p: downstream_calls.append(p), depends_on=["image"]),
+        ])
+        run = dag.run()
+
+        assert run.status == "failed"
+        assert run["video"].status == "skipped"
+        assert downstream_calls == []
+        assert len(run.steps()) == 1
+
+    def test_invalid_graphs_are_rejected(self):
+        with pytest.raises(ValidationError):
+            PipelineDAG([PipelineStep("a", run=dict, depends_on=["missing"])])
+        with pytest.raises(ValidationError):
+            PipelineDAG([
+                PipelineStep("a", run=dict, depends_on=["b"]),
+                PipelineStep("b", run=dict, depends_on=["a"]),
+            ])
+
+
+class TestDeclarativePipeline:
+    """Tests for the pipeline_run JSON spec."""
+
+    @patch("app.tools.registry.dispatch_action_async")
+    def test_spec_with_refs(self, mock_dispatch):
+        calls = []
+
+        async def dispatch(action, payload):
+            calls.append((action, payload))
+            if action == "higgsfield_image":
+                return _completed("https://example.com/key.png")
+            return _completed("https://example.com/clip.mp4")
+
+        mock_dispatch.side_effect = dispatch
+        result = run_pipeline({
+            "steps": [
+                {"name": "key", "action": "higgsfield_image", "payload": {"prompt": "A castle"}},
+                {
+                    "name": "clip",
+                    "action": "higgsfield_video",
+                    "payload": {"image_url": "${key.links.0.url}"}
+                },
+            ]
+        })
+
+        assert result["status"] == "completed"
+        assert result["model"] == "custom"
+        assert len(result["links"]) == 2
+        assert calls[1][1]["image_url"] == "https://example.com/key.png"
+
+    def test_nested_pipelines_rejected(self):
+        with pytest.raises(ValidationError):
+            run_pipeline({"steps": [{"name": "a", "action": "pipeline_audio_stack"}]})
@@ -2,7 +2,7 @@
 Tests for ElevenLabs handlers (Phase 2).
 """
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
 from app.tools.elevenlabs.client import ElevenLabsClient
@@ -34,7 +34,7 @@ class TestElevenLabsClient:
         
         mock_client = MagicMock()
         mock_client.request.return_value = mock_response
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        mock_client_class.return_value = mock_client
         
         client = ElevenLabsClient()
         result = client.text_to_speech("Hello world")
@@ -57,7 +57,7 @@ class TestElevenLabsClient:
         
         mock_client = MagicMock()
         mock_client.request.return_value = mock_response
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        mock_client_class.return_value = mock_client
         
         client = ElevenLabsClient()
         with pytest.raises(ProviderError) as exc_info:
@@ -153,9 +153,9 @@ class TestElevenLabsEndpoints:
     def test_elevenlabs_voice_endpoint(self, mock_get_client):
         """Test ElevenLabs voice endpoint."""
         mock_client = Mock()
-        mock_client.text_to_speech.return_value = {
+        mock_client.text_to_speech_async = AsyncMock(return_value={
             "audio_url": "https://example.com/audio.mp3"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
@@ -179,9 +179,9 @@ class TestElevenLabsEndpoints:
     def test_elevenlabs_music_endpoint(self, mock_get_client):
         """Test ElevenLabs music endpoint."""
         mock_client = Mock()
-        mock_client.generate_music.return_value = {
+        mock_client.generate_music_async = AsyncMock(return_value={
             "audio_url": "https://example.com/music.mp3"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
@@ -203,9 +203,9 @@ class TestElevenLabsEndpoints:
     def test_elevenlabs_soundfx_endpoint(self, mock_get_client):
         """Test ElevenLabs soundfx endpoint."""
         mock_client = Mock()
-        mock_client.generate_sound_effect.return_value = {
+        mock_client.generate_sound_effect_async = AsyncMock(return_value={
             "audio_url": "https://example.com/sfx.mp3"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
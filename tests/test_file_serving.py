@@ -0,0 +1,121 @@
+"""
+Tests for media delivery (content types, validators, conditional and range requests).
+"""
+import hashlib
+import os
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.config.settings import settings
+from app.main import app
+from app.utils.blob_store import adopt_file
+from app.utils.project_media import get_project_media_index, get_project_n1_pix_dir
+
+
+client = TestClient(app)
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+def _store_asset(tmp_path, content, name="clip.mp4"):
+    path = tmp_path / "media" / "demo" / "video" / name
+    path.parent.mkdir(parents=True)
+    path.write_bytes(content)
+    return path
+
+
+class TestAssets:
+    """Tests for /assets."""
+
+    def test_content_type_and_strong_etag_from_blob(self, tmp_path):
+        content = b"0123456789" * 100
+        path = _store_asset(tmp_path, content)
+        adopt_file(path, "asset_1")
+
+        response = client.get("/assets/demo/video/clip.mp4")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "video/mp4"
+        assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "last-modified" in response.headers
+        assert response.content == content
+
+    def test_etag_without_blob(self, tmp_path):
+        with patch.object(settings, "BLOB_STORE_ENABLED", False):
+            _store_asset(tmp_path, b"abc", name="song.mp3")
+            response = client.get("/assets/demo/video/song.mp3")
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.headers["etag"].startswith('"')
+
+    def test_if_none_match_returns_304(self, tmp_path):
+        _store_asset(tmp_path, b"frames")
+        etag = client.get("/assets/demo/video/clip.mp4").headers["etag"]
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"If-None-Match": f'W/{etag}, "other"'})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+    def test_if_modified_since(self, tmp_path):
+        path = _store_asset(tmp_path, b"frames")
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+        last_modified = client.get("/assets/demo/video/clip.mp4").headers["last-modified"]
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+        response = client.get(
+            "/assets/demo/video/clip.mp4",
+            headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+        )
+        assert response.status_code == 200
+
+    def test_hidden_paths_are_not_served(self, tmp_path):
+        path = _store_asset(tmp_path, b"secret", name=".upload-1.part")
+        (path.parent.parent / ".blobs").mkdir()
+        (path.parent.parent / ".blobs" / "manifest.json").write_text("{}")
+
+        assert client.get("/assets/demo/video/.upload-1.part").status_code == 404
+        assert client.get("/assets/demo/.blobs/manifest.json").status_code == 404
+
+    def test_byte_ranges(self, tmp_path):
+        content = bytes(range(256)) * 4
+        _store_asset(tmp_path, content)
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+        assert response.content == content[100:200]
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"Range": "bytes=-24"})
+        assert response.status_code == 206
+        assert response.content == content[-24:]
+
+        response = client.get("/assets/demo/video/clip.mp4", headers={"Range": "bytes=5000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+class TestMediapix:
+    """Tests for /projects/{id}/mediapix."""
+
+    def test_etag_from_media_index(self):
+        content = b"\x89PNG fake"
+        digest = hashlib.sha256(content).hexdigest()
+        (get_project_n1_pix_dir("demo") / "N1_char_01_image_01.png").write_bytes(content)
+        get_project_media_index("demo").add("pix", "N1_char_01_image_01.png", size=len(content), sha256=digest)
+
+        response = client.get("/projects/demo/mediapix/N1_char_01_image_01.png")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == f'"{digest}"'
+        assert "max-age" in response.headers["cache-control"]
+
+        response = client.get(
+            "/projects/demo/mediapix/N1_char_01_image_01.png",
+            headers={"If-None-Match": f'"{digest}"'}
+        )
+        assert response.status_code == 304
@@ -0,0 +1,87 @@
+"""
+Tests for pooled SFTP uploads and the background upload queue.
+"""
+import json
+import time
+from unittest.mock import Mock, patch
+from app.config.settings import settings
+from app.utils.ftp_storage import SFTPSessionPool, sftp_upload
+from app.utils.upload_queue import UploadQueue, apply_uploaded_urls
+
+
+def _wait_for(queue, upload_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        entry = queue.get(upload_id)
+        if entry["status"] == status:
+            return entry
+        time.sleep(0.01)
+    raise AssertionError(f"upload {upload_id} not {status}: {queue.get(upload_id)}")
+
+
+class TestSFTPSessionPool:
+    """Tests for session reuse and the remote directory cache."""
+
+    @patch("app.utils.ftp_storage.paramiko")
+    def test_uploads_share_one_session(self, mock_paramiko, tmp_path):
+        sftp = Mock()
+        sftp.stat.side_effect = IOError("missing")
+        mock_paramiko.SFTPClient.from_transport.return_value = sftp
+        mock_paramiko.Transport.return_value.is_active.return_value = True
+        local = tmp_path / "a.png"
+        local.write_bytes(b"png")
+
+        with patch.object(settings, "FTP_HOST", "sftp.example.com"), \
+                patch.object(settings, "FTP_BASE_DIR", "/media"), \
+                patch.object(settings, "FTP_PUBLIC_BASE_URL", "https://cdn.example.com"), \
+                patch("app.utils.ftp_storage._pool", SFTPSessionPool(max_sessions=2)):
+            results = [sftp_upload(str(local), "demo", "image", f"{i}.png") for i in range(3)]
+
+        assert mock_paramiko.Transport.call_count == 1
+        assert sftp.put.call_count == 3
+        assert [call.args[0] for call in sftp.mkdir.call_args_list] == ["/media", "/media/demo", "/media/demo/image"]
+        assert results[2]["url"] == "https://cdn.example.com/demo/image/2.png"
+
+
+class TestUploadQueue:
+    """Tests for background uploads."""
+
+    @patch("app.utils.upload_queue.sftp_upload")
+    def test_failed_upload_is_retried(self, mock_upload, tmp_path):
+        mock_upload.side_effect = [OSError("connection lost"), {"url": "https://cdn.example.com/demo/image/a.png"}]
+        queue = UploadQueue(store_dir=tmp_path, workers=2, max_attempts=3, retry_delay=0.01)
+        try:
+            upload = queue.enqueue("/tmp/a.png", "demo", "image", "a.png", asset_id="asset_1")
+            entry = _wait_for(queue, upload["upload_id"], "uploaded")
+        finally:
+            queue.stop()
+
+        assert entry["attempts"] == 2
+        stored = json.loads((tmp_path / f"{upload['upload_id']}.json").read_text())
+        assert stored["url"] == "https://cdn.example.com/demo/image/a.png"
+
+    @patch("app.utils.upload_queue.sftp_upload")
+    def test_interrupted_uploads_resume_after_restart(self, mock_upload, tmp_path):
+        mock_upload.return_value = {"url": "https://cdn.example.com/demo/video/v.mp4"}
+        record = {
+            "upload_id": "upload_job_1",
+            "status": "uploading",
+            "local_path": "/tmp/v.mp4",
+            "project_name": "demo",
+            "asset_type": "video",
+            "filename": "v.mp4",
+            "attempts": 0
+        }
+        (tmp_path / "upload_job_1.json").write_text(json.dumps(record))
+
+        queue = UploadQueue(store_dir=tmp_path, workers=1, retry_delay=0)
+        try:
+            assert queue.recover() == 1
+            _wait_for(queue, "upload_job_1", "uploaded")
+        finally:
+            queue.stop()
+
+        result = {"links": [{"url": "/assets/demo/Media/video/v.mp4", "provider": "local", "upload_id": "upload_job_1"}]}
+        with patch("app.utils.upload_queue.get_upload_queue", return_value=queue):
+            apply_uploaded_urls(result)
+        assert result["links"][0] == {"url": "https://cdn.example.com/demo/video/v.mp4", "provider": "ftp"}
@@ -1,8 +1,9 @@
 """
 Tests for Higgsfield handlers (Phase 2).
 """
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
 from app.tools.higgsfield.client import HiggsfieldClient
@@ -34,7 +35,7 @@ class TestHiggsfieldClient:
         
         mock_client = MagicMock()
         mock_client.request.return_value = mock_response
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        mock_client_class.return_value = mock_client
         
         client = HiggsfieldClient()
         result = client.generate_image("A beautiful sunset")
@@ -52,13 +53,48 @@ class TestHiggsfieldClient:
         
         mock_client = MagicMock()
         mock_client.request.return_value = mock_response
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        mock_client_class.return_value = mock_client
         
         client = HiggsfieldClient()
         result = client.generate_video(prompt="A dancing cat")
         
         assert "job_id" in result
 
+    @patch("httpx.Client")
+    def test_requests_reuse_pooled_client(self, mock_client_class):
+        """Consecutive requests share one pooled httpx client."""
+        mock_response = Mock()
+        mock_response.json.return_value = {"status": "pending"}
+        mock_response.status_code = 200
+        mock_response.content = b'{"status": "pending"}'
+
+        mock_client = MagicMock()
+        mock_client.is_closed = False
+        mock_client.request.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        client = HiggsfieldClient()
+        client.get_job_status("job_1")
+        client.get_job_status("job_2")
+
+        assert mock_client_class.call_count == 1
+        assert mock_client.request.call_count == 2
+        assert "limits" in mock_client_class.call_args.kwargs
+
+    def test_async_client_is_shared_and_closed(self):
+        """The async client is reused within a loop and closed by aclose()."""
+        client = HiggsfieldClient()
+
+        async def scenario():
+            first = client.http.async_client()
+            second = client.http.async_client()
+            await client.http.aclose()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first is second
+        assert first.is_closed
+
 
 class TestHiggsfieldHandlers:
     """Tests for Higgsfield handlers."""
@@ -119,6 +155,48 @@ class TestHiggsfieldHandlers:
         assert result["status"] == "completed"
         assert len(result["links"]) > 0
         mock_client.poll_job.assert_called_once_with("job_123")
+
+    @patch("app.tools.higgsfield.image.get_client")
+    def test_image_generation_reattaches_to_resumed_job(self, mock_get_client):
+        """A resumed pipeline step polls its recorded job instead of submitting again."""
+        mock_client = Mock()
+        mock_client.poll_job.return_value = {
+            "status": "completed",
+            "result_url": "https://example.com/image.png"
+        }
+        mock_get_client.return_value = mock_client
+
+        result = image.generate_image({
+            "prompt": "A beautiful sunset",
+            "wait_for_completion": True,
+            "_resume_job_id": "job_123"
+        })
+
+        assert result["status"] == "completed"
+        assert result["job_id"] == "job_123"
+        mock_client.generate_image.assert_not_called()
+        mock_client.poll_job.assert_called_once_with("job_123")
+    
+    @patch("app.tools.higgsfield.image.get_client")
+    def test_image_generation_async_handler_polls_without_blocking(self, mock_get_client):
+        """Test async image handler awaits the async polling path."""
+        mock_client = Mock()
+        mock_client.generate_image_async = AsyncMock(return_value={"job_id": "job_123"})
+        mock_client.poll_job_async = AsyncMock(return_value={
+            "status": "completed",
+            "result_url": "https://example.com/image.png"
+        })
+        mock_get_client.return_value = mock_client
+        
+        result = asyncio.run(image.generate_image_async({
+            "prompt": "A beautiful sunset",
+            "wait_for_completion": True
+        }))
+        
+        assert result["status"] == "completed"
+        assert len(result["links"]) > 0
+        mock_client.poll_job_async.assert_awaited_once_with("job_123")
+        mock_client.poll_job.assert_not_called()
     
     def test_video_missing_prompt_and_image(self):
         """Test video generation with missing prompt and image_url."""
@@ -163,9 +241,9 @@ class TestHiggsfieldEndpoints:
     def test_higgsfield_image_endpoint(self, mock_get_client):
         """Test Higgsfield image endpoint."""
         mock_client = Mock()
-        mock_client.generate_image.return_value = {
+        mock_client.generate_image_async = AsyncMock(return_value={
             "image_url": "https://example.com/image.png"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
@@ -188,9 +266,9 @@ class TestHiggsfieldEndpoints:
     def test_higgsfield_video_endpoint(self, mock_get_client):
         """Test Higgsfield video endpoint."""
         mock_client = Mock()
-        mock_client.generate_video.return_value = {
+        mock_client.generate_video_async = AsyncMock(return_value={
             "job_id": "job_123"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
@@ -213,10 +291,10 @@ class TestHiggsfieldEndpoints:
     def test_check_job_status_endpoint(self, mock_get_client):
         """Test check_job_status endpoint."""
         mock_client = Mock()
-        mock_client.get_job_status.return_value = {
+        mock_client.get_job_status_async = AsyncMock(return_value={
             "status": "completed",
             "result_url": "https://example.com/image.png"
-        }
+        })
         mock_get_client.return_value = mock_client
         
         response = client.post(
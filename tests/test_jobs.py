@@ -0,0 +1,152 @@
+"""
+Tests for the background job engine.
+"""
+import asyncio
+import json
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.config.settings import settings
+from app.jobs.engine import JobEngine
+from app.jobs.progress import report_progress
+from app.main import app
+from app.mcp.schemas import MCPRequest
+from app.mcp.server import handle_mcp_request
+from app.tools.registry import handle_check_job_status
+
+
+client = TestClient(app)
+
+
+def _run_job(engine, action, payload, session_id=None):
+    async def scenario():
+        handle = engine.submit(action, payload, session_id=session_id)
+        await asyncio.gather(*engine._tasks.values())
+        await engine.flush()
+        return handle
+
+    return asyncio.run(scenario())
+
+
+def test_submit_runs_action_and_persists_record(tmp_path):
+    events = []
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda session, msg: events.append((session, msg)))
+
+    handle = _run_job(engine, "ping", {"timestamp": "t"}, session_id="sse_1")
+
+    assert handle["status"] == "queued"
+    assert handle["provider"] == "engine"
+    job = asyncio.run(engine.get(handle["job_id"]))
+    assert job["status"] == "completed"
+    assert job["result"]["message"] == "pong"
+    assert job["params"]["wait_for_completion"] is True
+
+    stored = json.loads((tmp_path / f"{handle['job_id']}.json").read_text())
+    assert stored["status"] == "completed"
+    assert [msg["status"] for _, msg in events] == ["queued", "running", "completed"]
+    assert all(session == "sse_1" for session, _ in events)
+
+
+def test_handler_failure_marks_job_failed(tmp_path):
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+
+    handle = _run_job(engine, "elevenlabs_voice", {})
+
+    job = asyncio.run(engine.get(handle["job_id"]))
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "VALIDATION_ERROR"
+
+
+def test_progress_is_recorded_from_handler(tmp_path):
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+
+    def handler(payload):
+        report_progress(payload, "submitted", provider_job_id="abc")
+        return {"status": "completed"}
+
+    with patch("app.tools.registry.get_action_handler", return_value=handler), \
+            patch("app.tools.registry.get_async_action_handler", return_value=None):
+        handle = _run_job(engine, "ping", {})
+
+    job = asyncio.run(engine.get(handle["job_id"]))
+    assert job["status"] == "completed"
+    assert job["progress"][0]["stage"] == "submitted"
+    assert job["progress"][0]["provider_job_id"] == "abc"
+
+
+def test_progress_writes_are_coalesced_off_the_loop(tmp_path):
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+    writes = []
+    write = engine._write
+
+    def counting_write(job_id, text):
+        writes.append(json.loads(text))
+        write(job_id, text)
+
+    async def handler(payload):
+        for i in range(20):
+            report_progress(payload, "poll", attempt=i)
+        return {"status": "completed"}
+
+    with patch.object(engine, "_write", counting_write), \
+            patch("app.tools.registry.get_async_action_handler", return_value=handler):
+        handle = _run_job(engine, "ping", {})
+
+    assert len(writes) < 20
+    assert writes[-1]["status"] == "completed"
+    assert len(writes[-1]["progress"]) == 20
+
+
+def test_finished_jobs_are_evicted_and_reloaded(tmp_path):
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+    with patch.object(settings, "JOB_MEMORY_TTL", 0):
+        first = _run_job(engine, "ping", {})
+        second = _run_job(engine, "ping", {})
+
+    assert first["job_id"] not in engine._jobs
+    assert asyncio.run(engine.get(first["job_id"]))["status"] == "completed"
+    assert asyncio.run(engine.get(second["job_id"]))["status"] == "completed"
+
+
+def test_sync_status_check_reads_engine_state_on_its_loop(tmp_path):
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+
+    async def scenario():
+        handle = engine.submit("ping", {})
+        # Sync handlers run in the threadpool while the job is still queued in memory
+        status = await asyncio.to_thread(
+            handle_check_job_status, {"provider": "engine", "job_id": handle["job_id"]}
+        )
+        listed = await engine.list()
+        await asyncio.gather(*engine._tasks.values())
+        await engine.flush()
+        return handle, status, listed
+
+    with patch("app.jobs.engine.get_job_engine", return_value=engine):
+        handle, status, listed = asyncio.run(scenario())
+
+    assert status["job_id"] == handle["job_id"]
+    assert status["status"] in {"queued", "running"}
+    assert [job["job_id"] for job in listed] == [handle["job_id"]]
+
+
+def test_recover_marks_stale_jobs_interrupted(tmp_path):
+    (tmp_path / "job_engine_stale.json").write_text(
+        json.dumps({"job_id": "job_engine_stale", "action": "ping", "status": "running"})
+    )
+    engine = JobEngine(store_dir=tmp_path, notifier=lambda *_: None)
+
+    assert engine.recover() == 1
+    job = asyncio.run(engine.get("job_engine_stale"))
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "JOB_INTERRUPTED"
+
+
+def test_background_requires_async_handler():
+    response = handle_mcp_request(MCPRequest(action="ping", payload={"background": True}))
+    assert response.status == "error"
+    assert response.error.code == "VALIDATION_ERROR"
+
+
+def test_unknown_job_returns_404():
+    response = client.get("/jobs/job_engine_missing")
+    assert response.status_code == 404
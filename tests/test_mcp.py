@@ -1,9 +1,17 @@
 """
 Tests for MCP endpoint (Phase 1 MVP).
 """
+import asyncio
+import json
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
+from app.config.settings import settings
 from app.main import app
+from app.mcp.schemas import MCPBatchRequest, MCPRequest
+from app.mcp.server import handle_mcp_batch_async
+from app.tools.registry import dispatch_action_async, get_async_action_handler
+from app.utils.errors import ActionNotFoundError
 
 
 client = TestClient(app)
@@ -17,6 +25,8 @@ def test_health_check():
     assert data["status"] == "ok"
     assert data["service"] == "MCP Narrations"
     assert "time" in data
+    assert data["providers"]["higgsfield"]["rate_limit"]["queued"] == 0
+    assert data["providers"]["higgsfield"]["circuit"]["state"] == "closed"
 
 
 def test_ping_action():
@@ -120,3 +130,131 @@ def test_request_id_generation():
     data = response.json()
     assert data["request_id"] is not None
     assert data["request_id"].startswith("req_")
+
+
+def test_dispatch_action_async_falls_back_to_sync_handler():
+    """Actions without an async handler run their sync handler in a thread."""
+    assert get_async_action_handler("ping") is None
+    data = asyncio.run(dispatch_action_async("ping", {"timestamp": "t"}))
+    assert data == {"message": "pong", "timestamp": "t"}
+
+
+def test_dispatch_action_async_unknown_action():
+    """Unknown actions raise ActionNotFoundError on the async path too."""
+    with pytest.raises(ActionNotFoundError):
+        asyncio.run(dispatch_action_async("unknown_action_xyz", {}))
+
+
+def test_provider_actions_have_async_handlers():
+    """Long-running provider actions are served from the event loop."""
+    for action in [
+        "higgsfield_image",
+        "higgsfield_video",
+        "elevenlabs_voice",
+        "elevenlabs_music",
+        "elevenlabs_soundfx",
+    ]:
+        assert get_async_action_handler(action) is not None
+
+
+def test_batch_runs_items_and_keeps_order():
+    """Batch returns one response per item, in request order."""
+    response = client.post(
+        "/mcp/batch",
+        json={
+            "requests": [
+                {"action": "ping", "request_id": "a"},
+                {"action": "list_tools", "request_id": "b"},
+                {"action": "storage_upload_status", "payload": {"upload_id": "missing"}, "request_id": "c"},
+            ]
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ok"
+    assert [item["request_id"] for item in data["results"]] == ["a", "b", "c"]
+    assert data["results"][0]["data"]["message"] == "pong"
+    assert data["results"][2]["status"] == "error"
+    assert data["results"][2]["error"]["code"] == "VALIDATION_ERROR"
+
+
+def test_batch_rejects_unknown_action_before_running():
+    """An invalid item rejects the whole batch up front."""
+    ran = []
+
+    async def tracking_handler(payload):
+        ran.append(payload)
+        return {"status": "completed"}
+
+    with patch.dict("app.tools.registry._async_action_registry", {"ping": tracking_handler}):
+        response = client.post(
+            "/mcp/batch",
+            json={"requests": [{"action": "ping"}, {"action": "unknown_action_xyz"}]}
+        )
+    data = response.json()
+    assert data["status"] == "error"
+    assert data["results"] == []
+    assert data["error"]["details"]["items"][0]["index"] == 1
+    assert data["error"]["details"]["items"][0]["code"] == "ACTION_NOT_FOUND"
+    assert ran == []
+
+
+def test_batch_validates_item_payloads_before_running():
+    """Each item's payload is checked like its handler would, before any item runs."""
+    ran = []
+
+    async def tracking_handler(payload):
+        ran.append(payload)
+        return {"status": "completed"}
+
+    with patch.dict("app.tools.registry._async_action_registry", {"ping": tracking_handler}):
+        response = client.post(
+            "/mcp/batch",
+            json={"requests": [
+                {"action": "ping"},
+                {"action": "elevenlabs_voice", "payload": {}},
+                {"action": "higgsfield_image", "payload": {"prompt": "A castle", "cache": "sometimes"}},
+                {"action": "pipeline_audio_stack", "payload": {"voice": {"text": "Hi"}, "mode": "turbo"}},
+            ]}
+        )
+    data = response.json()
+    assert data["status"] == "error"
+    assert [item["index"] for item in data["error"]["details"]["items"]] == [1, 2, 3]
+    assert data["error"]["details"]["items"][0]["message"] == "text is required"
+    assert ran == []
+
+
+def test_batch_streams_ndjson():
+    """stream=true yields one NDJSON line per item with its index."""
+    response = client.post(
+        "/mcp/batch",
+        json={"stream": True, "requests": [{"action": "ping"}, {"action": "ping"}]}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert all(line["status"] == "ok" for line in lines)
+
+
+def test_batch_respects_provider_concurrency():
+    """Items for the same provider never exceed the configured cap."""
+    state = {"running": 0, "peak": 0}
+
+    async def slow_handler(payload):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return {"status": "completed"}
+
+    batch = MCPBatchRequest(
+        requests=[MCPRequest(action="higgsfield_image", payload={"prompt": str(i)}) for i in range(6)]
+    )
+    with patch.dict("app.tools.registry._async_action_registry", {"higgsfield_image": slow_handler}), \
+            patch.object(settings, "HIGGSFIELD_MAX_CONCURRENCY", 2):
+        result = asyncio.run(handle_mcp_batch_async(batch))
+
+    assert result.status == "ok"
+    assert all(item.status == "ok" for item in result.results)
+    assert state["peak"] == 2
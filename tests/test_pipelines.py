@@ -1,18 +1,28 @@
 """
 Tests for pipeline handlers (Phase 3).
 """
+import asyncio
+import threading
+import time
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from fastapi.testclient import TestClient
 from app.main import app
-from app.pipelines.image_to_video import image_to_video
-from app.pipelines.audio_stack import audio_stack
+from app.pipelines.image_to_video import image_to_video, image_to_video_async
+from app.pipelines.audio_stack import audio_stack, audio_stack_async
+from app.pipelines import checkpoint as checkpoint_module
+from app.pipelines.checkpoint import PipelineCheckpoint
+from app.pipelines.resume import resume_pipeline
 from app.utils.errors import ValidationError
+from app.tools.registry import validate_action_payload
 
 
 client = TestClient(app)
 
 
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
 class TestImageToVideoPipeline:
     """Tests for image_to_video pipeline."""
     
@@ -21,8 +31,8 @@ class TestImageToVideoPipeline:
         with pytest.raises(ValidationError):
             image_to_video({})
     
-    @patch("app.pipelines.image_to_video.image.generate_image")
-    @patch("app.pipelines.image_to_video.video.generate_video")
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
+    @patch("app.pipelines.image_to_video.video.generate_video_async")
     def test_pipeline_success(self, mock_video, mock_image):
         """Test successful pipeline execution."""
         # Mock image generation
@@ -66,7 +76,7 @@ class TestImageToVideoPipeline:
         assert result["steps"][0]["name"] == "image_generation"
         assert result["steps"][1]["name"] == "video_generation"
     
-    @patch("app.pipelines.image_to_video.image.generate_image")
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
     def test_pipeline_image_failure(self, mock_image):
         """Test pipeline when image generation fails."""
         mock_image.return_value = {
@@ -110,9 +120,9 @@ class TestAudioStackPipeline:
                 "music": {}
             })
     
-    @patch("app.pipelines.audio_stack.voice.generate_voice")
-    @patch("app.pipelines.audio_stack.music.generate_music")
-    @patch("app.pipelines.audio_stack.soundfx.generate_soundfx")
+    @patch("app.pipelines.audio_stack.voice.generate_voice_async")
+    @patch("app.pipelines.audio_stack.music.generate_music_async")
+    @patch("app.pipelines.audio_stack.soundfx.generate_soundfx_async")
     def test_pipeline_all_audio_types(self, mock_soundfx, mock_music, mock_voice):
         """Test pipeline with all audio types."""
         # Mock voice
@@ -167,7 +177,7 @@ class TestAudioStackPipeline:
         assert len(result["links"]) == 3
         assert len(result["steps"]) == 3
     
-    @patch("app.pipelines.audio_stack.voice.generate_voice")
+    @patch("app.pipelines.audio_stack.voice.generate_voice_async")
     def test_pipeline_voice_only(self, mock_voice):
         """Test pipeline with only voice."""
         mock_voice.return_value = {
@@ -190,12 +200,174 @@ class TestAudioStackPipeline:
         assert len(result["steps"]) == 1
         assert result["steps"][0]["name"] == "voice_generation"
 
+    def test_invalid_mode(self):
+        """Test pipeline with an unknown execution mode."""
+        with pytest.raises(ValidationError):
+            audio_stack({"voice": {"text": "Hi"}, "mode": "turbo"})
+
+    @pytest.mark.parametrize("payload", [
+        {"voice": {"text": "Hi"}, "step_timeout": "soon"},
+        {"voice": {"text": "Hi"}, "step_timeout": -5},
+        {"voice": {"text": "Hi", "timeout": "later"}},
+        {"voice": {"text": "Hi", "timeout": 0}},
+    ])
+    def test_invalid_timeout(self, payload):
+        """Test non-numeric or non-positive timeouts are rejected up front."""
+        with pytest.raises(ValidationError):
+            validate_action_payload("pipeline_audio_stack", payload)
+        with pytest.raises(ValidationError):
+            audio_stack(payload)
+
+    def test_parallel_mode_overlaps_steps(self):
+        """Parallel mode runs steps concurrently: wall time ~ slowest step."""
+        def slow_result(kind):
+            async def generate(params):
+                await asyncio.sleep(0.2)
+                return {
+                    "job_id": f"{kind}_job",
+                    "status": "completed",
+                    "links": [{"url": f"https://example.com/{kind}.mp3", "asset_id": kind,
+                               "asset_type": kind, "provider": "elevenlabs",
+                               "created_at": "2024-01-01T00:00:00Z"}]
+                }
+            return generate
+
+        with patch("app.pipelines.audio_stack.voice.generate_voice_async", slow_result("voice")), \
+                patch("app.pipelines.audio_stack.music.generate_music_async", slow_result("music")), \
+                patch("app.pipelines.audio_stack.soundfx.generate_soundfx_async", slow_result("soundfx")):
+            started = time.monotonic()
+            result = asyncio.run(audio_stack_async({
+                "voice": {"text": "Hello"},
+                "music": {"prompt": "Strings"},
+                "soundfx": {"prompt": "Rain"},
+                "mode": "parallel"
+            }))
+            elapsed = time.monotonic() - started
+
+        assert result["status"] == "completed"
+        assert elapsed < 0.5
+        assert [link["asset_type"] for link in result["links"]] == ["voice", "music", "soundfx"]
+
+    @patch("app.pipelines.audio_stack.get_client")
+    def test_parallel_mode_returns_partial_results_on_timeout(self, mock_get_client):
+        """A step exceeding its timeout is reported; finished steps are kept."""
+        async def never_finishes(job_id, max_wait=None):
+            await asyncio.sleep(10)
+
+        mock_get_client.return_value.poll_job_async = never_finishes
+        voice_result = {
+            "job_id": "voice_job",
+            "status": "completed",
+            "links": [{"url": "https://example.com/voice.mp3", "asset_id": "v", "asset_type": "voice",
+                       "provider": "elevenlabs", "created_at": "2024-01-01T00:00:00Z"}]
+        }
+        with patch("app.pipelines.audio_stack.voice.generate_voice_async", AsyncMock(return_value=voice_result)), \
+                patch("app.pipelines.audio_stack.music.generate_music_async",
+                      AsyncMock(return_value={"job_id": "music_job", "status": "pending"})):
+            result = audio_stack({
+                "voice": {"text": "Hello"},
+                "music": {"prompt": "Strings", "timeout": 0.05},
+                "mode": "parallel"
+            })
+
+        assert result["status"] == "partial"
+        assert len(result["links"]) == 1
+        assert result["steps"][1]["status"] == "timeout"
+        assert result["steps"][1]["job_id"] == "music_job"
+        assert result["error"]["code"] == "STEP_TIMEOUT"
+
+
+class TestPipelineCheckpoints:
+    """Tests for pipeline checkpointing and resume."""
+
+    IMAGE_RESULT = {
+        "job_id": "img_job_123",
+        "status": "completed",
+        "provider": "higgsfield",
+        "links": [{
+            "url": "/assets/default/Media/image/img.png",
+            "asset_id": "img_asset_123",
+            "asset_type": "image",
+            "provider": "local",
+            "created_at": "2024-01-01T00:00:00Z"
+        }]
+    }
+
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
+    @patch("app.pipelines.image_to_video.video.generate_video_async")
+    def test_steps_are_checkpointed(self, mock_video, mock_image, data_root):
+        mock_image.return_value = self.IMAGE_RESULT
+
+        def submit_video(params):
+            params["_progress"]("submitted", provider="higgsfield", provider_job_id="vid_job_123")
+            return {"job_id": "vid_job_123", "status": "pending", "links": []}
+
+        mock_video.side_effect = submit_video
+        result = image_to_video({"prompt": "A sunset", "wait_for_completion": False})
+
+        checkpoint = PipelineCheckpoint.load("default", result["job_id"])
+        assert checkpoint.path.parent == data_root / "data" / "default" / "pipeline_runs"
+        steps = checkpoint.record["steps"]
+        assert steps["image"]["status"] == "completed"
+        assert steps["image"]["result"]["links"][0]["url"] == "/assets/default/Media/image/img.png"
+        assert steps["video"]["status"] == "pending"
+        assert steps["video"]["job_id"] == "vid_job_123"
+        assert checkpoint.record["response"]["status"] == "pending"
+
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
+    @patch("app.pipelines.image_to_video.video.generate_video_async")
+    def test_async_run_writes_checkpoints_off_the_loop(self, mock_video, mock_image):
+        mock_image.return_value = self.IMAGE_RESULT
+        mock_video.return_value = {"job_id": "vid_job_123", "status": "pending", "links": []}
+        writers = []
+        write = checkpoint_module.atomic_write_text
+
+        def recording_write(path, text):
+            writers.append(threading.current_thread())
+            write(path, text)
+
+        with patch.object(checkpoint_module, "atomic_write_text", recording_write):
+            result = asyncio.run(image_to_video_async({"prompt": "A sunset", "wait_for_completion": False}))
+
+        assert writers and threading.main_thread() not in writers
+        checkpoint = PipelineCheckpoint.load("default", result["job_id"])
+        assert checkpoint.record["steps"]["video"]["job_id"] == "vid_job_123"
+        assert checkpoint.record["response"]["status"] == "pending"
+
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
+    @patch("app.pipelines.image_to_video.video.generate_video_async")
+    def test_resume_skips_completed_steps_and_reattaches(self, mock_video, mock_image):
+        mock_image.return_value = self.IMAGE_RESULT
+        mock_video.return_value = {"job_id": "vid_job_123", "status": "pending", "links": []}
+        first = image_to_video({"prompt": "A sunset", "wait_for_completion": False})
+
+        mock_image.reset_mock()
+        mock_video.reset_mock()
+        mock_video.return_value = {
+            "job_id": "vid_job_123",
+            "status": "completed",
+            "links": [{"url": "https://example.com/video.mp4", "asset_id": "vid", "asset_type": "video"}]
+        }
+        result = resume_pipeline({"pipeline_job_id": first["job_id"]})
+
+        assert result["job_id"] == first["job_id"]
+        assert result["status"] == "completed"
+        assert len(result["links"]) == 2
+        mock_image.assert_not_called()
+        video_params = mock_video.call_args[0][0]
+        assert video_params["_resume_job_id"] == "vid_job_123"
+        assert video_params["image_url"] == "/assets/default/Media/image/img.png"
+
+    def test_resume_unknown_pipeline(self):
+        with pytest.raises(ValidationError):
+            resume_pipeline({"pipeline_job_id": "pipeline_missing"})
+
 
 class TestPipelineEndpoints:
     """Tests for pipeline MCP endpoints."""
     
-    @patch("app.pipelines.image_to_video.image.generate_image")
-    @patch("app.pipelines.image_to_video.video.generate_video")
+    @patch("app.pipelines.image_to_video.image.generate_image_async")
+    @patch("app.pipelines.image_to_video.video.generate_video_async")
     def test_pipeline_image_to_video_endpoint(self, mock_video, mock_image):
         """Test image_to_video pipeline endpoint."""
         mock_image.return_value = {
@@ -225,8 +397,8 @@ class TestPipelineEndpoints:
         assert data["action"] == "pipeline_image_to_video"
         assert data["data"]["status"] == "completed"
     
-    @patch("app.pipelines.audio_stack.voice.generate_voice")
-    @patch("app.pipelines.audio_stack.music.generate_music")
+    @patch("app.pipelines.audio_stack.voice.generate_voice_async")
+    @patch("app.pipelines.audio_stack.music.generate_music_async")
     def test_pipeline_audio_stack_endpoint(self, mock_music, mock_voice):
         """Test audio_stack pipeline endpoint."""
         mock_voice.return_value = {
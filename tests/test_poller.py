@@ -0,0 +1,163 @@
+"""
+Tests for the shared job poller.
+"""
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.tools.elevenlabs.client import ElevenLabsClient
+from app.tools.poller import JobPoller, PollSchedule, get_schedule
+from app.utils.errors import ProviderError
+
+
+def _status_sequence(*statuses):
+    calls = []
+
+    def status_fn():
+        calls.append(1)
+        index = min(len(calls), len(statuses)) - 1
+        return {"status": statuses[index]}
+
+    return status_fn, calls
+
+
+def test_schedule_backs_off_to_ceiling():
+    schedule = PollSchedule(initial_interval=1.0, max_interval=4.0, backoff_factor=2.0)
+    assert schedule.next_interval(1.0) == 2.0
+    assert schedule.next_interval(2.0) == 4.0
+    assert schedule.next_interval(4.0) == 4.0
+
+
+def test_schedule_reads_provider_settings():
+    with patch.object(settings, "HIGGSFIELD_POLL_MAX_INTERVAL", 42.0):
+        assert get_schedule("higgsfield").max_interval == 42.0
+
+
+def test_wait_resolves_multiple_jobs():
+    poller = JobPoller(max_workers=2)
+    status_a, calls_a = _status_sequence("pending", "completed")
+    status_b, calls_b = _status_sequence("failed")
+    try:
+        future_a = poller.watch("higgsfield", "a", status_a, {"completed", "failed"}, poll_interval=0.01)
+        future_b = poller.watch("higgsfield", "b", status_b, {"completed", "failed"}, poll_interval=0.01)
+        assert future_a.result(timeout=2)["status"] == "completed"
+        assert future_b.result(timeout=2)["status"] == "failed"
+    finally:
+        poller.stop()
+    assert len(calls_a) == 2
+    assert len(calls_b) == 1
+    assert poller.pending() == {}
+
+
+def test_duplicate_watchers_share_polls():
+    poller = JobPoller()
+    status_fn, calls = _status_sequence("pending", "pending", "completed")
+    try:
+        first = poller.watch("elevenlabs", "job", status_fn, {"completed"}, poll_interval=0.01)
+        second = poller.watch("elevenlabs", "job", status_fn, {"completed"}, poll_interval=0.01)
+        assert first.result(timeout=2) == second.result(timeout=2)
+    finally:
+        poller.stop()
+    assert len(calls) == 3
+
+
+def test_wait_timeout_returns_last_status():
+    poller = JobPoller()
+    status_fn, _ = _status_sequence("processing")
+    try:
+        result = poller.wait("higgsfield", "slow", status_fn, {"completed"}, max_wait=0.05, poll_interval=0.01)
+    finally:
+        poller.stop()
+    assert result["status"] == "processing"
+    assert poller.pending() == {}
+
+
+def test_status_error_is_raised_to_waiter():
+    poller = JobPoller()
+
+    def failing_status():
+        raise ProviderError(provider="higgsfield", message="boom", retryable=False)
+
+    try:
+        with pytest.raises(ProviderError):
+            poller.wait("higgsfield", "bad", failing_status, {"completed"}, max_wait=2)
+    finally:
+        poller.stop()
+
+
+def test_wait_async_does_not_block_loop():
+    poller = JobPoller()
+    status_fn, _ = _status_sequence("pending", "pending", "completed")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        result = await poller.wait_async("higgsfield", "job", status_fn, {"completed"}, poll_interval=0.02)
+        task.cancel()
+        return result, ticks
+
+    try:
+        result, ticks = asyncio.run(scenario())
+    finally:
+        poller.stop()
+    assert result["status"] == "completed"
+    assert ticks > 1
+
+
+def test_slow_status_call_does_not_hold_back_other_jobs():
+    poller = JobPoller(max_workers=2)
+    release = threading.Event()
+
+    def slow_status():
+        release.wait(timeout=5)
+        return {"status": "completed"}
+
+    fast_status, _ = _status_sequence("completed")
+    try:
+        slow = poller.watch("higgsfield", "slow", slow_status, {"completed"}, poll_interval=0.01)
+        fast = poller.watch("higgsfield", "fast", fast_status, {"completed"}, poll_interval=0.01)
+        assert fast.result(timeout=2)["status"] == "completed"
+        assert not slow.done()
+        release.set()
+        assert slow.result(timeout=2)["status"] == "completed"
+    finally:
+        release.set()
+        poller.stop()
+
+
+def test_wait_async_runs_async_status_on_caller_loop():
+    poller = JobPoller()
+    statuses = iter(["pending", "completed"])
+    loops = []
+
+    async def status_fn():
+        loops.append(asyncio.get_running_loop())
+        return {"status": next(statuses)}
+
+    async def scenario():
+        result = await poller.wait_async("elevenlabs", "job", status_fn, {"completed"}, poll_interval=0.01)
+        return result, asyncio.get_running_loop()
+
+    try:
+        result, loop = asyncio.run(scenario())
+    finally:
+        poller.stop()
+    assert result["status"] == "completed"
+    assert loops == [loop, loop]
+
+
+def test_polling_interval_setting_fixes_client_interval():
+    with patch.object(settings, "ELEVENLABS_POLLING_INTERVAL", 2.0), \
+            patch("app.tools.elevenlabs.client.get_poller") as mock_get_poller:
+        ElevenLabsClient().poll_job("job")
+        ElevenLabsClient().poll_job("job", poll_interval=0.5)
+    intervals = [call.kwargs["poll_interval"] for call in mock_get_poller.return_value.wait.call_args_list]
+    assert intervals == [2.0, 0.5]
@@ -0,0 +1,132 @@
+"""
+Tests for project media storage and its manifest index.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import threading
+import httpx
+import pytest
+from unittest.mock import patch
+from fastapi import UploadFile
+from app.config.settings import settings
+from app.utils.blob_store import get_blob_store
+from app.utils.project_media import (
+    MediaTooLargeError,
+    delete_project_media,
+    get_project_media_dir,
+    get_project_media_index,
+    list_project_media,
+    save_project_audio_url,
+    save_project_n1_character_image_upload,
+    save_project_n1_motif_audio_upload,
+)
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+def _upload(content, filename="face.png"):
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+class TestMediaIndex:
+    """Tests for index allocation, listing and deletion."""
+
+    def test_concurrent_uploads_get_distinct_indices(self):
+        results = []
+
+        def upload(i):
+            results.append(asyncio.run(
+                save_project_n1_character_image_upload("demo", 1, _upload(f"image {i}".encode()))
+            ))
+
+        threads = [threading.Thread(target=upload, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        filenames = sorted(result["filename"] for result in results)
+        assert filenames == [f"N1_char_01_image_{i:02d}.png" for i in range(1, 9)]
+        entries = list_project_media("demo", kind="character_image", owner={"character": 1})
+        assert [entry["sequence"] for entry in entries] == list(range(1, 9))
+        assert entries[0]["size"] == len(b"image 0")
+
+    def test_worker_processes_never_share_a_sequence(self):
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        def allocate():
+            index = get_project_media_index("demo")
+            for _ in range(5):
+                results.put(index.allocate("pix", "N1_char_01_image_"))
+
+        workers = [context.Process(target=allocate) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert sorted(results.get(timeout=5) for _ in range(20)) == list(range(1, 21))
+
+    def test_existing_files_are_indexed_on_first_use(self):
+        pix = get_project_media_dir("demo", "pix")
+        (pix / "N1_char_02_image_05.png").write_bytes(b"old")
+
+        result = asyncio.run(save_project_n1_character_image_upload("demo", 2, _upload(b"new")))
+
+        assert result["filename"] == "N1_char_02_image_06.png"
+        assert len(list_project_media("demo", category="pix")) == 2
+
+    def test_delete_checks_owner(self):
+        result = asyncio.run(save_project_n1_character_image_upload("demo", 3, _upload(b"img")))
+
+        with pytest.raises(ValueError):
+            delete_project_media("demo", "pix", result["filename"], kind="character_image", owner={"character": 4})
+        assert delete_project_media("demo", "pix", result["filename"], kind="character_image", owner={"character": 3})
+        assert list_project_media("demo") == []
+        assert get_blob_store().lookup(f"demo/pix/{result['filename']}") is None
+        assert not delete_project_media("demo", "pix", result["filename"], kind="character_image", owner={"character": 3})
+
+
+class TestStreamingUploads:
+    """Tests for chunked uploads."""
+
+    def test_upload_is_streamed_and_hashed(self):
+        content = b"x" * 10_000
+        with patch.object(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 1024):
+            result = asyncio.run(save_project_n1_motif_audio_upload("demo", 1, _upload(content, "theme.mp3")))
+
+        entry = list_project_media("demo", kind="motif_audio")[0]
+        assert result["filename"] == "N1_motif_01_audio_01.mp3"
+        assert entry["sha256"] == hashlib.sha256(content).hexdigest()
+        assert entry["size"] == len(content)
+
+    def test_oversized_upload_is_rejected(self):
+        with patch.object(settings, "MEDIA_UPLOAD_MAX_BYTES", 4096), \
+                patch.object(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 1024):
+            with pytest.raises(MediaTooLargeError):
+                asyncio.run(save_project_n1_motif_audio_upload("demo", 1, _upload(b"x" * 5000, "theme.mp3")))
+
+        assert list(get_project_media_dir("demo", "pix").iterdir()) == []
+        assert list_project_media("demo") == []
+
+    def test_url_import_is_streamed_hashed_and_capped(self):
+        content = b"y" * 10_000
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=content, headers={"content-type": "audio/mpeg"})
+        )
+        with patch("app.utils.project_media.get_download_client", return_value=httpx.Client(transport=transport)):
+            result = save_project_audio_url("demo", "https://example.com/theme")
+            entry = list_project_media("demo", category="music")[0]
+            assert result["filename"] == "demo_N0_audio_01.mp3"
+            assert entry["sha256"] == hashlib.sha256(content).hexdigest()
+            assert entry["size"] == len(content)
+
+            with patch.object(settings, "MEDIA_UPLOAD_MAX_BYTES", 4096):
+                with pytest.raises(MediaTooLargeError):
+                    save_project_audio_url("demo", "https://example.com/theme")
+        assert len(list_project_media("demo", category="music")) == 1
+        assert [p.name for p in get_project_media_dir("demo", "music").iterdir()] == ["demo_N0_audio_01.mp3"]
@@ -0,0 +1,176 @@
+"""
+Tests for project strata storage and its in-process cache.
+"""
+import json
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.utils import project_storage
+from app.utils.project_storage import get_strata_path, read_strata, write_strata
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+class TestStrataCache:
+    """Tests for read_strata caching."""
+
+    def test_repeated_reads_parse_once(self):
+        write_strata("demo", "n0", {"title": "Intro"})
+        project_storage.clear_strata_cache()
+        with patch.object(project_storage, "_read_json", wraps=project_storage._read_json) as read_json:
+            for _ in range(3):
+                assert read_strata("demo", "n0")["data"] == {"title": "Intro"}
+        assert read_json.call_count == 1
+
+    def test_write_refreshes_cache_without_reparse(self):
+        write_strata("demo", "n1", {"characters": ("a", "b")})
+        with patch.object(project_storage, "_read_json") as read_json:
+            state = read_strata("demo", "n1")
+        read_json.assert_not_called()
+        # Same shape as a reader parsing the file
+        assert state["data"]["characters"] == ["a", "b"]
+
+    def test_returned_state_is_a_copy(self):
+        write_strata("demo", "n0", {"nested": {"value": 1}})
+        state = read_strata("demo", "n0")
+        state["data"]["nested"]["value"] = 2
+        assert read_strata("demo", "n0")["data"]["nested"]["value"] == 1
+
+    def test_external_edit_is_picked_up(self):
+        write_strata("demo", "n0", {"title": "Intro"})
+        path = get_strata_path("demo", "n0")
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        payload["data"]["title"] = "Edited by hand"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        assert read_strata("demo", "n0")["data"]["title"] == "Edited by hand"
+
+    def test_missing_strata_raises(self):
+        with pytest.raises(FileNotFoundError):
+            read_strata("demo", "n2")
+
+
+class TestStrataJournal:
+    """Tests for writer patches appended to the strata journal."""
+
+    def test_patch_is_appended_not_rewritten(self):
+        from app.narration_agent.narration.state_merger import merge_target_patch
+
+        write_strata("demo", "n1", {"characters": {"main": [{"name": "Ana"}]}})
+        path = get_strata_path("demo", "n1")
+        snapshot = path.read_bytes()
+        assert read_strata("demo", "n1")["data"]["characters"]["main"][0] == {"name": "Ana"}
+
+        result = merge_target_patch("demo", "n1.characters.main[0]", {"role": "hero"})
+        assert result["seq"] == 1
+        assert path.read_bytes() == snapshot
+        journal = project_storage.get_strata_journal_path("demo", "n1").read_text(encoding="utf-8")
+        assert json.loads(journal)["target_path"] == "n1.characters.main[0]"
+        assert read_strata("demo", "n1")["data"]["characters"]["main"][0] == {"name": "Ana", "role": "hero"}
+
+        # Another process (empty cache) replays the journal
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n1")["data"]["characters"]["main"][0]["role"] == "hero"
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        write_strata("demo", "n0", {"title": ""})
+        with patch.object(settings, "STRATA_JOURNAL_MAX_ENTRIES", 3):
+            for i in range(3):
+                project_storage.append_strata_patch("demo", "n0", "n0.title", f"v{i}")
+        snapshot = json.loads(get_strata_path("demo", "n0").read_text(encoding="utf-8"))
+        assert snapshot["data"]["title"] == "v2"
+        assert snapshot["journal_seq"] == 3
+        assert not project_storage.get_strata_journal_path("demo", "n0").exists()
+        archive = get_strata_path("demo", "n0").with_name("demo_N0.journal.archive.jsonl")
+        assert len(archive.read_text(encoding="utf-8").splitlines()) == 3
+
+        # Sequence numbers keep growing after compaction
+        assert project_storage.append_strata_patch("demo", "n0", "n0.title", "v3")["seq"] == 4
+
+    def test_interrupted_compaction_does_not_replay_twice(self):
+        write_strata("demo", "n0", {"tags": []})
+        project_storage.append_strata_patch("demo", "n0", "n0.tags[0]", "a")
+        journal = project_storage.get_strata_journal_path("demo", "n0").read_bytes()
+        project_storage.compact_strata("demo", "n0")
+        # Crash between writing the snapshot and emptying the journal
+        project_storage.get_strata_journal_path("demo", "n0").write_bytes(journal)
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n0")["data"]["tags"] == ["a"]
+
+    def test_torn_append_is_dropped(self):
+        write_strata("demo", "n0", {"title": "Intro"})
+        project_storage.append_strata_patch("demo", "n0", "n0.title", "Kept")
+        journal_path = project_storage.get_strata_journal_path("demo", "n0")
+        with open(journal_path, "a", encoding="utf-8") as handle:
+            handle.write('{"seq": 2, "target_path": "n0.ti')
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n0")["data"]["title"] == "Kept"
+        assert project_storage.append_strata_patch("demo", "n0", "n0.title", "Next")["seq"] == 2
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n0")["data"]["title"] == "Next"
+
+    def test_full_write_supersedes_pending_patches(self):
+        write_strata("demo", "n0", {"title": "Intro"})
+        project_storage.append_strata_patch("demo", "n0", "n0.title", "Patched")
+        write_strata("demo", "n0", {"title": "Replaced"})
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n0")["data"]["title"] == "Replaced"
+        assert project_storage.append_strata_patch("demo", "n0", "n0.title", "Again")["seq"] == 2
+
+    def test_merge_returns_same_shape_without_journal(self):
+        from app.narration_agent.narration.state_merger import merge_target_patch
+
+        write_strata("demo", "n0", {"title": "Intro"})
+        journaled = merge_target_patch("demo", "n0.title", "Patched")
+        with patch.object(settings, "STRATA_JOURNAL_ENABLED", False):
+            rewritten = merge_target_patch("demo", "n0.title", "Rewritten")
+
+        assert set(rewritten) == set(journaled)
+        assert rewritten["seq"] is None
+        assert read_strata("demo", "n0")["data"]["title"] == "Rewritten"
+
+
+class TestConcurrentWrites:
+    """Tests for strata locks and atomic writes."""
+
+    def test_concurrent_read_modify_write_loses_no_update(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from app.narration_agent.narration.state_merger import merge_target_patch
+
+        write_strata("demo", "n0", {})
+        with patch.object(settings, "STRATA_JOURNAL_ENABLED", False):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda i: merge_target_patch("demo", f"n0.note_{i}", i), range(40)))
+        project_storage.clear_strata_cache()
+        assert read_strata("demo", "n0")["data"] == {f"note_{i}": i for i in range(40)}
+
+    def test_strata_lock_is_held_across_workers(self):
+        fcntl = pytest.importorskip("fcntl")
+        lock = project_storage.strata_lock("demo", "n1")
+        with lock:
+            with lock:  # re-entrant for the owning thread
+                with open(lock.path, "a+", encoding="utf-8") as other_worker:
+                    with pytest.raises(BlockingIOError):
+                        fcntl.flock(other_worker.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with open(lock.path, "a+", encoding="utf-8") as other_worker:
+            fcntl.flock(other_worker.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def test_atomic_write_replaces_without_leftovers(self, data_root):
+        target = data_root / "state.json"
+        target.write_text("old", encoding="utf-8")
+        project_storage.atomic_write_text(target, '{"new": true}')
+        assert target.read_text(encoding="utf-8") == '{"new": true}'
+        assert [p.name for p in data_root.iterdir()] == ["state.json"]
+
+    def test_reader_leaves_append_in_progress_alone(self):
+        write_strata("demo", "n0", {"title": "Intro"})
+        project_storage.append_strata_patch("demo", "n0", "n0.title", "Kept")
+        journal_path = project_storage.get_strata_journal_path("demo", "n0")
+        # Another worker is halfway through writing its entry
+        with open(journal_path, "a", encoding="utf-8") as handle:
+            handle.write('{"seq": 2, "target_path": "n0.title", ')
+        assert read_strata("demo", "n0")["data"]["title"] == "Kept"
+        assert journal_path.read_text(encoding="utf-8").endswith('"n0.title", ')
+        with open(journal_path, "a", encoding="utf-8") as handle:
+            handle.write('"patch": "Finished", "ts": "t"}\n')
+        assert read_strata("demo", "n0")["data"]["title"] == "Finished"
@@ -0,0 +1,121 @@
+"""
+Tests for the provider rate limiter.
+"""
+import asyncio
+import threading
+import time
+import httpx
+from unittest.mock import Mock, call, patch
+from app.config.settings import settings
+from app.tools.higgsfield.client import HiggsfieldClient
+from app.tools.rate_limit import ConcurrencyGate, ProviderLimiter, TokenBucket, rate_key, retry_delay
+
+
+def _response(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.example.com/images/generate")
+    return httpx.Response(status_code, headers=headers or {}, json={}, request=request)
+
+
+class TestRateLimitPrimitives:
+    """Tests for buckets, gates and retry delays."""
+
+    def test_token_bucket_smooths_bursts(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        delays = [bucket.reserve() for _ in range(4)]
+        assert delays[:2] == [0.0, 0.0]
+        assert 0.05 < delays[2] < delays[3] <= 0.2
+
+    def test_retry_delay_honors_headers(self):
+        assert retry_delay(1, _response(429, {"Retry-After": "7"})) == 7
+        assert 2 <= retry_delay(1, _response(429, {"x-ratelimit-reset-requests": "2s"})) < 3
+        with patch.object(settings, "PROVIDER_RETRY_BASE_DELAY", 1.0):
+            assert 4 <= retry_delay(3, _response(503)) <= 6
+
+    def test_rate_key(self):
+        assert rate_key("GET", "jobs/123") is None
+        assert rate_key("POST", "images/generate", {"model": "flux"}) == "flux"
+        assert rate_key("POST", "nano-banana", {"prompt": "x"}) == "nano-banana"
+
+    def test_gate_caps_threads_and_tasks(self):
+        gate = ConcurrencyGate(2)
+        peak, active, lock = [0], [0], threading.Lock()
+
+        def work():
+            gate.acquire()
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            gate.release()
+
+        async def async_work():
+            await gate.acquire_async()
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            gate.release()
+
+        async def main():
+            threads = [threading.Thread(target=work) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            await asyncio.gather(*(async_work() for _ in range(3)))
+            await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+
+        asyncio.run(main())
+        assert peak[0] == 2
+        assert gate.active == 0 and gate.queued == 0
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        gate = ConcurrencyGate(1)
+
+        async def main():
+            await gate.acquire_async()
+            waiter = asyncio.create_task(gate.acquire_async())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            gate.release()
+            await asyncio.sleep(0)
+            await asyncio.wait_for(gate.acquire_async(), 1)
+            gate.release()
+
+        asyncio.run(main())
+        assert gate.active == 0
+
+    def test_limiter_reports_queue_depth(self):
+        limiter = ProviderLimiter("test", rate=0, max_in_flight=1)
+        limiter.gate.acquire()
+        thread = threading.Thread(target=limiter.gate.acquire)
+        thread.start()
+        time.sleep(0.05)
+        assert limiter.stats()["queued"] == 1
+        limiter.gate.release()
+        thread.join(1)
+        assert limiter.stats()["in_flight"] == 1
+
+
+class TestClientRetries:
+    """Tests for client retry/backoff behaviour."""
+
+    @patch("app.tools.higgsfield.client.time.sleep")
+    @patch("httpx.Client")
+    def test_429_is_retried_after_retry_after(self, mock_client_class, mock_sleep):
+        mock_client = Mock()
+        mock_client.request.side_effect = [
+            _response(429, {"Retry-After": "3"}),
+            httpx.Response(200, json={"job_id": "job_1"}, request=httpx.Request("POST", "https://x")),
+        ]
+        mock_client_class.return_value = mock_client
+
+        client = HiggsfieldClient()
+        client.limiter = ProviderLimiter("higgsfield", rate=0, max_in_flight=2)
+        result = client.generate_image("A castle")
+
+        assert result["job_id"] == "job_1"
+        assert mock_sleep.call_args_list[0] == call(3.0)
+        assert client.limiter._paused_until > time.monotonic()
@@ -0,0 +1,142 @@
+"""
+Tests for the generation result cache.
+"""
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+from app.config.settings import settings
+from app.tools.higgsfield import image
+from app.tools.result_cache import ResultCache, cache_key
+from app.utils.errors import ValidationError
+
+
+@pytest.fixture
+def cache(tmp_path):
+    result_cache = ResultCache(store_dir=tmp_path / "result_cache", max_entries=2, max_age=60)
+    with patch.object(settings, "RESULT_CACHE_ENABLED", True), \
+            patch("app.tools.result_cache.get_result_cache", return_value=result_cache):
+        yield result_cache
+
+
+def _completed(url="https://example.com/image.png"):
+    return {"job_id": "job_1", "status": "completed", "links": [{"url": url, "asset_type": "image"}]}
+
+
+class TestCacheKey:
+    """Tests for request normalization."""
+
+    def test_equivalent_requests_share_a_key(self):
+        first = cache_key("higgsfield_image", {
+            "prompt": "A  castle at dusk ", "seed": 4, "width": 1024.0,
+            "wait_for_completion": True, "_trace": object()
+        })
+        second = cache_key("higgsfield_image", {"width": 1024, "seed": 4, "prompt": "A castle at dusk"})
+        assert first == second
+
+    def test_params_and_action_change_the_key(self):
+        base = {"prompt": "A castle", "seed": 4}
+        assert cache_key("higgsfield_image", base) != cache_key("higgsfield_image", {**base, "seed": 5})
+        assert cache_key("higgsfield_image", base) != cache_key("higgsfield_video", base)
+
+    def test_project_changes_the_key(self):
+        base = {"prompt": "A castle", "seed": 4}
+        trace = type("Trace", (), {"project": "other"})()
+        assert cache_key("higgsfield_image", base) == cache_key("higgsfield_image", {**base, "project": "default"})
+        assert cache_key("higgsfield_image", base) != cache_key("higgsfield_image", {**base, "project": "other"})
+        assert cache_key("higgsfield_image", {**base, "_trace": trace}) == cache_key(
+            "higgsfield_image", {**base, "project_name": "other"}
+        )
+
+
+class TestResultCache:
+    """Tests for storage and eviction."""
+
+    def test_entries_persist_across_instances(self, tmp_path):
+        ResultCache(store_dir=tmp_path).put("k1", "higgsfield_image", _completed())
+        assert ResultCache(store_dir=tmp_path).get("k1")["status"] == "completed"
+
+    def test_lru_and_age_eviction(self, cache):
+        cache.put("k1", "higgsfield_image", _completed())
+        cache.put("k2", "higgsfield_image", _completed())
+        cache.get("k1")
+        cache.put("k3", "higgsfield_image", _completed())
+        assert cache.get("k2") is None
+        assert cache.get("k1") is not None
+
+        cache.max_age = 0.01
+        time.sleep(0.02)
+        assert cache.get("k1") is None
+
+    def test_size_budget_evicts_least_recently_used(self, cache, tmp_path):
+        cache.max_entries, cache.max_bytes = 10, 6
+        with patch("app.tools.result_cache.get_storage_path", return_value=tmp_path):
+            for name in ("a", "b", "c"):
+                (tmp_path / f"{name}.png").write_bytes(b"png")
+                cache.put(name, "higgsfield_image", _completed(f"/assets/{name}.png"))
+                cache.get("a")
+            assert cache.get("b") is None
+            assert cache.get("a") is not None and cache.get("c") is not None
+            assert cache.stats()["bytes"] == 6
+
+    def test_missing_local_asset_invalidates_entry(self, cache, tmp_path):
+        with patch("app.tools.result_cache.get_storage_path", return_value=tmp_path):
+            asset = tmp_path / "demo" / "Media" / "image" / "img.png"
+            asset.parent.mkdir(parents=True)
+            asset.write_bytes(b"png")
+            cache.put("k1", "higgsfield_image", _completed("/assets/demo/Media/image/img.png"))
+            assert cache.get("k1") is not None
+            asset.unlink()
+            assert cache.get("k1") is None
+
+
+class TestCachedHandlers:
+    """Tests for the cache around generation handlers."""
+
+    @patch("app.tools.higgsfield.image.get_client")
+    def test_repeated_request_skips_provider(self, mock_get_client, cache):
+        mock_client = Mock()
+        mock_client.generate_image.return_value = {"url": "https://example.com/image.png"}
+        mock_get_client.return_value = mock_client
+
+        first = image.generate_image({"prompt": "A castle", "seed": 1})
+        second = image.generate_image({"prompt": "A castle", "seed": 1})
+        third = asyncio.run(image.generate_image_async({"prompt": "A castle", "seed": 1}))
+
+        assert mock_client.generate_image.call_count == 1
+        assert second["cache"] == "hit"
+        assert third["links"] == first["links"]
+
+    @patch("app.tools.higgsfield.image.get_client")
+    def test_bypass_and_refresh(self, mock_get_client, cache):
+        mock_client = Mock()
+        mock_client.generate_image.return_value = {"url": "https://example.com/image.png"}
+        mock_get_client.return_value = mock_client
+
+        image.generate_image({"prompt": "A castle", "seed": 1, "cache": "bypass"})
+        assert cache.stats()["entries"] == 0
+
+        image.generate_image({"prompt": "A castle", "seed": 1})
+        mock_client.generate_image.return_value = {"url": "https://example.com/new.png"}
+        refreshed = image.generate_image({"prompt": "A castle", "seed": 1, "cache": "refresh"})
+        cached = image.generate_image({"prompt": "A castle", "seed": 1})
+
+        assert mock_client.generate_image.call_count == 3
+        assert refreshed["links"][0]["url"] == "https://example.com/new.png"
+        assert cached["links"][0]["url"] == "https://example.com/new.png"
+
+    @patch("app.tools.higgsfield.image.get_client")
+    def test_unseeded_requests_are_new_variations(self, mock_get_client, cache):
+        mock_client = Mock()
+        mock_client.generate_image.return_value = {"url": "https://example.com/image.png"}
+        mock_get_client.return_value = mock_client
+
+        image.generate_image({"prompt": "A castle"})
+        image.generate_image({"prompt": "A castle"})
+
+        assert mock_client.generate_image.call_count == 2
+        assert cache.stats()["entries"] == 0
+
+    def test_invalid_cache_mode(self, cache):
+        with pytest.raises(ValidationError):
+            image.generate_image({"prompt": "A castle", "cache": "sometimes"})
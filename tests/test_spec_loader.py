@@ -0,0 +1,58 @@
+"""
+Tests for the narration spec registry.
+"""
+import copy
+import json
+import pytest
+from unittest.mock import patch
+from app.narration_agent.spec_loader import SpecRegistry, load_json, thaw
+
+
+@pytest.fixture
+def registry(tmp_path):
+    (tmp_path / "chat").mkdir()
+    (tmp_path / "chat" / "prompt.md").write_text("You are a narrator.", encoding="utf-8")
+    (tmp_path / "chat" / "state.json").write_text(
+        json.dumps({"core": {"steps": ["a"]}}), encoding="utf-8"
+    )
+    return SpecRegistry(tmp_path)
+
+
+class TestSpecRegistry:
+    """Tests for memoization, immutability and reload."""
+
+    def test_warm_reads_do_no_io(self, registry):
+        assert registry.preload() == 2
+        registry.text("chat/missing.md")
+        with patch.object(registry, "_read", side_effect=AssertionError("disk read")):
+            assert registry.text("chat/prompt.md") == "You are a narrator."
+            assert registry.json("chat/state.json")["core"]["steps"] == ["a"]
+            assert registry.text("chat/missing.md") == ""
+
+    def test_json_specs_are_shared_and_read_only(self, registry):
+        spec = registry.json("chat/state.json")
+        assert registry.json("chat/state.json") is spec
+        with pytest.raises(TypeError):
+            spec["core"]["steps"].append("b")
+        with pytest.raises(TypeError):
+            spec["extra"] = 1
+        # Still plain JSON for callers
+        assert json.loads(json.dumps(spec)) == {"core": {"steps": ["a"]}}
+
+    def test_thaw_and_deepcopy_give_mutable_copies(self, registry):
+        spec = registry.json("chat/state.json")
+        for mutable in (thaw(spec), copy.deepcopy(spec)):
+            mutable["core"]["steps"].append("b")
+            assert type(mutable["core"]) is dict
+        assert spec["core"]["steps"] == ["a"]
+
+    def test_clear_reloads_edited_specs(self, registry, tmp_path):
+        registry.preload()
+        (tmp_path / "chat" / "prompt.md").write_text("Edited.", encoding="utf-8")
+        assert registry.text("chat/prompt.md") == "You are a narrator."
+        registry.clear()
+        assert registry.text("chat/prompt.md") == "Edited."
+
+    def test_package_specs_load(self):
+        schema = load_json("narration/specs/state_structure_n0.json")
+        assert isinstance(schema, dict) and schema
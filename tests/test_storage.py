@@ -0,0 +1,123 @@
+"""
+Tests for streaming asset downloads.
+"""
+import hashlib
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.mcp.schemas import AssetLink
+from app.utils.errors import InternalError
+from app.utils.media_storage import process_asset_links
+from app.utils.storage import download_file
+
+
+CONTENT = bytes(range(256)) * 64
+
+
+class _InterruptedStream(httpx.SyncByteStream):
+    """Yields part of the body, then drops the connection."""
+
+    def __init__(self, data, cut):
+        self.data = data
+        self.cut = cut
+
+    def __iter__(self):
+        yield self.data[:self.cut]
+        raise httpx.ReadError("connection reset")
+
+
+@pytest.fixture
+def storage_root(tmp_path):
+    with patch.object(settings, "STORAGE_PATH", str(tmp_path)):
+        yield tmp_path
+
+
+def _serve(handler):
+    client = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return patch("app.utils.storage.get_download_client", return_value=client)
+
+
+class TestDownloadFile:
+    """Tests for download_file."""
+
+    def test_streams_to_file_with_hash(self, storage_root):
+        def handler(request):
+            return httpx.Response(200, headers={"content-type": "video/mp4"}, content=CONTENT)
+
+        with _serve(handler):
+            info = download_file("https://cdn.example.com/clip", "demo", "video", asset_id="asset_1")
+
+        assert info["filename"] == "asset_1.mp4"
+        assert info["size"] == len(CONTENT)
+        assert info["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+        assert (storage_root / "demo" / "Media" / "video" / "asset_1.mp4").read_bytes() == CONTENT
+        assert not list((storage_root / "demo" / "Media" / "video").glob(".*.part"))
+
+    def test_interrupted_transfer_resumes_with_range(self, storage_root):
+        ranges = []
+
+        def handler(request):
+            ranges.append(request.headers.get("range"))
+            if "range" not in request.headers:
+                return httpx.Response(
+                    200,
+                    headers={"content-length": str(len(CONTENT))},
+                    stream=_InterruptedStream(CONTENT, 5000)
+                )
+            start = int(request.headers["range"].split("=")[1].rstrip("-"))
+            return httpx.Response(
+                206,
+                headers={"content-range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"},
+                content=CONTENT[start:]
+            )
+
+        with _serve(handler):
+            info = download_file("https://cdn.example.com/clip.mp4", "demo", "video")
+
+        assert ranges == [None, "bytes=5000-"]
+        assert info["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+        assert (storage_root / "demo" / "Media" / "video" / info["filename"]).read_bytes() == CONTENT
+
+    def test_max_size_rejects_and_cleans_up(self, storage_root):
+        def handler(request):
+            return httpx.Response(200, content=CONTENT)
+
+        with _serve(handler):
+            with pytest.raises(InternalError):
+                download_file("https://cdn.example.com/clip.mp4", "demo", "video", max_bytes=1000)
+
+        assert list((storage_root / "demo" / "Media" / "video").iterdir()) == []
+
+
+class TestProcessAssetLinks:
+    """Tests for concurrent asset post-processing."""
+
+    @patch("app.utils.media_storage.download_and_store_asset")
+    def test_links_processed_concurrently_in_order(self, mock_store):
+        def store(provider_url, project_name, asset_type, asset_id, created_at):
+            time.sleep(0.2)
+            if asset_id == "a2":
+                return None
+            return AssetLink(
+                url=f"/assets/demo/Media/image/{asset_id}.png",
+                asset_id=asset_id,
+                asset_type=asset_type,
+                provider="local",
+                created_at=created_at
+            )
+
+        mock_store.side_effect = store
+        links = [
+            {"url": f"https://example.com/{i}.png", "asset_id": f"a{i}", "asset_type": "image", "provider": "higgsfield"}
+            for i in range(4)
+        ]
+        start = time.monotonic()
+        processed = process_asset_links(links, "demo", "image", "2026-01-01T00:00:00Z")
+
+        assert time.monotonic() - start < 0.6
+        assert [link["asset_id"] for link in processed] == ["a0", "a1", "a2", "a3"]
+        assert processed[0]["url"] == "/assets/demo/Media/image/a0.png"
+        # Failed link falls back to the provider URL
+        assert processed[2]["url"] == "https://example.com/2.png"
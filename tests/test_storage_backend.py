@@ -0,0 +1,109 @@
+"""
+Tests for the pluggable project state backends (file layout and SQLite).
+"""
+import pytest
+from unittest.mock import patch
+from app.config.settings import settings
+from app.narration_agent.chat.chat_memory_store import ChatMemoryStore
+from app.utils.project_storage import (
+    append_strata_patch,
+    create_project,
+    delete_project,
+    list_projects,
+    read_strata,
+    read_ui_strata,
+    write_strata,
+    write_ui_strata,
+)
+from app.utils.storage_backend import (
+    FileBackend,
+    SQLiteBackend,
+    get_storage_backend,
+)
+from app.utils.storage_tools import migrate_storage
+
+
+pytestmark = pytest.mark.usefixtures("data_root")
+
+
+@pytest.fixture
+def sqlite_backend():
+    with patch.object(settings, "STORAGE_BACKEND", "sqlite"):
+        yield get_storage_backend()
+
+
+class TestSQLiteBackend:
+    """Tests for project state stored in SQLite."""
+
+    def test_strata_roundtrip_without_files(self, sqlite_backend, data_root):
+        create_project("demo")
+        write_strata("demo", "n0", {"title": "Intro"})
+        write_ui_strata("demo", "n0", {"title": "Intro (UI)"})
+
+        assert read_strata("demo", "n0")["data"] == {"title": "Intro"}
+        assert read_ui_strata("demo", "n0")["data"] == {"title": "Intro (UI)"}
+        assert not (data_root / "data" / "demo" / "metadata" / "demo_N0.json").exists()
+        assert sqlite_backend.path.exists()
+        with pytest.raises(ValueError):
+            create_project("demo")
+
+    def test_patches_are_transactional_and_journaled(self, sqlite_backend):
+        write_strata("demo", "n1", {"characters": {"main": []}})
+        append_strata_patch("demo", "n1", "n1.characters.main[0]", {"name": "Ana"})
+        result = append_strata_patch("demo", "n1", "n1.characters.main[0]", {"role": "hero"})
+
+        assert result["seq"] == 2
+        assert read_strata("demo", "n1")["data"]["characters"]["main"] == [{"name": "Ana", "role": "hero"}]
+        assert [entry["seq"] for entry in sqlite_backend.journal("demo", "n1")] == [1, 2]
+        with pytest.raises(FileNotFoundError):
+            append_strata_patch("demo", "n2", "n2.title", "x")
+
+    def test_projects_listing_and_deletion(self, sqlite_backend):
+        write_strata("alpha", "n0", {})
+        write_strata("beta", "n0", {})
+        assert [project["project_id"] for project in list_projects()] == ["alpha", "beta"]
+
+        delete_project("alpha")
+        assert [project["project_id"] for project in list_projects()] == ["beta"]
+        with pytest.raises(FileNotFoundError):
+            read_strata("alpha", "n0")
+
+    def test_chat_memory(self, sqlite_backend):
+        store = ChatMemoryStore()
+        store.save_messages("demo", "s1", [{"role": "user", "content": "hello"}])
+        store.save_meta("demo", "s1", {"mode": "edit"})
+        store.save_state_snapshot("demo", "s1", {"core": {}})
+
+        assert store.load_messages("demo", "s1") == [{"role": "user", "content": "hello"}]
+        assert store.load_meta("demo", "s1") == {"mode": "edit"}
+        assert store.load_state_snapshot("demo", "s1") == {"core": {}}
+        assert sqlite_backend.list_keys("demo", "chat_state") == ["s1"]
+
+
+class TestMigration:
+    """Tests for the file -> SQLite migration."""
+
+    def test_migrates_every_document(self, tmp_path):
+        write_strata("demo", "n0", {"title": "Intro"})
+        append_strata_patch("demo", "n0", "n0.title", "Patched")
+        write_ui_strata("demo", "n0", {"title": "UI"})
+        store = ChatMemoryStore()
+        store.save_messages("demo", "s1", [{"role": "user", "content": "hi"}])
+        store.save_output_state_snapshot("demo", "s1", {"done": True})
+        store.save_edit_messages("demo", "e1", [{"role": "user", "content": "edit"}])
+
+        target = SQLiteBackend(tmp_path / "state.sqlite3")
+        try:
+            result = migrate_storage(FileBackend(), target)
+            assert result["projects"] == 1
+            assert result["by_kind"]["strata"] == 1
+            assert result["by_kind"]["chat_session"] == 1
+            assert result["by_kind"]["chat_output_state"] == 1
+            assert result["by_kind"]["chat_edit"] == 1
+            # The pending journal is folded into the migrated strata
+            assert target.get("demo", "strata", "n0")["data"]["title"] == "Patched"
+            assert target.get("demo", "ui_strata", "n0")["data"]["title"] == "UI"
+            assert result["by_kind"]["chat_messages"] == 1
+            assert target.read_log("demo", "chat_messages", "s1") == [{"role": "user", "content": "hi"}]
+        finally:
+            target.close()